@@ -2,6 +2,8 @@
 bedrock-ez-search: Simple semantic search using Amazon Bedrock embeddings
 """
 
+from .ann import IVFIndex
+from .cache import EmbeddingCache, FileEmbeddingStore
 from .search import SemanticSearch
 
-__all__ = ["SemanticSearch"]
+__all__ = ["SemanticSearch", "IVFIndex", "EmbeddingCache", "FileEmbeddingStore"]
@@ -0,0 +1,184 @@
+"""
+Approximate nearest neighbor search over unit-length embeddings
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Rows scored against the centroids at a time when assigning vectors to lists
+ASSIGN_BLOCK_ROWS = 16384
+
+
+class IVFIndex:
+    """
+    An inverted file (IVF) index for approximate cosine similarity search.
+
+    Vectors are grouped under the nearest of n_lists centroids learned with
+    spherical k-means. A query is compared with the centroids first and then only
+    with the vectors in its n_probe closest lists, so a search reads roughly
+    n_probe / n_lists of the corpus. Increase n_probe for better recall.
+    """
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        sample_per_list: int = 64,
+        seed: int = 0,
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            n_lists: Number of lists (defaults to 4 * sqrt(number of vectors))
+            n_probe: Number of lists scanned per query
+            n_iter: Number of k-means iterations
+            sample_per_list: Vectors sampled per list to train the centroids
+            seed: Random seed for the centroid training
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.sample_per_list = sample_per_list
+        self.seed = seed
+
+        self.centroids = None
+        self._list_ids = None
+        self._list_offsets = None
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Index of the closest centroid for each vector."""
+        return np.concatenate(
+            [
+                np.argmax(
+                    np.asarray(vectors[i : i + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+                    @ self.centroids.T,
+                    axis=1,
+                )
+                for i in range(0, len(vectors), ASSIGN_BLOCK_ROWS)
+            ]
+        )
+
+    def fit(self, vectors: np.ndarray) -> "IVFIndex":
+        """
+        Train the centroids and assign every vector to a list.
+
+        Args:
+            vectors: Unit-length vectors, one per row
+
+        Returns:
+            The fitted index
+        """
+        n = len(vectors)
+        if n == 0:
+            raise ValueError("Cannot build an IVF index without vectors.")
+        n_lists = min(self.n_lists or max(1, int(4 * np.sqrt(n))), n)
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, n_lists * self.sample_per_list)
+        sample_ids = np.sort(rng.choice(n, sample_size, replace=False))
+        sample = np.asarray(vectors[sample_ids], dtype=np.float32)
+
+        self.centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignment = self._assign(sample)
+            order = np.argsort(assignment, kind="stable")
+            lists, starts = np.unique(assignment[order], return_index=True)
+            ends = np.append(starts[1:], len(order))
+            # Summing contiguous slices is much faster than np.add.reduceat on rows
+            grouped = sample[order]
+            sums = np.stack([grouped[start:end].sum(axis=0) for start, end in zip(starts, ends)])
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Lists that lost all their vectors keep their previous centroid
+            self.centroids[lists] = sums / np.where(norms == 0, 1, norms)
+
+        assignment = self._assign(vectors)
+        self._list_ids = np.argsort(assignment, kind="stable")
+        self._list_offsets = np.searchsorted(
+            assignment[self._list_ids], np.arange(n_lists + 1)
+        )
+        return self
+
+    def is_fitted(self, n: int) -> bool:
+        """True if the index was fitted on (or loaded for) n vectors."""
+        return self._list_ids is not None and len(self._list_ids) == n
+
+    def save(self, path: str) -> None:
+        """
+        Save the fitted index to a .npz file, so large indexes are built once.
+
+        Args:
+            path: Destination file
+        """
+        if self.centroids is None:
+            raise ValueError("The IVF index has not been fitted. Call fit() first.")
+        np.savez(
+            path,
+            centroids=self.centroids,
+            list_ids=self._list_ids,
+            list_offsets=self._list_offsets,
+        )
+
+    @classmethod
+    def load(cls, path: str, n_probe: int = 8) -> "IVFIndex":
+        """
+        Load an index saved with save().
+
+        Args:
+            path: File written by save()
+            n_probe: Number of lists scanned per query
+
+        Returns:
+            The fitted index
+        """
+        with np.load(path) as data:
+            index = cls(n_lists=len(data["centroids"]), n_probe=n_probe)
+            index.centroids = data["centroids"]
+            index._list_ids = data["list_ids"]
+            index._list_offsets = data["list_offsets"]
+        return index
+
+    def search(
+        self, queries: np.ndarray, vectors: np.ndarray, top_k: int
+    ) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Find the approximate top_k vectors for each query.
+
+        Args:
+            queries: Unit-length query vectors, one per row
+            vectors: The vectors the index was fitted on
+            top_k: Number of results per query
+
+        Returns:
+            Tuple of (indices, scores) lists, one array per query sorted by decreasing score
+        """
+        if self.centroids is None:
+            raise ValueError("The IVF index has not been fitted. Call fit() first.")
+
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[
+            :, :n_probe
+        ]
+
+        indices, scores = [], []
+        for query, lists in zip(queries, probes):
+            candidates = np.concatenate(
+                [
+                    self._list_ids[self._list_offsets[i] : self._list_offsets[i + 1]]
+                    for i in lists
+                ]
+            )
+            candidates.sort()
+            candidate_scores = np.asarray(vectors[candidates], dtype=np.float32) @ query
+            k = min(top_k, len(candidates))
+            if k == 0:
+                indices.append(candidates)
+                scores.append(candidate_scores)
+                continue
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            top = top[np.argsort(-candidate_scores[top], kind="stable")]
+            indices.append(candidates[top])
+            scores.append(candidate_scores[top])
+        return indices, scores
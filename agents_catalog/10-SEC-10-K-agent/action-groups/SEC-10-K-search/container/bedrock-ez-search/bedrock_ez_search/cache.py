@@ -0,0 +1,152 @@
+"""
+Caches of query embeddings, keyed on model ID and normalized text
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share an entry."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class FileEmbeddingStore:
+    """
+    Persistent embedding store with one .npy file per entry.
+
+    Files are written to a temporary name and renamed, so the directory can be
+    shared by several processes, such as Lambda containers mounting the same
+    Amazon EFS file system.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the embeddings; created if needed
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        try:
+            return np.load(self._path(key))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+        np.save(tmp_path, embedding)
+        os.replace(tmp_path, path)
+
+
+class EmbeddingCache:
+    """
+    In-process LRU cache of query embeddings with an optional persistent tier.
+
+    Entries are keyed on (model_id, normalized text). Lookups that miss the LRU
+    are tried in the persistent store and, if found there, kept in the LRU.
+    """
+
+    def __init__(self, max_entries: int = 1024, store: Optional[FileEmbeddingStore] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of embeddings kept in memory
+            store: Optional persistent store shared across processes
+        """
+        self.max_entries = max_entries
+        self.store = store
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _store_key(key: Tuple[str, str]) -> str:
+        return hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()
+
+    def _remember(self, key: Tuple[str, str], embedding: np.ndarray) -> None:
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """
+        Return the cached embedding of text, or None.
+
+        Args:
+            model_id: The embedding model
+            text: The embedded text
+
+        Returns:
+            The embedding, or None if it is not cached
+        """
+        key = (model_id, normalize_text(text))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        if self.store is not None:
+            embedding = self.store.get(self._store_key(key))
+            if embedding is not None:
+                embedding.setflags(write=False)
+
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                return None
+            self.store_hits += 1
+            self._remember(key, embedding)
+            return embedding
+
+    def put(self, model_id: str, text: str, embedding: np.ndarray) -> None:
+        """
+        Cache the embedding of text.
+
+        Args:
+            model_id: The embedding model
+            text: The embedded text
+            embedding: Its embedding
+        """
+        key = (model_id, normalize_text(text))
+        # Cached arrays are shared by callers, so they are read-only copies
+        embedding = np.array(embedding)
+        embedding.setflags(write=False)
+        with self._lock:
+            self._remember(key, embedding)
+        if self.store is not None:
+            try:
+                self.store.put(self._store_key(key), embedding)
+            except OSError:
+                # The in-memory entry is still usable
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counts and the number of embeddings in memory."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
@@ -3,11 +3,63 @@ Core semantic search functionality using Amazon Bedrock embeddings
 """
 
 import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Union, Optional, Any
 
 import boto3
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from .ann import IVFIndex
+from .cache import EmbeddingCache
+
+# Bedrock errors that are retried with exponential backoff
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "TooManyRequestsException",
+}
+
+# Cohere embedding models accept up to 96 texts per request
+COHERE_BATCH_SIZE = 96
+
+# Query rows scored against the corpus at a time by search_many
+SEARCH_BLOCK_ROWS = 64
+
+# Document rows read at a time when computing embedding norms
+NORM_BLOCK_ROWS = 65536
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Return unit-length float32 rows, reusing the input if it is already normalized.
+
+    Pre-normalized float32 arrays (including memory-mapped ones) are not copied.
+    """
+    norms = np.concatenate(
+        [
+            np.linalg.norm(np.asarray(embeddings[i : i + NORM_BLOCK_ROWS], dtype=np.float32), axis=1)
+            for i in range(0, len(embeddings), NORM_BLOCK_ROWS)
+        ]
+    )
+    if embeddings.dtype == np.float32 and np.allclose(norms, 1, atol=1e-3):
+        return embeddings
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.where(norms == 0, 1, norms).astype(np.float32)[:, None]
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Column indices of the top_k scores in each row, sorted by decreasing score."""
+    top_k = min(top_k, scores.shape[1])
+    if top_k <= 0:
+        return np.empty((len(scores), 0), dtype=np.intp)
+    top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1)
 
 
 class SemanticSearch:
@@ -23,6 +75,10 @@ class SemanticSearch:
         model_id: str = "amazon.titan-embed-text-v1",
         region_name: Optional[str] = None,
         profile_name: Optional[str] = None,
+        max_workers: int = 1,
+        max_retries: int = 5,
+        ann_index: Optional[IVFIndex] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
     ):
         """
         Initialize the semantic search engine.
@@ -31,6 +87,14 @@ class SemanticSearch:
             model_id: The Amazon Bedrock model ID to use for embeddings
             region_name: AWS region name (uses boto3 default if None)
             profile_name: AWS profile name (uses boto3 default if None)
+            max_workers: Number of concurrent Bedrock requests when embedding
+                         documents and batches of queries
+            max_retries: Number of retries of throttled Bedrock requests
+            ann_index: Optional approximate nearest neighbor index (e.g. IVFIndex)
+                       to use instead of exact search; fitted by index() unless it
+                       was loaded for the same number of documents
+            embedding_cache: Optional cache of query embeddings, which may be
+                             shared by several SemanticSearch instances
         """
         session_kwargs = {}
         if region_name:
@@ -39,11 +103,56 @@ class SemanticSearch:
             session_kwargs["profile_name"] = profile_name
             
         session = boto3.Session(**session_kwargs)
-        self.bedrock_runtime = session.client("bedrock-runtime")
+        if max_workers > 10:
+            # The default connection pool holds 10 connections
+            self.bedrock_runtime = session.client(
+                "bedrock-runtime", config=Config(max_pool_connections=max_workers)
+            )
+        else:
+            self.bedrock_runtime = session.client("bedrock-runtime")
         self.model_id = model_id
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.ann_index = ann_index
+        self.embedding_cache = embedding_cache
         
         self._documents = []
         self._embeddings = None
+        self._normalized = None
+
+    @property
+    def _is_cohere(self) -> bool:
+        return "cohere.embed" in self.model_id
+
+    def _invoke_model(self, request_body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Invoke the embedding model, retrying throttled requests with exponential backoff.
+        
+        Args:
+            request_body: The model request
+            
+        Returns:
+            The parsed model response
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.bedrock_runtime.invoke_model(
+                    modelId=self.model_id,
+                    body=json.dumps(request_body)
+                )
+                return json.loads(response.get("body").read())
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code not in RETRYABLE_ERROR_CODES or attempt == self.max_retries:
+                    raise
+                time.sleep(min(20.0, 0.5 * 2**attempt) * random.uniform(0.5, 1.0))
+
+    def _map(self, function, items: List[Any]) -> List[Any]:
+        """Apply function to items in order, on max_workers threads."""
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(function, items))
         
     def _get_embedding(self, text: str) -> np.ndarray:
         """
@@ -55,19 +164,31 @@ class SemanticSearch:
         Returns:
             A numpy array containing the embedding vector
         """
+        if self._is_cohere:
+            return self._get_cohere_embeddings([text], input_type="search_query")[0]
+
         request_body = {
             "inputText": text
         }
         
-        response = self.bedrock_runtime.invoke_model(
-            modelId=self.model_id,
-            body=json.dumps(request_body)
-        )
-        
-        response_body = json.loads(response.get("body").read())
+        response_body = self._invoke_model(request_body)
         embedding = np.array(response_body.get("embedding"))
         
         return embedding
+
+    def _get_cohere_embeddings(self, texts: List[str], input_type: str) -> np.ndarray:
+        """
+        Get embeddings for up to COHERE_BATCH_SIZE texts in one Cohere request.
+        
+        Args:
+            texts: The texts to embed
+            input_type: "search_document" or "search_query"
+            
+        Returns:
+            A numpy array containing the embedding vectors
+        """
+        response_body = self._invoke_model({"texts": texts, "input_type": input_type})
+        return np.array(response_body.get("embeddings"))
     
     def _get_batch_embeddings(self, texts: List[str]) -> np.ndarray:
         """
@@ -79,16 +200,22 @@ class SemanticSearch:
         Returns:
             A numpy array containing the embedding vectors
         """
-        # For simplicity, we'll process one at a time
-        # In a production system, you might want to batch these calls
-        embeddings = []
-        for text in texts:
-            embedding = self._get_embedding(text)
-            embeddings.append(embedding)
-        
-        return np.vstack(embeddings)
+        if self._is_cohere:
+            batches = [
+                texts[i : i + COHERE_BATCH_SIZE]
+                for i in range(0, len(texts), COHERE_BATCH_SIZE)
+            ]
+            return np.vstack(
+                self._map(
+                    lambda batch: self._get_cohere_embeddings(batch, "search_document"),
+                    batches,
+                )
+            )
+
+        # Other models embed one text per request, so requests run on max_workers threads
+        return np.vstack(self._map(self._get_embedding, texts))
     
-    def index(self, documents: List[str], cache_path: Optional[str] = None, embeddings_file: Optional[str] = None) -> None:
+    def index(self, documents: List[str], cache_path: Optional[str] = None, embeddings_file: Optional[str] = None, mmap: bool = False) -> None:
         """
         Index a list of documents for semantic search.
         
@@ -99,6 +226,8 @@ class SemanticSearch:
             embeddings_file: Optional path to load pre-computed embeddings from a .npy file
                             If provided, embeddings will be loaded from this file instead
                             of computing them via the Bedrock API
+            mmap: Memory-map embeddings_file instead of reading it; pre-normalized
+                  float32 files are then searched without loading them into memory
                             
         Raises:
             ValueError: If the number of embeddings loaded from file doesn't match
@@ -108,7 +237,10 @@ class SemanticSearch:
         
         # Load embeddings from file if embeddings_file is provided
         if embeddings_file is not None:
-            loaded_embeddings = np.load(embeddings_file)
+            if mmap:
+                loaded_embeddings = np.load(embeddings_file, mmap_mode="r")
+            else:
+                loaded_embeddings = np.load(embeddings_file)
             
             # Validate that the number of embeddings matches the number of documents
             if len(loaded_embeddings) != len(documents):
@@ -125,7 +257,97 @@ class SemanticSearch:
         # Save embeddings to file if cache_path is provided
         if cache_path is not None:
             np.save(cache_path, self._embeddings)
+
+        # Searches score unit-length vectors with a single dot product
+        self._normalized = _normalize(self._embeddings)
+        # A loaded index that matches the documents is used as is
+        if self.ann_index is not None and not self.ann_index.is_fitted(len(documents)):
+            self.ann_index.fit(self._normalized)
     
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Get unit-length embeddings for search queries, using the embedding cache if set.
+        
+        Args:
+            queries: The search queries
+            
+        Returns:
+            A float32 numpy array with one unit-length embedding per query
+        """
+        if self.embedding_cache is None:
+            return _normalize(np.vstack(self._map(self._get_embedding, queries)))
+
+        embeddings = [self.embedding_cache.get(self.model_id, query) for query in queries]
+        missing = list(dict.fromkeys(
+            query for query, embedding in zip(queries, embeddings) if embedding is None
+        ))
+        computed = dict(zip(missing, self._map(self._get_embedding, missing)))
+        for query, embedding in computed.items():
+            self.embedding_cache.put(self.model_id, query, embedding)
+        embeddings = [
+            computed[query] if embedding is None else embedding
+            for query, embedding in zip(queries, embeddings)
+        ]
+        return _normalize(np.vstack(embeddings))
+
+    def search_embeddings(self, query_embeddings: np.ndarray, top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search the indexed documents with unit-length query embeddings.
+        
+        Args:
+            query_embeddings: Unit-length query embeddings, one per row
+            top_k: Number of top results to return per query
+            
+        Returns:
+            One list of dictionaries containing document text and similarity score per query
+        """
+        if self._normalized is None or len(self._documents) == 0:
+            raise ValueError("No documents have been indexed. Call index() first.")
+
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32).reshape(
+            -1, self._normalized.shape[1]
+        )
+        if self.ann_index is not None:
+            indices, scores = self.ann_index.search(query_embeddings, self._normalized, top_k)
+        else:
+            indices, scores = [], []
+            for i in range(0, len(query_embeddings), SEARCH_BLOCK_ROWS):
+                block_scores = query_embeddings[i : i + SEARCH_BLOCK_ROWS] @ self._normalized.T
+                block_indices = _top_k(block_scores, top_k)
+                indices.extend(block_indices)
+                scores.extend(np.take_along_axis(block_scores, block_indices, axis=1))
+
+        return [
+            [
+                {
+                    "document": self._documents[idx],
+                    "score": float(score),
+                    "index": int(idx)
+                }
+                for idx, score in zip(query_indices, query_scores)
+            ]
+            for query_indices, query_scores in zip(indices, scores)
+        ]
+
+    def search_many(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search the indexed documents for several queries at once.
+        
+        The queries are embedded on max_workers threads and scored together.
+        
+        Args:
+            queries: The search queries
+            top_k: Number of top results to return per query
+            
+        Returns:
+            One list of dictionaries containing document text and similarity score per query
+        """
+        if self._normalized is None or len(self._documents) == 0:
+            raise ValueError("No documents have been indexed. Call index() first.")
+        if not queries:
+            return []
+        return self.search_embeddings(self.embed_queries(queries), top_k=top_k)
+
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Search the indexed documents for semantic matches to the query.
@@ -137,28 +359,4 @@ class SemanticSearch:
         Returns:
             List of dictionaries containing document text and similarity score
         """
-        if self._embeddings is None or len(self._documents) == 0:
-            raise ValueError("No documents have been indexed. Call index() first.")
-        
-        # Get query embedding
-        query_embedding = self._get_embedding(query)
-        
-        # Calculate cosine similarities
-        similarities = cosine_similarity(
-            query_embedding.reshape(1, -1), 
-            self._embeddings
-        )[0]
-        
-        # Get top-k indices
-        top_indices = np.argsort(similarities)[::-1][:top_k]
-        
-        # Prepare results
-        results = []
-        for idx in top_indices:
-            results.append({
-                "document": self._documents[idx],
-                "score": float(similarities[idx]),
-                "index": int(idx)
-            })
-        
-        return results
+        return self.search_many([query], top_k=top_k)[0]
@@ -0,0 +1,94 @@
+"""
+Benchmark exact and IVF search at several corpus sizes
+
+Uses synthetic clustered embeddings, so no Bedrock calls are made. Example:
+
+    python benchmarks/benchmark_search.py --sizes 10000 100000 1000000 --dim 1024
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from bedrock_ez_search import IVFIndex, SemanticSearch
+
+BLOCK_ROWS = 65536
+
+
+def write_embeddings(path: str, n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Write n unit-length clustered embeddings to a .npy file; returns the cluster centers."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 100), dim)).astype(np.float32)
+    embeddings = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, dim))
+    for i in range(0, n, BLOCK_ROWS):
+        rows = min(BLOCK_ROWS, n - i)
+        block = centers[rng.integers(len(centers), size=rows)]
+        block += rng.normal(scale=0.5, size=block.shape).astype(np.float32)
+        embeddings[i : i + rows] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    embeddings.flush()
+    return centers
+
+
+def timed(function, repeat: int = 1):
+    """Return the result of the last call and the median duration in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def benchmark(n: int, dim: int, n_queries: int, top_k: int, n_probe: int, directory: str) -> None:
+    path = os.path.join(directory, f"embeddings_{n}.npy")
+    write_embeddings(path, n, dim)
+    documents = [f"Document {i}" for i in range(n)]
+    rng = np.random.default_rng(1)
+    corpus = np.load(path, mmap_mode="r")
+    queries = np.asarray(corpus[np.sort(rng.choice(n, n_queries, replace=False))])
+    queries += rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = SemanticSearch(region_name="us-east-1")
+    _, index_ms = timed(lambda: exact.index(documents, embeddings_file=path, mmap=True))
+    _, single_ms = timed(lambda: exact.search_embeddings(queries[:1], top_k=top_k), repeat=10)
+    expected, batch_ms = timed(lambda: exact.search_embeddings(queries, top_k=top_k))
+    print(
+        f"n={n:>9,} exact  index {index_ms:9.1f} ms | 1 query {single_ms:8.2f} ms"
+        f" | {n_queries} queries {batch_ms:9.1f} ms"
+    )
+
+    ivf = SemanticSearch(region_name="us-east-1", ann_index=IVFIndex(n_probe=n_probe))
+    _, index_ms = timed(lambda: ivf.index(documents, embeddings_file=path, mmap=True))
+    _, single_ms = timed(lambda: ivf.search_embeddings(queries[:1], top_k=top_k), repeat=10)
+    results, batch_ms = timed(lambda: ivf.search_embeddings(queries, top_k=top_k))
+    recall = statistics.mean(
+        len({r["index"] for r in got} & {r["index"] for r in want}) / len(want)
+        for got, want in zip(results, expected)
+    )
+    print(
+        f"n={n:>9,} ivf    index {index_ms:9.1f} ms | 1 query {single_ms:8.2f} ms"
+        f" | {n_queries} queries {batch_ms:9.1f} ms | recall@{top_k} {recall:.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=1024, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per batch")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, default=8, help="IVF lists scanned per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.sizes:
+            benchmark(n, args.dim, args.queries, args.top_k, args.n_probe, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,14 @@
 Tests for the SemanticSearch class
 """
 
+import json
 import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import numpy as np
 
-from bedrock_ez_search import SemanticSearch
+from bedrock_ez_search import EmbeddingCache, FileEmbeddingStore, IVFIndex, SemanticSearch
 
 
 class TestSemanticSearch(unittest.TestCase):
@@ -248,6 +250,278 @@ class TestSemanticSearch(unittest.TestCase):
                     self.assertEqual(args[0], "cached_embeddings.npy")
                     np.testing.assert_array_equal(args[1], mock_embeddings)
 
+    @patch('boto3.Session')
+    def test_search_scores_are_cosine_similarities(self, mock_session):
+        """Test that search scores unnormalized embeddings by cosine similarity"""
+        mock_session.return_value.client.return_value = MagicMock()
+        
+        search = SemanticSearch()
+        documents = np.array([
+            [3.0, 0.0, 0.0, 0.0],
+            [1.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 5.0, 0.0],
+        ])
+        query = np.array([2.0, 1.0, 0.0, 0.0])
+        
+        with patch.object(search, '_get_embedding') as mock_get_embedding:
+            mock_get_embedding.side_effect = list(documents)
+            search.index(["Document 1", "Document 2", "Document 3"])
+            
+            mock_get_embedding.side_effect = None
+            mock_get_embedding.return_value = query
+            results = search.search("test query", top_k=2)
+        
+        expected = documents @ query / np.linalg.norm(documents, axis=1) / np.linalg.norm(query)
+        self.assertEqual([r["index"] for r in results], [1, 0])
+        for result in results:
+            self.assertAlmostEqual(result["score"], expected[result["index"]], places=5)
+    
+    @patch('boto3.Session')
+    def test_batch_embeddings_with_thread_pool(self, mock_session):
+        """Test that parallel indexing keeps embeddings in document order"""
+        mock_session.return_value.client.return_value = MagicMock()
+        
+        search = SemanticSearch(max_workers=4)
+        documents = [f"Document {i}" for i in range(20)]
+        embeddings = {doc: np.array([float(i), 1.0, 0.0, 0.0]) for i, doc in enumerate(documents)}
+        
+        with patch.object(search, '_get_embedding', side_effect=lambda text: embeddings[text]):
+            search.index(documents)
+        
+        np.testing.assert_array_equal(search._embeddings[:, 0], np.arange(20))
+    
+    @patch('time.sleep')
+    @patch('boto3.Session')
+    def test_get_embedding_retries_throttling(self, mock_session, mock_sleep):
+        """Test that throttled Bedrock requests are retried"""
+        from botocore.exceptions import ClientError
+        
+        mock_client = MagicMock()
+        mock_session.return_value.client.return_value = mock_client
+        
+        mock_response = {
+            "body": MagicMock()
+        }
+        mock_response["body"].read.return_value = '{"embedding": [0.1, 0.2, 0.3, 0.4]}'
+        throttled = ClientError({"Error": {"Code": "ThrottlingException"}}, "InvokeModel")
+        mock_client.invoke_model.side_effect = [throttled, throttled, mock_response]
+        
+        search = SemanticSearch()
+        embedding = search._get_embedding("test text")
+        
+        np.testing.assert_array_equal(embedding, np.array([0.1, 0.2, 0.3, 0.4]))
+        self.assertEqual(mock_client.invoke_model.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+    
+    @patch('boto3.Session')
+    def test_get_embedding_does_not_retry_other_errors(self, mock_session):
+        """Test that non-throttling errors are raised immediately"""
+        from botocore.exceptions import ClientError
+        
+        mock_client = MagicMock()
+        mock_session.return_value.client.return_value = mock_client
+        mock_client.invoke_model.side_effect = ClientError(
+            {"Error": {"Code": "ValidationException"}}, "InvokeModel"
+        )
+        
+        search = SemanticSearch()
+        with self.assertRaises(ClientError):
+            search._get_embedding("test text")
+        self.assertEqual(mock_client.invoke_model.call_count, 1)
+    
+    @patch('boto3.Session')
+    def test_cohere_batch_embeddings(self, mock_session):
+        """Test that Cohere models embed documents in batches of 96"""
+        mock_client = MagicMock()
+        mock_session.return_value.client.return_value = mock_client
+        
+        def invoke_model(modelId, body):
+            texts = json.loads(body)["texts"]
+            response = {"body": MagicMock()}
+            response["body"].read.return_value = json.dumps(
+                {"embeddings": [[float(text.split()[1]), 1.0] for text in texts]}
+            )
+            return response
+        
+        mock_client.invoke_model.side_effect = invoke_model
+        
+        search = SemanticSearch(model_id="cohere.embed-english-v3", max_workers=2)
+        search.index([f"Document {i}" for i in range(100)])
+        
+        batch_sizes = sorted(
+            len(json.loads(call.kwargs["body"])["texts"])
+            for call in mock_client.invoke_model.call_args_list
+        )
+        self.assertEqual(batch_sizes, [4, 96])
+        np.testing.assert_array_equal(search._embeddings[:, 0], np.arange(100))
+    
+    @patch('boto3.Session')
+    def test_search_many(self, mock_session):
+        """Test searching for several queries at once"""
+        mock_session.return_value.client.return_value = MagicMock()
+        
+        search = SemanticSearch()
+        
+        with patch.object(search, '_get_embedding') as mock_get_embedding:
+            mock_get_embedding.side_effect = [
+                np.array([0.9, 0.1, 0.1, 0.1]),  # doc 1
+                np.array([0.1, 0.9, 0.1, 0.1]),  # doc 2
+                np.array([0.1, 0.1, 0.9, 0.1]),  # doc 3
+            ]
+            search.index(["Document 1", "Document 2", "Document 3"])
+            
+            mock_get_embedding.side_effect = [
+                np.array([0.1, 0.1, 0.9, 0.1]),  # same as doc 3
+                np.array([0.9, 0.1, 0.1, 0.1]),  # same as doc 1
+            ]
+            results = search.search_many(["query 1", "query 2"], top_k=2)
+        
+        self.assertEqual(len(results), 2)
+        self.assertEqual([len(r) for r in results], [2, 2])
+        self.assertEqual(results[0][0]["document"], "Document 3")
+        self.assertEqual(results[1][0]["document"], "Document 1")
+        self.assertAlmostEqual(results[0][0]["score"], 1.0, places=5)
+    
+    @patch('boto3.Session')
+    def test_search_many_without_index(self, mock_session):
+        """Test that searching before indexing raises an error"""
+        mock_session.return_value.client.return_value = MagicMock()
+        
+        search = SemanticSearch()
+        with self.assertRaises(ValueError):
+            search.search_many(["query"])
+
+
+class TestIVFIndex(unittest.TestCase):
+    """Test cases for the IVFIndex class"""
+    
+    def setUp(self):
+        """Set up clustered unit-length vectors"""
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(10, 16))
+        vectors = centers[rng.integers(10, size=500)] + rng.normal(scale=0.3, size=(500, 16))
+        self.vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+        self.queries = self.vectors[:20]
+    
+    def test_probing_all_lists_is_exact(self):
+        """Test that scanning every list returns the exact top-k"""
+        index = IVFIndex(n_lists=8, n_probe=8).fit(self.vectors)
+        indices, scores = index.search(self.queries, self.vectors, top_k=5)
+        
+        expected = np.argsort(-(self.queries @ self.vectors.T), axis=1, kind="stable")[:, :5]
+        for got, want, got_scores in zip(indices, expected, scores):
+            self.assertEqual(set(got), set(want))
+            self.assertTrue(np.all(np.diff(got_scores) <= 0))
+    
+    def test_semantic_search_with_ivf_index(self):
+        """Test SemanticSearch with an approximate index"""
+        with patch('boto3.Session'):
+            search = SemanticSearch(ann_index=IVFIndex(n_lists=8, n_probe=2))
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "embeddings.npy")
+            np.save(path, self.vectors)
+            search.index([f"Document {i}" for i in range(500)], embeddings_file=path, mmap=True)
+        
+            results = search.search_embeddings(self.queries[:1], top_k=3)[0]
+        
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["index"], 0)
+        self.assertAlmostEqual(results[0]["score"], 1.0, places=5)
+    
+    def test_save_and_load(self):
+        """Test that a saved index is loaded without refitting"""
+        index = IVFIndex(n_lists=8, n_probe=3).fit(self.vectors)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ivf.npz")
+            index.save(path)
+            loaded = IVFIndex.load(path, n_probe=3)
+        
+        self.assertTrue(loaded.is_fitted(500))
+        expected, _ = index.search(self.queries, self.vectors, top_k=5)
+        got, _ = loaded.search(self.queries, self.vectors, top_k=5)
+        for a, b in zip(got, expected):
+            np.testing.assert_array_equal(a, b)
+        
+        with patch('boto3.Session'):
+            search = SemanticSearch(ann_index=loaded)
+        with patch.object(loaded, 'fit') as mock_fit:
+            with patch.object(search, '_get_batch_embeddings', return_value=self.vectors):
+                search.index([f"Document {i}" for i in range(500)])
+            mock_fit.assert_not_called()
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test cases for the EmbeddingCache class"""
+    
+    def test_lookup_normalizes_text_and_counts(self):
+        """Test that lookups ignore case and whitespace and are counted"""
+        cache = EmbeddingCache()
+        self.assertIsNone(cache.get("model", "Revenue"))
+        cache.put("model", "Revenue", np.array([0.1, 0.2]))
+        
+        np.testing.assert_array_equal(cache.get("model", "  revenue "), np.array([0.1, 0.2]))
+        self.assertIsNone(cache.get("other-model", "Revenue"))
+        self.assertEqual(
+            cache.stats(), {"hits": 1, "store_hits": 0, "misses": 2, "entries": 1}
+        )
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = EmbeddingCache(max_entries=2)
+        cache.put("model", "a", np.array([1.0]))
+        cache.put("model", "b", np.array([2.0]))
+        cache.get("model", "a")
+        cache.put("model", "c", np.array([3.0]))
+        
+        self.assertIsNotNone(cache.get("model", "a"))
+        self.assertIsNone(cache.get("model", "b"))
+        self.assertIsNotNone(cache.get("model", "c"))
+    
+    def test_file_store_is_shared(self):
+        """Test that a persistent store serves entries written by another cache"""
+        with tempfile.TemporaryDirectory() as directory:
+            EmbeddingCache(store=FileEmbeddingStore(directory)).put(
+                "model", "R&D expense", np.array([0.5, 0.5])
+            )
+            cache = EmbeddingCache(store=FileEmbeddingStore(directory))
+            
+            np.testing.assert_array_equal(cache.get("model", "r&d expense"), np.array([0.5, 0.5]))
+            cache.get("model", "r&d expense")
+        
+        self.assertEqual(
+            cache.stats(), {"hits": 1, "store_hits": 1, "misses": 0, "entries": 1}
+        )
+    
+    @patch('boto3.Session')
+    def test_search_uses_cache(self, mock_session):
+        """Test that repeated queries are embedded once"""
+        mock_session.return_value.client.return_value = MagicMock()
+        
+        cache = EmbeddingCache()
+        search = SemanticSearch(embedding_cache=cache)
+        
+        with patch.object(search, '_get_embedding') as mock_get_embedding:
+            mock_get_embedding.side_effect = [
+                np.array([0.9, 0.1, 0.1, 0.1]),  # doc 1
+                np.array([0.1, 0.9, 0.1, 0.1]),  # doc 2
+            ]
+            search.index(["Document 1", "Document 2"])
+            
+            mock_get_embedding.reset_mock()
+            mock_get_embedding.side_effect = [
+                np.array([0.1, 0.9, 0.1, 0.1]),  # revenue
+                np.array([0.9, 0.1, 0.1, 0.1]),  # cost
+            ]
+            first = search.search("Revenue", top_k=1)
+            results = search.search_many(["revenue", "cost", "Revenue "], top_k=1)
+        
+        self.assertEqual(mock_get_embedding.call_count, 2)
+        self.assertEqual(first, results[0])
+        self.assertEqual([r[0]["document"] for r in results], ["Document 2", "Document 1", "Document 2"])
+        self.assertEqual(cache.stats()["hits"], 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,165 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Load-once resolver of company names and tickers to SEC registrants.
+
+Queries are resolved, in order, by an exact match on the preprocessed company
+name, an exact match on the ticker if the query is typed like one (e.g. "F"), a
+fuzzy match on the name, and finally an exact match on the ticker in any case, so
+that a name like "ford" isn't captured by the ticker FORD. The fuzzy match scores only
+the names that share the most character trigrams with the query, and falls back to
+scoring every name when none of those clears the cutoff. Recent resolutions are
+memoized.
+"""
+
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+# Names scored by the fuzzy matcher per query, and resolutions memoized per container
+SHORTLIST_SIZE = 256
+MEMO_MAX_ENTRIES = 4096
+
+# Queries typed like a ticker: short, uppercase, optionally with a class suffix
+TICKER_PATTERN = re.compile(r"[A-Z][A-Z0-9]{0,5}(?:[.-][A-Z0-9]{1,2})?")
+
+logger = logging.getLogger(__name__)
+
+
+def _trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return list({padded[i : i + 3] for i in range(len(padded) - 2)})
+
+
+class CompanyIndex:
+    """
+    Company lookups over the registrants in a cik-ref.json file.
+
+    Args:
+        company_tickers (Dict): Parsed cik-ref.json, mapping keys to
+            {"cik_str", "ticker", "title"} dictionaries
+    """
+
+    def __init__(self, company_tickers: Dict):
+        self.companies = list(company_tickers.values())
+        self.names = [utils.default_process(c.get("title", "")) for c in self.companies]
+
+        self._by_name = {}
+        self._by_ticker = {}
+        postings = defaultdict(list)
+        for i, (company, name) in enumerate(zip(self.companies, self.names)):
+            # Keep the first registrant for duplicate names, as a full scan would
+            self._by_name.setdefault(name, i)
+            if company.get("ticker"):
+                self._by_ticker.setdefault(company["ticker"].upper(), i)
+            for trigram in _trigrams(name):
+                postings[trigram].append(i)
+        self._postings = {
+            trigram: np.array(ids, dtype=np.int32) for trigram, ids in postings.items()
+        }
+
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shortlist(self, name: str) -> np.ndarray:
+        """Indices of the names sharing the most trigrams with name, in file order."""
+        postings = [self._postings[t] for t in _trigrams(name) if t in self._postings]
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+        counts = np.bincount(np.concatenate(postings), minlength=len(self.names))
+        candidates = np.flatnonzero(counts)
+        if len(candidates) > SHORTLIST_SIZE:
+            top = np.argpartition(-counts[candidates], SHORTLIST_SIZE - 1)[:SHORTLIST_SIZE]
+            candidates = np.sort(candidates[top])
+        return candidates
+
+    def _fuzzy_match(self, name: str, score_cutoff: int) -> Optional[int]:
+        candidates = self._shortlist(name)
+        match = process.extractOne(
+            name,
+            [self.names[i] for i in candidates],
+            scorer=fuzz.WRatio,
+            processor=None,
+            score_cutoff=score_cutoff,
+        )
+        if match:
+            return int(candidates[match[2]])
+
+        match = process.extractOne(
+            name, self.names, scorer=fuzz.WRatio, processor=None, score_cutoff=score_cutoff
+        )
+        return match[2] if match else None
+
+    def resolve(self, query: str, score_cutoff: int = 80) -> Optional[Dict]:
+        """
+        Find the registrant for a company name or ticker.
+
+        Args:
+            query (str): Company name or ticker
+            score_cutoff (int): Minimum fuzzy similarity score
+
+        Returns:
+            Optional[Dict]: Company information dictionary if found, None otherwise
+        """
+        key = (query, score_cutoff)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        name = utils.default_process(query)
+        ticker = query.strip().upper()
+        if name in self._by_name:
+            index = self._by_name[name]
+        elif TICKER_PATTERN.fullmatch(query.strip()) and ticker in self._by_ticker:
+            index = self._by_ticker[ticker]
+        else:
+            index = self._fuzzy_match(name, score_cutoff) if name else None
+            if index is None:
+                index = self._by_ticker.get(ticker)
+        company = self.companies[index] if index is not None else None
+
+        with self._lock:
+            self._memo[key] = company
+            while len(self._memo) > MEMO_MAX_ENTRIES:
+                self._memo.popitem(last=False)
+        return company
+
+
+_company_indexes = {}
+_company_indexes_lock = threading.Lock()
+
+
+def get_company_index(data_file: str) -> Optional[CompanyIndex]:
+    """
+    Return the container-wide index of a cik-ref.json file, loading it on first use.
+
+    Args:
+        data_file (str): Path to the JSON file containing company data
+
+    Returns:
+        Optional[CompanyIndex]: The index, or None if the file cannot be read or is empty
+
+    Raises:
+        json.JSONDecodeError: If the data_file contains invalid JSON
+    """
+    with _company_indexes_lock:
+        if data_file not in _company_indexes:
+            try:
+                # amazonq-ignore-next-line
+                with open(data_file, "r", encoding="utf-8") as f:
+                    company_tickers = json.load(f)
+            except IOError as e:
+                logger.error(f"Error opening file {data_file}: {str(e)}")
+                return None
+            _company_indexes[data_file] = (
+                CompanyIndex(company_tickers) if company_tickers else None
+            )
+        return _company_indexes[data_file]
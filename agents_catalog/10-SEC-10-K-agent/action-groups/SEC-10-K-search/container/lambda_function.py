@@ -1,17 +1,14 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from bedrock_ez_search import SemanticSearch
-
-import boto3
 import json
 import logging
 import os
 from pathlib import Path
-from rapidfuzz import process, fuzz, utils
-import re
 import requests
 from sec_edgar_api import EdgarClient
+from company_index import get_company_index
+from tag_index import PACKAGED_TAG_INDEX_DIR, get_tag_index, is_tag_index
 from typing import Dict, Optional, List
 import urllib
 import warnings
@@ -37,15 +34,12 @@ edgar = EdgarClient(
     user_agent=os.environ.get("USER_AGENT", "AWS HCLS AGENTS").strip().upper()
 )
 
-s3 = boto3.client("s3")
-s3.download_file(
-    "5d1a4b76751b4c8a994ce96bafd91ec9", "us-gaap/embeddings.npy", "/tmp/embeddings.npy"
-)
-s3.download_file(
-    "5d1a4b76751b4c8a994ce96bafd91ec9",
-    "us-gaap/descriptions.csv",
-    "/tmp/descriptions.csv",
-)
+# Load the company index and the tag index packaged into the image during
+# initialization; containers without a packaged tag index build it from S3 on the
+# first find_relevant_tags request
+if is_tag_index(PACKAGED_TAG_INDEX_DIR):
+    get_tag_index()
+get_company_index("cik-ref.json")
 
 ##############################################################################
 # Get CIK for company name
@@ -56,7 +50,10 @@ def get_cik(
     query: str, data_file: Path, score_cutoff: int = DEFAULT_SCORE_CUTOFF
 ) -> Optional[Dict]:
     """
-    Look up the SEC Central Index Key (CIK) for a given company name using fuzzy matching.
+    Look up the SEC Central Index Key (CIK) for a given company name or ticker.
+
+    Exact name and ticker matches are served from a hash map, other names by fuzzy
+    matching; the company index is built once per container.
 
     Args:
         query (str): The company name to search for
@@ -70,27 +67,11 @@ def get_cik(
         FileNotFoundError: If the data_file doesn't exist
         json.JSONDecodeError: If the data_file contains invalid JSON
     """
-    try:
-        # amazonq-ignore-next-line
-        with open(data_file, "r", encoding="utf-8") as f:
-            company_tickers = json.load(f)
-    except IOError as e:
-        logger.error(f"Error opening file {data_file}: {str(e)}")
+    company_index = get_company_index(str(data_file))
+    if company_index is None:
         return None
 
-    if not company_tickers:
-        return None
-
-    choices = [company.get("title", "") for company in company_tickers.values()]
-
-    match = process.extractOne(
-        query,
-        choices,
-        scorer=fuzz.WRatio,
-        processor=utils.default_process,
-        score_cutoff=score_cutoff,
-    )
-    return list(company_tickers.values())[match[2]] if match else None
+    return company_index.resolve(query, score_cutoff=score_cutoff)
 
 
 ##############################################################################
@@ -124,43 +105,24 @@ def get_cik(
 ##############################################################################
 
 
-def get_relevant_tags(
-    query: str,
-    top_k: int = 5,
-    index_descriptions: Path = "/tmp/descriptions.csv",
-    index_embeddings: Path = "/tmp/embeddings.npy",
-) -> Dict:
-    with open(index_descriptions, "r") as f:
-        pattern = r"^([^,]+),([^,]+),(.+)$"
-        available_facts = []
-        for line in f:
-            match = re.match(pattern, line.strip())
-            if match:
-                taxonomy, tag, description = match.groups()
-                available_facts.append(
-                    {
-                        "taxonomy": taxonomy,
-                        "tag": tag,
-                        "description": description,
-                    }
-                )
-            else:
-                logger.error(f"Error parsing line: {line.strip()}")
+def get_relevant_tags(query: str, top_k: int = 5) -> Dict:
+    """
+    Find the XBRL tags whose descriptions are most similar to a query.
+
+    Args:
+        query (str): Topic or question to search for
+        top_k (int): Number of tags to return
 
+    Returns:
+        Dict: List of taxonomy, tag, description and score dictionaries, best first
+    """
     try:
-        search = SemanticSearch(
-            model_id="amazon.titan-embed-text-v2:0",  # Using v2 model
-        )
-        search.index(
-            [i["description"] for i in available_facts if i["description"] is not None],
-            embeddings_file=index_embeddings,
+        tag_index = get_tag_index()
+        results = tag_index.search(query, top_k=top_k)
+        logger.debug(
+            f"Embedding cache: {tag_index.search_engine.embedding_cache.stats()}"
         )
-        hits = search.search(query, top_k=top_k)
-
-        # Get the records in available_facts that correspond to the index values for the records in search_results
-        search_results = [available_facts[i["index"]] for i in hits]
-
-        return search_results
+        return results
     except Exception as e:
         logger.error(f"Error during search: {str(e)}")
         return {"TEXT": {"body": f"Error during search: {str(e)}"}}
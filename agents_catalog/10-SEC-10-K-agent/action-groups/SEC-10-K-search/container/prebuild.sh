@@ -0,0 +1,8 @@
+#!/bin/bash
+# Run by the CodeBuild container build (build/container.yaml) before `docker build`.
+# Downloads the tag descriptions and embeddings so the Dockerfile packages a tag index.
+set -euo pipefail
+
+cd "$(dirname "$0")"
+aws s3 cp s3://5d1a4b76751b4c8a994ce96bafd91ec9/us-gaap/descriptions.csv tag_index_source/descriptions.csv
+aws s3 cp s3://5d1a4b76751b4c8a994ce96bafd91ec9/us-gaap/embeddings.npy tag_index_source/embeddings.npy
@@ -0,0 +1,294 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Load-once index of the us-gaap XBRL tags used by find_relevant_tags.
+
+The index is a directory with two files:
+
+- embeddings.npy: one unit-length embedding per tag description (float32 or float16),
+  memory-mapped so only the pages touched by a search are read
+- tags.json: {"taxonomy": [...], "tag": [...], "description": [...]} in embedding order
+
+Build it from the descriptions.csv/embeddings.npy pair published in S3 with:
+
+    python tag_index.py --output tag_index
+
+The container image build does this from the files prebuild.sh downloads (see the
+Dockerfile). Containers without a packaged index build one in /tmp from S3 the first
+time it is needed.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+import boto3
+import numpy as np
+from bedrock_ez_search import EmbeddingCache, FileEmbeddingStore, SemanticSearch
+
+TAG_INDEX_BUCKET = "5d1a4b76751b4c8a994ce96bafd91ec9"
+TAG_INDEX_DESCRIPTIONS_KEY = "us-gaap/descriptions.csv"
+TAG_INDEX_EMBEDDINGS_KEY = "us-gaap/embeddings.npy"
+TAG_INDEX_MODEL_ID = "amazon.titan-embed-text-v2:0"
+
+PACKAGED_TAG_INDEX_DIR = os.environ.get(
+    "TAG_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tag_index")
+)
+FALLBACK_TAG_INDEX_DIR = "/tmp/tag_index"
+
+# Query embedding cache: entries kept in memory, and an optional directory (e.g. an
+# Amazon EFS mount) that shares embeddings across containers
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "1024"))
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "")
+
+DESCRIPTION_PATTERN = re.compile(r"^([^,]+),([^,]+),(.+)$")
+
+# Rows of a float16 index converted to float32 at a time when scoring
+SCORE_BLOCK_ROWS = 8192
+
+logger = logging.getLogger(__name__)
+
+
+def parse_descriptions(path: str) -> Dict[str, List[str]]:
+    """
+    Parse a descriptions CSV with one "taxonomy,tag,description" line per tag.
+
+    Args:
+        path (str): Path to the descriptions CSV
+
+    Returns:
+        Dict[str, List[str]]: Taxonomies, tags and descriptions in file order
+    """
+    columns = {"taxonomy": [], "tag": [], "description": []}
+    with open(path, "r") as f:
+        for line in f:
+            match = DESCRIPTION_PATTERN.match(line.strip())
+            if match:
+                taxonomy, tag, description = match.groups()
+                columns["taxonomy"].append(taxonomy)
+                columns["tag"].append(tag)
+                columns["description"].append(description)
+            else:
+                logger.error(f"Error parsing line: {line.strip()}")
+    return columns
+
+
+def build_tag_index(
+    descriptions_file: str, embeddings_file: str, output_dir: str, dtype: str = "float32"
+) -> str:
+    """
+    Build a tag index directory from a descriptions CSV and its embeddings.
+
+    Args:
+        descriptions_file (str): Path to the descriptions CSV
+        embeddings_file (str): Path to the .npy embeddings, one row per description
+        output_dir (str): Directory to write the index to
+        dtype (str): Storage type of the normalized embeddings, "float32" or "float16"
+
+    Returns:
+        str: The output directory
+
+    Raises:
+        ValueError: If the number of embeddings doesn't match the number of descriptions
+    """
+    columns = parse_descriptions(descriptions_file)
+    embeddings = np.load(embeddings_file).astype(np.float32)
+    if len(embeddings) != len(columns["tag"]):
+        raise ValueError(
+            f"Number of embeddings in file ({len(embeddings)}) "
+            f"doesn't match number of descriptions ({len(columns['tag'])})"
+        )
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Write to temporary names and rename, so a concurrent reader never sees a partial index
+    tmp_embeddings = os.path.join(output_dir, f"embeddings.{os.getpid()}.tmp.npy")
+    np.save(tmp_embeddings, embeddings.astype(dtype))
+    os.replace(tmp_embeddings, os.path.join(output_dir, "embeddings.npy"))
+    tmp_tags = os.path.join(output_dir, f"tags.{os.getpid()}.tmp")
+    with open(tmp_tags, "w") as f:
+        json.dump(columns, f)
+    os.replace(tmp_tags, os.path.join(output_dir, "tags.json"))
+    logger.info(f"Built tag index with {len(embeddings)} tags in {output_dir}")
+    return output_dir
+
+
+def download_tag_index(output_dir: str, dtype: str = "float32") -> str:
+    """Build a tag index from the descriptions and embeddings published in S3."""
+    s3 = boto3.client("s3")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        descriptions_file = os.path.join(tmp_dir, "descriptions.csv")
+        embeddings_file = os.path.join(tmp_dir, "embeddings.npy")
+        s3.download_file(TAG_INDEX_BUCKET, TAG_INDEX_DESCRIPTIONS_KEY, descriptions_file)
+        s3.download_file(TAG_INDEX_BUCKET, TAG_INDEX_EMBEDDINGS_KEY, embeddings_file)
+        return build_tag_index(descriptions_file, embeddings_file, output_dir, dtype)
+
+
+def is_tag_index(path: str) -> bool:
+    return os.path.exists(os.path.join(path, "embeddings.npy")) and os.path.exists(
+        os.path.join(path, "tags.json")
+    )
+
+
+def create_embedding_cache() -> EmbeddingCache:
+    """Create the query embedding cache configured by the EMBEDDING_CACHE_* environment variables."""
+    store = None
+    if EMBEDDING_CACHE_DIR:
+        try:
+            store = FileEmbeddingStore(EMBEDDING_CACHE_DIR)
+        except OSError as e:
+            logger.warning(f"Embedding cache persistence disabled: {str(e)}")
+    return EmbeddingCache(max_entries=EMBEDDING_CACHE_MAX_ENTRIES, store=store)
+
+
+class TagIndex:
+    """
+    Semantic search over XBRL tag descriptions.
+
+    A search embeds the query once with Amazon Bedrock (or finds it in the embedding
+    cache) and scores every tag with a single matrix-vector product against the
+    memory-mapped, pre-normalized embeddings.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_id: str = TAG_INDEX_MODEL_ID,
+        search_engine: Optional[SemanticSearch] = None,
+    ):
+        """
+        Load a tag index directory.
+
+        Args:
+            path (str): Directory written by build_tag_index
+            model_id (str): Bedrock model used to embed queries; must match the index
+            search_engine: Optional SemanticSearch used to embed queries
+
+        Raises:
+            ValueError: If the number of embeddings doesn't match the number of tags
+        """
+        self.path = path
+        self.model_id = model_id
+        self.search_engine = search_engine or SemanticSearch(
+            model_id=model_id, embedding_cache=create_embedding_cache()
+        )
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(path, "tags.json"), "r") as f:
+            columns = json.load(f)
+        self.taxonomies = np.array(columns["taxonomy"], dtype=object)
+        self.tags = np.array(columns["tag"], dtype=object)
+        self.descriptions = np.array(columns["description"], dtype=object)
+        if len(self.embeddings) != len(self.tags):
+            raise ValueError(
+                f"Number of embeddings in {path} ({len(self.embeddings)}) "
+                f"doesn't match number of tags ({len(self.tags)})"
+            )
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Unit-length float32 query embedding."""
+        return self.search_engine.embed_queries([text])[0]
+
+    def scores(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every tag to a unit-length query embedding."""
+        if self.embeddings.dtype == np.float32:
+            return self.embeddings @ query_embedding
+        # numpy has no fast float16 product, so score blocks of rows in float32
+        return np.concatenate(
+            [
+                self.embeddings[i : i + SCORE_BLOCK_ROWS].astype(np.float32) @ query_embedding
+                for i in range(0, len(self.embeddings), SCORE_BLOCK_ROWS)
+            ]
+        )
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        Find the tags whose descriptions are most similar to the query.
+
+        Args:
+            query (str): The search query
+            top_k (int): Number of tags to return
+
+        Returns:
+            List[Dict]: taxonomy, tag, description and score of each tag, best first
+        """
+        scores = self.scores(self.embed(query))
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return []
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {
+                "taxonomy": self.taxonomies[i],
+                "tag": self.tags[i],
+                "description": self.descriptions[i],
+                "score": float(scores[i]),
+            }
+            for i in top
+        ]
+
+
+_tag_index: Optional[TagIndex] = None
+_tag_index_lock = threading.Lock()
+
+
+def get_tag_index() -> TagIndex:
+    """
+    Return the container-wide tag index, loading it on first use.
+
+    The index packaged into the image is used when present; otherwise one is built
+    in /tmp from S3 and reused by later invocations of the same container.
+    """
+    global _tag_index
+    with _tag_index_lock:
+        if _tag_index is None:
+            path = PACKAGED_TAG_INDEX_DIR
+            if not is_tag_index(path):
+                logger.warning(
+                    f"No tag index packaged in {path}, building one from s3://{TAG_INDEX_BUCKET}"
+                )
+                path = FALLBACK_TAG_INDEX_DIR
+                if not is_tag_index(path):
+                    download_tag_index(path)
+            _tag_index = TagIndex(path)
+        return _tag_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the XBRL tag index")
+    parser.add_argument("--output", default="tag_index", help="Index directory to write")
+    parser.add_argument(
+        "--descriptions", help="Local descriptions CSV (default: download from S3)"
+    )
+    parser.add_argument(
+        "--embeddings", help="Local embeddings .npy (default: download from S3)"
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["float32", "float16"],
+        default="float32",
+        help="Storage type of the embeddings; float16 halves the image size",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.descriptions and args.embeddings:
+        build_tag_index(args.descriptions, args.embeddings, args.output, args.dtype)
+    elif args.descriptions or args.embeddings:
+        parser.error("--descriptions and --embeddings must be given together")
+    else:
+        download_tag_index(args.output, args.dtype)
+
+
+if __name__ == "__main__":
+    main()
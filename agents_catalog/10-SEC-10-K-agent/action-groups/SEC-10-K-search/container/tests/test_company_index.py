@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from company_index import get_company_index
+
+CIK_REF = os.path.join(os.path.dirname(__file__), "..", "cik-ref.json")
+
+
+def resolve(query):
+    return get_company_index(CIK_REF).resolve(query)
+
+
+def test_name_is_not_captured_by_ticker():
+    # FORD is the ticker of Forward Industries
+    assert resolve("ford")["title"] == "FORD MOTOR CO"
+    assert resolve("Ford")["title"] == "FORD MOTOR CO"
+
+
+def test_ticker_typed_as_ticker():
+    assert resolve("F")["title"] == "FORD MOTOR CO"
+    assert resolve("FORD")["title"] == "Forward Industries, Inc."
+    assert resolve("BRK-B")["ticker"] == "BRK-B"
+
+
+def test_exact_name_and_fuzzy_name():
+    assert resolve("Apple Inc.")["ticker"] == "AAPL"
+    assert resolve("Microsoft")["ticker"] == "MSFT"
+
+
+def test_lowercase_ticker_without_name_match():
+    assert resolve("aapl")["ticker"] == "AAPL"
+
+
+def test_no_match():
+    assert resolve("xyzq") is None
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "bedrock-ez-search"))
+
+from tag_index import TagIndex, build_tag_index
+
+DESCRIPTIONS = [
+    "us-gaap,Revenues,Amount of revenue recognized from goods sold and services rendered",
+    "us-gaap,NetIncomeLoss,Portion of profit or loss attributable to the parent",
+    "us-gaap,Assets,Sum of the carrying amounts of all assets",
+    "us-gaap,LongTermDebt,Amount of long-term debt, including current maturities",
+]
+# Unnormalized, so the index has to normalize them
+EMBEDDINGS = [[3.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.0, 0.0, 5.0], [1.0, 1.0, 0.0]]
+
+
+class FakeSearchEngine:
+    """Embeds a few known queries, standing in for Amazon Bedrock"""
+
+    QUERIES = {"revenue": [1.0, 0.0, 0.0], "profit": [0.0, 1.0, 0.0], "balance sheet": [0.0, 0.6, 0.8]}
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_queries(self, texts):
+        self.calls.extend(texts)
+        return np.array([self.QUERIES[text] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture(params=["float32", "float16"])
+def index(request, tmp_path):
+    descriptions_file = tmp_path / "descriptions.csv"
+    descriptions_file.write_text("\n".join(DESCRIPTIONS) + "\n")
+    embeddings_file = tmp_path / "raw_embeddings.npy"
+    np.save(embeddings_file, np.array(EMBEDDINGS, dtype=np.float32))
+    path = build_tag_index(str(descriptions_file), str(embeddings_file), str(tmp_path / "index"), request.param)
+    return TagIndex(path, search_engine=FakeSearchEngine())
+
+
+def test_search_returns_best_tags_first(index):
+    results = index.search("revenue", top_k=2)
+
+    assert [result["tag"] for result in results] == ["Revenues", "LongTermDebt"]
+    assert results[0]["taxonomy"] == "us-gaap"
+    assert results[0]["description"].startswith("Amount of revenue")
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-3)
+    assert results[1]["score"] == pytest.approx(np.sqrt(0.5), abs=1e-3)
+
+
+def test_search_embeds_the_query_once(index):
+    results = index.search("balance sheet", top_k=10)
+
+    assert len(index) == len(results) == 4
+    assert [result["tag"] for result in results] == ["Assets", "NetIncomeLoss", "LongTermDebt", "Revenues"]
+    assert index.search_engine.calls == ["balance sheet"]
+    assert index.search("profit", top_k=0) == []
+
+
+def test_descriptions_must_match_embeddings(tmp_path):
+    descriptions_file = tmp_path / "descriptions.csv"
+    descriptions_file.write_text("\n".join(DESCRIPTIONS[:3]) + "\n")
+    embeddings_file = tmp_path / "raw_embeddings.npy"
+    np.save(embeddings_file, np.array(EMBEDDINGS, dtype=np.float32))
+
+    with pytest.raises(ValueError):
+        build_tag_index(str(descriptions_file), str(embeddings_file), str(tmp_path / "index"))
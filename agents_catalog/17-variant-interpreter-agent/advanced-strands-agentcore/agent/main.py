@@ -48,6 +48,7 @@ TOOL SELECTION STRATEGY:
 3. **For frequency analysis**: Use analyze_allele_frequencies (e.g., "rare variants", "population frequencies", allele frequency comparisons with 1000 Genomes)
 4. **For cohort studies**: Use compare_sample_variants (e.g., "compare samples", "family analysis")
 5. **For complex queries**: Use execute_dynamic_genomics_query
+6. **After a new VEP pipeline ingest**: Use refresh_variant_summary_tables (e.g., "samples X and Y were just ingested")
 
 EXECUTION FLOW:
 1. Understand the user query
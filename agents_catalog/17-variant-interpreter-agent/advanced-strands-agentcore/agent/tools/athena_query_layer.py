@@ -0,0 +1,301 @@
+"""
+Athena Query Layer Module
+Result caching, adaptive polling and direct S3 result download for the genomics store tools
+"""
+
+import asyncio
+import codecs
+import csv
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .query_backends import QueryBackend
+
+# Quoted SQL string literal, with '' as an escaped quote
+SQL_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+
+def normalize_sql(query):
+    """
+    Normalize SQL text for cache keys: collapse whitespace and lowercase everything
+    outside string literals, and drop trailing semicolons. Literals are left untouched.
+    """
+    parts = SQL_STRING_LITERAL.split(query.strip())
+    normalized = ''.join(
+        part if i % 2 else re.sub(r'\s+', ' ', part).lower()
+        for i, part in enumerate(parts)
+    )
+    return normalized.strip().rstrip(';').strip()
+
+
+def _estimate_rows_size(rows):
+    """Rough in-memory size of a list of row dicts with string values"""
+    return sum(len(str(key)) + len(str(value)) for row in rows for key, value in row.items())
+
+
+class QueryResultCache:
+    """
+    Content-addressed cache of Athena result rows.
+
+    Entries are keyed on the normalized SQL, the database and the store versions,
+    so any ingest that changes a store version naturally invalidates old results.
+    Entries expire after `ttl_seconds` and the least recently used entries are
+    evicted once `max_entries` or `max_bytes` is exceeded.
+    """
+
+    def __init__(self, ttl_seconds=900, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(query, database, store_versions=None):
+        payload = json.dumps([normalize_sql(query), database, store_versions], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return a copy of the cached rows for `key`, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, rows = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(rows)
+
+    def put(self, key, rows):
+        """Store rows for `key`; results larger than the whole cache are not stored"""
+        size = _estimate_rows_size(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, list(rows))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+def _poll_delays(initial_delay, max_delay, backoff):
+    """Yield exponentially increasing poll delays capped at `max_delay`"""
+    delay = initial_delay
+    while True:
+        yield delay
+        delay = min(delay * backoff, max_delay)
+
+
+def _check_state(execution):
+    """Return True when the query succeeded, raise when it failed, False while running"""
+    status = execution['Status']
+    state = status['State']
+    if state == 'SUCCEEDED':
+        return True
+    if state in ('FAILED', 'CANCELLED'):
+        raise Exception(f"Query failed: {status.get('StateChangeReason', 'Unknown error')}")
+    return False
+
+
+def page_query_results(athena_client, query_id):
+    """Fetch all result rows through the GetQueryResults API, 1000 rows per call"""
+    rows = []
+    next_token = None
+    columns = None
+
+    while True:
+        kwargs = {'QueryExecutionId': query_id, 'MaxResults': 1000}
+        if next_token:
+            kwargs['NextToken'] = next_token
+        results = athena_client.get_query_results(**kwargs)
+
+        # Get column names from first response
+        if columns is None:
+            columns = [col['Name'] for col in results['ResultSet']['ResultSetMetadata']['ColumnInfo']]
+
+        # Process rows (skip header only on first page)
+        start_idx = 1 if next_token is None else 0
+        for row in results['ResultSet']['Rows'][start_idx:]:
+            row_data = [col.get('VarCharValue', '') for col in row['Data']]
+            rows.append(dict(zip(columns, row_data)))
+
+        next_token = results.get('NextToken')
+        if not next_token:
+            return rows
+
+
+def _split_s3_uri(uri):
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+
+def download_query_results(s3_client, output_location):
+    """
+    Read result rows straight from the query's S3 output object.
+
+    CSV results are streamed through csv.DictReader; Parquet results are read with
+    pandas. NULLs become empty strings, matching the GetQueryResults rows.
+    """
+    bucket, key = _split_s3_uri(output_location)
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+
+    if key.endswith('.csv'):
+        reader = csv.DictReader(codecs.getreader('utf-8')(body))
+        return [dict(row) for row in reader]
+
+    if key.endswith('.parquet'):
+        import pandas as pd
+        frame = pd.read_parquet(io.BytesIO(body.read()))
+        frame = frame.astype(object).where(frame.notna(), '')
+        return [{column: str(value) for column, value in row.items()} for row in frame.to_dict('records')]
+
+    raise ValueError(f"Unsupported result format: {output_location}")
+
+
+class AthenaQueryRunner(QueryBackend):
+    """
+    Runs Athena queries with result caching, adaptive polling and S3 result download.
+
+    Args:
+        athena_client: boto3 Athena client
+        s3_client: boto3 S3 client used to download result objects (optional)
+        output_location: S3 URI for query results
+        workgroup: Athena workgroup
+        cache: QueryResultCache instance, or None to disable caching
+        version_provider: Callable returning the current store versions for cache keys
+        timeout: Maximum seconds to wait for a query to finish
+    """
+
+    name = 'athena'
+
+    def __init__(self, athena_client, s3_client=None, output_location=None, workgroup='primary',
+                 cache=None, version_provider=None, timeout=300,
+                 initial_delay=0.25, max_delay=5.0, backoff=1.5):
+        self.athena_client = athena_client
+        self.s3_client = s3_client
+        self.output_location = output_location
+        self.workgroup = workgroup
+        self.cache = cache
+        self.version_provider = version_provider
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+
+    def _cache_key(self, query, database):
+        versions = self.version_provider() if self.version_provider else None
+        return QueryResultCache.make_key(query, database, versions)
+
+    def _start(self, query, database):
+        kwargs = {
+            'QueryString': query,
+            'QueryExecutionContext': {'Database': database},
+            'WorkGroup': self.workgroup
+        }
+        if self.output_location:
+            kwargs['ResultConfiguration'] = {'OutputLocation': self.output_location}
+        return self.athena_client.start_query_execution(**kwargs)['QueryExecutionId']
+
+    def _fetch_rows(self, query_id, execution):
+        output_location = execution.get('ResultConfiguration', {}).get('OutputLocation', '')
+        if self.s3_client and output_location.endswith(('.csv', '.parquet')):
+            try:
+                return download_query_results(self.s3_client, output_location)
+            except Exception as e:
+                print(f"Falling back to GetQueryResults paging: {e}")
+        return page_query_results(self.athena_client, query_id)
+
+    def wait(self, query_id):
+        """Poll until the query finishes, backing off between calls"""
+        deadline = time.monotonic() + self.timeout
+        for delay in _poll_delays(self.initial_delay, self.max_delay, self.backoff):
+            execution = self.athena_client.get_query_execution(QueryExecutionId=query_id)['QueryExecution']
+            if _check_state(execution):
+                return execution
+            if time.monotonic() + delay > deadline:
+                raise Exception("Query timed out")
+            time.sleep(delay)  # nosemgrep: arbitrary-sleep
+
+    async def wait_async(self, query_id):
+        """Asyncio variant of `wait`; boto3 calls run in worker threads"""
+        deadline = time.monotonic() + self.timeout
+        for delay in _poll_delays(self.initial_delay, self.max_delay, self.backoff):
+            response = await asyncio.to_thread(self.athena_client.get_query_execution, QueryExecutionId=query_id)
+            execution = response['QueryExecution']
+            if _check_state(execution):
+                return execution
+            if time.monotonic() + delay > deadline:
+                raise Exception("Query timed out")
+            await asyncio.sleep(delay)
+
+    def execute(self, query, database, use_cache=True):
+        """Execute a query and return its rows as a list of dicts"""
+        key = self._cache_key(query, database) if self.cache and use_cache else None
+        if key:
+            rows = self.cache.get(key)
+            if rows is not None:
+                print(f"Athena cache hit ({len(rows)} rows)")
+                return rows
+
+        query_id = self._start(query, database)
+        execution = self.wait(query_id)
+        rows = self._fetch_rows(query_id, execution)
+
+        if key:
+            self.cache.put(key, rows)
+        return rows
+
+    async def execute_async(self, query, database, use_cache=True):
+        """Asyncio variant of `execute`"""
+        key = None
+        if self.cache and use_cache:
+            key = await asyncio.to_thread(self._cache_key, query, database)
+            rows = self.cache.get(key)
+            if rows is not None:
+                print(f"Athena cache hit ({len(rows)} rows)")
+                return rows
+
+        query_id = await asyncio.to_thread(self._start, query, database)
+        execution = await self.wait_async(query_id)
+        rows = await asyncio.to_thread(self._fetch_rows, query_id, execution)
+
+        if key:
+            self.cache.put(key, rows)
+        return rows
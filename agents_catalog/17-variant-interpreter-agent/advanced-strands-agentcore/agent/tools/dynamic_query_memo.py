@@ -0,0 +1,134 @@
+"""
+Dynamic Query Memo Module
+Memo of validated LLM-generated SQL for the dynamic query tool
+
+Questions are normalized before lookup, so repeats of the same question by
+different analysts reuse the SQL instead of a new generation round trip. An
+optional similarity lookup also serves near-duplicate wordings, but only when
+every word other than a stopword matches exactly: gene symbols (in any case),
+sample IDs, numbers and filter words all change the meaning of the SQL.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+# Words that carry no meaning for the generated SQL
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'in', 'on', 'for', 'to', 'and', 'with', 'by', 'is', 'are', 'be',
+    'me', 'show', 'list', 'give', 'find', 'get', 'what', 'which', 'all', 'any', 'please', 'can',
+    'you', 'i', 'we', 'do', 'does', 'there', 'that', 'have', 'has'
+}
+
+WORD_PATTERN = re.compile(r"[A-Za-z0-9_.:>/-]+")
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(word.lower().strip('.:/-') for word in WORD_PATTERN.findall(question)).strip()
+
+
+def literal_terms(question):
+    """
+    Terms that must match exactly for two questions to share SQL: every word that
+    isn't a stopword, since a gene symbol typed in lowercase ("kras") can't be told
+    apart from other words
+    """
+    return frozenset(word.upper() for word in normalize_question(question).split() if word not in STOPWORDS)
+
+
+def question_words(question):
+    return frozenset(normalize_question(question).split())
+
+
+def _jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class DynamicQueryMemo:
+    """
+    LRU memo of generated SQL keyed on normalized question, patient filter and schema fingerprint.
+
+    Args:
+        max_entries: Maximum memoized questions
+        similarity_threshold: Minimum word Jaccard similarity for a near-duplicate question
+            with the same literal terms to reuse SQL; 0 disables the similarity lookup
+    """
+
+    def __init__(self, max_entries=512, similarity_threshold=0.8):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(question, patient_ids=None, schema_fingerprint=None):
+        patients = tuple(sorted(p.strip() for p in patient_ids if p.strip())) if patient_ids else ()
+        return normalize_question(question), patients, schema_fingerprint
+
+    def lookup(self, question, patient_ids=None, schema_fingerprint=None):
+        """
+        Return (sql, match) where match is 'exact' or 'similar', or (None, None) on a miss
+        """
+        key = self.make_key(question, patient_ids, schema_fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['sql'], 'exact'
+
+            if self.similarity_threshold > 0:
+                literals = literal_terms(question)
+                words = question_words(question)
+                best_key, best_score = None, 0.0
+                for other_key, other in self._entries.items():
+                    if other_key[1:] != key[1:] or other['literals'] != literals:
+                        continue
+                    score = _jaccard(words, other['words'])
+                    if score > best_score:
+                        best_key, best_score = other_key, score
+                if best_key is not None and best_score >= self.similarity_threshold:
+                    self._entries.move_to_end(best_key)
+                    self.similar_hits += 1
+                    return self._entries[best_key]['sql'], 'similar'
+
+            self.misses += 1
+            return None, None
+
+    def put(self, question, sql, patient_ids=None, schema_fingerprint=None):
+        """Memoize SQL that executed successfully for `question`"""
+        key = self.make_key(question, patient_ids, schema_fingerprint)
+        with self._lock:
+            self._entries[key] = {
+                'sql': sql,
+                'literals': literal_terms(question),
+                'words': question_words(question)
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_sql(self, sql):
+        """Forget every question memoized with `sql`"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry['sql'] == sql]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses
+            }
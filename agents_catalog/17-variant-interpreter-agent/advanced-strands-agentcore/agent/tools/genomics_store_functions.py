@@ -5,8 +5,10 @@ Using HealthOmics stores directly instead of DynamoDB tracking
 """
 
 import os
+import asyncio
 import boto3
 from botocore.client import Config
+import hashlib
 import json
 from datetime import datetime
 import time
@@ -14,6 +16,11 @@ import re
 import pandas as pd
 from botocore.exceptions import ClientError, NoCredentialsError, NoRegionError
 
+from .athena_query_layer import AthenaQueryRunner, QueryResultCache
+from .dynamic_query_memo import DynamicQueryMemo
+from .query_backends import DuckDBBackend
+from .variant_summary_tables import VariantSummaryTables
+
 def validate_sql_input(value):
     """Validate input to prevent SQL injection - only allow alphanumeric and safe characters"""
     if not isinstance(value, str):
@@ -23,6 +30,9 @@ def validate_sql_input(value):
         raise ValueError(f"Invalid input: {value}. Only alphanumeric characters, underscore, hyphen, and dot are allowed.")
     return value
 
+class QueryInputError(ValueError):
+    """Raised when tool arguments cannot be turned into a valid query"""
+
 # Initialize AWS configuration with comprehensive error handling
 def get_aws_config():
     """Get AWS configuration with multiple fallback options"""
@@ -66,6 +76,27 @@ LAKE_FORMATION_DATABASE = os.environ.get('LAKE_FORMATION_DATABASE', '<YOUR_AWS_P
 VARIANT_STORE_NAME = os.environ.get('VARIANT_STORE_NAME', 'genomicsvariantstore')
 ANNOTATION_STORE_NAME = os.environ.get('ANNOTATION_STORE_NAME', 'genomicsannotationstore')
 
+# Athena query layer configuration
+ATHENA_OUTPUT_LOCATION = os.environ.get('ATHENA_OUTPUT_LOCATION', f's3://aws-athena-query-results-{ACCOUNT_ID}-{REGION}/')
+ATHENA_QUERY_TIMEOUT_SECONDS = int(os.environ.get('ATHENA_QUERY_TIMEOUT_SECONDS', '300'))
+ATHENA_CACHE_TTL_SECONDS = int(os.environ.get('ATHENA_CACHE_TTL_SECONDS', '900'))
+ATHENA_CACHE_MAX_ENTRIES = int(os.environ.get('ATHENA_CACHE_MAX_ENTRIES', '256'))
+ATHENA_CACHE_MAX_MB = int(os.environ.get('ATHENA_CACHE_MAX_MB', '64'))
+STORE_VERSION_TTL_SECONDS = 60
+
+# Execution backend for the tool SQL: 'athena' (default) or 'duckdb' over local Parquet exports
+# of the stores, laid out as <LOCAL_STORE_PATH>/<store name>/*.parquet
+GENOMICS_QUERY_BACKEND = os.environ.get('GENOMICS_QUERY_BACKEND', 'athena')
+LOCAL_STORE_PATH = os.environ.get('LOCAL_STORE_PATH', '')
+
+# Optional materialized summary tables (disabled when no location is configured)
+SUMMARY_TABLES_LOCATION = os.environ.get('SUMMARY_TABLES_LOCATION', '')
+
+# Dynamic query generation: Bedrock prompt caching of the schema prompt and memo of validated SQL
+BEDROCK_PROMPT_CACHING = os.environ.get('BEDROCK_PROMPT_CACHING', 'true').lower() == 'true'
+DYNAMIC_QUERY_MEMO_MAX_ENTRIES = int(os.environ.get('DYNAMIC_QUERY_MEMO_MAX_ENTRIES', '512'))
+DYNAMIC_QUERY_SIMILARITY_THRESHOLD = float(os.environ.get('DYNAMIC_QUERY_SIMILARITY_THRESHOLD', '0.8'))
+
 # Genomic analysis constants
 PATHOGENIC_SIGNIFICANCE = ['Pathogenic', 'Likely_pathogenic', 'Pathogenic/Likely_pathogenic']
 BENIGN_SIGNIFICANCE = ['Benign', 'Likely_benign', 'Benign/Likely_benign']
@@ -108,6 +139,13 @@ def initialize_aws_clients():
         print(f"⚠️ Glue client failed: {e}")
         clients['glue'] = None
     
+    try:
+        clients['s3'] = boto3.client('s3', region_name=REGION)
+        print("✅ S3 client initialized")
+    except Exception as e:
+        print(f"⚠️ S3 client failed: {e}")
+        clients['s3'] = None
+    
     return clients
 
 # Initialize all clients
@@ -116,6 +154,7 @@ athena_client = aws_clients['athena']
 bedrock_client = aws_clients['bedrock']
 omics_client = aws_clients['omics']
 glue_client = aws_clients['glue']
+s3_client = aws_clients['s3']
 
 print(f"Region: {REGION}")
 print(f"Account ID: {ACCOUNT_ID}")
@@ -189,131 +228,184 @@ def get_annotation_store_info():
     except Exception as e:
         return {'error': f'Error getting annotation store info: {str(e)}'}
 
-def execute_athena_query_on_stores(query, database=None):
+_store_versions = {'value': None, 'expires_at': 0.0}
+
+def get_store_versions():
+    """
+    Get a version fingerprint (update time and size) of the variant and annotation stores.
+    Used in Athena cache keys so a new ingest invalidates cached results.
+    Refreshed at most every STORE_VERSION_TTL_SECONDS.
+    """
+    now = time.monotonic()
+    if _store_versions['value'] is not None and now < _store_versions['expires_at']:
+        return _store_versions['value']
+    
+    versions = {}
+    if omics_client is not None:
+        for name, getter in ((VARIANT_STORE_NAME, omics_client.get_variant_store),
+                             (ANNOTATION_STORE_NAME, omics_client.get_annotation_store)):
+            try:
+                store = getter(name=name)
+                versions[name] = [str(store.get('updateTime', '')), store.get('storeSizeBytes', 0)]
+            except Exception as e:
+                print(f"Could not get version of store {name}: {e}")
+                versions[name] = None
+    
+    _store_versions['value'] = versions
+    _store_versions['expires_at'] = now + STORE_VERSION_TTL_SECONDS
+    return versions
+
+# Shared query runner with content-addressed result cache
+athena_result_cache = QueryResultCache(
+    ttl_seconds=ATHENA_CACHE_TTL_SECONDS,
+    max_entries=ATHENA_CACHE_MAX_ENTRIES,
+    max_bytes=ATHENA_CACHE_MAX_MB * 1024 * 1024
+)
+athena_query_runner = AthenaQueryRunner(
+    athena_client,
+    s3_client=s3_client,
+    output_location=ATHENA_OUTPUT_LOCATION,
+    cache=athena_result_cache,
+    version_provider=get_store_versions,
+    timeout=ATHENA_QUERY_TIMEOUT_SECONDS
+)
+
+def create_query_backend():
+    """
+    Create the configured execution backend for the tool SQL
+    """
+    if GENOMICS_QUERY_BACKEND == 'duckdb':
+        print(f"Using local DuckDB backend over {LOCAL_STORE_PATH}")
+        return DuckDBBackend({
+            VARIANT_STORE_NAME: os.path.join(LOCAL_STORE_PATH, VARIANT_STORE_NAME),
+            ANNOTATION_STORE_NAME: os.path.join(LOCAL_STORE_PATH, ANNOTATION_STORE_NAME)
+        })
+    return athena_query_runner
+
+query_backend = create_query_backend()
+
+def execute_athena_query_on_stores(query, database=None, use_cache=True):
     """
-    Execute Athena query on genomics stores using default database
+    Execute Athena query on genomics stores using default database.
+    Identical queries against unchanged stores are served from the result cache.
     """
-    if athena_client is None:
+    if query_backend.name == 'athena' and athena_client is None:
         raise Exception("Athena client not available. Please configure AWS credentials and region.")
         
     try:
         if not database:
             database = LAKE_FORMATION_DATABASE
         
-        print(f"Executing query on database '{database}': {query}")
-        
         # Print the query execution details in the expected format
         print("=" * 84)
         print(f"Executing query on database '{database}': ")
         print(f"        {query}")
         
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={'Database': database},
-            WorkGroup='primary',
-            ResultConfiguration={
-                'OutputLocation': f's3://aws-athena-query-results-{ACCOUNT_ID}-{REGION}/'
-            }
-        )
-        
-        query_id = response['QueryExecutionId']
-        
-        # Wait for completion
-        max_attempts = 30
-        for attempt in range(max_attempts):
-            result = athena_client.get_query_execution(QueryExecutionId=query_id)
-            status = result['QueryExecution']['Status']['State']
-            
-            if status == 'SUCCEEDED':
-                break
-            elif status in ['FAILED', 'CANCELLED']:
-                error_reason = result['QueryExecution']['Status'].get('StateChangeReason', 'Unknown error')
-                raise Exception(f"Query failed: {error_reason}")
-            
-            time.sleep(2)  # nosemgrep: arbitrary-sleep
-        
-        if status != 'SUCCEEDED':
-            raise Exception("Query timed out")
-        
-        # Get results with pagination
-        rows = []
-        next_token = None
-        columns = None
-        
-        while True:
-            if next_token:
-                results = athena_client.get_query_results(
-                    QueryExecutionId=query_id,
-                    NextToken=next_token,
-                    MaxResults=1000
-                )
-            else:
-                results = athena_client.get_query_results(
-                    QueryExecutionId=query_id,
-                    MaxResults=1000
-                )
-            
-            # Get column names from first response
-            if columns is None:
-                columns = [col['Name'] for col in results['ResultSet']['ResultSetMetadata']['ColumnInfo']]
-            
-            # Process rows (skip header only on first page)
-            start_idx = 1 if next_token is None else 0
-            for row in results['ResultSet']['Rows'][start_idx:]:
-                row_data = [col.get('VarCharValue', '') for col in row['Data']]
-                row_dict = dict(zip(columns, row_data))
-                rows.append(row_dict)
-            
-            # Check if there are more results
-            next_token = results.get('NextToken')
-            if not next_token:
-                break
+        rows = query_backend.execute(query, database, use_cache=use_cache)
         
         print(f"Retrieved {len(rows)} total rows from Athena query")
         return rows
         
     except Exception as e:
         print(f"Error executing Athena query: {e}")
-def get_table_schema_info():
+
+async def execute_athena_query_on_stores_async(query, database=None, use_cache=True):
     """
-    Get schema information for variant and annotation stores
+    Asyncio variant of execute_athena_query_on_stores, so several store queries can run concurrently
     """
+    if query_backend.name == 'athena' and athena_client is None:
+        raise Exception("Athena client not available. Please configure AWS credentials and region.")
+        
     try:
-        var_store_info = get_variant_store_info()
-        ann_store_info = get_annotation_store_info()
+        if not database:
+            database = LAKE_FORMATION_DATABASE
+        
+        print("=" * 84)
+        print(f"Executing query on database '{database}': ")
+        print(f"        {query}")
         
-        # Get actual store names from HealthOmics
-        var_store_name = VARIANT_STORE_NAME
-        ann_store_name = ANNOTATION_STORE_NAME
+        rows = await query_backend.execute_async(query, database, use_cache=use_cache)
         
-        # Try to get schema from Glue catalog if available
-        variant_schema = "sampleid, contigname, start, end, referenceallele, alternatealleles, filters, annotations, qual, depth, information"
-        annotation_schema = "contigname, start, end, referenceallele, alternatealleles, attributes"
+        print(f"Retrieved {len(rows)} total rows from Athena query")
+        return rows
         
-        if glue_client:
-            try:
-                # Get variant store schema
-                var_response = glue_client.get_table(
-                    DatabaseName=LAKE_FORMATION_DATABASE,
-                    Name=var_store_name
-                )
-                variant_columns = [col['Name'] for col in var_response['Table']['StorageDescriptor']['Columns']]
-                variant_schema = ", ".join(variant_columns)
-            except Exception as e:
-                print(f"Could not get variant store schema from Glue: {e}")
-            
-            try:
-                # Get annotation store schema
-                ann_response = glue_client.get_table(
-                    DatabaseName=LAKE_FORMATION_DATABASE,
-                    Name=ann_store_name
-                )
-                annotation_columns = [col['Name'] for col in ann_response['Table']['StorageDescriptor']['Columns']]
-                annotation_schema = ", ".join(annotation_columns)
-            except Exception as e:
-                print(f"Could not get annotation store schema from Glue: {e}")
+    except Exception as e:
+        print(f"Error executing Athena query: {e}")
+
+# Materialized summary tables, used by the tools while they match the live stores
+summary_tables = None
+if SUMMARY_TABLES_LOCATION and query_backend.name == 'athena' and athena_client is not None and s3_client is not None:
+    summary_tables = VariantSummaryTables(
+        athena_query_runner,
+        s3_client,
+        database=LAKE_FORMATION_DATABASE,
+        variant_store=validate_sql_input(VARIANT_STORE_NAME),
+        annotation_store=validate_sql_input(ANNOTATION_STORE_NAME),
+        location=SUMMARY_TABLES_LOCATION,
+        version_provider=get_store_versions
+    )
+
+def summary_tables_fresh():
+    """
+    Check whether the summary tables exist and were built from the current store versions
+    """
+    if summary_tables is None:
+        return False
+    try:
+        return summary_tables.is_fresh()
+    except Exception as e:
+        print(f"Could not check summary table freshness: {e}")
+        return False
+
+def refresh_summary_tables_function(sample_ids=None, full_rebuild=False):
+    """
+    Refresh the summary tables after a VEP pipeline ingest.
+    Only the given (or newly ingested) samples are recomputed unless a full rebuild is needed.
+    """
+    if summary_tables is None:
+        return {"error": "Summary tables are not configured. Set SUMMARY_TABLES_LOCATION."}
+    try:
+        validated_samples = [validate_sql_input(s.strip()) for s in sample_ids if s.strip()] if sample_ids else None
+        result = summary_tables.refresh(validated_samples, full_rebuild=full_rebuild)
+        return {"analysis_type": "Summary Table Refresh", **result}
+    except Exception as e:
+        return {"error": f"Error refreshing summary tables: {str(e)}"}
+
+def _load_table_schema_info():
+    """
+    Get schema information for variant and annotation stores from the Glue catalog
+    """
+    var_store_name = VARIANT_STORE_NAME
+    ann_store_name = ANNOTATION_STORE_NAME
+    
+    # Try to get schema from Glue catalog if available
+    variant_schema = "sampleid, contigname, start, end, referenceallele, alternatealleles, filters, annotations, qual, depth, information"
+    annotation_schema = "contigname, start, end, referenceallele, alternatealleles, attributes"
+    
+    if glue_client:
+        try:
+            # Get variant store schema
+            var_response = glue_client.get_table(
+                DatabaseName=LAKE_FORMATION_DATABASE,
+                Name=var_store_name
+            )
+            variant_columns = [col['Name'] for col in var_response['Table']['StorageDescriptor']['Columns']]
+            variant_schema = ", ".join(variant_columns)
+        except Exception as e:
+            print(f"Could not get variant store schema from Glue: {e}")
         
-        annotation_structure = """
+        try:
+            # Get annotation store schema
+            ann_response = glue_client.get_table(
+                DatabaseName=LAKE_FORMATION_DATABASE,
+                Name=ann_store_name
+            )
+            annotation_columns = [col['Name'] for col in ann_response['Table']['StorageDescriptor']['Columns']]
+            annotation_schema = ", ".join(annotation_columns)
+        except Exception as e:
+            print(f"Could not get annotation store schema from Glue: {e}")
+    
+    annotation_structure = """
 VEP Annotations Structure:
 - v.annotations.vep[1].symbol (gene symbol)
 - v.annotations.vep[1].impact (HIGH, MODERATE, LOW)
@@ -330,34 +422,70 @@ ClinVar Attributes Structure:
 - a.attributes['RS'] (dbSNP ID)
 - a.attributes['ALLELEID'] (ClinVar allele ID)
 """
+    
+    summary_structure = ""
+    if summary_tables_fresh():
+        summary_structure = f"""
+PRECOMPUTED SUMMARY TABLES (up to date, prefer these over joining the stores):
+- {LAKE_FORMATION_DATABASE}.{summary_tables.annotated_variants}: PASS variants already joined to ClinVar
+  (sampleid, contig [no 'chr' prefix], contigname, start, referenceallele, alternate_allele, qual, depth,
+  filter_status, allele_frequency_1000g, vep_gene, vep_impact, vep_consequence, clinvar_significance,
+  associated_disease, clinvar_gene)
+- {LAKE_FORMATION_DATABASE}.{summary_tables.sample_summary}: one row per sample with total_variants,
+  pathogenic_count, likely_pathogenic_count, vus_count, benign_count, high/moderate/low/modifier_impact_count,
+  avg_quality, avg_depth, unique_genes_affected, snv_count, deletion_count, insertion_count, pathogenic_percentage
+- {LAKE_FORMATION_DATABASE}.{summary_tables.gene_pathogenic_index}: one row per (gene_symbol, sampleid) with
+  pathogenic_count, likely_pathogenic_count, high_impact_count, pathogenic_variant_ids
+"""
+    
+    return {
+        'variant_store_name': var_store_name,
+        'annotation_store_name': ann_store_name,
+        'variant_store_schema': variant_schema,
+        'annotation_store_schema': annotation_schema,
+        'annotation_structure': annotation_structure,
+        'summary_structure': summary_structure
+    }
+
+def get_schema_fingerprint():
+    """
+    Fingerprint of the store metadata the schema prompt depends on: store versions and
+    whether the summary tables are usable. Changes whenever the schema snapshot may be stale.
+    """
+    payload = json.dumps([get_store_versions(), summary_tables_fresh()], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+_schema_snapshot = {'fingerprint': None, 'value': None}
+
+def get_table_schema_info(refresh=False):
+    """
+    Get schema information for variant and annotation stores.
+    The snapshot is reused until the store metadata fingerprint changes.
+    """
+    try:
+        fingerprint = get_schema_fingerprint()
+        if not refresh and _schema_snapshot['value'] is not None and _schema_snapshot['fingerprint'] == fingerprint:
+            return _schema_snapshot['value']
         
-        return {
-            'variant_store_name': var_store_name,
-            'annotation_store_name': ann_store_name,
-            'variant_store_schema': variant_schema,
-            'annotation_store_schema': annotation_schema,
-            'annotation_structure': annotation_structure
-        }
+        schema_info = _load_table_schema_info()
+        schema_info['schema_fingerprint'] = fingerprint
+        schema_info['schema_prompt'] = build_schema_prompt(schema_info)
+        _schema_snapshot['fingerprint'] = fingerprint
+        _schema_snapshot['value'] = schema_info
+        return schema_info
         
     except Exception as e:
         return {'error': f'Error getting schema info: {str(e)}'}
 
-def construct_dynamic_query(user_question, patient_ids=None):
+def build_schema_prompt(schema_info):
     """
-    Construct a dynamic SQL query based on user question and schema information
+    Build the static part of the SQL generation prompt. It does not depend on the question,
+    so it is identical across questions and can be served from the Bedrock prompt cache.
     """
-    try:
-        # Get schema information
-        schema_info = get_table_schema_info()
-        
-        if 'error' in schema_info:
-            return schema_info
-        
-        var_store_name = schema_info['variant_store_name']
-        ann_store_name = schema_info['annotation_store_name']
-        
-        # Create a comprehensive prompt for Claude to construct the query
-        schema_context = f"""
+    var_store_name = schema_info['variant_store_name']
+    ann_store_name = schema_info['annotation_store_name']
+    
+    return f"""
 GENOMIC DATABASE SCHEMA INFORMATION:
 
 VARIANT STORE TABLE: {var_store_name}
@@ -368,6 +496,7 @@ Available columns: {schema_info.get('annotation_store_schema', 'Schema not avail
 
 ANNOTATION ATTRIBUTES STRUCTURE:
 {schema_info.get('annotation_structure', 'Structure not available')}
+{schema_info.get('summary_structure', '')}
 
 COMMON JOIN PATTERN:
 The variant and annotation stores are typically joined on:
@@ -405,15 +534,7 @@ CRITICAL SYNTAX RULES:
 5. Quality filtering: Always include v.qual > 30 AND contains(v.filters, 'PASS')
 6. The 1000 genomes frequency: 1000 genomes frequency available in v.information['af']
 
-USER QUESTION: {user_question}
-"""
-        
-        if patient_ids:
-            schema_context += f"\nPATIENT FILTER: Include only these patient IDs: {patient_ids}"
-        
-        schema_context += """
-
-Please construct a SQL query to answer the user's question using the schema information provided above. 
+Construct SQL queries to answer the user's question using the schema information provided above. 
 The query should:
 1. Use proper table aliases (v for variant store, a for annotation store)
 2. Include appropriate JOINs if both tables are needed
@@ -421,23 +542,92 @@ The query should:
 4. Use proper attribute access for ClinVar data
 5. Include patient filtering if specified
 6. Be optimized for performance
+7. Use LEFT JOIN or INNER JOIN explicitly instead of just JOIN
 
 Return ONLY the SQL query without any explanation or markdown formatting.
 """
+
+def construct_dynamic_query(user_question, patient_ids=None):
+    """
+    Construct a dynamic SQL query based on user question and schema information
+    """
+    try:
+        # Get schema information
+        schema_info = get_table_schema_info()
+        
+        if 'error' in schema_info:
+            return schema_info
+        
+        question_prompt = f"USER QUESTION: {user_question}\n"
+        
+        if patient_ids:
+            question_prompt += f"\nPATIENT FILTER: Include only these patient IDs: {patient_ids}\n"
+        
+        question_prompt += "\nReturn ONLY the SQL query without any explanation or markdown formatting."
         
         return {
-            'schema_context': schema_context,
-            'var_store_name': var_store_name,
-            'ann_store_name': ann_store_name,
+            'schema_context': schema_info['schema_prompt'] + "\n" + question_prompt,
+            'schema_prompt': schema_info['schema_prompt'],
+            'question_prompt': question_prompt,
+            'schema_fingerprint': schema_info['schema_fingerprint'],
+            'var_store_name': schema_info['variant_store_name'],
+            'ann_store_name': schema_info['annotation_store_name'],
             'patient_ids': patient_ids
         }
         
     except Exception as e:
         return {"error": f"Error constructing dynamic query: {str(e)}"}
 
+# Validated SQL from earlier dynamic questions
+dynamic_query_memo = DynamicQueryMemo(
+    max_entries=DYNAMIC_QUERY_MEMO_MAX_ENTRIES,
+    similarity_threshold=DYNAMIC_QUERY_SIMILARITY_THRESHOLD
+)
+
+def generate_dynamic_sql(query_context):
+    """
+    Generate SQL with Claude. The schema prompt is sent as a cached system prompt
+    so repeated questions only pay for the question tokens.
+    """
+    system_block = {"type": "text", "text": query_context['schema_prompt']}
+    if BEDROCK_PROMPT_CACHING:
+        system_block["cache_control"] = {"type": "ephemeral"}
+    
+    response = bedrock_client.invoke_model(
+        modelId="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+        body=json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 2000,
+            "system": [system_block],
+            "messages": [
+                {
+                    "role": "user",
+                    "content": query_context['question_prompt']
+                }
+            ]
+        })
+    )
+    
+    response_body = json.loads(response['body'].read())
+    usage = response_body.get('usage', {})
+    print(f"SQL generation tokens: input={usage.get('input_tokens', 0)}, "
+          f"cache_read={usage.get('cache_read_input_tokens', 0)}, "
+          f"cache_write={usage.get('cache_creation_input_tokens', 0)}")
+    generated_query = response_body['content'][0]['text'].strip()
+    
+    # Clean up the query (remove any markdown formatting)
+    if generated_query.startswith('```sql'):
+        generated_query = generated_query.replace('```sql', '').replace('```', '').strip()
+    elif generated_query.startswith('```'):
+        generated_query = generated_query.replace('```', '').strip()
+    
+    return generated_query
+
 def execute_dynamic_query(user_question, patient_ids=None):
     """
-    Execute a dynamically constructed query based on user question
+    Execute a dynamically constructed query based on user question.
+    SQL that already answered the same (or a near-duplicate) question for the same
+    patients and schema is reused instead of generating it again.
     """
     try:
         # Get query construction context
@@ -446,38 +636,31 @@ def execute_dynamic_query(user_question, patient_ids=None):
         if 'error' in query_context:
             return query_context
         
+        fingerprint = query_context['schema_fingerprint']
+        memo_query, match = dynamic_query_memo.lookup(user_question, patient_ids, fingerprint)
+        if memo_query:
+            print(f"Reusing memoized SQL ({match} match)")
+            results = execute_athena_query_on_stores(memo_query)
+            if results is not None:
+                return {
+                    'user_question': user_question,
+                    'generated_query': memo_query,
+                    'results': results,
+                    'query_context': f'Memoized query reused ({match} question match)'
+                }
+            # The stored SQL no longer runs; generate it again
+            dynamic_query_memo.discard_sql(memo_query)
+        
         # Use bedrock to generate the SQL query
         if bedrock_client is None:
             return {"error": "Bedrock client not available for dynamic query construction"}
         
-        prompt = query_context['schema_context']
-        
-        # Call Claude to generate the SQL query
-        response = bedrock_client.invoke_model(
-            modelId="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 2000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt + "\n\nIMPORTANT: Use LEFT JOIN or INNER JOIN explicitly instead of just JOIN."
-                    }
-                ]
-            })
-        )
-        
-        response_body = json.loads(response['body'].read())
-        generated_query = response_body['content'][0]['text'].strip()
-        
-        # Clean up the query (remove any markdown formatting)
-        if generated_query.startswith('```sql'):
-            generated_query = generated_query.replace('```sql', '').replace('```', '').strip()
-        elif generated_query.startswith('```'):
-            generated_query = generated_query.replace('```', '').strip()
+        generated_query = generate_dynamic_sql(query_context)
         
         # Execute the generated query
         results = execute_athena_query_on_stores(generated_query)
+        if results is not None:
+            dynamic_query_memo.put(user_question, generated_query, patient_ids, fingerprint)
         
         return {
             'user_question': user_question,
@@ -628,151 +811,303 @@ def get_stores_information():
             'summary': f"Failed to retrieve stores information: {str(e)}"
         }
 
-def query_variants_by_gene_function(gene_symbols, sample_ids=None, include_frequency=True):
-    """Query variants in specific genes with comprehensive clinical annotations"""
-    try:
-        genes = [g.strip().upper() for g in gene_symbols if g.strip()]
-        # Validate gene symbols
-        validated_genes = [validate_sql_input(gene.strip()) for gene in genes if gene.strip()]
-        if not validated_genes:
-            return {"error": "No valid gene symbols provided"}
-        
-        gene_list = "', '".join(validated_genes)
-        
-        sample_filter = ""
-        if sample_ids:
-            validated_samples = [validate_sql_input(s.strip()) for s in sample_ids if s.strip()]
-            if validated_samples:
-                sample_list = "', '".join(validated_samples)
-                sample_filter = f"AND v.sampleid IN ('{sample_list}')"
-        
-        frequency_fields = ""
-        if include_frequency:
-            frequency_fields = "v.information['af'] as allele_frequency_1000g,"
-        
-        # Validate store names
-        validated_variant_store = validate_sql_input(VARIANT_STORE_NAME)
-        validated_annotation_store = validate_sql_input(ANNOTATION_STORE_NAME)
-        
-        query = f"""
-        WITH variant_annotations AS (
-            SELECT 
-                v.sampleid,
-                v.contigname,
-                v.start,
-                v.referenceallele,
-                v.alternatealleles[1] as alternate_allele,
-                v.qual,
-                v.depth,
-                {frequency_fields}
-                v.filters[1] as filter_status,
-                
-                CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as vep_gene,
-                CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as vep_impact,
-                CASE WHEN cardinality(v.annotations.vep) > 0 AND cardinality(v.annotations.vep[1].consequence) > 0 
-                     THEN v.annotations.vep[1].consequence[1] END as vep_consequence,
-                
-                a.attributes['CLNSIG'] as clinvar_significance,
-                a.attributes['CLNDN'] as associated_disease,
-                split_part(a.attributes['GENEINFO'], ':', 1) as clinvar_gene
-                
-            FROM {validated_variant_store} v
-            LEFT JOIN {validated_annotation_store} a ON (
-                REPLACE(v.contigname, 'chr', '') = REPLACE(a.contigname, 'chr', '')
-                AND v.start = a.start
-                AND v.referenceallele = a.referenceallele
-                AND v.alternatealleles[1] = a.alternatealleles[1]
+def build_variants_by_gene_query(gene_symbols, sample_ids=None, include_frequency=True, use_summary=False):
+    """Build the gene-specific variant query SQL, reading the annotated variants summary table if use_summary"""
+    genes = [g.strip().upper() for g in gene_symbols if g.strip()]
+    # Validate gene symbols
+    validated_genes = [validate_sql_input(gene.strip()) for gene in genes if gene.strip()]
+    if not validated_genes:
+        raise QueryInputError("No valid gene symbols provided")
+    
+    gene_list = "', '".join(validated_genes)
+    
+    sample_filter = ""
+    if sample_ids:
+        validated_samples = [validate_sql_input(s.strip()) for s in sample_ids if s.strip()]
+        if validated_samples:
+            sample_list = "', '".join(validated_samples)
+            sample_filter = f"AND v.sampleid IN ('{sample_list}')"
+    
+    frequency_fields = ""
+    if include_frequency:
+        frequency_fields = "v.information['af'] as allele_frequency_1000g,"
+    
+    # Validate store names
+    validated_variant_store = validate_sql_input(VARIANT_STORE_NAME)
+    validated_annotation_store = validate_sql_input(ANNOTATION_STORE_NAME)
+    
+    if use_summary:
+        # Pre-joined on the normalized contig key, so there is no join or REPLACE() at query time
+        summary_frequency_fields = "v.allele_frequency_1000g," if include_frequency else ""
+        variant_annotations = f"""
+        SELECT
+            v.sampleid,
+            v.contigname,
+            v.start,
+            v.referenceallele,
+            v.alternate_allele,
+            v.qual,
+            v.depth,
+            {summary_frequency_fields}
+            v.filter_status,
+            v.vep_gene,
+            v.vep_impact,
+            v.vep_consequence,
+            v.clinvar_significance,
+            v.associated_disease,
+            v.clinvar_gene
+        FROM {LAKE_FORMATION_DATABASE}.{summary_tables.annotated_variants} v
+        WHERE v.qual > 30 
+            AND (
+                UPPER(v.vep_gene) IN ('{gene_list}')
+                OR UPPER(v.clinvar_gene) IN ('{gene_list}')
             )
-            WHERE v.qual > 30 
-                AND contains(v.filters, 'PASS')
-                AND (
-                    (cardinality(v.annotations.vep) > 0 AND UPPER(v.annotations.vep[1].symbol) IN ('{gene_list}'))
-                    OR UPPER(split_part(a.attributes['GENEINFO'], ':', 1)) IN ('{gene_list}')
-                )
-                {sample_filter}
+            {sample_filter}
+        """
+    else:
+        variant_annotations = f"""
+        SELECT
+            v.sampleid,
+            v.contigname,
+            v.start,
+            v.referenceallele,
+            v.alternatealleles[1] as alternate_allele,
+            v.qual,
+            v.depth,
+            {frequency_fields}
+            v.filters[1] as filter_status,
+
+            CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as vep_gene,
+            CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as vep_impact,
+            CASE WHEN cardinality(v.annotations.vep) > 0 AND cardinality(v.annotations.vep[1].consequence) > 0
+                 THEN v.annotations.vep[1].consequence[1] END as vep_consequence,
+
+            a.attributes['CLNSIG'] as clinvar_significance,
+            a.attributes['CLNDN'] as associated_disease,
+            split_part(a.attributes['GENEINFO'], ':', 1) as clinvar_gene
+
+        FROM {validated_variant_store} v
+        LEFT JOIN {validated_annotation_store} a ON (
+            REPLACE(v.contigname, 'chr', '') = REPLACE(a.contigname, 'chr', '')
+            AND v.start = a.start
+            AND v.referenceallele = a.referenceallele
+            AND v.alternatealleles[1] = a.alternatealleles[1]
         )
-        
-        SELECT 
-            sampleid,
-            CONCAT(contigname, ':', CAST(start as VARCHAR), ':', referenceallele, '>', alternate_allele) as variant_id,
-            COALESCE(clinvar_gene, vep_gene) as gene_symbol,
-            vep_consequence as consequence,
-            vep_impact as impact,
-            clinvar_significance,
-            associated_disease,
-            qual,
-            depth,
-            {'allele_frequency_1000g,' if include_frequency else ''}
-            
-            CASE 
-                WHEN clinvar_significance = 'Pathogenic' AND vep_impact = 'HIGH' THEN 10
-                WHEN clinvar_significance = 'Pathogenic' AND vep_impact = 'MODERATE' THEN 9
-                WHEN clinvar_significance = 'Likely_pathogenic' AND vep_impact = 'HIGH' THEN 8
-                WHEN clinvar_significance = 'Likely_pathogenic' AND vep_impact = 'MODERATE' THEN 7
-                WHEN clinvar_significance = 'Uncertain_significance' AND vep_impact = 'HIGH' THEN 6
-                WHEN vep_impact = 'HIGH' THEN 5
-                WHEN clinvar_significance = 'Uncertain_significance' AND vep_impact = 'MODERATE' THEN 4
-                ELSE 1
-            END as priority_score
-
-        FROM variant_annotations
-        ORDER BY priority_score DESC, qual DESC
+        WHERE v.qual > 30
+            AND contains(v.filters, 'PASS')
+            AND (
+                (cardinality(v.annotations.vep) > 0 AND UPPER(v.annotations.vep[1].symbol) IN ('{gene_list}'))
+                OR UPPER(split_part(a.attributes['GENEINFO'], ':', 1)) IN ('{gene_list}')
+            )
+            {sample_filter}
         """
-        
+
+    query = f"""
+    WITH variant_annotations AS ({variant_annotations})
+
+    SELECT 
+        sampleid,
+        CONCAT(contigname, ':', CAST(start as VARCHAR), ':', referenceallele, '>', alternate_allele) as variant_id,
+        COALESCE(clinvar_gene, vep_gene) as gene_symbol,
+        vep_consequence as consequence,
+        vep_impact as impact,
+        clinvar_significance,
+        associated_disease,
+        qual,
+        depth,
+        {'allele_frequency_1000g,' if include_frequency else ''}
+        
+        CASE 
+            WHEN clinvar_significance = 'Pathogenic' AND vep_impact = 'HIGH' THEN 10
+            WHEN clinvar_significance = 'Pathogenic' AND vep_impact = 'MODERATE' THEN 9
+            WHEN clinvar_significance = 'Likely_pathogenic' AND vep_impact = 'HIGH' THEN 8
+            WHEN clinvar_significance = 'Likely_pathogenic' AND vep_impact = 'MODERATE' THEN 7
+            WHEN clinvar_significance = 'Uncertain_significance' AND vep_impact = 'HIGH' THEN 6
+            WHEN vep_impact = 'HIGH' THEN 5
+            WHEN clinvar_significance = 'Uncertain_significance' AND vep_impact = 'MODERATE' THEN 4
+            ELSE 1
+        END as priority_score
+
+    FROM variant_annotations
+    ORDER BY priority_score DESC, qual DESC
+    """
+    return query
+
+def summarize_variants_by_gene(results, gene_symbols):
+    """Summarize rows returned by the gene-specific variant query"""
+    genes = [g.strip().upper() for g in gene_symbols if g.strip()]
+    
+    gene_counts = {}
+    impact_counts = {}
+    significance_counts = {}
+    
+    for row in results:
+        gene = row.get('gene_symbol', 'Unknown')
+        impact = row.get('impact', 'Unknown')
+        significance = row.get('clinvar_significance', 'Unknown')
+        
+        gene_counts[gene] = gene_counts.get(gene, 0) + 1
+        if impact != 'Unknown':
+            impact_counts[impact] = impact_counts.get(impact, 0) + 1
+        if significance != 'Unknown':
+            significance_counts[significance] = significance_counts.get(significance, 0) + 1
+    
+    return {
+        "analysis_type": "Gene-Specific Variant Analysis",
+        "genes_queried": genes,
+        "total_variants": len(results),
+        "variants": results[:100],
+        "summary": {
+            "variants_per_gene": gene_counts,
+            "impact_distribution": impact_counts,
+            "clinical_significance": significance_counts
+        }
+    }
+
+def query_variants_by_gene_function(gene_symbols, sample_ids=None, include_frequency=True):
+    """Query variants in specific genes with comprehensive clinical annotations"""
+    try:
+        query = build_variants_by_gene_query(gene_symbols, sample_ids, include_frequency,
+                                             use_summary=summary_tables_fresh())
         results = execute_athena_query_on_stores(query)
+        return summarize_variants_by_gene(results, gene_symbols)
         
-        gene_counts = {}
-        impact_counts = {}
-        significance_counts = {}
-        
-        for row in results:
-            gene = row.get('gene_symbol', 'Unknown')
-            impact = row.get('impact', 'Unknown')
-            significance = row.get('clinvar_significance', 'Unknown')
-            
-            gene_counts[gene] = gene_counts.get(gene, 0) + 1
-            if impact != 'Unknown':
-                impact_counts[impact] = impact_counts.get(impact, 0) + 1
-            if significance != 'Unknown':
-                significance_counts[significance] = significance_counts.get(significance, 0) + 1
-        
-        return {
-            "analysis_type": "Gene-Specific Variant Analysis",
-            "genes_queried": genes,
-            "total_variants": len(results),
-            "variants": results[:100],
-            "summary": {
-                "variants_per_gene": gene_counts,
-                "impact_distribution": impact_counts,
-                "clinical_significance": significance_counts
-            }
-        }
+    except QueryInputError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Error in gene variant query: {str(e)}"}
+
+async def query_variants_by_gene_function_async(gene_symbols, sample_ids=None, include_frequency=True):
+    """Asyncio variant of query_variants_by_gene_function"""
+    try:
+        query = build_variants_by_gene_query(gene_symbols, sample_ids, include_frequency,
+                                             use_summary=summary_tables_fresh())
+        results = await execute_athena_query_on_stores_async(query)
+        return summarize_variants_by_gene(results, gene_symbols)
         
+    except QueryInputError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"Error in gene variant query: {str(e)}"}
 
+def build_variants_by_chromosome_query(chromosome, sample_ids=None, position_range=None):
+    """Build the chromosome variant query SQL"""
+    # Validate chromosome input
+    chr_clean = validate_sql_input(chromosome.replace('chr', '').upper())
+    
+    sample_filter = ""
+    if sample_ids:
+        validated_samples = [validate_sql_input(s.strip()) for s in sample_ids if s.strip()]
+        if validated_samples:
+            sample_list = "', '".join(validated_samples)
+            sample_filter = f"AND v.sampleid IN ('{sample_list}')"
+    
+    position_filter = ""
+    if position_range and '-' in position_range:
+        try:
+            start_pos, end_pos = position_range.split('-')
+            position_filter = f"AND v.start BETWEEN {int(start_pos)} AND {int(end_pos)}"
+        except ValueError:
+            raise QueryInputError("Invalid position range format. Use 'start-end' format.")
+    
+    query = f"""
+    SELECT 
+        v.sampleid,
+        v.contigname,
+        v.start,
+        v.referenceallele,
+        v.alternatealleles[1] as alternate_allele,
+        v.qual,
+        v.depth,
+        v.information['af'] as allele_frequency_1000g,
+        
+        CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as gene_symbol,
+        CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as impact,
+        CASE WHEN cardinality(v.annotations.vep) > 0 AND cardinality(v.annotations.vep[1].consequence) > 0 
+             THEN v.annotations.vep[1].consequence[1] END as consequence,
+        
+        a.attributes['CLNSIG'] as clinical_significance,
+        a.attributes['CLNDN'] as associated_disease
+        
+    FROM {validate_sql_input(VARIANT_STORE_NAME)} v
+    LEFT JOIN {validate_sql_input(ANNOTATION_STORE_NAME)} a ON (
+        REPLACE(v.contigname, 'chr', '') = REPLACE(a.contigname, 'chr', '')
+        AND v.start = a.start
+        AND v.referenceallele = a.referenceallele
+        AND v.alternatealleles[1] = a.alternatealleles[1]
+    )
+    WHERE v.qual > 30 
+        AND contains(v.filters, 'PASS')
+        AND REPLACE(v.contigname, 'chr', '') = '{chr_clean}'
+        {position_filter}
+        {sample_filter}
+    ORDER BY v.start
+    """
+    return query
+
+def summarize_variants_by_chromosome(results, chromosome, position_range=None):
+    """Summarize rows returned by the chromosome variant query"""
+    chr_clean = chromosome.replace('chr', '').upper()
+    
+    gene_counts = {}
+    impact_counts = {}
+    
+    for row in results:
+        gene = row.get('gene_symbol')
+        impact = row.get('impact')
+        
+        if gene:
+            gene_counts[gene] = gene_counts.get(gene, 0) + 1
+        if impact:
+            impact_counts[impact] = impact_counts.get(impact, 0) + 1
+    
+    return {
+        "analysis_type": "Chromosome-Specific Analysis",
+        "chromosome": chr_clean,
+        "position_range": position_range if position_range else "entire chromosome",
+        "total_variants": len(results),
+        "variants": results[:100],
+        "summary": {
+            "top_genes": dict(sorted(gene_counts.items(), key=lambda x: x[1], reverse=True)[:10]),
+            "impact_distribution": impact_counts
+        }
+    }
+
 def query_variants_by_chromosome_function(chromosome, sample_ids=None, position_range=None):
     """Query variants by chromosome with optional position range filtering"""
     try:
-        # Validate chromosome input
-        chr_clean = validate_sql_input(chromosome.replace('chr', '').upper())
-        
-        sample_filter = ""
-        if sample_ids:
-            validated_samples = [validate_sql_input(s.strip()) for s in sample_ids if s.strip()]
-            if validated_samples:
-                sample_list = "', '".join(validated_samples)
-                sample_filter = f"AND v.sampleid IN ('{sample_list}')"
-        
-        position_filter = ""
-        if position_range and '-' in position_range:
-            try:
-                start_pos, end_pos = position_range.split('-')
-                position_filter = f"AND v.start BETWEEN {int(start_pos)} AND {int(end_pos)}"
-            except ValueError:
-                return {"error": "Invalid position range format. Use 'start-end' format."}
+        query = build_variants_by_chromosome_query(chromosome, sample_ids, position_range)
+        results = execute_athena_query_on_stores(query)
+        return summarize_variants_by_chromosome(results, chromosome, position_range)
         
-        query = f"""
+    except QueryInputError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Error in chromosome variant query: {str(e)}"}
+
+async def query_variants_by_chromosome_function_async(chromosome, sample_ids=None, position_range=None):
+    """Asyncio variant of query_variants_by_chromosome_function"""
+    try:
+        query = build_variants_by_chromosome_query(chromosome, sample_ids, position_range)
+        results = await execute_athena_query_on_stores_async(query)
+        return summarize_variants_by_chromosome(results, chromosome, position_range)
+        
+    except QueryInputError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Error in chromosome variant query: {str(e)}"}
+
+def build_allele_frequencies_query(sample_ids=None, frequency_threshold=0.01):
+    """Build the allele frequency analysis query SQL"""
+    sample_filter = ""
+    if sample_ids:
+        samples = [s.strip() for s in sample_ids if s.strip()]
+        if samples:
+            sample_list = "', '".join(samples)
+            sample_filter = f"AND v.sampleid IN ('{sample_list}')"
+    
+    query = f"""
+    WITH variant_data AS (
         SELECT 
             v.sampleid,
             v.contigname,
@@ -781,15 +1116,18 @@ def query_variants_by_chromosome_function(chromosome, sample_ids=None, position_
             v.alternatealleles[1] as alternate_allele,
             v.qual,
             v.depth,
-            v.information['af'] as allele_frequency_1000g,
             
-            CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as gene_symbol,
-            CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as impact,
+            CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as vep_gene,
+            CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as vep_impact,
             CASE WHEN cardinality(v.annotations.vep) > 0 AND cardinality(v.annotations.vep[1].consequence) > 0 
-                 THEN v.annotations.vep[1].consequence[1] END as consequence,
+                 THEN v.annotations.vep[1].consequence[1] END as vep_consequence,
             
             a.attributes['CLNSIG'] as clinical_significance,
-            a.attributes['CLNDN'] as associated_disease
+            split_part(a.attributes['GENEINFO'], ':', 1) as clinvar_gene,
+            
+            TRY_CAST(v.information['af'] as DOUBLE) as allele_frequency,
+            TRY_CAST(v.information['dp'] as INTEGER) as total_depth,
+            TRY_CAST(v.information['mq'] as DOUBLE) as mapping_quality
             
         FROM {validate_sql_input(VARIANT_STORE_NAME)} v
         LEFT JOIN {validate_sql_input(ANNOTATION_STORE_NAME)} a ON (
@@ -798,265 +1136,248 @@ def query_variants_by_chromosome_function(chromosome, sample_ids=None, position_
             AND v.referenceallele = a.referenceallele
             AND v.alternatealleles[1] = a.alternatealleles[1]
         )
-        WHERE v.qual > 30 
+        WHERE v.information['af'] IS NOT NULL
+            AND v.qual > 30 
             AND contains(v.filters, 'PASS')
-            AND REPLACE(v.contigname, 'chr', '') = '{chr_clean}'
-            {position_filter}
             {sample_filter}
-        ORDER BY v.start
-        """
-        
-        results = execute_athena_query_on_stores(query)
-        
-        gene_counts = {}
-        impact_counts = {}
+    )
+
+    SELECT 
+        sampleid,
+        COALESCE(clinvar_gene, vep_gene) as gene_symbol,
+        contigname,
+        start,
+        referenceallele,
+        alternate_allele,
+        qual,
+        depth,
+        allele_frequency,
+        total_depth,
+        mapping_quality,
+        clinical_significance,
+        vep_impact,
+        vep_consequence as consequence,
+        
+        CASE 
+            WHEN qual > 100 AND depth > 20 THEN 'High Quality'
+            WHEN qual > 50 AND depth > 10 THEN 'Medium Quality'
+            ELSE 'Low Quality'
+        END as quality_tier,
+        
+        CASE 
+            WHEN allele_frequency < 0.001 THEN 'Very Rare'
+            WHEN allele_frequency < {frequency_threshold} THEN 'Rare'
+            WHEN allele_frequency < 0.05 THEN 'Uncommon'
+            WHEN allele_frequency IS NOT NULL THEN 'Common'
+            ELSE 'Unknown'
+        END as rarity_category,
+        
+        CASE 
+            WHEN allele_frequency IS NOT NULL AND allele_frequency > 0 
+            THEN ROUND(-LOG10(allele_frequency), 2)
+            ELSE NULL
+        END as rarity_score,
+        
+        CASE 
+            WHEN allele_frequency IS NOT NULL AND allele_frequency > 0 AND allele_frequency < 1
+            THEN ROUND(2 * allele_frequency * (1 - allele_frequency), 4)
+            ELSE NULL
+        END as expected_het_frequency
+
+    FROM variant_data
+    WHERE allele_frequency IS NOT NULL
+    ORDER BY allele_frequency ASC, qual DESC
+    """
+    return query
+
+def summarize_allele_frequencies(results, frequency_threshold=0.01):
+    """Summarize rows returned by the allele frequency analysis query"""
+    rarity_counts = {}
+    quality_counts = {}
+    rare_variants = []
+    
+    for row in results:
+        rarity = row.get('rarity_category', 'Unknown')
+        quality = row.get('quality_tier', 'Unknown')
         
-        for row in results:
-            gene = row.get('gene_symbol')
-            impact = row.get('impact')
-            
-            if gene:
-                gene_counts[gene] = gene_counts.get(gene, 0) + 1
-            if impact:
-                impact_counts[impact] = impact_counts.get(impact, 0) + 1
+        rarity_counts[rarity] = rarity_counts.get(rarity, 0) + 1
+        quality_counts[quality] = quality_counts.get(quality, 0) + 1
         
-        return {
-            "analysis_type": "Chromosome-Specific Analysis",
-            "chromosome": chr_clean,
-            "position_range": position_range if position_range else "entire chromosome",
-            "total_variants": len(results),
-            "variants": results[:100],
-            "summary": {
-                "top_genes": dict(sorted(gene_counts.items(), key=lambda x: x[1], reverse=True)[:10]),
-                "impact_distribution": impact_counts
-            }
+        if rarity in ['Very Rare', 'Rare']:
+            rare_variants.append(row)
+    
+    return {
+        "analysis_type": "Allele Frequency Analysis",
+        "frequency_threshold": frequency_threshold,
+        "total_variants_with_frequency": len(results),
+        "rarity_distribution": rarity_counts,
+        "quality_distribution": quality_counts,
+        "rare_variants_detail": rare_variants[:50],
+        "summary_statistics": {
+            "very_rare_count": rarity_counts.get('Very Rare', 0),
+            "rare_count": rarity_counts.get('Rare', 0),
+            "high_quality_count": quality_counts.get('High Quality', 0)
         }
-        
-    except Exception as e:
-        return {"error": f"Error in chromosome variant query: {str(e)}"}
+    }
 
 def analyze_allele_frequencies_function(sample_ids=None, frequency_threshold=0.01):
     """Analyze allele frequencies and compare with 1000 Genomes Project data"""
     try:
-        sample_filter = ""
-        if sample_ids:
-            samples = [s.strip() for s in sample_ids if s.strip()]
-            if samples:
-                sample_list = "', '".join(samples)
-                sample_filter = f"AND v.sampleid IN ('{sample_list}')"
-        
-        query = f"""
-        WITH variant_data AS (
-            SELECT 
-                v.sampleid,
-                v.contigname,
-                v.start,
-                v.referenceallele,
-                v.alternatealleles[1] as alternate_allele,
-                v.qual,
-                v.depth,
-                
-                CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as vep_gene,
-                CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as vep_impact,
-                CASE WHEN cardinality(v.annotations.vep) > 0 AND cardinality(v.annotations.vep[1].consequence) > 0 
-                     THEN v.annotations.vep[1].consequence[1] END as vep_consequence,
-                
-                a.attributes['CLNSIG'] as clinical_significance,
-                split_part(a.attributes['GENEINFO'], ':', 1) as clinvar_gene,
-                
-                TRY_CAST(v.information['af'] as DOUBLE) as allele_frequency,
-                TRY_CAST(v.information['dp'] as INTEGER) as total_depth,
-                TRY_CAST(v.information['mq'] as DOUBLE) as mapping_quality
-                
-            FROM {validate_sql_input(VARIANT_STORE_NAME)} v
-            LEFT JOIN {validate_sql_input(ANNOTATION_STORE_NAME)} a ON (
-                REPLACE(v.contigname, 'chr', '') = REPLACE(a.contigname, 'chr', '')
-                AND v.start = a.start
-                AND v.referenceallele = a.referenceallele
-                AND v.alternatealleles[1] = a.alternatealleles[1]
-            )
-            WHERE v.information['af'] IS NOT NULL
-                AND v.qual > 30 
-                AND contains(v.filters, 'PASS')
-                {sample_filter}
-        )
-
-        SELECT 
-            sampleid,
-            COALESCE(clinvar_gene, vep_gene) as gene_symbol,
-            contigname,
-            start,
-            referenceallele,
-            alternate_allele,
-            qual,
-            depth,
-            allele_frequency,
-            total_depth,
-            mapping_quality,
-            clinical_significance,
-            vep_impact,
-            vep_consequence as consequence,
-            
-            CASE 
-                WHEN qual > 100 AND depth > 20 THEN 'High Quality'
-                WHEN qual > 50 AND depth > 10 THEN 'Medium Quality'
-                ELSE 'Low Quality'
-            END as quality_tier,
-            
-            CASE 
-                WHEN allele_frequency < 0.001 THEN 'Very Rare'
-                WHEN allele_frequency < {frequency_threshold} THEN 'Rare'
-                WHEN allele_frequency < 0.05 THEN 'Uncommon'
-                WHEN allele_frequency IS NOT NULL THEN 'Common'
-                ELSE 'Unknown'
-            END as rarity_category,
-            
-            CASE 
-                WHEN allele_frequency IS NOT NULL AND allele_frequency > 0 
-                THEN ROUND(-LOG10(allele_frequency), 2)
-                ELSE NULL
-            END as rarity_score,
-            
-            CASE 
-                WHEN allele_frequency IS NOT NULL AND allele_frequency > 0 AND allele_frequency < 1
-                THEN ROUND(2 * allele_frequency * (1 - allele_frequency), 4)
-                ELSE NULL
-            END as expected_het_frequency
-
-        FROM variant_data
-        WHERE allele_frequency IS NOT NULL
-        ORDER BY allele_frequency ASC, qual DESC
-        """
-        
+        query = build_allele_frequencies_query(sample_ids, frequency_threshold)
         results = execute_athena_query_on_stores(query)
+        return summarize_allele_frequencies(results, frequency_threshold)
         
-        rarity_counts = {}
-        quality_counts = {}
-        rare_variants = []
-        
-        for row in results:
-            rarity = row.get('rarity_category', 'Unknown')
-            quality = row.get('quality_tier', 'Unknown')
-            
-            rarity_counts[rarity] = rarity_counts.get(rarity, 0) + 1
-            quality_counts[quality] = quality_counts.get(quality, 0) + 1
-            
-            if rarity in ['Very Rare', 'Rare']:
-                rare_variants.append(row)
-        
-        return {
-            "analysis_type": "Allele Frequency Analysis",
-            "frequency_threshold": frequency_threshold,
-            "total_variants_with_frequency": len(results),
-            "rarity_distribution": rarity_counts,
-            "quality_distribution": quality_counts,
-            "rare_variants_detail": rare_variants[:50],
-            "summary_statistics": {
-                "very_rare_count": rarity_counts.get('Very Rare', 0),
-                "rare_count": rarity_counts.get('Rare', 0),
-                "high_quality_count": quality_counts.get('High Quality', 0)
-            }
-        }
-        
+    except QueryInputError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"Error in allele frequency analysis: {str(e)}"}
 
-def compare_sample_variants_function(sample_ids):
-    """Compare variant profiles between multiple samples for population analysis"""
+async def analyze_allele_frequencies_function_async(sample_ids=None, frequency_threshold=0.01):
+    """Asyncio variant of analyze_allele_frequencies_function"""
     try:
-        validated_samples = [validate_sql_input(s.strip()) for s in sample_ids if s.strip()]
-        if len(validated_samples) < 2:
-            return {"error": "At least 2 sample IDs required for comparison"}
+        query = build_allele_frequencies_query(sample_ids, frequency_threshold)
+        results = await execute_athena_query_on_stores_async(query)
+        return summarize_allele_frequencies(results, frequency_threshold)
         
-        sample_list = "', '".join(validated_samples)
-        
-        query = f"""
-        WITH sample_variants AS (
-            SELECT 
-                v.sampleid,
-                v.qual,
-                v.depth,
-                v.referenceallele,
-                v.alternatealleles[1] as alternate_allele,
-                v.filters[1] as filter_status,
-                
-                CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as vep_gene,
-                CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as vep_impact,
-                
-                a.attributes['CLNSIG'] as clinical_significance,
-                split_part(a.attributes['GENEINFO'], ':', 1) as clinvar_gene
-                
-            FROM {validate_sql_input(VARIANT_STORE_NAME)} v
-            LEFT JOIN {validate_sql_input(ANNOTATION_STORE_NAME)} a ON (
-                REPLACE(v.contigname, 'chr', '') = REPLACE(a.contigname, 'chr', '')
-                AND v.start = a.start
-                AND v.referenceallele = a.referenceallele
-                AND v.alternatealleles[1] = a.alternatealleles[1]
-            )
-            WHERE v.filters[1] = 'PASS'
-                AND v.sampleid IN ('{sample_list}')
-        )
+    except QueryInputError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Error in allele frequency analysis: {str(e)}"}
 
+def build_sample_comparison_query(sample_ids, use_summary=False):
+    """Build the sample comparison query SQL, reading the per-sample summary table if use_summary"""
+    validated_samples = [validate_sql_input(s.strip()) for s in sample_ids if s.strip()]
+    if len(validated_samples) < 2:
+        raise QueryInputError("At least 2 sample IDs required for comparison")
+    
+    sample_list = "', '".join(validated_samples)
+    
+    if use_summary:
+        query = f"""
+    SELECT 
+        sampleid, total_variants,
+        pathogenic_count, likely_pathogenic_count, vus_count, benign_count,
+        high_impact_count, moderate_impact_count, low_impact_count, modifier_impact_count,
+        avg_quality, avg_depth, min_quality, max_quality,
+        unique_genes_affected, snv_count, deletion_count, insertion_count,
+        pathogenic_percentage
+    FROM {LAKE_FORMATION_DATABASE}.{summary_tables.sample_summary}
+    WHERE sampleid IN ('{sample_list}')
+    ORDER BY sampleid
+    """
+        return query
+    
+    query = f"""
+    WITH sample_variants AS (
         SELECT 
-            sampleid,
-            COUNT(*) as total_variants,
-            
-            COUNT(CASE WHEN clinical_significance = 'Pathogenic' THEN 1 END) as pathogenic_count,
-            COUNT(CASE WHEN clinical_significance = 'Likely_pathogenic' THEN 1 END) as likely_pathogenic_count,
-            COUNT(CASE WHEN clinical_significance = 'Uncertain_significance' THEN 1 END) as vus_count,
-            COUNT(CASE WHEN clinical_significance IN ('Benign', 'Likely_benign') THEN 1 END) as benign_count,
-            
-            COUNT(CASE WHEN vep_impact = 'HIGH' THEN 1 END) as high_impact_count,
-            COUNT(CASE WHEN vep_impact = 'MODERATE' THEN 1 END) as moderate_impact_count,
-            COUNT(CASE WHEN vep_impact = 'LOW' THEN 1 END) as low_impact_count,
-            COUNT(CASE WHEN vep_impact = 'MODIFIER' THEN 1 END) as modifier_impact_count,
-            
-            ROUND(AVG(CAST(qual as DOUBLE)), 2) as avg_quality,
-            ROUND(AVG(CAST(depth as DOUBLE)), 2) as avg_depth,
-            MIN(qual) as min_quality,
-            MAX(qual) as max_quality,
-            
-            COUNT(DISTINCT COALESCE(clinvar_gene, vep_gene)) as unique_genes_affected,
-            
-            COUNT(CASE 
-                WHEN LENGTH(referenceallele) = 1 AND LENGTH(alternate_allele) = 1 
-                THEN 1 
-            END) as snv_count,
+            v.sampleid,
+            v.qual,
+            v.depth,
+            v.referenceallele,
+            v.alternatealleles[1] as alternate_allele,
+            v.filters[1] as filter_status,
             
-            COUNT(CASE 
-                WHEN LENGTH(referenceallele) > LENGTH(alternate_allele) 
-                THEN 1 
-            END) as deletion_count,
+            CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as vep_gene,
+            CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as vep_impact,
             
-            COUNT(CASE 
-                WHEN LENGTH(referenceallele) < LENGTH(alternate_allele) 
-                THEN 1 
-            END) as insertion_count,
+            a.attributes['CLNSIG'] as clinical_significance,
+            split_part(a.attributes['GENEINFO'], ':', 1) as clinvar_gene
             
-            ROUND(
-                COUNT(CASE WHEN clinical_significance IN ('Pathogenic', 'Likely_pathogenic') THEN 1 END) * 100.0 / COUNT(*), 
-                2
-            ) as pathogenic_percentage
+        FROM {validate_sql_input(VARIANT_STORE_NAME)} v
+        LEFT JOIN {validate_sql_input(ANNOTATION_STORE_NAME)} a ON (
+            REPLACE(v.contigname, 'chr', '') = REPLACE(a.contigname, 'chr', '')
+            AND v.start = a.start
+            AND v.referenceallele = a.referenceallele
+            AND v.alternatealleles[1] = a.alternatealleles[1]
+        )
+        WHERE v.filters[1] = 'PASS'
+            AND v.sampleid IN ('{sample_list}')
+    )
 
-        FROM sample_variants
-        GROUP BY sampleid
-        ORDER BY sampleid
-        """
-        
+    SELECT 
+        sampleid,
+        COUNT(*) as total_variants,
+        
+        COUNT(CASE WHEN clinical_significance = 'Pathogenic' THEN 1 END) as pathogenic_count,
+        COUNT(CASE WHEN clinical_significance = 'Likely_pathogenic' THEN 1 END) as likely_pathogenic_count,
+        COUNT(CASE WHEN clinical_significance = 'Uncertain_significance' THEN 1 END) as vus_count,
+        COUNT(CASE WHEN clinical_significance IN ('Benign', 'Likely_benign') THEN 1 END) as benign_count,
+        
+        COUNT(CASE WHEN vep_impact = 'HIGH' THEN 1 END) as high_impact_count,
+        COUNT(CASE WHEN vep_impact = 'MODERATE' THEN 1 END) as moderate_impact_count,
+        COUNT(CASE WHEN vep_impact = 'LOW' THEN 1 END) as low_impact_count,
+        COUNT(CASE WHEN vep_impact = 'MODIFIER' THEN 1 END) as modifier_impact_count,
+        
+        ROUND(AVG(CAST(qual as DOUBLE)), 2) as avg_quality,
+        ROUND(AVG(CAST(depth as DOUBLE)), 2) as avg_depth,
+        MIN(qual) as min_quality,
+        MAX(qual) as max_quality,
+        
+        COUNT(DISTINCT COALESCE(clinvar_gene, vep_gene)) as unique_genes_affected,
+        
+        COUNT(CASE 
+            WHEN LENGTH(referenceallele) = 1 AND LENGTH(alternate_allele) = 1 
+            THEN 1 
+        END) as snv_count,
+        
+        COUNT(CASE 
+            WHEN LENGTH(referenceallele) > LENGTH(alternate_allele) 
+            THEN 1 
+        END) as deletion_count,
+        
+        COUNT(CASE 
+            WHEN LENGTH(referenceallele) < LENGTH(alternate_allele) 
+            THEN 1 
+        END) as insertion_count,
+        
+        ROUND(
+            COUNT(CASE WHEN clinical_significance IN ('Pathogenic', 'Likely_pathogenic') THEN 1 END) * 100.0 / COUNT(*), 
+            2
+        ) as pathogenic_percentage
+
+    FROM sample_variants
+    GROUP BY sampleid
+    ORDER BY sampleid
+    """
+    return query
+
+def summarize_sample_comparison(results, sample_ids):
+    """Summarize rows returned by the sample comparison query"""
+    samples = [s.strip() for s in sample_ids if s.strip()]
+    
+    return {
+        "analysis_type": "Sample Comparison Analysis",
+        "samples_compared": samples,
+        "comparison_results": results,
+        "summary": {
+            "total_samples": len(results),
+            "comparison_metrics": [
+                "total_variants", "pathogenic_count", "high_impact_count", 
+                "avg_quality", "unique_genes_affected", "pathogenic_percentage"
+            ]
+        }
+    }
+
+def compare_sample_variants_function(sample_ids):
+    """Compare variant profiles between multiple samples for population analysis"""
+    try:
+        query = build_sample_comparison_query(sample_ids, use_summary=summary_tables_fresh())
         results = execute_athena_query_on_stores(query)
+        return summarize_sample_comparison(results, sample_ids)
         
-        return {
-            "analysis_type": "Sample Comparison Analysis",
-            "samples_compared": samples,
-            "comparison_results": results,
-            "summary": {
-                "total_samples": len(results),
-                "comparison_metrics": [
-                    "total_variants", "pathogenic_count", "high_impact_count", 
-                    "avg_quality", "unique_genes_affected", "pathogenic_percentage"
-                ]
-            }
-        }
+    except QueryInputError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Error in sample comparison: {str(e)}"}
+
+async def compare_sample_variants_function_async(sample_ids):
+    """Asyncio variant of compare_sample_variants_function"""
+    try:
+        query = build_sample_comparison_query(sample_ids, use_summary=summary_tables_fresh())
+        results = await execute_athena_query_on_stores_async(query)
+        return summarize_sample_comparison(results, sample_ids)
         
+    except QueryInputError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"Error in sample comparison: {str(e)}"}
@@ -15,6 +15,7 @@ from .genomics_store_functions import (
     query_variants_by_chromosome_function,
     analyze_allele_frequencies_function,
     compare_sample_variants_function,
+    refresh_summary_tables_function,
     get_stores_information,
     get_available_samples_from_variant_store,
     REGION,
@@ -237,13 +238,36 @@ def execute_dynamic_genomics_query(user_question: str, sample_ids: str = "") ->
     except Exception as e:
         return f"Error executing dynamic genomics query: {str(e)}"
 
+@tool
+def refresh_variant_summary_tables(sample_ids: str = "", full_rebuild: bool = False) -> str:
+    """
+    Refresh the materialized variant summary tables after a VEP pipeline ingest.
+    
+    Args:
+        sample_ids: Optional comma-separated list of newly ingested sample IDs (default: samples not yet summarized)
+        full_rebuild: Rebuild every table from the live stores (default: False)
+    
+    Returns:
+        JSON string with the refresh mode and the samples that were recomputed
+    """
+    try:
+        samples = [s.strip() for s in sample_ids.split(',') if s.strip()] if sample_ids else None
+        
+        result = refresh_summary_tables_function(samples, full_rebuild)
+        
+        return f"{json.dumps(result, indent=2, default=str)}"
+        
+    except Exception as e:
+        return f"Error refreshing variant summary tables: {str(e)}"
+
 # Create list of tools for genomics stores
 genomics_store_agent_tools = [
     query_variants_by_gene,
     query_variants_by_chromosome, 
     analyze_allele_frequencies,
     compare_sample_variants,
-    execute_dynamic_genomics_query
+    execute_dynamic_genomics_query,
+    refresh_variant_summary_tables
 ]
 
 model = BedrockModel(
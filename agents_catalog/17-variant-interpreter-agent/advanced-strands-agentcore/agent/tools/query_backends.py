@@ -0,0 +1,105 @@
+"""
+Query Backends Module
+Pluggable execution backends for the SQL generated by the genomics store tools
+
+- Athena (AthenaQueryRunner in athena_query_layer): the production backend
+- DuckDBBackend: embedded columnar engine over local Parquet exports of the
+  variant and annotation stores, for profiling, load testing and small cohorts
+"""
+
+import asyncio
+import os
+import re
+import threading
+
+
+class QueryBackend:
+    """
+    Interface implemented by every execution backend.
+
+    `execute` returns result rows as a list of dicts with string values, the same
+    shape Athena returns, so the tool summarizers work unchanged on any backend.
+    """
+
+    name = 'base'
+
+    def execute(self, query, database, use_cache=True):
+        raise NotImplementedError
+
+    async def execute_async(self, query, database, use_cache=True):
+        return await asyncio.to_thread(self.execute, query, database, use_cache)
+
+
+# Athena (Trino) functions that have a different name in DuckDB.
+# The generated tool SQL only applies these to arrays.
+TRINO_TO_DUCKDB_FUNCTIONS = {
+    'cardinality': 'len',
+    'contains': 'list_contains',
+}
+
+
+def translate_trino_to_duckdb(query):
+    """Rewrite the Athena-specific function calls used by the tool SQL into DuckDB equivalents"""
+    for trino_name, duckdb_name in TRINO_TO_DUCKDB_FUNCTIONS.items():
+        query = re.sub(rf'\b{trino_name}\s*\(', f'{duckdb_name}(', query, flags=re.IGNORECASE)
+    return query
+
+
+def _to_athena_value(value):
+    """Format a DuckDB value the way Athena returns it in a result row"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+class DuckDBBackend(QueryBackend):
+    """
+    Runs the tool SQL with DuckDB against local Parquet exports of the stores.
+
+    Args:
+        tables: Mapping of table name (as used in the SQL) to a Parquet file, glob
+            or directory; directories are read as '<dir>/**/*.parquet'
+        database_path: DuckDB database file, ':memory:' by default
+        threads: DuckDB worker threads (defaults to DuckDB's own choice)
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, tables, database_path=':memory:', threads=None):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("DuckDBBackend requires the 'duckdb' package: pip install duckdb") from e
+
+        self.connection = duckdb.connect(database_path)
+        if threads:
+            self.connection.execute(f"SET threads = {int(threads)}")
+        self._lock = threading.Lock()
+        for table, path in tables.items():
+            self.register_parquet(table, path)
+
+    def register_parquet(self, table, path):
+        """Expose a Parquet export as a view named `table`"""
+        if os.path.isdir(path):
+            path = os.path.join(path, '**', '*.parquet')
+        escaped_path = path.replace("'", "''")
+        self.connection.execute(
+            f'CREATE OR REPLACE VIEW "{table}" AS SELECT * FROM read_parquet(\'{escaped_path}\')'
+        )
+
+    def execute(self, query, database=None, use_cache=True):
+        """Execute tool SQL; `database` and `use_cache` are accepted for interface parity"""
+        # One connection per backend; cursors give each calling thread its own session
+        with self._lock:
+            cursor = self.connection.cursor()
+        try:
+            result = cursor.execute(translate_trino_to_duckdb(query))
+            columns = [column[0] for column in result.description]
+            return [
+                {column: _to_athena_value(value) for column, value in zip(columns, row)}
+                for row in result.fetchall()
+            ]
+        finally:
+            cursor.close()
@@ -0,0 +1,287 @@
+"""
+Variant Summary Tables Module
+Materialized, incrementally refreshed summary tables over the genomics stores
+
+Three Iceberg tables are maintained through Athena:
+- <prefix>_annotated_variants: PASS variants pre-joined to ClinVar on a normalized
+  contig key (no 'chr' prefix), partitioned by that key
+- <prefix>_sample_summary: per-sample impact / clinical significance counts
+- <prefix>_gene_pathogenic_index: per gene and sample pathogenic variant counts and IDs
+
+A JSON state object next to the tables records the store versions the tables were
+built from; the tables are only used while those versions match the live stores.
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+
+STATE_CACHE_SECONDS = 60
+
+# Maximum pathogenic variant IDs kept per gene and sample in the gene index
+MAX_INDEXED_VARIANT_IDS = 50
+
+
+class VariantSummaryTables:
+    """
+    Builds, refreshes and reports freshness of the variant summary tables.
+
+    Args:
+        runner: AthenaQueryRunner used for DDL/DML (results are never cached)
+        s3_client: boto3 S3 client used for the state object
+        database: Glue database holding the stores and the summary tables
+        variant_store: Variant store table name
+        annotation_store: Annotation store table name
+        location: S3 URI prefix under which the tables and state are written
+        version_provider: Callable returning the current store versions
+        prefix: Table name prefix
+    """
+
+    def __init__(self, runner, s3_client, database, variant_store, annotation_store, location,
+                 version_provider, prefix='variant_summary'):
+        self.runner = runner
+        self.s3_client = s3_client
+        self.database = database
+        self.variant_store = variant_store
+        self.annotation_store = annotation_store
+        self.location = location.rstrip('/') + '/'
+        self.version_provider = version_provider
+        self.annotated_variants = f"{prefix}_annotated_variants"
+        self.sample_summary = f"{prefix}_sample_summary"
+        self.gene_pathogenic_index = f"{prefix}_gene_pathogenic_index"
+        self._state = None
+        self._state_expires_at = 0.0
+
+    # === STATE ===
+    def _state_location(self):
+        bucket, _, key = self.location[len('s3://'):].partition('/')
+        return bucket, f"{key}_state.json"
+
+    def get_state(self, refresh=False):
+        """Return the recorded build state, or None if the tables were never built"""
+        now = time.monotonic()
+        if not refresh and now < self._state_expires_at:
+            return self._state
+        bucket, key = self._state_location()
+        try:
+            body = self.s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+            self._state = json.loads(body)
+        except self.s3_client.exceptions.NoSuchKey:
+            self._state = None
+        except Exception as e:
+            print(f"Could not read summary table state: {e}")
+            self._state = None
+        self._state_expires_at = now + STATE_CACHE_SECONDS
+        return self._state
+
+    def _put_state(self, state):
+        bucket, key = self._state_location()
+        self.s3_client.put_object(Bucket=bucket, Key=key, Body=json.dumps(state, default=str))
+        self._state = state
+        self._state_expires_at = time.monotonic() + STATE_CACHE_SECONDS
+
+    def is_fresh(self):
+        """True when the tables were built from the current variant and annotation store versions"""
+        state = self.get_state()
+        if not state:
+            return False
+        return state.get('store_versions') == json.loads(json.dumps(self.version_provider(), default=str))
+
+    # === SQL ===
+    def _table(self, name):
+        return f"{self.database}.{name}"
+
+    def _sample_filter(self, column, sample_ids):
+        if not sample_ids:
+            return ""
+        sample_list = "', '".join(sample_ids)
+        return f"AND {column} IN ('{sample_list}')"
+
+    def annotated_variants_select(self, sample_ids=None):
+        """SELECT producing annotated variant rows, optionally for a subset of samples"""
+        return f"""
+    SELECT
+        v.sampleid,
+        REPLACE(v.contigname, 'chr', '') as contig,
+        v.contigname,
+        v.start,
+        v.referenceallele,
+        v.alternatealleles[1] as alternate_allele,
+        v.qual,
+        v.depth,
+        v.filters[1] as filter_status,
+        v.information['af'] as allele_frequency_1000g,
+
+        CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].symbol END as vep_gene,
+        CASE WHEN cardinality(v.annotations.vep) > 0 THEN v.annotations.vep[1].impact END as vep_impact,
+        CASE WHEN cardinality(v.annotations.vep) > 0 AND cardinality(v.annotations.vep[1].consequence) > 0
+             THEN v.annotations.vep[1].consequence[1] END as vep_consequence,
+
+        a.attributes['CLNSIG'] as clinvar_significance,
+        a.attributes['CLNDN'] as associated_disease,
+        split_part(a.attributes['GENEINFO'], ':', 1) as clinvar_gene
+
+    FROM {self.variant_store} v
+    LEFT JOIN {self.annotation_store} a ON (
+        REPLACE(v.contigname, 'chr', '') = REPLACE(a.contigname, 'chr', '')
+        AND v.start = a.start
+        AND v.referenceallele = a.referenceallele
+        AND v.alternatealleles[1] = a.alternatealleles[1]
+    )
+    WHERE contains(v.filters, 'PASS')
+        {self._sample_filter('v.sampleid', sample_ids)}
+    """
+
+    def sample_summary_select(self, sample_ids=None):
+        """SELECT producing per-sample summary rows from the annotated variants table"""
+        return f"""
+    SELECT
+        sampleid,
+        COUNT(*) as total_variants,
+
+        COUNT(CASE WHEN clinvar_significance = 'Pathogenic' THEN 1 END) as pathogenic_count,
+        COUNT(CASE WHEN clinvar_significance = 'Likely_pathogenic' THEN 1 END) as likely_pathogenic_count,
+        COUNT(CASE WHEN clinvar_significance = 'Uncertain_significance' THEN 1 END) as vus_count,
+        COUNT(CASE WHEN clinvar_significance IN ('Benign', 'Likely_benign') THEN 1 END) as benign_count,
+
+        COUNT(CASE WHEN vep_impact = 'HIGH' THEN 1 END) as high_impact_count,
+        COUNT(CASE WHEN vep_impact = 'MODERATE' THEN 1 END) as moderate_impact_count,
+        COUNT(CASE WHEN vep_impact = 'LOW' THEN 1 END) as low_impact_count,
+        COUNT(CASE WHEN vep_impact = 'MODIFIER' THEN 1 END) as modifier_impact_count,
+
+        ROUND(AVG(CAST(qual as DOUBLE)), 2) as avg_quality,
+        ROUND(AVG(CAST(depth as DOUBLE)), 2) as avg_depth,
+        MIN(qual) as min_quality,
+        MAX(qual) as max_quality,
+
+        COUNT(DISTINCT COALESCE(clinvar_gene, vep_gene)) as unique_genes_affected,
+
+        COUNT(CASE
+            WHEN LENGTH(referenceallele) = 1 AND LENGTH(alternate_allele) = 1
+            THEN 1
+        END) as snv_count,
+
+        COUNT(CASE
+            WHEN LENGTH(referenceallele) > LENGTH(alternate_allele)
+            THEN 1
+        END) as deletion_count,
+
+        COUNT(CASE
+            WHEN LENGTH(referenceallele) < LENGTH(alternate_allele)
+            THEN 1
+        END) as insertion_count,
+
+        ROUND(
+            COUNT(CASE WHEN clinvar_significance IN ('Pathogenic', 'Likely_pathogenic') THEN 1 END) * 100.0 / COUNT(*),
+            2
+        ) as pathogenic_percentage
+
+    FROM {self._table(self.annotated_variants)}
+    WHERE filter_status = 'PASS'
+        {self._sample_filter('sampleid', sample_ids)}
+    GROUP BY sampleid
+    """
+
+    def gene_pathogenic_index_select(self, sample_ids=None):
+        """SELECT producing per gene and sample pathogenic variant index rows"""
+        return f"""
+    SELECT
+        COALESCE(clinvar_gene, vep_gene) as gene_symbol,
+        sampleid,
+        COUNT(CASE WHEN clinvar_significance = 'Pathogenic' THEN 1 END) as pathogenic_count,
+        COUNT(CASE WHEN clinvar_significance = 'Likely_pathogenic' THEN 1 END) as likely_pathogenic_count,
+        COUNT(CASE WHEN vep_impact = 'HIGH' THEN 1 END) as high_impact_count,
+        slice(
+            array_agg(CONCAT(contigname, ':', CAST(start as VARCHAR), ':', referenceallele, '>', alternate_allele)
+                      ORDER BY qual DESC),
+            1, {MAX_INDEXED_VARIANT_IDS}
+        ) as pathogenic_variant_ids
+    FROM {self._table(self.annotated_variants)}
+    WHERE qual > 30
+        AND clinvar_significance IN ('Pathogenic', 'Likely_pathogenic', 'Pathogenic/Likely_pathogenic')
+        AND COALESCE(clinvar_gene, vep_gene) IS NOT NULL
+        {self._sample_filter('sampleid', sample_ids)}
+    GROUP BY COALESCE(clinvar_gene, vep_gene), sampleid
+    """
+
+    # === BUILD / REFRESH ===
+    def _run(self, query):
+        print("=" * 84)
+        print(f"Summary tables: {query.strip().splitlines()[0]} ...")
+        return self.runner.execute(query, self.database, use_cache=False)
+
+    def _ctas(self, name, select, partitioning=None):
+        partition_clause = f",\n        partitioning = ARRAY['{partitioning}']" if partitioning else ""
+        self._run(f"DROP TABLE IF EXISTS {self._table(name)}")
+        self._run(f"""
+    CREATE TABLE {self._table(name)}
+    WITH (
+        table_type = 'ICEBERG',
+        is_external = false,
+        location = '{self.location}{name}/'{partition_clause}
+    )
+    AS {select}
+    """)
+
+    def _replace_samples(self, name, select, sample_ids):
+        sample_list = "', '".join(sample_ids)
+        self._run(f"DELETE FROM {self._table(name)} WHERE sampleid IN ('{sample_list}')")
+        self._run(f"INSERT INTO {self._table(name)} {select}")
+
+    def find_unsummarized_samples(self):
+        """Samples present in the variant store but missing from the sample summary table"""
+        rows = self._run(f"""
+    SELECT DISTINCT v.sampleid
+    FROM {self.variant_store} v
+    WHERE v.sampleid NOT IN (SELECT sampleid FROM {self._table(self.sample_summary)})
+    """)
+        return [row['sampleid'] for row in rows]
+
+    def build(self):
+        """Rebuild all summary tables from the live stores"""
+        versions = self.version_provider()
+        self._ctas(self.annotated_variants, self.annotated_variants_select(), partitioning='contig')
+        self._ctas(self.sample_summary, self.sample_summary_select())
+        self._ctas(self.gene_pathogenic_index, self.gene_pathogenic_index_select())
+        self._put_state({
+            'store_versions': versions,
+            'refreshed_at': datetime.now(timezone.utc).isoformat(),
+            'mode': 'full'
+        })
+
+    def refresh(self, sample_ids=None, full_rebuild=False):
+        """
+        Bring the summary tables up to date after a VEP pipeline ingest.
+
+        Only the given samples (or, if none are given, samples not yet summarized) are
+        recomputed. A change to the annotation store affects every sample, so it
+        triggers a full rebuild, as does a missing state object.
+
+        Returns:
+            dict: Refresh mode and the samples that were recomputed
+        """
+        state = self.get_state(refresh=True)
+        versions = self.version_provider()
+        annotation_changed = (
+            state is None
+            or (state.get('store_versions') or {}).get(self.annotation_store)
+            != json.loads(json.dumps(versions, default=str)).get(self.annotation_store)
+        )
+
+        if full_rebuild or annotation_changed:
+            self.build()
+            return {'mode': 'full', 'samples': 'all'}
+
+        samples = list(sample_ids) if sample_ids else self.find_unsummarized_samples()
+        if samples:
+            self._replace_samples(self.annotated_variants, self.annotated_variants_select(samples), samples)
+            self._replace_samples(self.sample_summary, self.sample_summary_select(samples), samples)
+            self._replace_samples(self.gene_pathogenic_index, self.gene_pathogenic_index_select(samples), samples)
+
+        self._put_state({
+            'store_versions': versions,
+            'refreshed_at': datetime.now(timezone.utc).isoformat(),
+            'mode': 'incremental',
+            'samples': samples
+        })
+        return {'mode': 'incremental', 'samples': samples}
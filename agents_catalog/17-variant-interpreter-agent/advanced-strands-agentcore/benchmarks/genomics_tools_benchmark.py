@@ -0,0 +1,214 @@
+"""
+Offline benchmark for the genomics store tools on the local DuckDB backend.
+
+Generates a synthetic cohort as Parquet exports shaped like the HealthOmics
+variant and annotation stores, then runs the tool functions from
+agent/tools/genomics_store_functions.py against it with
+GENOMICS_QUERY_BACKEND=duckdb, reporting latency and peak RSS per tool.
+Each tool runs in its own subprocess so peak RSS is not shared between tools.
+
+Requires duckdb (pip install duckdb) in addition to the agent requirements.
+
+Usage:
+    python benchmarks/genomics_tools_benchmark.py --samples 50 --variants-per-sample 200000
+    python benchmarks/genomics_tools_benchmark.py --data-dir /tmp/cohort --keep-data
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'agent')
+
+VARIANT_STORE_NAME = 'genomicsvariantstore'
+ANNOTATION_STORE_NAME = 'genomicsannotationstore'
+
+KNOWN_GENES = ['BRCA1', 'BRCA2', 'TP53', 'EGFR', 'KRAS', 'CYP2D6', 'CYP2C19', 'APC', 'MLH1', 'PTEN']
+IMPACTS = ['HIGH', 'MODERATE', 'LOW', 'MODIFIER']
+CONSEQUENCES = ['stop_gained', 'missense_variant', 'synonymous_variant', 'intron_variant']
+CLNSIG = ['Pathogenic', 'Likely_pathogenic', 'Uncertain_significance', 'Likely_benign', 'Benign']
+
+# Tool name -> (function name, positional args)
+TOOLS = {
+    'query_variants_by_gene': ('query_variants_by_gene_function', [['BRCA1', 'TP53', 'KRAS']]),
+    'query_variants_by_chromosome': ('query_variants_by_chromosome_function', ['17']),
+    'analyze_allele_frequencies': ('analyze_allele_frequencies_function', [None, 0.01]),
+    'compare_sample_variants': ('compare_sample_variants_function', [['S0000', 'S0001', 'S0002']]),
+}
+
+
+def _sql_list(values):
+    return '[' + ', '.join(f"'{value}'" for value in values) + ']'
+
+
+def generate_cohort(data_dir, samples, variants_per_sample, sites, genes, annotated_fraction=0.3):
+    """Write synthetic variant and annotation store Parquet exports under data_dir"""
+    import duckdb
+
+    variant_dir = os.path.join(data_dir, VARIANT_STORE_NAME)
+    annotation_dir = os.path.join(data_dir, ANNOTATION_STORE_NAME)
+    os.makedirs(variant_dir, exist_ok=True)
+    os.makedirs(annotation_dir, exist_ok=True)
+
+    con = duckdb.connect()
+    # Deterministic pseudo-random integers; hash() is UBIGINT, which list indexing rejects
+    con.execute("CREATE MACRO h(a, salt) AS CAST(hash(a, salt) % 1000000007 AS BIGINT)")
+    # Every variant sits on one of `sites` known sites so that a share of them join to ClinVar
+    site_columns = f"""
+        site,
+        1 + site % 22 AS chrom,
+        10000 + (site // 22) * 100 AS start,
+        {_sql_list(['A', 'C', 'G', 'T'])}[1 + h(site, 'ref') % 4] AS ref,
+        {_sql_list(['C', 'G', 'T', 'A'])}[1 + h(site, 'ref') % 4] AS alt,
+        site % {genes} AS gene_index
+    """
+    gene_expr = f"""CASE WHEN gene_index < {len(KNOWN_GENES)}
+                    THEN {_sql_list(KNOWN_GENES)}[1 + gene_index]
+                    ELSE 'GENE' || CAST(gene_index AS VARCHAR) END"""
+
+    con.execute(f"""
+    COPY (
+        WITH draws AS (
+            SELECT i, i // {variants_per_sample} AS sample_index, h(i, 'site') % {sites} AS site
+            FROM range({samples * variants_per_sample}) t(i)
+        ),
+        located AS (SELECT i, sample_index, {site_columns} FROM draws)
+        SELECT
+            'S' || lpad(CAST(sample_index AS VARCHAR), 4, '0') AS sampleid,
+            'chr' || CAST(chrom AS VARCHAR) AS contigname,
+            start,
+            start + 1 AS "end",
+            ref AS referenceallele,
+            [alt] AS alternatealleles,
+            CASE WHEN h(i, 'filter') % 10 < 9 THEN ['PASS'] ELSE ['LowQual'] END AS filters,
+            CAST(10 + h(i, 'qual') % 200 AS DOUBLE) AS qual,
+            CAST(5 + h(i, 'depth') % 60 AS INTEGER) AS depth,
+            MAP(['af', 'dp', 'mq'], [
+                CAST(ROUND((h(site, 'af') % 100000) / 100000.0, 5) AS VARCHAR),
+                CAST(5 + h(i, 'depth') % 60 AS VARCHAR),
+                CAST(20 + h(i, 'mq') % 40 AS VARCHAR)
+            ]) AS information,
+            {{'vep': [{{
+                'symbol': {gene_expr},
+                'impact': {_sql_list(IMPACTS)}[1 + h(site, 'impact') % 4],
+                'consequence': [{_sql_list(CONSEQUENCES)}[1 + h(site, 'impact') % 4]],
+                'biotype': 'protein_coding'
+            }}]}} AS annotations
+        FROM located
+    ) TO '{os.path.join(variant_dir, 'part-0.parquet')}' (FORMAT PARQUET)
+    """)
+
+    con.execute(f"""
+    COPY (
+        WITH located AS (SELECT {site_columns} FROM range({sites}) t(site))
+        SELECT
+            CAST(chrom AS VARCHAR) AS contigname,
+            start,
+            start + 1 AS "end",
+            ref AS referenceallele,
+            [alt] AS alternatealleles,
+            MAP(['CLNSIG', 'CLNDN', 'GENEINFO', 'RS'], [
+                {_sql_list(CLNSIG)}[1 + h(site, 'clnsig') % 5],
+                'Synthetic_condition_' || CAST(h(site, 'dn') % 50 AS VARCHAR),
+                {gene_expr} || ':' || CAST(1000 + gene_index AS VARCHAR),
+                CAST(site AS VARCHAR)
+            ]) AS attributes
+        FROM located
+        WHERE h(site, 'annotated') % 1000 < {int(annotated_fraction * 1000)}
+    ) TO '{os.path.join(annotation_dir, 'part-0.parquet')}' (FORMAT PARQUET)
+    """)
+
+
+def run_tool(tool, data_dir, repeat):
+    """Run one tool in-process against the DuckDB backend and print a JSON result line"""
+    os.environ['GENOMICS_QUERY_BACKEND'] = 'duckdb'
+    os.environ['LOCAL_STORE_PATH'] = data_dir
+    os.environ['VARIANT_STORE_NAME'] = VARIANT_STORE_NAME
+    os.environ['ANNOTATION_STORE_NAME'] = ANNOTATION_STORE_NAME
+    os.environ.setdefault('AWS_EC2_METADATA_DISABLED', 'true')
+    sys.path.insert(0, AGENT_DIR)
+
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        from tools import genomics_store_functions as functions
+
+    function_name, args = TOOLS[tool]
+    function = getattr(functions, function_name)
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function(*args)
+        timings.append(time.perf_counter() - start)
+
+    if 'error' in result:
+        raise SystemExit(f"{tool} failed: {result['error']}")
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    rows = (result.get('total_variants') or result.get('total_variants_with_frequency')
+            or len(result.get('comparison_results', [])))
+    print(json.dumps({
+        'tool': tool,
+        'rows': rows,
+        'first_seconds': round(timings[0], 4),
+        'median_seconds': round(statistics.median(timings[1:] or timings), 4),
+        'peak_rss_mb': round(peak_mb, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--variants-per-sample', type=int, default=100_000)
+    parser.add_argument('--sites', type=int, default=500_000, help='Distinct variant sites in the cohort')
+    parser.add_argument('--genes', type=int, default=2_000)
+    parser.add_argument('--repeat', type=int, default=5, help='Calls per tool; the first is reported separately')
+    parser.add_argument('--tools', nargs='+', choices=sorted(TOOLS), default=list(TOOLS))
+    parser.add_argument('--data-dir', help='Cohort directory (generated if it does not contain the stores)')
+    parser.add_argument('--keep-data', action='store_true', help='Do not delete a generated temporary cohort')
+    parser.add_argument('--run-tool', choices=sorted(TOOLS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_tool:
+        run_tool(args.run_tool, args.data_dir, args.repeat)
+        return
+
+    tmpdir = None
+    data_dir = args.data_dir
+    if not data_dir:
+        tmpdir = tempfile.mkdtemp(prefix='genomics-cohort-')
+        data_dir = tmpdir
+    if not os.path.isdir(os.path.join(data_dir, VARIANT_STORE_NAME)):
+        total = args.samples * args.variants_per_sample
+        print(f"Generating {args.samples} samples x {args.variants_per_sample:,} variants ({total:,} rows) -> {data_dir}")
+        start = time.perf_counter()
+        generate_cohort(data_dir, args.samples, args.variants_per_sample, args.sites, args.genes)
+        print(f"Generated in {time.perf_counter() - start:.1f}s")
+
+    try:
+        print(f"{'tool':<32}{'rows':>10}{'first s':>10}{'median s':>10}{'peak RSS MB':>14}")
+        for tool in args.tools:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-tool', tool,
+                 '--data-dir', data_dir, '--repeat', str(args.repeat)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['tool']:<32}{result['rows']:>10,}{result['first_seconds']:>10}"
+                  f"{result['median_seconds']:>10}{result['peak_rss_mb']:>14}")
+    finally:
+        if tmpdir and not args.keep_data:
+            import shutil
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+# Add the agent tools path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../agent/tools"))
+
+from dynamic_query_memo import DynamicQueryMemo, literal_terms
+
+FINGERPRINT = "schema-v1"
+KRAS_SQL = "SELECT * FROM variants WHERE gene = 'KRAS'"
+
+
+def make_memo():
+    memo = DynamicQueryMemo(similarity_threshold=0.8)
+    memo.put("show me all variants in kras for the cohort", KRAS_SQL, schema_fingerprint=FINGERPRINT)
+    return memo
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    sql, match = make_memo().lookup("Show me all variants in KRAS for the cohort.", schema_fingerprint=FINGERPRINT)
+    assert (sql, match) == (KRAS_SQL, "exact")
+
+
+def test_similar_wording_reuses_sql():
+    sql, match = make_memo().lookup("show all variants in kras for the cohort", schema_fingerprint=FINGERPRINT)
+    assert (sql, match) == (KRAS_SQL, "similar")
+
+
+def test_lowercase_gene_names_must_match():
+    assert literal_terms("variants in kras") != literal_terms("variants in egfr")
+
+    # Long enough that the two questions differ in only one word out of ten
+    memo = DynamicQueryMemo(similarity_threshold=0.8)
+    memo.put(
+        "count pathogenic missense variants in kras across tumor samples from cohort b high impact",
+        KRAS_SQL, schema_fingerprint=FINGERPRINT
+    )
+    sql, match = memo.lookup(
+        "count pathogenic missense variants in egfr across tumor samples from cohort b high impact",
+        schema_fingerprint=FINGERPRINT
+    )
+    assert (sql, match) == (None, None)
+    assert memo.stats()["misses"] == 1
+
+
+def test_schema_fingerprint_must_match():
+    sql, _ = make_memo().lookup("show me all variants in kras for the cohort", schema_fingerprint="schema-v2")
+    assert sql is None
@@ -7,12 +7,21 @@ import csv
 import io
 import gzip
 
+from vep_analysis import (
+    analyze_variants,
+    parse_vep_output,
+    process_variant_chunk,
+    stream_vep_analysis,
+)
+
 # Environment variables
 REGION = os.environ.get('REGION','us-east-1')
 ACCOUNT_ID = os.environ.get('ACCOUNT_ID','123456789123')
 BUCKET_NAME = os.environ.get('BUCKET_NAME','apj-omics-us')
 MODEL_ID = os.environ.get('MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
 modelid = 'anthropic.claude-3-5-sonnet-20240620-v1:0'
+# 'streaming' (pure Python) or 'columnar' (NumPy, needs a numpy layer)
+VEP_ANALYSIS_MODE = os.environ.get('VEP_ANALYSIS_MODE', 'streaming')
 #BATCH_JOB_QUEUE = os.environ.get('BATCH_JOB_QUEUE')
 
 # Bedrock configuration
@@ -136,250 +145,6 @@ def retrieve_existing_vep_report(patient_id):
         'result': report
     })
 
-def parse_vep_output(vcf_content):
-    variants = []
-    csq_fields = ["Allele", "Consequence", "IMPACT", "SYMBOL", "Gene", "Feature_type", 
-                  "Feature", "BIOTYPE", "EXON", "INTRON", "HGVSc", "HGVSp", 
-                  "cDNA_position", "CDS_position", "Protein_position", "Amino_acids", 
-                  "Codons", "Existing_variation", "DISTANCE", "STRAND", "FLAGS", 
-                  "SYMBOL_SOURCE", "HGNC_ID"]
-    
-    header_found = False
-    header_columns = None
-    
-    # Process the VCF content in chunks
-    chunk_size = 1000  # Adjust based on your needs
-    current_chunk = []
-    
-    for line in vcf_content.split('\n'):
-        if line.startswith('#CHROM'):
-            header_found = True
-            header_columns = line.strip().split('\t')
-            continue
-        
-        if not header_found or not line.strip() or line.startswith('#'):
-            continue
-            
-        current_chunk.append(line)
-        
-        # Process chunk when it reaches the specified size
-        if len(current_chunk) >= chunk_size:
-            variants.extend(process_variant_chunk(current_chunk, csq_fields))
-            current_chunk = []
-    
-    # Process any remaining variants
-    if current_chunk:
-        variants.extend(process_variant_chunk(current_chunk, csq_fields))
-    
-    return variants
-
-def process_variant_chunk(chunk, csq_fields):
-    chunk_variants = []
-    for line in chunk:
-        fields = line.strip().split('\t')
-        if len(fields) < 8:
-            continue
-            
-        # Extract basic variant information
-        chrom, pos, id_, ref, alt, qual, filter_, info = fields[:8]
-        
-        # Parse INFO field to get CSQ
-        info_dict = {}
-        for info_field in info.split(';'):
-            if '=' in info_field:
-                key, value = info_field.split('=', 1)
-                info_dict[key] = value
-        
-        if 'CSQ' not in info_dict:
-            continue
-            
-        # Process each CSQ annotation
-        for csq in info_dict['CSQ'].split(','):
-            csq_values = csq.split('|')
-            if len(csq_values) != len(csq_fields):
-                continue
-                
-            variant = {
-                'chr': chrom,
-                'pos': int(pos),
-                'id': id_,
-                'ref': ref,
-                'alt': alt,
-                'qual': qual,
-                'filter': filter_
-            }
-            
-            for field, value in zip(csq_fields, csq_values):
-                variant[field.lower()] = value if value else None
-                
-            for key, value in info_dict.items():
-                if key != 'CSQ':
-                    variant[f'info_{key.lower()}'] = value
-                    
-            chunk_variants.append(variant)
-    
-    return chunk_variants
-
-def analyze_variants(variants):
-    """
-    Analyze variants with memory optimizations
-    Args:
-        variants: List of variants to analyze
-    """
-    # Initialize analysis structure with limits
-    MAX_STORED_VARIANTS = 1000  # Limit for storing detailed variants
-    MAX_GENES = 100            # Limit for number of genes to track
-    
-    analysis = {
-        'total_variants': len(variants),
-        'variants_per_chromosome': {},
-        'impact_summary': {
-            'HIGH': 0,
-            'MODERATE': 0,
-            'LOW': 0,
-            'MODIFIER': 0
-        },
-        'consequence_types': {},
-        'transcript_effects': {
-            'coding_variants': [],
-            'non_coding_variants': [],
-            'splice_variants': [],
-            'regulatory_variants': []
-        },
-        'gene_impacts': {},
-        'biotype_summary': {},
-        'detailed_variants': []
-    }
-    
-    # Track high-impact genes separately for efficient sorting
-    gene_impact_scores = {}
-    
-    for variant in variants:
-        # Basic variant location
-        chrom = variant['chr']
-        analysis['variants_per_chromosome'][chrom] = analysis['variants_per_chromosome'].get(chrom, 0) + 1
-        
-        # Impact analysis
-        impact = variant.get('impact', 'UNKNOWN')
-        analysis['impact_summary'][impact] = analysis['impact_summary'].get(impact, 0) + 1
-        
-        # Process consequences
-        consequences = variant.get('consequence', '').split('&')
-        for consequence in consequences:
-            if not consequence:
-                continue
-                
-            analysis['consequence_types'][consequence] = analysis['consequence_types'].get(consequence, 0) + 1
-            
-            # Create basic variant info (only store essential data)
-            variant_info = {
-                'location': f"{variant['chr']}:{variant['pos']}",
-                'gene': variant.get('symbol')
-            }
-            
-            # Categorize effects with size limits
-            if any(term in consequence.lower() for term in ['missense', 'nonsense', 'frameshift', 'inframe']):
-                if len(analysis['transcript_effects']['coding_variants']) < MAX_STORED_VARIANTS:
-                    variant_info.update({
-                        'consequence': consequence,
-                        'hgvsp': variant.get('hgvsp'),
-                        'impact': impact
-                    })
-                    analysis['transcript_effects']['coding_variants'].append(variant_info)
-                    
-            elif 'splice' in consequence.lower():
-                if len(analysis['transcript_effects']['splice_variants']) < MAX_STORED_VARIANTS:
-                    variant_info['hgvsc'] = variant.get('hgvsc')
-                    analysis['transcript_effects']['splice_variants'].append(variant_info)
-                    
-            elif 'regulatory' in consequence.lower():
-                if len(analysis['transcript_effects']['regulatory_variants']) < MAX_STORED_VARIANTS:
-                    analysis['transcript_effects']['regulatory_variants'].append(variant_info)
-                    
-            elif 'non_coding' in consequence.lower():
-                if len(analysis['transcript_effects']['non_coding_variants']) < MAX_STORED_VARIANTS:
-                    analysis['transcript_effects']['non_coding_variants'].append(variant_info)
-
-        # Track gene impacts efficiently
-        gene = variant.get('symbol')
-        if gene:
-            if gene not in gene_impact_scores:
-                gene_impact_scores[gene] = {
-                    'high_impact': 0,
-                    'moderate_impact': 0,
-                    'low_impact': 0,
-                    'modifier_impact': 0,
-                    'total_variants': 0,
-                    'variants': []
-                }
-            
-            impact_key = f"{impact.lower()}_impact"
-            gene_impact_scores[gene][impact_key] += 1
-            gene_impact_scores[gene]['total_variants'] += 1
-            
-            # Store limited variants per gene
-            if len(gene_impact_scores[gene]['variants']) < 50:  # Limit variants per gene
-                gene_impact_scores[gene]['variants'].append({
-                    'location': f"{variant['chr']}:{variant['pos']}",
-                    'consequence': consequences[0] if consequences else None,
-                    'hgvsc': variant.get('hgvsc'),
-                    'hgvsp': variant.get('hgvsp')
-                })
-
-        # Biotype summary
-        biotype = variant.get('biotype')
-        if biotype:
-            analysis['biotype_summary'][biotype] = analysis['biotype_summary'].get(biotype, 0) + 1
-
-        # Store detailed variants for high and moderate impacts
-        if impact in ['HIGH', 'MODERATE'] and len(analysis['detailed_variants']) < MAX_STORED_VARIANTS:
-            analysis['detailed_variants'].append({
-                'location': f"{variant['chr']}:{variant['pos']}",
-                'ref': variant['ref'],
-                'alt': variant['alt'],
-                'gene': gene,
-                'consequence': consequences[0] if consequences else None,
-                'impact': impact,
-                'hgvsc': variant.get('hgvsc'),
-                'hgvsp': variant.get('hgvsp')
-            })
-
-    # Process gene impacts and sort for most significant
-    sorted_genes = sorted(
-        gene_impact_scores.items(),
-        key=lambda x: (x[1]['high_impact'], x[1]['moderate_impact'], x[1]['total_variants']),
-        reverse=True
-    )[:MAX_GENES]
-    
-    analysis['gene_impacts'] = {
-        gene: data for gene, data in sorted_genes
-    }
-
-    # Generate summary statistics
-    analysis['summary'] = {
-        'total_variants': analysis['total_variants'],
-        'high_impact_variants': analysis['impact_summary']['HIGH'],
-        'moderate_impact_variants': analysis['impact_summary']['MODERATE'],
-        'coding_variants': len(analysis['transcript_effects']['coding_variants']),
-        'splice_variants': len(analysis['transcript_effects']['splice_variants']),
-        'most_affected_genes': [
-            {
-                'gene': gene,
-                'high_impact': data['high_impact'],
-                'moderate_impact': data['moderate_impact'],
-                'total_variants': data['total_variants']
-            }
-            for gene, data in sorted_genes[:10]  # Top 10 genes only
-        ],
-        'top_consequences': sorted(
-            analysis['consequence_types'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]
-    }
-
-    return analysis
-
 def vep_feature_extraction(patient_id):
     if not patient_id:
         return create_response(400, {'error': 'patient_id is required'})
@@ -387,37 +152,14 @@ def vep_feature_extraction(patient_id):
     key = f"omics-test-out/{patient_id}/pubdir/annotation/null/null.ann.vcf.gz"
     
     try:
-        variants = []
-        # Stream the file in chunks
+        # Stream the object line by line and aggregate as we go so memory is
+        # bounded by the summary size rather than the number of variants
         response = s3_client.get_object(Bucket=BUCKET_NAME, Key=key)
-        chunk_size = 1024 * 1024  # 1MB chunks
-        
-        with gzip.GzipFile(fileobj=response['Body']) as gz:
-            buffer = ""
-            while True:
-                chunk = gz.read(chunk_size)
-                if not chunk:
-                    break
-                
-                try:
-                    buffer += chunk.decode('utf-8')
-                except UnicodeDecodeError:
-                    buffer += chunk.decode('latin-1')
-                
-                lines = buffer.split('\n')
-                # Keep the last incomplete line in the buffer
-                buffer = lines[-1]
-                # Process complete lines
-                if len(lines) > 1:
-                    chunk_variants = parse_vep_output('\n'.join(lines[:-1]))
-                    variants.extend(chunk_variants)
-        
-        # Process any remaining content in the buffer
-        if buffer:
-            chunk_variants = parse_vep_output(buffer)
-            variants.extend(chunk_variants)
-        
-        analysis = analyze_variants(variants)
+        if VEP_ANALYSIS_MODE == 'columnar':
+            from vep_columnar import columnar_vep_analysis
+            analysis = columnar_vep_analysis(response['Body'])
+        else:
+            analysis = stream_vep_analysis(response['Body'])
         return analysis
         
     except Exception as e:
@@ -0,0 +1,345 @@
+"""
+Parsing and summarisation of Ensembl VEP annotated VCF files.
+
+The functions in this module have no AWS dependencies so they can be used
+from the Lambda handler as well as from local benchmarks.
+"""
+import gzip
+
+# Fallback CSQ layout, used only when the VCF has no ##INFO=<ID=CSQ header
+DEFAULT_CSQ_FIELDS = ["Allele", "Consequence", "IMPACT", "SYMBOL", "Gene", "Feature_type",
+                      "Feature", "BIOTYPE", "EXON", "INTRON", "HGVSc", "HGVSp",
+                      "cDNA_position", "CDS_position", "Protein_position", "Amino_acids",
+                      "Codons", "Existing_variation", "DISTANCE", "STRAND", "FLAGS",
+                      "SYMBOL_SOURCE", "HGNC_ID"]
+
+MAX_STORED_VARIANTS = 1000  # Limit for storing detailed variants
+MAX_GENES = 100             # Limit for number of genes to track
+MAX_VARIANTS_PER_GENE = 50  # Limit for variants stored per gene
+
+CODING_TERMS = ('missense', 'nonsense', 'frameshift', 'inframe')
+
+
+def parse_csq_header(line):
+    """
+    Extract the CSQ field names from a VEP ##INFO=<ID=CSQ header line.
+
+    Returns:
+        list: Field names in annotation order, or None if the line is not a CSQ header.
+    """
+    if not line.startswith('##INFO=<ID=CSQ'):
+        return None
+    marker = 'Format: '
+    start = line.find(marker)
+    if start == -1:
+        return None
+    fields = line[start + len(marker):].rstrip().rstrip('>').rstrip('"')
+    return fields.split('|')
+
+
+def _iter_raw_lines(stream, chunk_size=1024 * 1024):
+    """Split a binary stream exposing only read() into lines"""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_vcf_lines(fileobj, gzipped=True):
+    """
+    Yield decoded lines from a (gzipped) VCF byte stream one at a time.
+
+    Args:
+        fileobj: Readable binary file-like object, e.g. an S3 StreamingBody
+        gzipped: Whether the stream is gzip compressed
+    """
+    raw_lines = gzip.GzipFile(fileobj=fileobj) if gzipped else _iter_raw_lines(fileobj)
+    for raw in raw_lines:
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            yield raw.decode('latin-1')
+
+
+def iter_csq_records(lines, csq_fields=None, include_info=False):
+    """
+    Yield one dict per CSQ annotation from an iterable of VCF lines.
+
+    The CSQ layout is read from the ##INFO=<ID=CSQ header when present; records
+    are only emitted after the #CHROM header line has been seen.
+
+    Args:
+        lines: Iterable of VCF text lines
+        csq_fields: CSQ field names to use when the header does not declare them
+        include_info: Also copy the non-CSQ INFO keys as info_<key> entries
+    """
+    csq_fields = csq_fields or DEFAULT_CSQ_FIELDS
+    csq_keys = [field.lower() for field in csq_fields]
+    header_found = False
+
+    for line in lines:
+        if line.startswith('#'):
+            if line.startswith('#CHROM'):
+                header_found = True
+            elif not header_found:
+                header_fields = parse_csq_header(line)
+                if header_fields:
+                    csq_keys = [field.lower() for field in header_fields]
+            continue
+
+        if not header_found:
+            continue
+
+        fields = line.rstrip('\r\n').split('\t')
+        if len(fields) < 8:
+            continue
+
+        # Extract basic variant information
+        chrom, pos, id_, ref, alt, qual, filter_, info = fields[:8]
+
+        # Parse INFO field to get CSQ
+        info_dict = {}
+        for info_field in info.split(';'):
+            if '=' in info_field:
+                key, value = info_field.split('=', 1)
+                info_dict[key] = value
+
+        if 'CSQ' not in info_dict:
+            continue
+
+        # Process each CSQ annotation
+        for csq in info_dict['CSQ'].split(','):
+            csq_values = csq.split('|')
+            if len(csq_values) != len(csq_keys):
+                continue
+
+            variant = {
+                'chr': chrom,
+                'pos': int(pos),
+                'id': id_,
+                'ref': ref,
+                'alt': alt,
+                'qual': qual,
+                'filter': filter_
+            }
+
+            for key, value in zip(csq_keys, csq_values):
+                variant[key] = value if value else None
+
+            if include_info:
+                for key, value in info_dict.items():
+                    if key != 'CSQ':
+                        variant[f'info_{key.lower()}'] = value
+
+            yield variant
+
+
+def parse_vep_output(vcf_content):
+    """Parse VEP annotated VCF text into a list of per-CSQ variant dicts"""
+    return list(iter_csq_records(vcf_content.split('\n'), include_info=True))
+
+
+def process_variant_chunk(chunk, csq_fields):
+    """Parse a list of VCF data lines (no headers) into per-CSQ variant dicts"""
+    return list(iter_csq_records(['#CHROM'] + list(chunk), csq_fields, include_info=True))
+
+
+class VariantAnalysisAggregator:
+    """
+    Incrementally builds the `analyze_variants` summary one CSQ record at a time.
+
+    Memory is bounded by the number of distinct chromosomes, consequences,
+    biotypes and genes, not by the number of records added.
+    """
+
+    def __init__(self):
+        self.total_variants = 0
+        self.variants_per_chromosome = {}
+        self.impact_summary = {
+            'HIGH': 0,
+            'MODERATE': 0,
+            'LOW': 0,
+            'MODIFIER': 0
+        }
+        self.consequence_types = {}
+        self.transcript_effects = {
+            'coding_variants': [],
+            'non_coding_variants': [],
+            'splice_variants': [],
+            'regulatory_variants': []
+        }
+        self.biotype_summary = {}
+        self.detailed_variants = []
+        self.gene_impact_scores = {}
+
+    def add(self, variant):
+        """Add a single CSQ record (as produced by `iter_csq_records`)"""
+        self.total_variants += 1
+
+        # Basic variant location
+        chrom = variant['chr']
+        location = f"{chrom}:{variant['pos']}"
+        self.variants_per_chromosome[chrom] = self.variants_per_chromosome.get(chrom, 0) + 1
+
+        # Impact analysis
+        impact = variant.get('impact') or 'UNKNOWN'
+        self.impact_summary[impact] = self.impact_summary.get(impact, 0) + 1
+
+        gene = variant.get('symbol')
+        effects = self.transcript_effects
+
+        # Process consequences
+        consequences = (variant.get('consequence') or '').split('&')
+        for consequence in consequences:
+            if not consequence:
+                continue
+
+            self.consequence_types[consequence] = self.consequence_types.get(consequence, 0) + 1
+
+            # Categorize effects with size limits
+            consequence_lower = consequence.lower()
+            if any(term in consequence_lower for term in CODING_TERMS):
+                if len(effects['coding_variants']) < MAX_STORED_VARIANTS:
+                    effects['coding_variants'].append({
+                        'location': location,
+                        'gene': gene,
+                        'consequence': consequence,
+                        'hgvsp': variant.get('hgvsp'),
+                        'impact': impact
+                    })
+
+            elif 'splice' in consequence_lower:
+                if len(effects['splice_variants']) < MAX_STORED_VARIANTS:
+                    effects['splice_variants'].append({
+                        'location': location,
+                        'gene': gene,
+                        'hgvsc': variant.get('hgvsc')
+                    })
+
+            elif 'regulatory' in consequence_lower:
+                if len(effects['regulatory_variants']) < MAX_STORED_VARIANTS:
+                    effects['regulatory_variants'].append({'location': location, 'gene': gene})
+
+            elif 'non_coding' in consequence_lower:
+                if len(effects['non_coding_variants']) < MAX_STORED_VARIANTS:
+                    effects['non_coding_variants'].append({'location': location, 'gene': gene})
+
+        # Track gene impacts
+        if gene:
+            scores = self.gene_impact_scores.get(gene)
+            if scores is None:
+                scores = self.gene_impact_scores[gene] = {
+                    'high_impact': 0,
+                    'moderate_impact': 0,
+                    'low_impact': 0,
+                    'modifier_impact': 0,
+                    'total_variants': 0,
+                    'variants': []
+                }
+
+            impact_key = f"{impact.lower()}_impact"
+            scores[impact_key] = scores.get(impact_key, 0) + 1
+            scores['total_variants'] += 1
+
+            if len(scores['variants']) < MAX_VARIANTS_PER_GENE:
+                scores['variants'].append({
+                    'location': location,
+                    'consequence': consequences[0] if consequences else None,
+                    'hgvsc': variant.get('hgvsc'),
+                    'hgvsp': variant.get('hgvsp')
+                })
+
+        # Biotype summary
+        biotype = variant.get('biotype')
+        if biotype:
+            self.biotype_summary[biotype] = self.biotype_summary.get(biotype, 0) + 1
+
+        # Store detailed variants for high and moderate impacts
+        if impact in ('HIGH', 'MODERATE') and len(self.detailed_variants) < MAX_STORED_VARIANTS:
+            self.detailed_variants.append({
+                'location': location,
+                'ref': variant['ref'],
+                'alt': variant['alt'],
+                'gene': gene,
+                'consequence': consequences[0] if consequences else None,
+                'impact': impact,
+                'hgvsc': variant.get('hgvsc'),
+                'hgvsp': variant.get('hgvsp')
+            })
+
+    def result(self):
+        """Return the analysis dict in the `analyze_variants` format"""
+        # Process gene impacts and sort for most significant
+        sorted_genes = sorted(
+            self.gene_impact_scores.items(),
+            key=lambda x: (x[1]['high_impact'], x[1]['moderate_impact'], x[1]['total_variants']),
+            reverse=True
+        )[:MAX_GENES]
+
+        analysis = {
+            'total_variants': self.total_variants,
+            'variants_per_chromosome': self.variants_per_chromosome,
+            'impact_summary': self.impact_summary,
+            'consequence_types': self.consequence_types,
+            'transcript_effects': self.transcript_effects,
+            'gene_impacts': {gene: data for gene, data in sorted_genes},
+            'biotype_summary': self.biotype_summary,
+            'detailed_variants': self.detailed_variants
+        }
+
+        # Generate summary statistics
+        analysis['summary'] = {
+            'total_variants': self.total_variants,
+            'high_impact_variants': self.impact_summary['HIGH'],
+            'moderate_impact_variants': self.impact_summary['MODERATE'],
+            'coding_variants': len(self.transcript_effects['coding_variants']),
+            'splice_variants': len(self.transcript_effects['splice_variants']),
+            'most_affected_genes': [
+                {
+                    'gene': gene,
+                    'high_impact': data['high_impact'],
+                    'moderate_impact': data['moderate_impact'],
+                    'total_variants': data['total_variants']
+                }
+                for gene, data in sorted_genes[:10]  # Top 10 genes only
+            ],
+            'top_consequences': sorted(
+                self.consequence_types.items(),
+                key=lambda x: x[1],
+                reverse=True
+            )[:5]
+        }
+
+        return analysis
+
+
+def analyze_variants(variants):
+    """
+    Analyze variants with memory optimizations
+    Args:
+        variants: Iterable of variants to analyze
+    """
+    aggregator = VariantAnalysisAggregator()
+    for variant in variants:
+        aggregator.add(variant)
+    return aggregator.result()
+
+
+def stream_vep_analysis(fileobj, gzipped=True):
+    """
+    Summarise a VEP annotated VCF in a single streaming pass.
+
+    Lines are read from the byte stream one at a time and each CSQ record is
+    folded into a `VariantAnalysisAggregator`, so no variant list is built.
+
+    Args:
+        fileobj: Readable binary file-like object, e.g. an S3 StreamingBody
+        gzipped: Whether the stream is gzip compressed
+    """
+    return analyze_variants(iter_csq_records(iter_vcf_lines(fileobj, gzipped)))
@@ -0,0 +1,391 @@
+"""
+Columnar representation and vectorized summarisation of VEP CSQ records.
+
+CSQ annotations are dictionary-encoded into typed arrays while the VCF is
+streamed, and the `analyze_variants` summary is then computed with NumPy
+group-by operations instead of per-record Python loops. Requires numpy.
+"""
+from array import array
+
+import numpy as np
+
+from vep_analysis import (
+    CODING_TERMS,
+    DEFAULT_CSQ_FIELDS,
+    MAX_GENES,
+    MAX_STORED_VARIANTS,
+    MAX_VARIANTS_PER_GENE,
+    iter_vcf_lines,
+    parse_csq_header,
+)
+
+BASE_IMPACTS = ('HIGH', 'MODERATE', 'LOW', 'MODIFIER')
+EFFECT_CATEGORIES = ('coding_variants', 'splice_variants', 'regulatory_variants', 'non_coding_variants')
+
+
+def classify_consequence(consequence):
+    """Return the transcript effect category for a single consequence term, or None"""
+    consequence_lower = consequence.lower()
+    if any(term in consequence_lower for term in CODING_TERMS):
+        return 'coding_variants'
+    if 'splice' in consequence_lower:
+        return 'splice_variants'
+    if 'regulatory' in consequence_lower:
+        return 'regulatory_variants'
+    if 'non_coding' in consequence_lower:
+        return 'non_coding_variants'
+    return None
+
+
+class _Categorical:
+    """Dictionary encoder: values are stored once, records hold int32 codes"""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+        self.codes = array('i')
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def to_numpy(self):
+        return np.frombuffer(self.codes, dtype=np.int32) if self.codes else np.zeros(0, dtype=np.int32)
+
+
+class VariantColumns:
+    """
+    Typed, dictionary-encoded columns of CSQ records.
+
+    IMPACT, Consequence, BIOTYPE, SYMBOL (and the string fields needed for the
+    detail lists) are stored as int32 category codes; positions as int32.
+    """
+
+    STRING_COLUMNS = ('chr', 'ref', 'alt', 'impact', 'consequence', 'biotype', 'symbol', 'hgvsc', 'hgvsp')
+
+    def __init__(self):
+        self._columns = {name: _Categorical() for name in self.STRING_COLUMNS}
+        self._pos = array('i')
+
+    def __len__(self):
+        return len(self._pos)
+
+    def append(self, chrom, pos, ref, alt, impact, consequence, biotype, symbol, hgvsc, hgvsp):
+        """Append one CSQ record; missing values are passed as None"""
+        columns = self._columns
+        columns['chr'].append(chrom)
+        columns['ref'].append(ref)
+        columns['alt'].append(alt)
+        columns['impact'].append(impact or 'UNKNOWN')
+        columns['consequence'].append(consequence or '')
+        columns['biotype'].append(biotype)
+        columns['symbol'].append(symbol)
+        columns['hgvsc'].append(hgvsc)
+        columns['hgvsp'].append(hgvsp)
+        self._pos.append(pos)
+
+    def codes(self, name):
+        """Return the int32 code array for a string column"""
+        return self._columns[name].to_numpy()
+
+    def categories(self, name):
+        """Return the category values for a string column, indexed by code"""
+        return self._columns[name].values
+
+    def positions(self):
+        return np.frombuffer(self._pos, dtype=np.int32) if self._pos else np.zeros(0, dtype=np.int32)
+
+    def value(self, name, row):
+        """Return the decoded value of a string column for a single row"""
+        column = self._columns[name]
+        return column.values[column.codes[row]]
+
+    @classmethod
+    def from_variants(cls, variants):
+        """Build columns from per-CSQ variant dicts (as produced by `iter_csq_records`)"""
+        table = cls()
+        for variant in variants:
+            table.append(
+                variant['chr'], variant['pos'], variant['ref'], variant['alt'],
+                variant.get('impact'), variant.get('consequence'), variant.get('biotype'),
+                variant.get('symbol'), variant.get('hgvsc'), variant.get('hgvsp')
+            )
+        return table
+
+    @classmethod
+    def from_vcf_lines(cls, lines, csq_fields=None):
+        """
+        Build columns directly from VCF text lines without creating per-record dicts.
+
+        Args:
+            lines: Iterable of VCF text lines
+            csq_fields: CSQ field names to use when the header does not declare them
+        """
+        table = cls()
+        csq_keys = [field.lower() for field in (csq_fields or DEFAULT_CSQ_FIELDS)]
+        header_found = False
+        wanted = ('impact', 'consequence', 'biotype', 'symbol', 'hgvsc', 'hgvsp')
+
+        for line in lines:
+            if line.startswith('#'):
+                if line.startswith('#CHROM'):
+                    header_found = True
+                    n_fields = len(csq_keys)
+                    # Missing CSQ columns resolve to the trailing empty slot
+                    slots = [csq_keys.index(key) if key in csq_keys else n_fields for key in wanted]
+                elif not header_found:
+                    header_fields = parse_csq_header(line)
+                    if header_fields:
+                        csq_keys = [field.lower() for field in header_fields]
+                continue
+
+            if not header_found:
+                continue
+
+            fields = line.rstrip('\r\n').split('\t')
+            if len(fields) < 8:
+                continue
+
+            info = fields[7]
+            start = info.find('CSQ=')
+            while start > 0 and info[start - 1] != ';':
+                start = info.find('CSQ=', start + 1)
+            if start == -1:
+                continue
+            end = info.find(';', start)
+            csq_info = info[start + 4:] if end == -1 else info[start + 4:end]
+
+            chrom, pos, ref, alt = fields[0], int(fields[1]), fields[3], fields[4]
+            for csq in csq_info.split(','):
+                csq_values = csq.split('|')
+                if len(csq_values) != n_fields:
+                    continue
+                csq_values.append('')
+                impact, consequence, biotype, symbol, hgvsc, hgvsp = (
+                    csq_values[slot] or None for slot in slots
+                )
+                table.append(chrom, pos, ref, alt, impact, consequence, biotype, symbol, hgvsc, hgvsp)
+
+        return table
+
+
+def _counts_by_category(codes, categories):
+    """bincount of category codes returned as {category: int} in first-seen order"""
+    counts = np.bincount(codes, minlength=len(categories))
+    return {category: int(count) for category, count in zip(categories, counts) if count}
+
+
+def analyze_columns(table):
+    """
+    Compute the `analyze_variants` summary from a `VariantColumns` table.
+
+    Returns:
+        dict: The same analysis structure produced by `analyze_variants`.
+    """
+    n = len(table)
+    pos = table.positions()
+    chrom_codes = table.codes('chr')
+    impact_codes = table.codes('impact')
+    consequence_codes = table.codes('consequence')
+    biotype_codes = table.codes('biotype')
+    symbol_codes = table.codes('symbol')
+
+    chroms = table.categories('chr')
+    impacts = table.categories('impact')
+    consequence_strings = table.categories('consequence')
+    biotypes = table.categories('biotype')
+    symbols = table.categories('symbol')
+
+    def location(row):
+        return f"{chroms[chrom_codes[row]]}:{pos[row]}"
+
+    # Per consequence string: its terms, their effect category and the first term
+    split_terms = [consequence.split('&') for consequence in consequence_strings]
+    first_terms = [terms[0] for terms in split_terms]
+
+    # Impact and chromosome summaries
+    impact_summary = dict.fromkeys(BASE_IMPACTS, 0)
+    impact_summary.update(_counts_by_category(impact_codes, impacts))
+    variants_per_chromosome = _counts_by_category(chrom_codes, chroms)
+
+    # Consequence counts: bincount per consequence string, then spread over its terms
+    consequence_string_counts = np.bincount(consequence_codes, minlength=len(consequence_strings))
+    consequence_types = {}
+    for terms, count in zip(split_terms, consequence_string_counts):
+        if not count:
+            continue
+        for term in terms:
+            if term:
+                consequence_types[term] = consequence_types.get(term, 0) + int(count)
+
+    # Transcript effects: only the first MAX_STORED_VARIANTS rows per category are materialized
+    transcript_effects = {
+        'coding_variants': [],
+        'non_coding_variants': [],
+        'splice_variants': [],
+        'regulatory_variants': []
+    }
+    for category in EFFECT_CATEGORIES:
+        terms_in_category = np.array(
+            [sum(1 for term in terms if term and classify_consequence(term) == category) for terms in split_terms],
+            dtype=np.int64
+        )
+        if not n or not terms_in_category.any():
+            continue
+        per_row = terms_in_category[consequence_codes]
+        rows = np.flatnonzero(per_row)
+        stop = np.searchsorted(np.cumsum(per_row[rows]), MAX_STORED_VARIANTS)
+        entries = transcript_effects[category]
+        for row in rows[:stop + 1].tolist():
+            gene = symbols[symbol_codes[row]]
+            for term in split_terms[consequence_codes[row]]:
+                if len(entries) >= MAX_STORED_VARIANTS:
+                    break
+                if not term or classify_consequence(term) != category:
+                    continue
+                if category == 'coding_variants':
+                    entries.append({
+                        'location': location(row),
+                        'gene': gene,
+                        'consequence': term,
+                        'hgvsp': table.value('hgvsp', row),
+                        'impact': impacts[impact_codes[row]]
+                    })
+                elif category == 'splice_variants':
+                    entries.append({
+                        'location': location(row),
+                        'gene': gene,
+                        'hgvsc': table.value('hgvsc', row)
+                    })
+                else:
+                    entries.append({'location': location(row), 'gene': gene})
+
+    # Per-gene impact scores via a (gene, impact) bincount
+    gene_category = np.array([symbol is not None for symbol in symbols], dtype=bool)
+    gene_rows = np.flatnonzero(gene_category[symbol_codes]) if n else np.zeros(0, dtype=np.int64)
+    n_symbols, n_impacts = len(symbols), len(impacts)
+    gene_impact_matrix = np.bincount(
+        symbol_codes[gene_rows].astype(np.int64) * n_impacts + impact_codes[gene_rows],
+        minlength=n_symbols * n_impacts
+    ).reshape(n_symbols, n_impacts)
+    gene_totals = gene_impact_matrix.sum(axis=1)
+
+    def impact_column(name):
+        return gene_impact_matrix[:, impacts.index(name)] if name in impacts else np.zeros(n_symbols, dtype=np.int64)
+
+    high, moderate = impact_column('HIGH'), impact_column('MODERATE')
+    candidate_genes = np.flatnonzero(gene_totals)
+    # lexsort is stable, so ties keep first-seen order like sorted(..., reverse=True)
+    order = np.lexsort((-gene_totals[candidate_genes], -moderate[candidate_genes], -high[candidate_genes]))
+    top_genes = candidate_genes[order][:MAX_GENES]
+
+    # First MAX_VARIANTS_PER_GENE rows for each top gene, in record order
+    top_rows = gene_rows[np.isin(symbol_codes[gene_rows], top_genes)]
+    top_rows = top_rows[np.argsort(symbol_codes[top_rows], kind='stable')]
+    boundaries = np.flatnonzero(np.diff(symbol_codes[top_rows])) + 1
+    rows_by_gene = {
+        int(symbol_codes[group[0]]): group[:MAX_VARIANTS_PER_GENE]
+        for group in np.split(top_rows, boundaries) if len(group)
+    }
+
+    gene_impacts = {}
+    for gene_code in top_genes.tolist():
+        scores = {
+            'high_impact': 0,
+            'moderate_impact': 0,
+            'low_impact': 0,
+            'modifier_impact': 0,
+            'total_variants': int(gene_totals[gene_code]),
+            'variants': [
+                {
+                    'location': location(row),
+                    'consequence': first_terms[consequence_codes[row]],
+                    'hgvsc': table.value('hgvsc', row),
+                    'hgvsp': table.value('hgvsp', row)
+                }
+                for row in rows_by_gene[gene_code].tolist()
+            ]
+        }
+        for impact_code, count in enumerate(gene_impact_matrix[gene_code].tolist()):
+            if count:
+                scores[f"{impacts[impact_code].lower()}_impact"] = count
+        gene_impacts[symbols[gene_code]] = scores
+
+    # Biotype summary
+    biotype_summary = {
+        biotype: count
+        for biotype, count in _counts_by_category(biotype_codes, biotypes).items()
+        if biotype
+    }
+
+    # Detailed variants for high and moderate impacts
+    detailed_impacts = np.array([impact in ('HIGH', 'MODERATE') for impact in impacts], dtype=bool)
+    detailed_rows = np.flatnonzero(detailed_impacts[impact_codes])[:MAX_STORED_VARIANTS] if n else []
+    detailed_variants = [
+        {
+            'location': location(row),
+            'ref': table.value('ref', row),
+            'alt': table.value('alt', row),
+            'gene': symbols[symbol_codes[row]],
+            'consequence': first_terms[consequence_codes[row]],
+            'impact': impacts[impact_codes[row]],
+            'hgvsc': table.value('hgvsc', row),
+            'hgvsp': table.value('hgvsp', row)
+        }
+        for row in np.asarray(detailed_rows).tolist()
+    ]
+
+    analysis = {
+        'total_variants': n,
+        'variants_per_chromosome': variants_per_chromosome,
+        'impact_summary': impact_summary,
+        'consequence_types': consequence_types,
+        'transcript_effects': transcript_effects,
+        'gene_impacts': gene_impacts,
+        'biotype_summary': biotype_summary,
+        'detailed_variants': detailed_variants
+    }
+
+    # Generate summary statistics
+    analysis['summary'] = {
+        'total_variants': n,
+        'high_impact_variants': impact_summary['HIGH'],
+        'moderate_impact_variants': impact_summary['MODERATE'],
+        'coding_variants': len(transcript_effects['coding_variants']),
+        'splice_variants': len(transcript_effects['splice_variants']),
+        'most_affected_genes': [
+            {
+                'gene': gene,
+                'high_impact': data['high_impact'],
+                'moderate_impact': data['moderate_impact'],
+                'total_variants': data['total_variants']
+            }
+            for gene, data in list(gene_impacts.items())[:10]  # Top 10 genes only
+        ],
+        'top_consequences': sorted(
+            consequence_types.items(),
+            key=lambda x: x[1],
+            reverse=True
+        )[:5]
+    }
+
+    return analysis
+
+
+def analyze_variants_columnar(variants):
+    """Columnar equivalent of `analyze_variants` for an iterable of variant dicts"""
+    return analyze_columns(VariantColumns.from_variants(variants))
+
+
+def columnar_vep_analysis(fileobj, gzipped=True):
+    """
+    Summarise a VEP annotated VCF using the columnar representation.
+
+    Args:
+        fileobj: Readable binary file-like object, e.g. an S3 StreamingBody
+        gzipped: Whether the stream is gzip compressed
+    """
+    return analyze_columns(VariantColumns.from_vcf_lines(iter_vcf_lines(fileobj, gzipped)))
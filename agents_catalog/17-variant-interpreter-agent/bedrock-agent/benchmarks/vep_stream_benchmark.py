@@ -0,0 +1,158 @@
+"""
+Benchmark the streaming VEP summary against the materialized variant list path.
+
+Generates a synthetic VEP annotated VCF (gzip) and summarises it with:
+
+* materialized - decode the whole file, build one dict per CSQ record with
+  `parse_vep_output`, then run `analyze_variants` over the list (the previous
+  `vep_feature_extraction` behaviour)
+* streaming    - `stream_vep_analysis`, a single pass over the byte stream
+* columnar     - `columnar_vep_analysis`, typed arrays + NumPy aggregation
+  (requires numpy)
+
+Each mode runs in its own subprocess so the reported peak RSS is not shared.
+
+Usage:
+    python benchmarks/vep_stream_benchmark.py --records 2000000
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'LambdaAgent'))
+
+from vep_analysis import (  # noqa: E402
+    DEFAULT_CSQ_FIELDS,
+    analyze_variants,
+    parse_vep_output,
+    stream_vep_analysis,
+)
+
+CONSEQUENCES = [
+    ('missense_variant', 'MODERATE'),
+    ('stop_gained', 'HIGH'),
+    ('frameshift_variant', 'HIGH'),
+    ('splice_region_variant&intron_variant', 'LOW'),
+    ('synonymous_variant', 'LOW'),
+    ('intron_variant', 'MODIFIER'),
+    ('regulatory_region_variant', 'MODIFIER'),
+    ('non_coding_transcript_exon_variant', 'MODIFIER'),
+    ('upstream_gene_variant', 'MODIFIER'),
+]
+BIOTYPES = ['protein_coding', 'lncRNA', 'miRNA', 'processed_pseudogene']
+CHROMOSOMES = [f'chr{c}' for c in list(range(1, 23)) + ['X', 'Y']]
+
+
+def generate_vcf(path, records, seed=0):
+    """Write a synthetic gzip VEP VCF with `records` CSQ annotations"""
+    rng = random.Random(seed)
+    genes = [f'GENE{i}' for i in range(20000)]
+    with gzip.open(path, 'wt', compresslevel=1) as out:
+        out.write('##fileformat=VCFv4.2\n')
+        out.write('##INFO=<ID=CSQ,Number=.,Type=String,Description="Consequence annotations from '
+                  'Ensembl VEP. Format: ' + '|'.join(DEFAULT_CSQ_FIELDS) + '">\n')
+        out.write('#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n')
+        written = 0
+        pos = 0
+        while written < records:
+            pos += rng.randint(1, 500)
+            annotations = []
+            for _ in range(min(rng.randint(1, 3), records - written)):
+                consequence, impact = rng.choice(CONSEQUENCES)
+                gene = rng.choice(genes)
+                values = [''] * len(DEFAULT_CSQ_FIELDS)
+                values[0] = 'T'
+                values[1] = consequence
+                values[2] = impact
+                values[3] = gene
+                values[4] = f'ENSG{rng.randint(0, 10**9):011d}'
+                values[5] = 'Transcript'
+                values[7] = rng.choice(BIOTYPES)
+                values[10] = f'ENST0001:c.{rng.randint(1, 5000)}C>T'
+                values[11] = f'ENSP0001:p.Arg{rng.randint(1, 900)}Cys' if impact != 'MODIFIER' else ''
+                annotations.append('|'.join(values))
+            written += len(annotations)
+            out.write(f"{rng.choice(CHROMOSOMES)}\t{pos}\t.\tC\tT\t50\tPASS\t"
+                      f"DP=30;CSQ={','.join(annotations)}\n")
+
+
+def run_materialized(path):
+    with open(path, 'rb') as f, gzip.GzipFile(fileobj=f) as gz:
+        content = gz.read().decode('utf-8')
+    return analyze_variants(parse_vep_output(content))
+
+
+def run_streaming(path):
+    with open(path, 'rb') as f:
+        return stream_vep_analysis(f)
+
+
+def run_columnar(path):
+    from vep_columnar import columnar_vep_analysis
+    with open(path, 'rb') as f:
+        return columnar_vep_analysis(f)
+
+
+MODES = {
+    'materialized': run_materialized,
+    'streaming': run_streaming,
+    'columnar': run_columnar,
+}
+
+
+def run_mode(mode, path):
+    """Run one mode in-process and print a JSON result line"""
+    start = time.perf_counter()
+    analysis = MODES[mode](path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    print(json.dumps({
+        'mode': mode,
+        'records': analysis['total_variants'],
+        'seconds': round(elapsed, 3),
+        'records_per_second': int(analysis['total_variants'] / elapsed) if elapsed else None,
+        'peak_rss_mb': round(peak_mb, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=2_000_000, help='Number of CSQ records to generate')
+    parser.add_argument('--vcf', help='Use an existing .vcf.gz instead of generating one')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['materialized', 'streaming', 'columnar'])
+    parser.add_argument('--run-mode', choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.run_mode, args.vcf)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = args.vcf
+        if not path:
+            path = os.path.join(tmpdir, 'synthetic.ann.vcf.gz')
+            print(f"Generating {args.records:,} CSQ records -> {path}")
+            generate_vcf(path, args.records)
+
+        print(f"{'mode':<14}{'records':>12}{'seconds':>10}{'records/s':>14}{'peak RSS MB':>14}")
+        for mode in args.modes:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-mode', mode, '--vcf', path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['mode']:<14}{result['records']:>12,}{result['seconds']:>10}"
+                  f"{result['records_per_second']:>14,}{result['peak_rss_mb']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""
+Global citation-rank index for PMC articles.
+
+The index is built offline from PMC Open Access reference lists and stored as a
+directory of memory-mapped numpy arrays:
+
+    pmids.npy          sorted PMIDs of every cited or citing article (uint32)
+    in_degree.npy      number of distinct articles citing each PMID (uint32)
+    pagerank.npy       optional PageRank of each PMID (float32)
+    pmcids.npy         sorted numeric PMCIDs of the citing articles (uint32)
+    pmcid_pmids.npy    PMID of each PMCID (uint32)
+    edges.npy          distinct citation edges, citing << 32 | cited (uint64)
+    metadata.json      counts and build time
+
+Only the first five arrays are read at query time, and only the pages touched by
+lookups are loaded. edges.npy lets later builds add new articles without
+re-reading the corpus, and an index built with PageRank keeps it up to date on
+later builds unless --no-pagerank is given:
+
+    python citation_index.py --output /data/pmc-citation-index --jats oa_bulk/ --pagerank
+    python citation_index.py --output /data/pmc-citation-index --article-store /tmp/pmc-article-store.sqlite3
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Directory of the prebuilt index (empty disables citation index ranking) and the
+# score used for ranking: "in_degree" or "pagerank"
+PMC_CITATION_INDEX_PATH = os.getenv("PMC_CITATION_INDEX_PATH", "")
+PMC_CITATION_INDEX_METRIC = os.getenv("PMC_CITATION_INDEX_METRIC", "in_degree")
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_MAX_ITERATIONS = 50
+PAGERANK_TOLERANCE = 1e-9
+
+MAX_UINT32 = 2**32 - 1
+
+logger = logging.getLogger("citation_index")
+logger.setLevel(logging.INFO)
+
+
+def _parse_ids(ids: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse numeric IDs ("PMC" prefix allowed) to uint32; returns (values, valid mask)."""
+    parsed = []
+    valid = []
+    for value in ids:
+        text = str(value).strip().upper().replace("PMC", "") if value else ""
+        ok = text.isdigit() and 0 < int(text) <= MAX_UINT32
+        parsed.append(int(text) if ok else 0)
+        valid.append(ok)
+    return np.asarray(parsed, dtype=np.uint32), np.asarray(valid, dtype=bool)
+
+
+def _lookup(keys: np.ndarray, query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions of query values in sorted keys, and a mask of those found."""
+    if len(keys) == 0 or len(query) == 0:
+        return np.zeros(len(query), dtype=np.int64), np.zeros(len(query), dtype=bool)
+    positions = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return positions, keys[positions] == query
+
+
+class CitationIndex:
+    """
+    Read-only view of a citation index directory.
+
+    Args:
+        path: Index directory written by build_citation_index
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "metadata.json")) as f:
+            self.metadata = json.load(f)
+        self.pmids = self._load("pmids.npy")
+        self.in_degree = self._load("in_degree.npy")
+        self.pagerank = (
+            self._load("pagerank.npy")
+            if os.path.exists(os.path.join(path, "pagerank.npy"))
+            else None
+        )
+        self.pmcids = self._load("pmcids.npy")
+        self.pmcid_pmids = self._load("pmcid_pmids.npy")
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, name), mmap_mode="r")
+
+    def pmids_for_pmcids(self, pmc_ids: List[str]) -> Dict[str, str]:
+        """Map PMC IDs to PMIDs for the articles in the index, keyed on numeric PMCID."""
+        values, valid = _parse_ids(pmc_ids)
+        positions, found = _lookup(self.pmcids, values)
+        found &= valid
+        return {
+            str(int(pmc_id)): str(int(self.pmcid_pmids[position]))
+            for pmc_id, position in zip(values[found], positions[found])
+        }
+
+    def scores(self, pmids: List[str]) -> Dict[str, Dict[str, float]]:
+        """In-degree (and PageRank, if built) for the PMIDs present in the index."""
+        values, valid = _parse_ids(pmids)
+        positions, found = _lookup(self.pmids, values)
+        found &= valid
+        scores = {}
+        for pmid, position in zip(values[found], positions[found]):
+            score = {"in_degree": int(self.in_degree[position])}
+            if self.pagerank is not None:
+                score["pagerank"] = float(self.pagerank[position])
+            scores[str(int(pmid))] = score
+        return scores
+
+    def rank_pmcids(
+        self, pmc_ids: List[str], metric: str = "in_degree"
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank PMC IDs by citation score, highest first.
+
+        Ties, including articles missing from the index, keep their input order, so
+        the esearch relevance order is preserved among equally cited articles.
+
+        Returns:
+            List of {"pmc_id", "pmid", "in_degree", "pagerank"} dictionaries
+        """
+        if metric == "pagerank" and self.pagerank is None:
+            logger.warning("Citation index has no PageRank, ranking by in-degree")
+            metric = "in_degree"
+
+        pmc_to_pmid = self.pmids_for_pmcids(pmc_ids)
+        scores = self.scores(list(pmc_to_pmid.values()))
+        ranked = []
+        for pmc_id in pmc_ids:
+            numeric_id = str(pmc_id).strip().upper().replace("PMC", "")
+            pmid = pmc_to_pmid.get(numeric_id)
+            score = scores.get(pmid, {})
+            ranked.append(
+                {
+                    "pmc_id": numeric_id,
+                    "pmid": pmid,
+                    "in_degree": score.get("in_degree", 0),
+                    "pagerank": score.get("pagerank", 0.0),
+                }
+            )
+        return sorted(ranked, key=lambda entry: entry[metric], reverse=True)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_citation_index() -> Optional[CitationIndex]:
+    """Return the process-wide citation index, or None if it is not configured or unavailable."""
+    global _index
+    if not PMC_CITATION_INDEX_PATH:
+        return None
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = CitationIndex(PMC_CITATION_INDEX_PATH)
+                logger.info(
+                    f"Loaded citation index with {_index.metadata.get('articles', 0)} articles"
+                )
+            except (OSError, ValueError) as e:
+                logger.warning(f"Citation index unavailable: {e}")
+                return None
+        return _index
+
+
+def _pagerank(
+    node_count: int, sources: np.ndarray, targets: np.ndarray
+) -> np.ndarray:
+    """PageRank by power iteration over an edge list of node positions."""
+    out_degree = np.bincount(sources, minlength=node_count).astype(np.float64)
+    dangling = out_degree == 0
+    rank = np.full(node_count, 1.0 / node_count)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        contributions = rank[sources] / out_degree[sources]
+        new_rank = np.bincount(targets, weights=contributions, minlength=node_count)
+        new_rank = (1 - PAGERANK_DAMPING) / node_count + PAGERANK_DAMPING * (
+            new_rank + rank[dangling].sum() / node_count
+        )
+        converged = np.abs(new_rank - rank).sum() < PAGERANK_TOLERANCE
+        rank = new_rank
+        if converged:
+            break
+    return rank.astype(np.float32)
+
+
+def build_citation_index(
+    output_path: str,
+    edges: Iterable[Tuple[Any, Any]],
+    id_map: Iterable[Tuple[Any, Any]] = (),
+    pagerank: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Build or update the citation index in output_path.
+
+    Edges and PMCID to PMID mappings already in output_path are merged with the new
+    ones, so an existing index can be updated with only the newly added articles.
+
+    Args:
+        output_path: Index directory
+        edges: (citing PMID, cited PMID) pairs; duplicates and self-citations are ignored
+        id_map: (PMCID, PMID) pairs of the citing articles
+        pagerank: Also compute PageRank; None recomputes it if the existing index has it
+
+    Returns:
+        The index metadata
+    """
+    os.makedirs(output_path, exist_ok=True)
+
+    edge_list = list(edges)
+    citing, citing_valid = _parse_ids(edge[0] for edge in edge_list)
+    cited, cited_valid = _parse_ids(edge[1] for edge in edge_list)
+    keep = citing_valid & cited_valid & (citing != cited)
+    encoded = (citing[keep].astype(np.uint64) << np.uint64(32)) | cited[keep]
+
+    edges_path = os.path.join(output_path, "edges.npy")
+    if os.path.exists(edges_path):
+        encoded = np.concatenate([np.load(edges_path), encoded])
+    encoded = np.unique(encoded)
+
+    map_list = list(id_map)
+    pmcids, pmcid_valid = _parse_ids(pair[0] for pair in map_list)
+    map_pmids, pmid_valid = _parse_ids(pair[1] for pair in map_list)
+    map_valid = pmcid_valid & pmid_valid
+    pmcids, map_pmids = pmcids[map_valid], map_pmids[map_valid]
+    pmcids_path = os.path.join(output_path, "pmcids.npy")
+    if os.path.exists(pmcids_path):
+        pmcids = np.concatenate([np.load(pmcids_path), pmcids])
+        map_pmids = np.concatenate(
+            [np.load(os.path.join(output_path, "pmcid_pmids.npy")), map_pmids]
+        )
+    # Later mappings win over earlier ones
+    pmcids, last = np.unique(pmcids[::-1], return_index=True)
+    map_pmids = map_pmids[::-1][last]
+
+    sources = (encoded >> np.uint64(32)).astype(np.uint32)
+    targets = (encoded & np.uint64(MAX_UINT32)).astype(np.uint32)
+    pmids = np.unique(np.concatenate([sources, targets, map_pmids]))
+    source_positions = np.searchsorted(pmids, sources)
+    target_positions = np.searchsorted(pmids, targets)
+    in_degree = np.bincount(target_positions, minlength=len(pmids)).astype(np.uint32)
+
+    arrays = {
+        "edges.npy": encoded,
+        "pmids.npy": pmids,
+        "in_degree.npy": in_degree,
+        "pmcids.npy": pmcids,
+        "pmcid_pmids.npy": map_pmids,
+    }
+    pagerank_path = os.path.join(output_path, "pagerank.npy")
+    if pagerank is None:
+        pagerank = os.path.exists(pagerank_path)
+    if pagerank and len(pmids):
+        arrays["pagerank.npy"] = _pagerank(len(pmids), source_positions, target_positions)
+    elif os.path.exists(pagerank_path):
+        # A stale PageRank would disagree with the updated graph
+        os.remove(pagerank_path)
+
+    for name, array in arrays.items():
+        tmp_path = os.path.join(output_path, f".{name}.tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(output_path, name))
+
+    metadata = {
+        "articles": int(len(pmids)),
+        "edges": int(len(encoded)),
+        "pmcids": int(len(pmcids)),
+        "pagerank": "pagerank.npy" in arrays,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(os.path.join(output_path, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+def _jats_files(paths: List[str]) -> Iterable[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith((".xml", ".nxml")):
+                        yield os.path.join(directory, name)
+        else:
+            yield path
+
+
+def read_jats(paths: List[str]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Citation edges and PMCID to PMID mappings from JATS XML files or directories."""
+    # Deferred import: the article parser lives with the search tool
+    from search_pmc import _iter_articles
+
+    edges, id_map = [], []
+    for file_path in _jats_files(paths):
+        with open(file_path, "rb") as f:
+            for article in _iter_articles(f):
+                pmid = article.get("pmid")
+                if not pmid:
+                    continue
+                if article.get("id"):
+                    id_map.append((article["id"], pmid))
+                edges.extend((pmid, ref_pmid) for ref_pmid in article.get("references", []))
+    return edges, id_map
+
+
+def read_article_store(store_path: str) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Citation edges and PMCID to PMID mappings from a PMC article store database."""
+    connection = sqlite3.connect(store_path)
+    try:
+        id_map = connection.execute(
+            "SELECT pmcid, pmid FROM articles WHERE pmid IS NOT NULL"
+        ).fetchall()
+        edges = connection.execute(
+            "SELECT articles.pmid, citations.ref_pmid FROM citations "
+            "JOIN articles ON articles.pmcid = citations.pmcid "
+            "WHERE articles.pmid IS NOT NULL"
+        ).fetchall()
+    finally:
+        connection.close()
+    return edges, id_map
+
+
+def read_edges_tsv(path: str) -> List[Tuple[str, str]]:
+    """(citing PMID, cited PMID) pairs from a two-column tab-separated file."""
+    with open(path, newline="") as f:
+        return [tuple(row[:2]) for row in csv.reader(f, delimiter="\t") if len(row) >= 2]
+
+
+def read_oa_file_list(path: str) -> List[Tuple[str, str]]:
+    """(PMCID, PMID) pairs from the PMC Open Access file list (oa_file_list.csv)."""
+    with open(path, newline="") as f:
+        return [
+            (row["Accession ID"], row["PMID"])
+            for row in csv.DictReader(f)
+            if row.get("Accession ID") and row.get("PMID")
+        ]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Build or update the PMC citation-rank index"
+    )
+    parser.add_argument("--output", required=True, help="Index directory")
+    parser.add_argument(
+        "--jats", nargs="*", default=[], help="JATS XML files or directories"
+    )
+    parser.add_argument("--article-store", help="PMC article store SQLite database")
+    parser.add_argument("--edges", help="Tab-separated citing/cited PMID pairs")
+    parser.add_argument("--id-map", help="PMC OA file list CSV mapping PMCIDs to PMIDs")
+    parser.add_argument(
+        "--pagerank",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Also compute PageRank (default: only if the existing index has it)",
+    )
+    args = parser.parse_args(argv)
+
+    edges, id_map = [], []
+    if args.jats:
+        jats_edges, jats_ids = read_jats(args.jats)
+        edges += jats_edges
+        id_map += jats_ids
+    if args.article_store:
+        store_edges, store_ids = read_article_store(args.article_store)
+        edges += store_edges
+        id_map += store_ids
+    if args.edges:
+        edges += read_edges_tsv(args.edges)
+    if args.id_map:
+        id_map += read_oa_file_list(args.id_map)
+
+    metadata = build_citation_index(args.output, edges, id_map, pagerank=args.pagerank)
+    print(json.dumps(metadata, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s | %(name)s | %(message)s")
+    main()
@@ -1,18 +1,21 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
+import functools
 import logging
 import os
 import re
 import uuid
 from typing import Optional
 
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 from paperqa import Settings, ask
 from paperqa.settings import (AgentSettings, AnswerSettings, IndexSettings,
                               ParsingSettings)
 from strands import tool
 import warnings
+
+from paper_cache import paper_cache
+
 warnings.filterwarnings("ignore", module="litellm")
 
 # Global configuration for commercial use filtering
@@ -125,50 +128,30 @@ def _validate_pmcid(pmcid: str) -> bool:
     return pattern_match
 
 
-def _download_from_s3(bucket: str, key: str, local_folder: str = "my_papers") -> str:
+def _download_from_s3(bucket: str, key: str, pmcid: str) -> str:
     """
-    Download file from S3 bucket to local folder using anonymous access
+    Get an article file from S3 through the local paper cache using anonymous access
+
+    The file is only downloaded if there is no local copy or its ETag changed.
 
     Args:
         bucket: S3 bucket name
         key: S3 object key
-        local_folder: Local folder to save the file (default: "my_papers")
+        pmcid: PMC identifier the file belongs to
 
     Returns:
-        str: Path to the downloaded file
+        str: Path to the local file
 
     Raises:
         PMCS3Error: If download fails
     """
     s3_path = f"s3://{bucket}/{key}"
+    local_path = paper_cache.text_folder(pmcid)
 
     try:
-        # Configure S3 client for anonymous access
-        from botocore import UNSIGNED
-        from botocore.config import Config
-
-        logger.debug(f"Configuring S3 client for anonymous access to {s3_path}")
-
-        s3_client = boto3.client(
-            "s3",
-            region_name="us-east-1",
-            config=Config(signature_version=UNSIGNED),
-        )
-
-        # Create local folder if it doesn't exist
-        os.makedirs(local_folder, exist_ok=True)
-        logger.debug(f"Ensured local folder exists: {local_folder}")
-
-        # Extract filename from key
-        filename = os.path.basename(key)
-        local_path = os.path.join(local_folder, filename)
-
-        logger.info(f"Attempting to download {s3_path} to {local_path}")
-
-        # Download the file
-        s3_client.download_file(bucket, key, local_path)
-
-        logger.info(f"Successfully downloaded file to {local_path}")
+        logger.info(f"Getting {s3_path} from the paper cache")
+        local_path = paper_cache.fetch(pmcid, bucket, key)
+        logger.info(f"Article file available at {local_path}")
         return local_path
 
     except ClientError as e:
@@ -222,6 +205,35 @@ def _download_from_s3(bucket: str, key: str, local_folder: str = "my_papers") ->
         raise PMCS3Error(f"Failed to download from S3: {str(e)}")
 
 
+@functools.lru_cache(maxsize=256)
+def _paperqa_settings(paper_directory: str, index_directory: str) -> Settings:
+    """
+    Build the paper-qa settings for one paper, once per paper.
+
+    The index name paper-qa derives from these settings is stable, so the index in
+    index_directory is reused and the paper is only chunked and embedded once.
+    """
+    return Settings(
+        llm=PAPERQA_LLM,
+        summary_llm=PAPERQA_SUMMARY_LLM,
+        agent=AgentSettings(
+            agent_llm=PAPERQA_AGENT_LLM,
+            index=IndexSettings(
+                index_directory=index_directory,
+                paper_directory=paper_directory,
+            ),
+            agent_type=PAPERQA_AGENT_TYPE,
+        ),
+        embedding=PAPERQA_EMBEDDING,
+        parsing=ParsingSettings(use_doc_details=False),
+        answer=AnswerSettings(
+            answer_max_sources=1,
+            evidence_k=PAPERQA_EVIDENCE_K,
+            evidence_summary_length=PAPERQA_EVIDENCE_SUMMARY_LENGTH,
+        ),
+    )
+
+
 def gather_evidence(pmcid: str, question: str, source: Optional[str] = None) -> dict:
     """
     Answer questions about a PMC article using paper-qa for intelligent retrieval.
@@ -237,6 +249,13 @@ def gather_evidence(pmcid: str, question: str, source: Optional[str] = None) ->
     Returns:
         dict: ToolResult with status and content containing the answer and sources
     """
+    # Hold the paper so concurrent questions about it share one download and index
+    with paper_cache.use(pmcid):
+        return _gather_evidence(pmcid, question, source)
+
+
+def _gather_evidence(pmcid: str, question: str, source: Optional[str] = None) -> dict:
+    """Answer a question about a paper held in the paper cache."""
     logger.info(f"Starting gather_evidence for PMCID: {pmcid}, question: {question}")
 
     # Configure PaperQA logging to avoid Rich handler errors in Jupyter
@@ -266,16 +285,14 @@ def gather_evidence(pmcid: str, question: str, source: Optional[str] = None) ->
         bucket = "pmc-oa-opendata"
         commercial_key = f"oa_comm/txt/all/{pmcid}.txt"
         noncommercial_key = f"oa_noncomm/txt/all/{pmcid}.txt"
-        local_text_folder = f"my_papers/{pmcid}/txt"
-        local_index_folder = f"my_papers/{pmcid}/index"
+        local_text_folder = paper_cache.text_folder(pmcid)
+        local_index_folder = paper_cache.index_folder(pmcid)
 
         # Step 2: Try to download from commercial bucket first
         local_file_path = None
         try:
             logger.debug(f"Checking commercial bucket for {pmcid}")
-            local_file_path = _download_from_s3(
-                bucket, commercial_key, local_folder=local_text_folder
-            )
+            local_file_path = _download_from_s3(bucket, commercial_key, pmcid)
             logger.info(f"Successfully retrieved commercial article {pmcid}")
 
         except PMCS3Error as e:
@@ -295,9 +312,7 @@ def gather_evidence(pmcid: str, question: str, source: Optional[str] = None) ->
             logger.info(f"Checking non-commercial bucket for {pmcid}")
 
             try:
-                local_file_path = _download_from_s3(
-                    bucket, noncommercial_key, local_folder=local_text_folder
-                )
+                local_file_path = _download_from_s3(bucket, noncommercial_key, pmcid)
                 logger.warning(
                     f"Article {pmcid} found in non-commercial bucket - licensing restrictions may apply"
                 )
@@ -330,29 +345,16 @@ def gather_evidence(pmcid: str, question: str, source: Optional[str] = None) ->
         logger.debug(f"Using paper directory: {local_text_folder}")
 
         # Configure paper-qa settings
-        settings = Settings(
-            llm=PAPERQA_LLM,
-            summary_llm=PAPERQA_SUMMARY_LLM,
-            agent=AgentSettings(
-                agent_llm=PAPERQA_AGENT_LLM,
-                index=IndexSettings(
-                    index_directory=local_index_folder,
-                    paper_directory=local_text_folder,
-                ),
-                agent_type=PAPERQA_AGENT_TYPE,
-            ),
-            embedding=PAPERQA_EMBEDDING,
-            parsing=ParsingSettings(use_doc_details=False),
-            answer=AnswerSettings(
-                answer_max_sources=1,
-                evidence_k=PAPERQA_EVIDENCE_K,
-                evidence_summary_length=PAPERQA_EVIDENCE_SUMMARY_LENGTH,
-            ),
-        )
+        settings = _paperqa_settings(local_text_folder, local_index_folder)
 
         # Ask the question
         logger.info("Invoking paper-qa")
+        index_name = settings.get_index_name()
+        index_before = paper_cache.index_fingerprint(pmcid, index_name)
         answer = ask(question, settings=settings)
+        if paper_cache.index_fingerprint(pmcid, index_name) != index_before:
+            # Share the new embeddings with other containers
+            paper_cache.sync(pmcid)
 
         # Format the response using Strands ToolResult format
         answer_text = answer.session.answer
@@ -1,10 +1,12 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
+import functools
 import logging
 import os
 import re
 import uuid
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
 
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
@@ -17,6 +19,9 @@ from paperqa.settings import (
 )
 from strands import tool
 import warnings
+
+from paper_cache import paper_cache
+
 warnings.filterwarnings("ignore", module="litellm")
 
 # Global configuration for commercial use filtering
@@ -40,6 +45,14 @@ PAPERQA_EVIDENCE_SUMMARY_LENGTH = os.getenv("EVIDENCE_SUMMARY_LENGTH", "25 to 50
 # Dynamo DB Configuration
 EVIDENCE_TABLE_NAME = os.getenv("EVIDENCE_TABLE_NAME", "deep-research-evidence")
 
+# Batch evidence configuration: maximum papers per call, concurrent article downloads
+# and concurrent paper-qa runs (each parses, embeds and queries one paper)
+EVIDENCE_BATCH_MAX_PAPERS = int(os.getenv("EVIDENCE_BATCH_MAX_PAPERS", 20))
+EVIDENCE_DOWNLOAD_WORKERS = int(os.getenv("EVIDENCE_DOWNLOAD_WORKERS", 16))
+EVIDENCE_PAPERQA_WORKERS = int(os.getenv("EVIDENCE_PAPERQA_WORKERS", 10))
+
+PMC_OA_BUCKET = "pmc-oa-opendata"
+
 # Configure logging
 logging.basicConfig(
     format="%(levelname)s | %(name)s | %(message)s",
@@ -135,50 +148,30 @@ def _validate_pmc_id(pmc_id: str) -> bool:
     return pattern_match
 
 
-def _download_from_s3(bucket: str, key: str, local_folder: str = "my_papers") -> str:
+def _download_from_s3(bucket: str, key: str, pmc_id: str) -> str:
     """
-    Download file from S3 bucket to local folder using anonymous access
+    Get an article file from S3 through the local paper cache using anonymous access
+
+    The file is only downloaded if there is no local copy or its ETag changed.
 
     Args:
         bucket: S3 bucket name
         key: S3 object key
-        local_folder: Local folder to save the file (default: "my_papers")
+        pmc_id: PMC identifier the file belongs to
 
     Returns:
-        str: Path to the downloaded file
+        str: Path to the local file
 
     Raises:
         PMCS3Error: If download fails
     """
     s3_path = f"s3://{bucket}/{key}"
+    local_path = paper_cache.text_folder(pmc_id)
 
     try:
-        # Configure S3 client for anonymous access
-        from botocore import UNSIGNED
-        from botocore.config import Config
-
-        logger.debug(f"Configuring S3 client for anonymous access to {s3_path}")
-
-        s3_client = boto3.client(
-            "s3",
-            region_name="us-east-1",
-            config=Config(signature_version=UNSIGNED),
-        )
-
-        # Create local folder if it doesn't exist
-        os.makedirs(local_folder, exist_ok=True)
-        logger.debug(f"Ensured local folder exists: {local_folder}")
-
-        # Extract filename from key
-        filename = os.path.basename(key)
-        local_path = os.path.join(local_folder, filename)
-
-        logger.info(f"Attempting to download {s3_path} to {local_path}")
-
-        # Download the file
-        s3_client.download_file(bucket, key, local_path)
-
-        logger.info(f"Successfully downloaded file to {local_path}")
+        logger.info(f"Getting {s3_path} from the paper cache")
+        local_path = paper_cache.fetch(pmc_id, bucket, key)
+        logger.info(f"Article file available at {local_path}")
         return local_path
 
     except ClientError as e:
@@ -289,7 +282,36 @@ def _save_to_db(
         raise
 
 
-def gather_evidence(pmc_id: str, question: str) -> dict:
+@functools.lru_cache(maxsize=256)
+def _paperqa_settings(paper_directory: str, index_directory: str) -> Settings:
+    """
+    Build the paper-qa settings for one paper, once per paper.
+
+    The index name paper-qa derives from these settings is stable, so the index in
+    index_directory is reused and the paper is only chunked and embedded once.
+    """
+    return Settings(
+        llm=PAPERQA_LLM,
+        summary_llm=PAPERQA_SUMMARY_LLM,
+        agent=AgentSettings(
+            agent_llm=PAPERQA_AGENT_LLM,
+            index=IndexSettings(
+                index_directory=index_directory,
+                paper_directory=paper_directory,
+            ),
+            agent_type=PAPERQA_AGENT_TYPE,
+        ),
+        embedding=PAPERQA_EMBEDDING,
+        parsing=ParsingSettings(use_doc_details=False),
+        answer=AnswerSettings(
+            answer_max_sources=1,
+            evidence_k=PAPERQA_EVIDENCE_K,
+            evidence_summary_length=PAPERQA_EVIDENCE_SUMMARY_LENGTH,
+        ),
+    )
+
+
+def gather_evidence(pmc_id: str, question: str, save_to_db: bool = True) -> dict:
     """
     Answer questions about a PMC article using paper-qa for intelligent retrieval.
 
@@ -299,10 +321,18 @@ def gather_evidence(pmc_id: str, question: str) -> dict:
     Args:
         pmc_id: PMC identifier (e.g., "PMC6033041")
         question: The question to answer about the paper
+        save_to_db: Save the evidence record to DynamoDB
 
     Returns:
         dict: ToolResult with status and content containing the answer and sources
     """
+    # Hold the paper so concurrent questions about it share one download and index
+    with paper_cache.use(pmc_id):
+        return _gather_evidence(pmc_id, question, save_to_db)
+
+
+def _gather_evidence(pmc_id: str, question: str, save_to_db: bool = True) -> dict:
+    """Answer a question about a paper held in the paper cache."""
     logger.info(f"Starting gather_evidence for PMCID: {pmc_id}, question: {question}")
 
     # Configure PaperQA logging to avoid Rich handler errors in Jupyter
@@ -324,19 +354,17 @@ def gather_evidence(pmc_id: str, question: str) -> dict:
             }
 
         # S3 configuration
-        bucket = "pmc-oa-opendata"
+        bucket = PMC_OA_BUCKET
         commercial_key = f"oa_comm/txt/all/{pmc_id}.txt"
         noncommercial_key = f"oa_noncomm/txt/all/{pmc_id}.txt"
-        local_text_folder = f"my_papers/{pmc_id}/txt"
-        local_index_folder = f"my_papers/{pmc_id}/index"
+        local_text_folder = paper_cache.text_folder(pmc_id)
+        local_index_folder = paper_cache.index_folder(pmc_id)
 
         # Step 2: Try to download from commercial bucket first
         local_file_path = None
         try:
             logger.debug(f"Checking commercial bucket for {pmc_id}")
-            local_file_path = _download_from_s3(
-                bucket, commercial_key, local_folder=local_text_folder
-            )
+            local_file_path = _download_from_s3(bucket, commercial_key, pmc_id)
             logger.info(f"Successfully retrieved commercial article {pmc_id}")
 
         except PMCS3Error as e:
@@ -356,9 +384,7 @@ def gather_evidence(pmc_id: str, question: str) -> dict:
             logger.info(f"Checking non-commercial bucket for {pmc_id}")
 
             try:
-                local_file_path = _download_from_s3(
-                    bucket, noncommercial_key, local_folder=local_text_folder
-                )
+                local_file_path = _download_from_s3(bucket, noncommercial_key, pmc_id)
                 logger.warning(
                     f"Article {pmc_id} found in non-commercial bucket - licensing restrictions may apply"
                 )
@@ -384,29 +410,16 @@ def gather_evidence(pmc_id: str, question: str) -> dict:
         logger.debug(f"Using paper directory: {local_text_folder}")
 
         # Configure paper-qa settings
-        settings = Settings(
-            llm=PAPERQA_LLM,
-            summary_llm=PAPERQA_SUMMARY_LLM,
-            agent=AgentSettings(
-                agent_llm=PAPERQA_AGENT_LLM,
-                index=IndexSettings(
-                    index_directory=local_index_folder,
-                    paper_directory=local_text_folder,
-                ),
-                agent_type=PAPERQA_AGENT_TYPE,
-            ),
-            embedding=PAPERQA_EMBEDDING,
-            parsing=ParsingSettings(use_doc_details=False),
-            answer=AnswerSettings(
-                answer_max_sources=1,
-                evidence_k=PAPERQA_EVIDENCE_K,
-                evidence_summary_length=PAPERQA_EVIDENCE_SUMMARY_LENGTH,
-            ),
-        )
+        settings = _paperqa_settings(local_text_folder, local_index_folder)
 
         # Ask the question
         logger.info("Invoking paper-qa")
+        index_name = settings.get_index_name()
+        index_before = paper_cache.index_fingerprint(pmc_id, index_name)
         answer = ask(question, settings=settings)
+        if paper_cache.index_fingerprint(pmc_id, index_name) != index_before:
+            # Share the new embeddings with other containers
+            paper_cache.sync(pmc_id)
 
         # Format the response using Strands ToolResult format
         answer_text = answer.session.answer
@@ -420,10 +433,10 @@ def gather_evidence(pmc_id: str, question: str) -> dict:
 
         logger.info(f"Successfully answered question for {pmc_id}")
         logger.debug(f"Answer: {answer_text[:200]}...")
-        # Save evidence record to DynamoDB
-        if not evidence_id:
+        # Save evidence record to DynamoDB; batch callers save all their records at once
+        if save_to_db and not evidence_id:
             logger.warning("No toolUseId found in tool_context, skipping DynamoDB save")
-        else:
+        elif save_to_db:
             try:
                 db_response = _save_to_db(
                     evidence_id,
@@ -485,6 +498,178 @@ def gather_evidence(pmc_id: str, question: str) -> dict:
         }
 
 
+def _save_batch_to_db(records: List[dict]) -> None:
+    """Save gathered evidence records to the DynamoDB table in batches
+
+    Args:
+        records: Evidence records with the same fields as written by _save_to_db
+
+    Raises:
+        ValueError: If table doesn't exist
+        ClientError: If DynamoDB operation fails
+    """
+    logger.info(f"Saving {len(records)} records to {EVIDENCE_TABLE_NAME}")
+
+    try:
+        table = dynamodb.Table(EVIDENCE_TABLE_NAME)
+        # The batch writer sends up to 25 items per request and resends unprocessed items
+        with table.batch_writer() as batch:
+            for record in records:
+                batch.put_item(Item=record)
+        logger.info(f"Successfully saved {len(records)} records")
+
+    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+        error_msg = f"DynamoDB table '{EVIDENCE_TABLE_NAME}' does not exist"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    except ClientError as e:
+        error_code = e.response.get("Error", {}).get("Code", "Unknown")
+        error_message = e.response.get("Error", {}).get("Message", str(e))
+        logger.error(f"DynamoDB error ({error_code}): {error_message}")
+        raise
+
+
+def _save_records(records: List[dict]) -> Dict[str, str]:
+    """
+    Save evidence records, one at a time if the batch save fails.
+
+    Returns:
+        Error message of each evidence ID that could not be saved
+    """
+    try:
+        _save_batch_to_db(records)
+        return {}
+    except Exception as db_error:
+        logger.error(
+            f"Failed to save batch to DynamoDB, saving records one at a time: {str(db_error)}"
+        )
+
+    errors = {}
+    for record in records:
+        try:
+            _save_to_db(
+                record["evidence_id"],
+                record["question"],
+                record["answer"],
+                record["source"],
+                record["context"],
+            )
+        except Exception as db_error:
+            logger.error(f"Failed to save to DynamoDB: {str(db_error)}")
+            errors[record["evidence_id"]] = str(db_error)
+    return errors
+
+
+def _prefetch_article(pmc_id: str) -> None:
+    """Download an article into the paper cache; errors are reported when it is answered."""
+    if not _validate_pmc_id(pmc_id):
+        return
+    try:
+        _download_from_s3(PMC_OA_BUCKET, f"oa_comm/txt/all/{pmc_id}.txt", pmc_id)
+    except PMCS3Error as e:
+        if "not found" not in str(e).lower() or COMMERCIAL_USE_ONLY:
+            return
+        try:
+            _download_from_s3(
+                PMC_OA_BUCKET, f"oa_noncomm/txt/all/{pmc_id}.txt", pmc_id
+            )
+        except PMCS3Error:
+            return
+
+
+def gather_evidence_batch(pmc_ids: List[str], question: str) -> dict:
+    """
+    Answer one question about several PMC articles in parallel.
+
+    Articles are downloaded concurrently, and each is answered by paper-qa as soon
+    as it is available, with separate bounded worker pools for downloads and for
+    paper-qa. The evidence records are saved to DynamoDB in one batch.
+
+    Args:
+        pmc_ids: PMC identifiers (e.g., ["PMC6033041", "PMC9438179"])
+        question: The question to answer about each paper
+
+    Returns:
+        dict: ToolResult with status and content containing the answers, in the
+        order of pmc_ids, and their evidence IDs
+    """
+    unique_ids = list(dict.fromkeys(pmc_ids))
+    if len(unique_ids) > EVIDENCE_BATCH_MAX_PAPERS:
+        logger.warning(
+            f"Gathering evidence from the first {EVIDENCE_BATCH_MAX_PAPERS} of {len(unique_ids)} papers"
+        )
+        unique_ids = unique_ids[:EVIDENCE_BATCH_MAX_PAPERS]
+    logger.info(
+        f"Starting gather_evidence_batch for {len(unique_ids)} papers, question: {question}"
+    )
+
+    _configure_paperqa_logging()
+
+    answers = {}
+    with ThreadPoolExecutor(
+        max_workers=EVIDENCE_DOWNLOAD_WORKERS
+    ) as download_pool, ThreadPoolExecutor(
+        max_workers=EVIDENCE_PAPERQA_WORKERS
+    ) as paperqa_pool:
+        downloads = {
+            download_pool.submit(_prefetch_article, pmc_id): pmc_id
+            for pmc_id in unique_ids
+        }
+        for download in as_completed(downloads):
+            pmc_id = downloads[download]
+            answers[pmc_id] = paperqa_pool.submit(
+                gather_evidence, pmc_id, question, save_to_db=False
+            )
+        results = {pmc_id: answer.result() for pmc_id, answer in answers.items()}
+
+    records = {}
+    for pmc_id in unique_ids:
+        result = results[pmc_id]
+        if result["status"] == "success":
+            details = result["content"][1]["json"]
+            records[pmc_id] = {
+                "evidence_id": details["evidence_id"],
+                "question": details["question"],
+                "answer": result["content"][0]["text"],
+                "source": pmc_id,
+                "context": [context.get("summary") for context in details["context"]],
+            }
+    save_errors = _save_records(list(records.values())) if records else {}
+
+    lines = []
+    summaries = []
+    saved = 0
+    for pmc_id in unique_ids:
+        result = results[pmc_id]
+        status = result["status"]
+        text = result["content"][0]["text"]
+        details = result["content"][1]["json"]
+        if pmc_id in records and records[pmc_id]["evidence_id"] in save_errors:
+            # Evidence IDs are only reported for records that can be read back
+            status = "error"
+            error = save_errors[records[pmc_id]["evidence_id"]]
+            details = {key: value for key, value in details.items() if key != "evidence_id"}
+            details["error"] = f"Evidence could not be saved: {error}"
+            lines.append(f"{pmc_id} (evidence not saved: {error}): {text}")
+        elif status == "success":
+            saved += 1
+            lines.append(f"{pmc_id} (evidence_id: {details['evidence_id']}): {text}")
+        else:
+            lines.append(f"{pmc_id} (error): {text}")
+        summaries.append({"status": status, "answer": text, **details})
+
+    logger.info(
+        f"Gathered and saved evidence from {saved} of {len(unique_ids)} papers"
+    )
+    return {
+        "status": "success" if saved else "error",
+        "content": [
+            {"text": "\n\n".join(lines)},
+            {"json": {"question": question, "results": summaries}},
+        ],
+    }
+
+
 @tool
 def gather_evidence_tool(pmc_id: str, question: str) -> dict:
     """
@@ -503,6 +688,24 @@ def gather_evidence_tool(pmc_id: str, question: str) -> dict:
     return gather_evidence(pmc_id=pmc_id, question=question)
 
 
+@tool
+def gather_evidence_batch_tool(pmc_ids: List[str], question: str) -> dict:
+    """
+    Answer the same question about several PMC articles at once using paper-qa.
+
+    The papers are downloaded and analyzed in parallel, so this is much faster than
+    calling gather_evidence_tool once per paper.
+
+    Args:
+        pmc_ids: PMC identifiers (e.g., ["PMC6033041", "PMC9438179"])
+        question: The question to answer about each paper
+
+    Returns:
+        dict: ToolResult with status and content containing one answer and evidence_id per paper
+    """
+    return gather_evidence_batch(pmc_ids=pmc_ids, question=question)
+
+
 if __name__ == "__main__":
     # Example usage for testing
     result = gather_evidence(
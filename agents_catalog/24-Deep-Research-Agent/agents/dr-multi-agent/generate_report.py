@@ -1,6 +1,9 @@
+import asyncio
 import json
 import logging
 import os
+import time
+from typing import Iterator, List
 
 import boto3
 import botocore
@@ -9,6 +12,20 @@ from strands import tool
 # Dynamo DB Configuration
 EVIDENCE_TABLE_NAME = os.getenv("EVIDENCE_TABLE_NAME", "deep-research-evidence")
 
+# BatchGetItem reads at most 100 keys per request
+EVIDENCE_BATCH_GET_SIZE = 100
+EVIDENCE_BATCH_GET_MAX_ATTEMPTS = 5
+
+# Report configuration: model, output limit and whether generate_report_tool streams
+# the report as it is written
+REPORT_MODEL_ID = os.getenv(
+    "REPORT_MODEL_ID", "us.anthropic.claude-sonnet-4-20250514-v1:0"
+)
+REPORT_MAX_TOKENS = int(os.getenv("REPORT_MAX_TOKENS", 10000))
+REPORT_STREAMING = os.getenv("REPORT_STREAMING", "true").lower() == "true"
+
+PUNCTUATION = (".", ",", "?", "!")
+
 # Configure logging
 logging.basicConfig(
     format="%(levelname)s | %(name)s | %(message)s",
@@ -114,15 +131,39 @@ Review the report to ensure it meets quality standards.
 """
 
 
-def _get_evidence_record(evidence_id: str) -> dict:
-    """Get an evidence record from DynamobDB table by evidence_id value"""
-
-    # Check if table exists
-    table = dynamodb.Table(EVIDENCE_TABLE_NAME)
-
-    response = table.get_item(Key={"evidence_id": evidence_id})
-
-    return response.get("Item")
+def _get_evidence_records(evidence_ids: List[str]) -> List[dict]:
+    """Get evidence records from the DynamoDB table with BatchGetItem, in the order of evidence_ids"""
+
+    unique_ids = list(dict.fromkeys(evidence_ids))
+    records = {}
+    for i in range(0, len(unique_ids), EVIDENCE_BATCH_GET_SIZE):
+        request = {
+            EVIDENCE_TABLE_NAME: {
+                "Keys": [
+                    {"evidence_id": evidence_id}
+                    for evidence_id in unique_ids[i : i + EVIDENCE_BATCH_GET_SIZE]
+                ]
+            }
+        }
+        for attempt in range(EVIDENCE_BATCH_GET_MAX_ATTEMPTS):
+            if attempt:
+                # Unprocessed keys are returned when the request is throttled
+                time.sleep(0.1 * 2**attempt)
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get("Responses", {}).get(EVIDENCE_TABLE_NAME, []):
+                records[item["evidence_id"]] = item
+            request = response.get("UnprocessedKeys")
+            if not request:
+                break
+        else:
+            logger.warning(
+                f"{len(request[EVIDENCE_TABLE_NAME]['Keys'])} evidence records were not retrieved after {EVIDENCE_BATCH_GET_MAX_ATTEMPTS} attempts"
+            )
+
+    missing = [evidence_id for evidence_id in unique_ids if evidence_id not in records]
+    if missing:
+        logger.warning(f"Evidence records not found: {', '.join(missing)}")
+    return [records[evidence_id] for evidence_id in unique_ids if evidence_id in records]
 
 
 def parse_db_records(records):
@@ -150,49 +191,87 @@ def parse_db_records(records):
     return contents
 
 
-def format_inline_citations(response_content: dict) -> None:
+class InlineCitationFormatter:
+    """
+    Incrementally format text and citations from the Anthropic Claude citations API.
+
+    Citations are added after the text they support, before its final punctuation
+    (e.g. "Recent studies show progress (PMC6033041)."). A trailing punctuation mark
+    is held back until it is known whether citations follow, so every other character
+    can be emitted as soon as it arrives. Each add method returns the text that is
+    ready to emit, and the full output is joined once at the end.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._pending = ""
+
+    def add_text(self, text: str) -> str:
+        if not text:
+            return ""
+        text = self._pending + text
+        if text[-1] in PUNCTUATION:
+            text, self._pending = text[:-1], text[-1]
+        else:
+            self._pending = ""
+        self._parts.append(text)
+        return text
+
+    def add_citations(self, citations: List[dict]) -> str:
+        text = "".join(f" ({citation.get('document_title')})" for citation in citations)
+        self._parts.append(text)
+        return text
+
+    def finish(self) -> str:
+        text, self._pending = self._pending, ""
+        self._parts.append(text)
+        return text
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts) + self._pending
+
+
+def format_inline_citations(response_content: dict) -> str:
     """Format response from Anthropic Claude citations API into inline citations"""
-    output = ""
+    formatter = InlineCitationFormatter()
     for content_item in response_content.get("content"):
-        output += content_item.get("text")
-        for citation in content_item.get("citations", []):
-            title = citation.get("document_title")
-            # If last character is punctuation, remove it
-            if output[-1] in [".", ",", "?", "!"]:
-                punctuation = output[-1]
-                output = output[:-1] + f" ({title}){punctuation}"
-            else:
-                output += f" ({title})"
+        formatter.add_text(content_item.get("text"))
+        formatter.add_citations(content_item.get("citations") or [])
+    formatter.finish()
+    return formatter.text
 
-    return output
 
-
-def generate_report(prompt: str, evidence_ids: list = []) -> str:
-    """Generate a formatted, well-written scientific report with inline citations to evidence records"""
+def _build_request_body(prompt: str, evidence_ids: list) -> dict:
+    """Build the citations API request from the prompt and evidence records"""
 
     content = []
 
     if evidence_ids:
-        logger.info("Getting evidence records")
-        evidence = []
-        for evidence_id in evidence_ids:
-            evidence.append(_get_evidence_record(evidence_id))
+        logger.info(f"Getting {len(evidence_ids)} evidence records")
+        evidence = _get_evidence_records(evidence_ids)
         logger.info("Parsing evidence records")
         content = parse_db_records(evidence)
 
     prompt_message = [{"type": "text", "text": prompt}]
     content.extend(prompt_message)
 
-    request_body = {
+    return {
         "anthropic_version": "bedrock-2023-05-31",
         "messages": [{"role": "user", "content": content}],
-        "max_tokens": 10000,
+        "max_tokens": REPORT_MAX_TOKENS,
         "system": SYSTEM_PROMPT,
     }
 
+
+def generate_report(prompt: str, evidence_ids: list = []) -> str:
+    """Generate a formatted, well-written scientific report with inline citations to evidence records"""
+
+    request_body = _build_request_body(prompt, evidence_ids)
+
     logger.info("Invoking Anthropic Claude citations API")
     response = bedrock_client.invoke_model(
-        modelId="us.anthropic.claude-sonnet-4-20250514-v1:0",
+        modelId=REPORT_MODEL_ID,
         contentType="application/json",
         accept="application/json",
         body=json.dumps(request_body),
@@ -204,8 +283,51 @@ def generate_report(prompt: str, evidence_ids: list = []) -> str:
     return formatted_result
 
 
+def stream_report(prompt: str, evidence_ids: list = []) -> Iterator[str]:
+    """Generate the same report as generate_report, yielding text with inline citations as it is written"""
+
+    request_body = _build_request_body(prompt, evidence_ids)
+
+    logger.info("Invoking Anthropic Claude citations API with response stream")
+    response = bedrock_client.invoke_model_with_response_stream(
+        modelId=REPORT_MODEL_ID,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(request_body),
+    )
+
+    formatter = InlineCitationFormatter()
+    citations = []
+    for event in response["body"]:
+        if "chunk" not in event:
+            raise RuntimeError(f"Report stream failed: {event}")
+        chunk = json.loads(event["chunk"]["bytes"])
+
+        # Citations of a text block are added once the whole block has arrived
+        if chunk["type"] == "content_block_start":
+            block = chunk["content_block"]
+            citations = list(block.get("citations") or [])
+            text = formatter.add_text(block.get("text"))
+        elif chunk["type"] == "content_block_delta":
+            delta = chunk["delta"]
+            if delta["type"] == "citations_delta":
+                citations.append(delta["citation"])
+            text = formatter.add_text(delta.get("text"))
+        elif chunk["type"] == "content_block_stop":
+            text = formatter.add_citations(citations)
+            citations = []
+        else:
+            continue
+        if text:
+            yield text
+
+    text = formatter.finish()
+    if text:
+        yield text
+
+
 @tool
-def generate_report_tool(prompt: str, evidence_ids: list = []) -> str:
+async def generate_report_tool(prompt: str, evidence_ids: list = []):
     """
     Generate a scientific report with inline citations from evidence.
 
@@ -220,7 +342,19 @@ def generate_report_tool(prompt: str, evidence_ids: list = []) -> str:
     Returns:
         A formatted scientific report with inline citations
     """
-    return generate_report(prompt=prompt, evidence_ids=evidence_ids)
+    if not REPORT_STREAMING:
+        yield await asyncio.to_thread(
+            generate_report, prompt=prompt, evidence_ids=evidence_ids
+        )
+        return
+
+    # Report text is streamed to the caller as {"report_chunk": ...} events
+    chunks = stream_report(prompt=prompt, evidence_ids=evidence_ids)
+    report = []
+    while (text := await asyncio.to_thread(next, chunks, None)) is not None:
+        report.append(text)
+        yield {"report_chunk": text}
+    yield "".join(report)
 
 
 if __name__ == "__main__":
@@ -79,6 +79,12 @@ async def strands_agent_bedrock(payload):
                         yield f"**{k}**: {v}\n"
                     yield "\n"
 
+            # Print report text as generate_report_tool writes it
+            if tool_stream := event.get("tool_stream_event"):
+                data = tool_stream.get("data")
+                if isinstance(data, dict) and "report_chunk" in data:
+                    yield data["report_chunk"]
+
             # Print event data
             if "data" in event:
                 yield event["data"]
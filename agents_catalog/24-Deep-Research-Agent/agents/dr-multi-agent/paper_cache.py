@@ -0,0 +1,328 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+import io
+import json
+import logging
+import os
+import shutil
+import tarfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import boto3
+from botocore import UNSIGNED
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Paper cache configuration: local directory holding one folder per article with its
+# text, paper-qa index and manifest, disk budget, how long a local copy is used
+# before its ETag is revalidated, and an optional s3://bucket/prefix shared by containers
+PAPER_CACHE_DIR = os.getenv("PAPER_CACHE_DIR", "my_papers")
+PAPER_CACHE_MAX_MB = int(os.getenv("PAPER_CACHE_MAX_MB", 2048))
+PAPER_CACHE_REVALIDATE_SECONDS = int(
+    os.getenv("PAPER_CACHE_REVALIDATE_SECONDS", 7 * 24 * 3600)
+)
+PAPER_CACHE_S3_URI = os.getenv("PAPER_CACHE_S3_URI", "")
+
+S3_MAX_POOL_CONNECTIONS = 32
+
+logger = logging.getLogger("paper_cache")
+logger.setLevel(logging.INFO)
+
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+
+
+def get_s3_client(anonymous: bool = True):
+    """
+    Return a shared S3 client; clients are thread safe and keep a connection pool.
+
+    Args:
+        anonymous: Unsigned client for public buckets such as pmc-oa-opendata,
+            otherwise a client using the default credentials
+    """
+    with _s3_clients_lock:
+        if anonymous not in _s3_clients:
+            config = Config(
+                max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                retries={"max_attempts": 5, "mode": "adaptive"},
+            )
+            if anonymous:
+                _s3_clients[anonymous] = boto3.client(
+                    "s3",
+                    region_name="us-east-1",
+                    config=config.merge(Config(signature_version=UNSIGNED)),
+                )
+            else:
+                _s3_clients[anonymous] = boto3.client("s3", config=config)
+        return _s3_clients[anonymous]
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+def _directory_fingerprint(path: str) -> Tuple:
+    """Cheap change detector: relative path, size and mtime of every file."""
+    entries = []
+    for directory, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(directory, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((os.path.relpath(file_path, path), stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(entries))
+
+
+class PaperCache:
+    """
+    Local cache of PMC article text and paper-qa indexes, one folder per PMCID.
+
+    Each folder holds the article text (txt/), the paper-qa index built from it
+    (index/) and a manifest with the S3 object and ETag it was downloaded from.
+    Local copies are used without contacting S3 until they are older than the
+    revalidation interval, after which a conditional GET on the ETag either
+    confirms them or downloads the new text and drops the stale index. Folders
+    are evicted least recently used first once the cache exceeds its size, and
+    can be synced to S3 so other containers start with a built index.
+
+    Args:
+        root: Cache directory
+        max_bytes: Disk budget; 0 disables eviction
+        revalidate_seconds: Age after which local copies are revalidated against S3
+        sync_uri: Optional s3://bucket/prefix to share folders across containers
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 0,
+        revalidate_seconds: int = 0,
+        sync_uri: str = "",
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self.sync_bucket, self.sync_prefix = None, ""
+        if sync_uri:
+            if not sync_uri.startswith("s3://"):
+                raise ValueError(f"Paper cache sync URI must start with s3://: {sync_uri}")
+            self.sync_bucket, _, self.sync_prefix = sync_uri[5:].partition("/")
+            self.sync_prefix = self.sync_prefix.strip("/")
+        self._locks: Dict[str, threading.RLock] = {}
+        self._in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.downloads = 0
+        self.restores = 0
+
+    def paper_folder(self, pmcid: str) -> str:
+        return os.path.join(self.root, pmcid)
+
+    def text_folder(self, pmcid: str) -> str:
+        return os.path.join(self.root, pmcid, "txt")
+
+    def index_folder(self, pmcid: str) -> str:
+        return os.path.join(self.root, pmcid, "index")
+
+    def _manifest_path(self, pmcid: str) -> str:
+        return os.path.join(self.root, pmcid, "manifest.json")
+
+    def _read_manifest(self, pmcid: str) -> Optional[dict]:
+        try:
+            with open(self._manifest_path(pmcid)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, pmcid: str, manifest: dict) -> None:
+        manifest["last_used"] = time.time()
+        tmp_path = f"{self._manifest_path(pmcid)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path(pmcid))
+
+    @contextmanager
+    def use(self, pmcid: str):
+        """Hold a paper for the duration of the block: serializes work on it and protects it from eviction."""
+        with self._lock:
+            lock = self._locks.setdefault(pmcid, threading.RLock())
+            self._in_use[pmcid] = self._in_use.get(pmcid, 0) + 1
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                self._in_use[pmcid] -= 1
+                if not self._in_use[pmcid]:
+                    del self._in_use[pmcid]
+
+    def fetch(self, pmcid: str, bucket: str, key: str, s3_client=None) -> str:
+        """
+        Return the local path of s3://bucket/key, downloading it only if it changed.
+
+        A local copy (restored from the sync location if needed) is used as is until
+        it is older than the revalidation interval.
+
+        Raises:
+            botocore.exceptions.ClientError: If the object cannot be read
+        """
+        local_path = os.path.join(self.text_folder(pmcid), os.path.basename(key))
+        with self.use(pmcid):
+            manifest = self._read_manifest(pmcid)
+            if manifest is None and self._restore(pmcid):
+                manifest = self._read_manifest(pmcid)
+            etag = None
+            if (
+                manifest
+                and manifest.get("bucket") == bucket
+                and manifest.get("key") == key
+                and os.path.exists(manifest["path"])
+            ):
+                if time.time() - manifest.get("validated_at", 0) < self.revalidate_seconds:
+                    self.hits += 1
+                    self._write_manifest(pmcid, manifest)
+                    return manifest["path"]
+                etag = manifest.get("etag")
+
+            s3_client = s3_client or get_s3_client()
+            request = {"Bucket": bucket, "Key": key}
+            if etag:
+                request["IfNoneMatch"] = etag
+            try:
+                response = s3_client.get_object(**request)
+            except ClientError as e:
+                if etag and e.response.get("Error", {}).get("Code") in ("304", "NotModified"):
+                    logger.info(f"Local copy of s3://{bucket}/{key} is up to date")
+                    self.revalidations += 1
+                    manifest["validated_at"] = time.time()
+                    self._write_manifest(pmcid, manifest)
+                    return manifest["path"]
+                raise
+
+            os.makedirs(self.text_folder(pmcid), exist_ok=True)
+            tmp_path = f"{local_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(response["Body"], f)
+            os.replace(tmp_path, local_path)
+            self.downloads += 1
+
+            if manifest and (manifest.get("key"), manifest.get("etag")) != (key, response.get("ETag")):
+                # The text changed, so the paper-qa index built from it is stale
+                shutil.rmtree(self.index_folder(pmcid), ignore_errors=True)
+                if manifest.get("path") != local_path and os.path.exists(manifest["path"]):
+                    os.remove(manifest["path"])
+
+            self._write_manifest(
+                pmcid,
+                {
+                    "bucket": bucket,
+                    "key": key,
+                    "etag": response.get("ETag"),
+                    "path": local_path,
+                    "validated_at": time.time(),
+                },
+            )
+        self.evict()
+        return local_path
+
+    def evict(self) -> int:
+        """Remove least recently used papers not in use until the cache fits max_bytes; returns the number removed."""
+        if not self.max_bytes or not os.path.isdir(self.root):
+            return 0
+        papers = []
+        total = 0
+        for pmcid in os.listdir(self.root):
+            folder = self.paper_folder(pmcid)
+            if not os.path.isdir(folder):
+                continue
+            size = _directory_size(folder)
+            total += size
+            manifest = self._read_manifest(pmcid) or {}
+            papers.append((manifest.get("last_used", 0), pmcid, size))
+
+        removed = 0
+        for _, pmcid, size in sorted(papers):
+            if total <= self.max_bytes:
+                break
+            with self._lock:
+                if pmcid in self._in_use:
+                    continue
+                shutil.rmtree(self.paper_folder(pmcid), ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} papers from the paper cache")
+        return removed
+
+    def index_fingerprint(self, pmcid: str, index_name: str = "") -> Tuple:
+        """Fingerprint of a paper's index folder, or of one named index inside it."""
+        return _directory_fingerprint(os.path.join(self.index_folder(pmcid), index_name))
+
+    def _sync_key(self, pmcid: str) -> str:
+        return f"{self.sync_prefix}/{pmcid}.tar.gz" if self.sync_prefix else f"{pmcid}.tar.gz"
+
+    def sync(self, pmcid: str) -> bool:
+        """Upload a paper folder to the sync location so other containers can reuse its index."""
+        if not self.sync_bucket:
+            return False
+        with self.use(pmcid):
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+                archive.add(self.paper_folder(pmcid), arcname=pmcid)
+        buffer.seek(0)
+        try:
+            get_s3_client(anonymous=False).upload_fileobj(
+                buffer, self.sync_bucket, self._sync_key(pmcid)
+            )
+        except ClientError as e:
+            logger.warning(f"Could not sync {pmcid} to s3://{self.sync_bucket}: {e}")
+            return False
+        logger.info(f"Synced {pmcid} to s3://{self.sync_bucket}/{self._sync_key(pmcid)}")
+        return True
+
+    def _restore(self, pmcid: str) -> bool:
+        if not self.sync_bucket:
+            return False
+        try:
+            response = get_s3_client(anonymous=False).get_object(
+                Bucket=self.sync_bucket, Key=self._sync_key(pmcid)
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+                logger.warning(f"Could not restore {pmcid} from s3://{self.sync_bucket}: {e}")
+            return False
+        os.makedirs(self.root, exist_ok=True)
+        with tarfile.open(fileobj=io.BytesIO(response["Body"].read()), mode="r:gz") as archive:
+            archive.extractall(self.root, filter="data")
+        self.restores += 1
+        logger.info(f"Restored {pmcid} from s3://{self.sync_bucket}/{self._sync_key(pmcid)}")
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "downloads": self.downloads,
+            "restores": self.restores,
+        }
+
+
+paper_cache = PaperCache(
+    PAPER_CACHE_DIR,
+    max_bytes=PAPER_CACHE_MAX_MB * 1024 * 1024,
+    revalidate_seconds=PAPER_CACHE_REVALIDATE_SECONDS,
+    sync_uri=PAPER_CACHE_S3_URI,
+)
@@ -0,0 +1,260 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+# Article store configuration: SQLite file (empty disables the store), articles kept
+# in memory, and age after which an article is fetched again
+PMC_ARTICLE_STORE_PATH = os.getenv(
+    "PMC_ARTICLE_STORE_PATH", "/tmp/pmc-article-store.sqlite3"
+)
+PMC_ARTICLE_STORE_MAX_MEMORY_ENTRIES = int(
+    os.getenv("PMC_ARTICLE_STORE_MAX_MEMORY_ENTRIES", 5000)
+)
+PMC_ARTICLE_STORE_TTL_DAYS = float(os.getenv("PMC_ARTICLE_STORE_TTL_DAYS", 30))
+
+# SQLite limits the number of host parameters per statement
+SQLITE_BATCH_SIZE = 500
+
+logger = logging.getLogger("pmc_article_store")
+logger.setLevel(logging.INFO)
+
+# Type alias forbetter readibility
+ArticleDict = Dict[str, Any]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    pmcid TEXT PRIMARY KEY,
+    pmid TEXT,
+    metadata TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_pmid ON articles (pmid);
+CREATE TABLE IF NOT EXISTS citations (
+    pmcid TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    ref_pmid TEXT NOT NULL,
+    PRIMARY KEY (pmcid, position)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_pmcid(pmc_id: str) -> str:
+    """Numeric PMC ID as used by esearch, e.g. "PMC1234567" -> "1234567"."""
+    return str(pmc_id).strip().upper().replace("PMC", "")
+
+
+def _batches(items: List[str]) -> Iterable[List[str]]:
+    for i in range(0, len(items), SQLITE_BATCH_SIZE):
+        yield items[i : i + SQLITE_BATCH_SIZE]
+
+
+class PMCArticleStore:
+    """
+    Local store of PMC article metadata and citation edges, keyed on PMCID.
+
+    Articles are stored in SQLite as one metadata row (with the PMID, indexed for
+    PMID to PMCID lookups) plus one row per reference PMID, and the most recently
+    used articles are kept in an in-memory LRU. Articles older than the TTL are
+    treated as missing so they are fetched again.
+
+    Args:
+        path: SQLite database file, or ":memory:"
+        max_memory_entries: Maximum number of articles kept in memory
+        ttl_seconds: Age after which a stored article is refetched; None never expires
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_memory_entries: int = 5000,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return self.ttl_seconds is None or time.time() - fetched_at < self.ttl_seconds
+
+    def _remember(self, pmc_id: str, fetched_at: float, article: ArticleDict) -> None:
+        self._memory[pmc_id] = (fetched_at, article)
+        self._memory.move_to_end(pmc_id)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, pmc_ids: List[str]) -> Dict[str, ArticleDict]:
+        """
+        Return the stored, unexpired articles for pmc_ids, keyed on numeric PMCID.
+
+        Returned articles are copies and include their "references" list.
+        """
+        requested = list(dict.fromkeys(normalize_pmcid(i) for i in pmc_ids))
+        found = {}
+        with self._lock:
+            missing = []
+            for pmc_id in requested:
+                entry = self._memory.get(pmc_id)
+                if entry is not None and self._is_fresh(entry[0]):
+                    self._memory.move_to_end(pmc_id)
+                    found[pmc_id] = entry[1]
+                else:
+                    missing.append(pmc_id)
+
+            for batch in _batches(missing):
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT pmcid, metadata, fetched_at FROM articles WHERE pmcid IN ({placeholders})",  # nosec - placeholders only
+                    batch,
+                ).fetchall()
+                articles = {
+                    pmc_id: (fetched_at, json.loads(metadata))
+                    for pmc_id, metadata, fetched_at in rows
+                    if self._is_fresh(fetched_at)
+                }
+                if not articles:
+                    continue
+
+                references = {pmc_id: [] for pmc_id in articles}
+                placeholders = ",".join("?" * len(articles))
+                for pmc_id, ref_pmid in self._connection.execute(
+                    f"SELECT pmcid, ref_pmid FROM citations WHERE pmcid IN ({placeholders}) ORDER BY pmcid, position",  # nosec - placeholders only
+                    list(articles),
+                ):
+                    references[pmc_id].append(ref_pmid)
+
+                for pmc_id, (fetched_at, article) in articles.items():
+                    if references[pmc_id]:
+                        article["references"] = references[pmc_id]
+                    self._remember(pmc_id, fetched_at, article)
+                    found[pmc_id] = article
+
+            self.hits += len(found)
+            self.misses += len(requested) - len(found)
+
+        return {pmc_id: _copy_article(article) for pmc_id, article in found.items()}
+
+    def put_many(self, articles: List[ArticleDict]) -> int:
+        """Store articles that have a PMCID ("id"); returns the number stored."""
+        now = time.time()
+        by_id = {
+            normalize_pmcid(article["id"]): article
+            for article in articles
+            if article.get("id")
+        }
+        rows = []
+        edges = []
+        for pmc_id, article in by_id.items():
+            metadata = {k: v for k, v in article.items() if k != "references"}
+            rows.append((pmc_id, article.get("pmid"), json.dumps(metadata), now))
+            edges.extend(
+                (pmc_id, position, ref_pmid)
+                for position, ref_pmid in enumerate(article.get("references", []))
+            )
+
+        if not rows:
+            return 0
+
+        with self._lock:
+            try:
+                with self._connection:
+                    for batch in _batches(list(by_id)):
+                        self._connection.execute(
+                            f"DELETE FROM citations WHERE pmcid IN ({','.join('?' * len(batch))})",  # nosec - placeholders only
+                            batch,
+                        )
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO articles (pmcid, pmid, metadata, fetched_at) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+                    self._connection.executemany(
+                        "INSERT INTO citations (pmcid, position, ref_pmid) VALUES (?, ?, ?)",
+                        edges,
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist {len(rows)} articles: {e}")
+            for pmc_id, article in by_id.items():
+                self._remember(pmc_id, now, _copy_article(article))
+        return len(rows)
+
+    def pmc_ids_for_pmids(self, pmids: List[str]) -> Dict[str, str]:
+        """Map PMIDs to numeric PMCIDs for the articles in the store."""
+        mapping = {}
+        with self._lock:
+            for batch in _batches(list(dict.fromkeys(pmids))):
+                placeholders = ",".join("?" * len(batch))
+                for pmid, pmc_id in self._connection.execute(
+                    f"SELECT pmid, pmcid FROM articles WHERE pmid IN ({placeholders})",  # nosec - placeholders only
+                    batch,
+                ):
+                    mapping[pmid] = pmc_id
+        return mapping
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stored = self._connection.execute(
+                "SELECT COUNT(*) FROM articles"
+            ).fetchone()[0]
+            return {
+                "stored": stored,
+                "in_memory": len(self._memory),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def _copy_article(article: ArticleDict) -> ArticleDict:
+    copy = dict(article)
+    if "references" in copy:
+        copy["references"] = list(copy["references"])
+    return copy
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_article_store() -> Optional[PMCArticleStore]:
+    """Return the process-wide article store, or None if it is disabled or unavailable."""
+    global _store
+    if not PMC_ARTICLE_STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = PMCArticleStore(
+                    PMC_ARTICLE_STORE_PATH,
+                    max_memory_entries=PMC_ARTICLE_STORE_MAX_MEMORY_ENTRIES,
+                    ttl_seconds=(
+                        PMC_ARTICLE_STORE_TTL_DAYS * 86400
+                        if PMC_ARTICLE_STORE_TTL_DAYS > 0
+                        else None
+                    ),
+                )
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"PMC article store disabled: {e}")
+                return None
+        return _store
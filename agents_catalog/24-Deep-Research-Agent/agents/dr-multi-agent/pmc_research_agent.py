@@ -5,7 +5,7 @@ from bedrock_agentcore.runtime import BedrockAgentCoreApp
 from strands import Agent, tool
 from strands.models import BedrockModel
 
-from gather_evidence_ddb import gather_evidence_tool
+from gather_evidence_ddb import gather_evidence_batch_tool, gather_evidence_tool
 from search_pmc import search_pmc_tool
 
 # Configure logging
@@ -49,7 +49,8 @@ Identify the PMC IDs of the most relevant papers and gather evidence from each o
 
 **Constraints:**
 - You MUST identify the PMC IDs of the most relevant papers from your search results
-- You MUST submit each PMC ID and the original query to the gather_evidence_tool
+- You MUST submit the PMC IDs of all selected papers and the original query in a single call to the gather_evidence_batch_tool
+- You SHOULD use the gather_evidence_tool only for a follow-up question about a single paper
 - You MUST process multiple papers to ensure comprehensive coverage of the topic
 - You SHOULD prioritize papers with higher citation counts and more recent publication dates
 
@@ -74,7 +75,7 @@ model = BedrockModel(
 )
 pmc_research_agent = Agent(
     model=model,
-    tools=[search_pmc_tool, gather_evidence_tool],
+    tools=[search_pmc_tool, gather_evidence_batch_tool, gather_evidence_tool],
     system_prompt=SYSTEM_PROMPT,
 )
 
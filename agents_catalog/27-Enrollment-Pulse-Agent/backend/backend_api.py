@@ -2,10 +2,13 @@
 """
 FastAPI Backend for Enrollment Pulse Agent
 """
-from fastapi import FastAPI, HTTPException, Header, Depends
+from fastapi import FastAPI, HTTPException, Header, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
+from datetime import date
+import json
 import sys
 import os
 from pathlib import Path
@@ -15,8 +18,10 @@ import logging
 sys.path.append(str(Path(__file__).parent / 'src'))
 
 from src.agent.enrollment_agent import query_agent
-from src.data.processors import CTMSDataProcessor
-from src.analysis.enrollment_metrics import EnrollmentAnalyzer
+# Imported like src/agent/tools.py does, so the API and the agent share one store and analyzer
+from data.store import get_ctms_store
+from data.clinical_trials_mirror import get_clinical_trials_mirror
+from analysis.enrollment_metrics import EnrollmentAnalyzer, get_enrollment_analyzer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -47,29 +52,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global data cache
-_data_cache = {}
-_analyzer_cache = None
-
 def get_data():
-    """Get processed CTMS data, using cache if available"""
-    global _data_cache, _analyzer_cache
+    """Get processed CTMS data from the shared data store, and its analyzer"""
+    snapshot = get_ctms_store().snapshot()
+    return snapshot.data, get_enrollment_analyzer(snapshot)
+
+def analytics_response(request: Request, name: str,
+                       compute: Callable[[EnrollmentAnalyzer], Any]) -> Response:
+    """
+    Serve an analyzer result, computed and JSON-encoded once per data snapshot and day.
     
-    if not _data_cache:
-        logger.info("Loading CTMS data...")
-        processor = CTMSDataProcessor()
-        _data_cache = processor.process_all()
-        
-        # Create analyzer
-        _analyzer_cache = EnrollmentAnalyzer(
-            summaries=_data_cache['enrollment_summaries'],
-            subjects=_data_cache['subjects'],
-            sites=_data_cache['sites'],
-            metrics=_data_cache.get('enrollment_metrics', [])
-        )
-        logger.info("Data loaded successfully")
+    The ETag identifies the snapshot and day, so a client that sends it back in
+    If-None-Match gets a 304 Not Modified until the data is refreshed.
+    """
+    snapshot = get_ctms_store().snapshot()
+    today = date.today()
+    etag = f'"{snapshot.etag}-{today:%Y%m%d}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
     
-    return _data_cache, _analyzer_cache
+    if_none_match = request.headers.get("if-none-match", "")
+    if any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    
+    key = ("response", name, today)
+    body = snapshot.derived.get(key)
+    if body is None:
+        result = jsonable_encoder(compute(get_enrollment_analyzer(snapshot)))
+        # Encoded like FastAPI's default JSONResponse
+        body = snapshot.derived.setdefault(key, json.dumps(
+            result, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8"))
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # Pydantic models for API requests/responses
 class QueryRequest(BaseModel):
@@ -123,119 +136,165 @@ async def root():
     """Health check endpoint"""
     return {"message": "Enrollment Pulse API is running", "status": "healthy"}
 
-import uuid
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from fastapi.responses import StreamingResponse
+from src.agent.query_jobs import (
+    JobQueueFullError, QueryJobRunner, create_job_store
+)
 
-# Job storage (in production, use Redis/DynamoDB)
-job_results = {}
-executor = ThreadPoolExecutor(max_workers=3)
+# Seconds /query waits for an answer before handing the running job off to /query/{job_id}
+SYNC_QUERY_TIMEOUT = 120.0
+# Seconds between checks for new tokens, and between keep-alive comments, on SSE streams
+SSE_POLL_INTERVAL = 0.1
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+# Background agent queries (in-memory, or SQLite shared by workers with QUERY_JOB_STORE_PATH)
+job_runner = QueryJobRunner(query_agent, store=create_job_store())
 
 class AsyncQueryResponse(BaseModel):
     job_id: str
-    status: str  # "processing", "completed", "failed"
+    status: str  # "queued", "processing", "completed", "failed", "cancelled"
     answer: Optional[str] = None
     error: Optional[str] = None
 
-def process_query_sync(job_id: str, question: str):
-    """Process query synchronously in background"""
-    try:
-        logger.info(f"Processing query {job_id}: {question}")
-        response = query_agent(question)
-        job_results[job_id] = {
-            "status": "completed",
-            "answer": str(response),
-            "error": None
-        }
-    except Exception as e:
-        logger.warning(f"Error processing query {job_id}: {str(e)}")
-        job_results[job_id] = {
-            "status": "failed",
-            "answer": None,
-            "error": str(e)
-        }
+def queue_full_error(e: JobQueueFullError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
 
 @app.post("/query/async", response_model=AsyncQueryResponse)
 async def query_agent_async(request: QueryRequest):
-    """Start async query processing"""
-    job_id = str(uuid.uuid4())
-    job_results[job_id] = {"status": "processing", "answer": None, "error": None}
-    
-    # Start background processing
-    executor.submit(process_query_sync, job_id, request.question)
+    """Start async query processing, or join an identical query already in progress"""
+    try:
+        job = job_runner.submit(request.question)
+    except JobQueueFullError as e:
+        raise queue_full_error(e)
     
-    return AsyncQueryResponse(
-        job_id=job_id,
-        status="processing"
-    )
+    return AsyncQueryResponse(job_id=job.job_id, status=job.status)
 
 @app.get("/query/{job_id}", response_model=AsyncQueryResponse)
 async def get_query_result(job_id: str):
     """Get query result by job ID"""
-    if job_id not in job_results:
+    job = job_runner.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    result = job_results[job_id]
     return AsyncQueryResponse(
-        job_id=job_id,
-        status=result["status"],
-        answer=result["answer"],
-        error=result["error"]
+        job_id=job.job_id,
+        status=job.status,
+        answer=job.answer,
+        error=job.error
+    )
+
+@app.delete("/query/{job_id}", response_model=AsyncQueryResponse)
+async def cancel_query(job_id: str):
+    """Cancel a queued or running query"""
+    job = job_runner.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return AsyncQueryResponse(job_id=job.job_id, status=job.status, answer=job.answer, error=job.error)
+
+@app.get("/query/{job_id}/events")
+async def stream_query_events(job_id: str, request: Request):
+    """
+    Stream a query's answer as Server-Sent Events: one "token" event per text chunk
+    the agent generates, then a final event named after the job status with the
+    complete result. Reconnecting clients can send Last-Event-ID to resume.
+    """
+    if job_runner.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    last_event_id = request.headers.get("last-event-id", "")
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    
+    async def events():
+        nonlocal start
+        running = job_runner.running_job(job_id)
+        last_sent = asyncio.get_running_loop().time()
+        
+        while True:
+            if running:
+                # Check for completion first, so no chunk is appended after the last read
+                done = running.done
+                chunks = running.read(start)
+            else:
+                # Run by another worker or already finished: only the result is available
+                job = job_runner.get(job_id)
+                chunks, done = [], job is None or job.finished
+            
+            for chunk in chunks:
+                yield f"id: {start}\nevent: token\ndata: {json.dumps({'text': chunk})}\n\n"
+                start += 1
+            if chunks:
+                last_sent = asyncio.get_running_loop().time()
+            if done or await request.is_disconnected():
+                break
+            if asyncio.get_running_loop().time() - last_sent > SSE_KEEPALIVE_INTERVAL:
+                yield ": keep-alive\n\n"
+                last_sent = asyncio.get_running_loop().time()
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+        
+        job = job_runner.get(job_id)
+        if job is not None:
+            result = AsyncQueryResponse(job_id=job.job_id, status=job.status, answer=job.answer, error=job.error)
+            yield f"event: {job.status}\ndata: {json.dumps(jsonable_encoder(result))}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @app.post("/query", response_model=QueryResponse)
 async def query_agent_endpoint(request: QueryRequest):
     """Quick sync query with timeout handling"""
     try:
-        # Try with 120-second timeout (Lambda has 15-minute max)
-        response = await asyncio.wait_for(
-            asyncio.get_event_loop().run_in_executor(
-                executor, query_agent, request.question
-            ),
-            timeout=120.0
-        )
-        return QueryResponse(answer=str(response), success=True)
+        job = job_runner.submit(request.question)
+    except JobQueueFullError as e:
+        raise queue_full_error(e)
     
-    except asyncio.TimeoutError:
-        # Start async job for complex queries
-        job_id = str(uuid.uuid4())
-        job_results[job_id] = {"status": "processing", "answer": None, "error": None}
-        executor.submit(process_query_sync, job_id, request.question)
+    try:
+        # Wait up to 120 seconds (Lambda has 15-minute max); the job keeps running after that
+        result = await job_runner.wait(job.job_id, timeout=SYNC_QUERY_TIMEOUT)
         
-        return QueryResponse(
-            answer=f"Query is taking longer than expected. Check status at /query/{job_id}",
-            success=True
-        )
+        if result is None:
+            # Hand the running job off to the async endpoints
+            return QueryResponse(
+                answer=f"Query is taking longer than expected. Check status at /query/{job.job_id}",
+                success=True
+            )
+        if result.status == "completed":
+            return QueryResponse(answer=result.answer, success=True)
+        return QueryResponse(answer="", success=False, error=result.error or f"Query {result.status}")
     
     except Exception as e:
         logger.warning(f"Error processing query: {str(e)}")
         return QueryResponse(answer="", success=False, error=str(e))
 
 @app.get("/status/overall", response_model=OverallStatusResponse)
-async def get_overall_status():
+async def get_overall_status(request: Request):
     """
     Get overall enrollment status for the trial
     """
     try:
-        data, analyzer = get_data()
-        status = analyzer.get_overall_enrollment_status()
-        
-        return OverallStatusResponse(**status)
+        return analytics_response(
+            request, "status_overall",
+            lambda analyzer: OverallStatusResponse(**analyzer.get_overall_enrollment_status())
+        )
     
     except Exception as e:
         logger.warning(f"Error getting overall status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sites/performance", response_model=List[SitePerformance])
-async def get_site_performance():
+async def get_site_performance(request: Request):
     """
     Get site performance rankings
     """
     try:
-        data, analyzer = get_data()
-        rankings = analyzer.get_site_performance_ranking()
-        
-        return [SitePerformance(**site) for site in rankings]
+        return analytics_response(
+            request, "sites_performance",
+            lambda analyzer: [SitePerformance(**site) for site in analyzer.get_site_performance_ranking()]
+        )
     
     except Exception as e:
         logger.warning(f"Error getting site performance: {str(e)}")
@@ -257,60 +316,60 @@ async def get_underperforming_sites(threshold: float = 60.0):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/cra/performance", response_model=CRAPerformance)
-async def get_cra_performance():
+async def get_cra_performance(request: Request):
     """
     Get CRA performance analysis
     """
     try:
-        data, analyzer = get_data()
-        cra_analysis = analyzer.analyze_cra_performance()
-        
-        return CRAPerformance(**cra_analysis)
+        return analytics_response(
+            request, "cra_performance",
+            lambda analyzer: CRAPerformance(**analyzer.analyze_cra_performance())
+        )
     
     except Exception as e:
         logger.warning(f"Error getting CRA performance: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/analytics/trends")
-async def get_enrollment_trends():
+async def get_enrollment_trends(request: Request):
     """
     Get monthly enrollment trends by region
     """
     try:
-        data, analyzer = get_data()
-        trends = analyzer.get_monthly_enrollment_trends()
-        
-        return {"trends": trends}
+        return analytics_response(
+            request, "analytics_trends",
+            lambda analyzer: {"trends": analyzer.get_monthly_enrollment_trends()}
+        )
     
     except Exception as e:
         logger.warning(f"Error getting enrollment trends: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/analytics/screening-efficiency")
-async def get_screening_efficiency():
+async def get_screening_efficiency(request: Request):
     """
     Get screening efficiency metrics by site
     """
     try:
-        data, analyzer = get_data()
-        efficiency = analyzer.calculate_screening_efficiency()
-        
-        return {"screening_efficiency": efficiency}
+        return analytics_response(
+            request, "analytics_screening_efficiency",
+            lambda analyzer: {"screening_efficiency": analyzer.calculate_screening_efficiency()}
+        )
     
     except Exception as e:
         logger.warning(f"Error getting screening efficiency: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/analytics/projections")
-async def get_enrollment_projections():
+async def get_enrollment_projections(request: Request):
     """
     Get enrollment projections based on current trends
     """
     try:
-        data, analyzer = get_data()
-        projections = analyzer.project_enrollment_timeline()
-        
-        return {"projections": projections}
+        return analytics_response(
+            request, "analytics_projections",
+            lambda analyzer: {"projections": analyzer.project_enrollment_timeline()}
+        )
     
     except Exception as e:
         logger.warning(f"Error getting enrollment projections: {str(e)}")
@@ -401,27 +460,30 @@ async def get_underperforming_sites_detailed_endpoint(threshold: float = 60.0):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/data/refresh")
-async def refresh_data():
+async def refresh_data(force: bool = False):
     """
-    Refresh the cached CTMS data
+    Refresh the cached CTMS data, re-ingesting only the CSV files that changed
     """
     try:
-        global _data_cache, _analyzer_cache
-        _data_cache = {}
-        _analyzer_cache = None
-        
-        # Reload data
+        result = get_ctms_store().refresh(force=force)
         get_data()
         
-        return {"message": "Data refreshed successfully", "success": True}
+        return {
+            "message": "Data refreshed successfully" if result.changed else "Data is up to date",
+            "success": True,
+            "version": result.version,
+            "changed_tables": result.changed_tables,
+            "affected_sites": result.affected_sites
+        }
     
     except Exception as e:
         logger.warning(f"Error refreshing data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Live Clinical Trials API Endpoints
+# Plain functions, so FastAPI runs their blocking ClinicalTrials.gov requests in its threadpool
 @app.get("/clinical-trials/search")
-async def search_live_trials(
+def search_live_trials(
     condition: Optional[str] = None,
     intervention: Optional[str] = None,
     status: Optional[str] = None,
@@ -453,7 +515,7 @@ async def search_live_trials(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/clinical-trials/competitive-landscape/{condition}")
-async def get_competitive_landscape_endpoint(condition: str, max_studies: int = 500):
+def get_competitive_landscape_endpoint(condition: str, max_studies: int = 500):
     """
     Analyze competitive landscape for a medical condition
     """
@@ -469,7 +531,7 @@ async def get_competitive_landscape_endpoint(condition: str, max_studies: int =
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/clinical-trials/recruiting-by-location")
-async def find_recruiting_trials_endpoint(
+def find_recruiting_trials_endpoint(
     condition: str,
     country: Optional[str] = None,
     state: Optional[str] = None,
@@ -495,7 +557,7 @@ async def find_recruiting_trials_endpoint(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/clinical-trials/enrollment-trends/{condition}")
-async def track_enrollment_trends_endpoint(condition: str, months_back: int = 12):
+def track_enrollment_trends_endpoint(condition: str, months_back: int = 12):
     """
     Track enrollment trends over time for a condition
     """
@@ -510,8 +572,32 @@ async def track_enrollment_trends_endpoint(condition: str, months_back: int = 12
         logger.warning(f"Error tracking enrollment trends: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/clinical-trials/mirror/sync")
+def sync_clinical_trials_mirror(condition: str, full: bool = False):
+    """
+    Sync the local mirror of a condition's clinical trials, downloading only the
+    studies updated since the previous sync unless full is set
+    """
+    try:
+        result = get_clinical_trials_mirror().sync(condition, full=full)
+        
+        return {
+            "message": f"Synced {result.studies_synced} studies",
+            "success": True,
+            "condition": result.condition,
+            "full_sync": result.full,
+            "studies_synced": result.studies_synced,
+            "condition_studies": result.condition_studies,
+            "mirrored_studies": result.mirrored_studies,
+            "synced_at": result.synced_at.isoformat()
+        }
+    
+    except Exception as e:
+        logger.warning(f"Error syncing clinical trials mirror: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/clinical-trials/{nct_id}")
-async def get_live_trial_details_endpoint(nct_id: str):
+def get_live_trial_details_endpoint(nct_id: str):
     """
     Get detailed information for a specific clinical trial
     """
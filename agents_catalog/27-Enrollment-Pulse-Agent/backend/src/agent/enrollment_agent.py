@@ -3,6 +3,7 @@ Enrollment Pulse - Clinical Trial Enrollment Optimization Agent
 """
 import sys
 from pathlib import Path
+from typing import Callable, Optional
 
 # Add root directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
@@ -224,18 +225,23 @@ class EnrollmentAgent:
         return query_agent(message)
 
 
-def query_agent(message: str) -> str:
+def query_agent(message: str, callback_handler: Optional[Callable] = None) -> str:
     """
     Query the enrollment agent with a message
     
     Args:
         message: User query about enrollment status or optimization
+        callback_handler: Optional handler of the agent's streaming events for this
+            query (e.g. data=<text chunk>), instead of printing them
         
     Returns:
         Agent response with analysis and recommendations
     """
     try:
-        response = enrollment_agent(message)
+        if callback_handler:
+            response = enrollment_agent(message, callback_handler=callback_handler)
+        else:
+            response = enrollment_agent(message)
         
         # Extract text content from the Strands Agent response
         if hasattr(response, 'message') and isinstance(response.message, dict):
@@ -12,6 +12,7 @@ import pandas as pd
 sys.path.append(str(Path(__file__).parent.parent))
 
 from data.clinicaltrials_api_client import ClinicalTrialsAPIClient
+from data.clinical_trials_mirror import get_clinical_trials_mirror, records
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +55,54 @@ def search_live_clinical_trials(
     Use this tool to get the most current clinical trials information
     for competitive analysis and market research.
     """
+    search_criteria = {
+        'condition': condition,
+        'intervention': intervention,
+        'status': status,
+        'phase': phase,
+        'sponsor_type': sponsor_type,
+        'country': country
+    }
+    
     try:
+        mirror = get_clinical_trials_mirror() if condition else None
+        if mirror and not mirror.has_condition(condition):
+            # Answer with one API request while the condition's studies are mirrored
+            mirror.sync_in_background(condition)
+        elif mirror:
+            try:
+                query = mirror.query(
+                    condition,
+                    limit=max_results,
+                    intervention=intervention,
+                    status=status,
+                    phase=phase,
+                    sponsor_class=sponsor_type,
+                    country=country
+                )
+                
+                return {
+                    'total_found': query.total_found,
+                    'returned_count': len(query.studies),
+                    'studies': [
+                        {
+                            'nct_id': study['nct_id'],
+                            'title': study['title'],
+                            'status': study['status'],
+                            'phase': study['phase'],
+                            'enrollment': study['enrollment_count'],
+                            'start_date': study['start_date'],
+                            'sponsor': study['sponsor'],
+                            'conditions': study['conditions']
+                        }
+                        for study in records(query.studies)
+                    ],
+                    'search_criteria': search_criteria,
+                    'data_freshness': query.freshness()
+                }
+            except Exception as e:
+                logger.warning(f"Error searching clinical trials mirror, searching the API instead: {e}")
+        
         client = get_api_client()
         
         # Convert single values to lists for API
@@ -99,14 +147,7 @@ def search_live_clinical_trials(
             'total_found': response.get('totalCount', 0),
             'returned_count': len(results),
             'studies': results,
-            'search_criteria': {
-                'condition': condition,
-                'intervention': intervention,
-                'status': status,
-                'phase': phase,
-                'sponsor_type': sponsor_type,
-                'country': country
-            }
+            'search_criteria': search_criteria
         }
         
     except Exception as e:
@@ -243,7 +284,7 @@ def analyze_live_competitive_landscape(condition: str, max_studies: int = 500) -
     
     Args:
         condition: Medical condition to analyze (e.g., "breast cancer", "oncology")
-        max_studies: Maximum number of studies to analyze
+        max_studies: Maximum number of studies to analyze, most recently updated first
     
     Returns:
         Comprehensive competitive analysis including:
@@ -258,19 +299,15 @@ def analyze_live_competitive_landscape(condition: str, max_studies: int = 500) -
     and identify market opportunities or threats.
     """
     try:
-        client = get_api_client()
+        # Most recently updated studies of the condition, from the local mirror
+        # (or from the API while the condition is first mirrored in the background)
+        query = get_clinical_trials_mirror().query(condition, limit=max_studies, wait=False)
         
-        # Get comprehensive data
-        studies = client.search_all_pages(
-            condition=condition,
-            page_size=min(max_studies, 1000)
-        )
-        
-        if not studies:
+        if query.studies.empty:
             return {'error': 'No studies found for the specified condition'}
         
-        # Convert to DataFrame for analysis
-        df = client.get_enrollment_data(studies)
+        # Enrollment data, as client.get_enrollment_data returns it
+        df = query.studies
         
         # Analyze recruiting competition
         recruiting_df = df[df['status'] == 'RECRUITING']
@@ -333,7 +370,8 @@ def analyze_live_competitive_landscape(condition: str, max_studies: int = 500) -
                 'market_maturity': 'Mature' if len(df) > 100 else 'Developing' if len(df) > 50 else 'Emerging',
                 'innovation_activity': 'High' if len(recruiting_df) > 20 else 'Medium' if len(recruiting_df) > 10 else 'Low',
                 'entry_barriers': 'High' if recruiting_enrollment > 10000 else 'Medium' if recruiting_enrollment > 5000 else 'Low'
-            }
+            },
+            'data_freshness': query.freshness()
         }
         
     except Exception as e:
@@ -367,51 +405,44 @@ def find_recruiting_trials_by_location(
     geographic markets and identify expansion opportunities.
     """
     try:
-        client = get_api_client()
-        
-        # Search for recruiting trials
-        studies = client.search_all_pages(
-            condition=condition,
-            status=['RECRUITING'],
-            location_country=country,
-            page_size=1000
+        # Search for recruiting trials in the local mirror, or the API until it has the condition
+        query = get_clinical_trials_mirror().query(
+            condition,
+            status='RECRUITING',
+            country=country,
+            wait=False
         )
         
-        if not studies:
+        if query.studies.empty:
             return {'error': 'No recruiting studies found for the specified criteria'}
         
-        # Filter by state/city if specified
-        filtered_studies = []
-        for study in studies:
-            protocol_section = study.get('protocolSection', {})
-            contacts_locations_module = protocol_section.get('contactsLocationsModule', {})
-            locations = contacts_locations_module.get('locations', [])
-            
-            # Check if study has locations matching criteria
-            matching_locations = []
-            for location in locations:
-                location_match = True
-                
-                if state and location.get('state', '').lower() != state.lower():
-                    location_match = False
-                if city and location.get('city', '').lower() != city.lower():
-                    location_match = False
-                
-                if location_match:
-                    matching_locations.append(location)
-            
-            if matching_locations:
-                # Add study with matching locations
-                study_info = {
-                    'nct_id': protocol_section.get('identificationModule', {}).get('nctId'),
-                    'title': protocol_section.get('identificationModule', {}).get('briefTitle'),
-                    'sponsor': protocol_section.get('sponsorCollaboratorsModule', {}).get('leadSponsor', {}).get('name'),
-                    'phase': '|'.join(protocol_section.get('designModule', {}).get('phases', [])),
-                    'enrollment': protocol_section.get('designModule', {}).get('enrollmentInfo', {}).get('count', 0),
-                    'matching_locations': matching_locations,
-                    'total_locations': len(locations)
-                }
-                filtered_studies.append(study_info)
+        # Filter locations by country/state/city if specified
+        locations = query.locations()
+        for column, value in (('country', country), ('state', state), ('city', city)):
+            if value:
+                locations = locations[locations[column].str.lower() == value.lower()]
+        
+        matching_locations = {}
+        for location in records(locations):
+            nct_id = location.pop('nct_id')
+            matching_locations.setdefault(nct_id, []).append(
+                {key: value for key, value in location.items() if value is not None}
+            )
+        
+        # Studies with locations matching criteria
+        filtered_studies = [
+            {
+                'nct_id': study['nct_id'],
+                'title': study['title'],
+                'sponsor': study['sponsor'],
+                'phase': study['phase'],
+                'enrollment': study['enrollment_count'],
+                'matching_locations': matching_locations[study['nct_id']],
+                'total_locations': study['location_count']
+            }
+            for study in records(query.studies)
+            if study['nct_id'] in matching_locations
+        ]
         
         # Calculate competition metrics
         total_enrollment = sum(study['enrollment'] for study in filtered_studies)
@@ -433,7 +464,8 @@ def find_recruiting_trials_by_location(
                 'competition_level': 'High' if len(filtered_studies) > 10 else 'Medium' if len(filtered_studies) > 5 else 'Low',
                 'market_saturation': 'High' if total_enrollment > 5000 else 'Medium' if total_enrollment > 2000 else 'Low',
                 'opportunity_assessment': 'Limited' if len(filtered_studies) > 15 else 'Moderate' if len(filtered_studies) > 8 else 'Good'
-            }
+            },
+            'data_freshness': query.freshness()
         }
         
     except Exception as e:
@@ -460,22 +492,17 @@ def track_enrollment_trends(condition: str, months_back: int = 12) -> Dict:
     for competitive positioning and market entry decisions.
     """
     try:
-        client = get_api_client()
-        
-        # Get all studies for the condition
-        studies = client.search_all_pages(
-            condition=condition,
-            page_size=1000
-        )
+        # Get all studies for the condition from the local mirror, or the API until it has them
+        query = get_clinical_trials_mirror().query(condition, wait=False)
         
-        if not studies:
+        if query.studies.empty:
             return {'error': 'No studies found for trend analysis'}
         
-        # Convert to DataFrame for time series analysis
-        df = client.get_enrollment_data(studies)
+        # Enrollment data, as client.get_enrollment_data returns it
+        df = query.studies
         
-        # Convert dates and filter recent studies
-        df['start_date'] = pd.to_datetime(df['start_date'], errors='coerce')
+        # Convert dates (YYYY-MM or YYYY-MM-DD) and filter recent studies
+        df['start_date'] = pd.to_datetime(df['start_date'], format='mixed', errors='coerce')
         
         # Filter to recent studies
         cutoff_date = pd.Timestamp.now() - pd.DateOffset(months=months_back)
@@ -535,7 +562,8 @@ def track_enrollment_trends(condition: str, months_back: int = 12) -> Dict:
                 'activity_level': 'High' if total_new_trials > months_back * 2 else 'Medium' if total_new_trials > months_back else 'Low',
                 'growth_trend': 'Increasing' if len(trend_data) > 6 and trend_data[-3:][0]['new_trials'] < trend_data[-1]['new_trials'] else 'Stable',
                 'market_interest': 'High' if len(recent_sponsor_activity) > 20 else 'Medium' if len(recent_sponsor_activity) > 10 else 'Low'
-            }
+            },
+            'data_freshness': query.freshness()
         }
         
     except Exception as e:
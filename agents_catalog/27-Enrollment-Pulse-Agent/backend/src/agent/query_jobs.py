@@ -0,0 +1,436 @@
+"""
+Background jobs for agent queries
+
+QueryJobRunner runs agent queries on a bounded pool of worker threads:
+
+- Single-flight: a question identical (ignoring case and whitespace) to one that is
+  still queued or running joins that job instead of starting a second agent run.
+- Backpressure: at most workers + queue_size jobs are accepted at a time; beyond
+  that submit() raises JobQueueFullError.
+- Cancellation: queued jobs never start; running jobs stop at the next token the
+  agent streams.
+- Result TTL: finished jobs are evicted from the store after result_ttl seconds.
+- Streaming: the text the agent streams is kept per running job, so clients can
+  follow long answers as they are generated.
+
+Job state lives in a store: InMemoryJobStore for a single process, or
+SQLiteJobStore to share jobs between the workers of a deployment.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Runner configuration
+QUERY_JOB_WORKERS = int(os.getenv('QUERY_JOB_WORKERS', '3'))
+QUERY_JOB_QUEUE_SIZE = int(os.getenv('QUERY_JOB_QUEUE_SIZE', '16'))
+QUERY_JOB_RESULT_TTL = int(os.getenv('QUERY_JOB_RESULT_TTL', '3600'))
+# SQLite database shared by the workers of a deployment; in-memory store if unset
+QUERY_JOB_STORE_PATH = os.getenv('QUERY_JOB_STORE_PATH', '')
+
+# Unfinished jobs not updated for this long are treated as lost (e.g. their worker died)
+STALE_JOB_SECONDS = 900
+# Seconds between updates of a running job, so that a slow job doesn't look lost
+HEARTBEAT_INTERVAL = 60
+# Seconds between evictions of expired results, and between checks of a shared
+# store for cancellations made by other workers
+EVICTION_INTERVAL = 60
+CANCEL_CHECK_INTERVAL = 1.0
+# Seconds between store reads when waiting on a job run by another worker
+POLL_INTERVAL = 0.5
+
+QUEUED = 'queued'
+PROCESSING = 'processing'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (QUEUED, PROCESSING)
+
+
+class JobQueueFullError(Exception):
+    """Raised when the runner already holds as many jobs as it accepts"""
+
+
+class JobCancelledError(Exception):
+    """Raised inside a running job to stop the agent"""
+
+
+def question_key(question: str) -> str:
+    """Key shared by questions that only differ in case or whitespace"""
+    normalized = re.sub(r'\s+', ' ', question).strip().casefold()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class QueryJob:
+    """State of an agent query job"""
+    job_id: str
+    question: str
+    question_key: str
+    status: str = QUEUED
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def new(cls, question: str) -> 'QueryJob':
+        return cls(job_id=str(uuid.uuid4()), question=question, question_key=question_key(question))
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in ACTIVE_STATUSES
+
+
+class InMemoryJobStore:
+    """Job store for a single process"""
+
+    shared = False
+
+    def __init__(self):
+        self._jobs: Dict[str, QueryJob] = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> Optional[QueryJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return QueryJob(**asdict(job)) if job else None
+
+    def _find_active(self, key: str) -> Optional[QueryJob]:
+        stale_before = time.time() - STALE_JOB_SECONDS
+        for job in self._jobs.values():
+            if job.question_key == key and not job.finished and job.updated_at >= stale_before:
+                return QueryJob(**asdict(job))
+        return None
+
+    def find_active(self, key: str) -> Optional[QueryJob]:
+        """Queued or running job of a question key, if any"""
+        with self._lock:
+            return self._find_active(key)
+
+    def create_or_get_active(self, job: QueryJob) -> Tuple[QueryJob, bool]:
+        """Store job, unless an active job has the same question; returns (job, created)"""
+        with self._lock:
+            existing = self._find_active(job.question_key)
+            if existing:
+                return existing, False
+            self._jobs[job.job_id] = QueryJob(**asdict(job))
+            return job, True
+
+    def update(self, job_id: str, only_if_active: bool = False, **fields) -> Optional[QueryJob]:
+        """Update a job; with only_if_active, finished jobs are left as they are"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if not (only_if_active and job.finished):
+                for name, value in fields.items():
+                    setattr(job, name, value)
+                job.updated_at = time.time()
+            return QueryJob(**asdict(job))
+
+    def evict_expired(self, ttl: float) -> int:
+        """Remove jobs that finished more than ttl seconds ago"""
+        expired_before = time.time() - ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished and job.updated_at < expired_before
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore:
+    """Job store in a SQLite database, shared by the processes that open it"""
+
+    shared = True
+
+    COLUMNS = ('job_id', 'question', 'question_key', 'status', 'answer', 'error',
+               'created_at', 'updated_at')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_jobs ("
+                "job_id TEXT PRIMARY KEY, question TEXT NOT NULL, question_key TEXT NOT NULL, "
+                "status TEXT NOT NULL, answer TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS query_jobs_active ON query_jobs (question_key, status)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection of the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _row_to_job(self, row) -> Optional[QueryJob]:
+        return QueryJob(**dict(zip(self.COLUMNS, row))) if row else None
+
+    def get(self, job_id: str) -> Optional[QueryJob]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM query_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return self._row_to_job(row)
+
+    def find_active(self, key: str) -> Optional[QueryJob]:
+        """Queued or running job of a question key, if any"""
+        row = self._connect().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM query_jobs "
+            "WHERE question_key = ? AND status IN (?, ?) AND updated_at >= ? "
+            "ORDER BY created_at LIMIT 1",
+            (key, *ACTIVE_STATUSES, time.time() - STALE_JOB_SECONDS)
+        ).fetchone()
+        return self._row_to_job(row)
+
+    def create_or_get_active(self, job: QueryJob) -> Tuple[QueryJob, bool]:
+        """Store job, unless an active job has the same question; returns (job, created)"""
+        conn = self._connect()
+        # An immediate transaction makes the check and the insert atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = self.find_active(job.question_key)
+            if existing:
+                conn.execute("COMMIT")
+                return existing, False
+            values = asdict(job)
+            conn.execute(
+                f"INSERT INTO query_jobs ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                tuple(values[column] for column in self.COLUMNS)
+            )
+            conn.execute("COMMIT")
+            return job, True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def update(self, job_id: str, only_if_active: bool = False, **fields) -> Optional[QueryJob]:
+        """Update a job; with only_if_active, finished jobs are left as they are"""
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        condition = "job_id = ?"
+        params = [*fields.values(), job_id]
+        if only_if_active:
+            condition += " AND status IN (?, ?)"
+            params.extend(ACTIVE_STATUSES)
+        self._connect().execute(f"UPDATE query_jobs SET {assignments} WHERE {condition}", params)
+        return self.get(job_id)
+
+    def evict_expired(self, ttl: float) -> int:
+        """Remove jobs that finished more than ttl seconds ago"""
+        cursor = self._connect().execute(
+            "DELETE FROM query_jobs WHERE status NOT IN (?, ?) AND updated_at < ?",
+            (*ACTIVE_STATUSES, time.time() - ttl)
+        )
+        return cursor.rowcount
+
+
+def create_job_store(path: str = QUERY_JOB_STORE_PATH):
+    """SQLite job store at path, or an in-memory store if path is empty"""
+    return SQLiteJobStore(path) if path else InMemoryJobStore()
+
+
+class RunningJob:
+    """Future, cancellation flag and streamed text of a job run by this process"""
+
+    def __init__(self):
+        self.future: Optional[Future] = None
+        self.cancelled = threading.Event()
+        self.chunks: List[str] = []
+        self._lock = threading.Lock()
+
+    def append(self, text: str) -> None:
+        with self._lock:
+            self.chunks.append(text)
+
+    def read(self, start: int = 0) -> List[str]:
+        """Text chunks the agent streamed, from chunk start on"""
+        with self._lock:
+            return self.chunks[start:]
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+
+class QueryJobRunner:
+    """Runs agent queries as deduplicated, bounded, cancellable background jobs"""
+
+    def __init__(self, run_query: Callable[..., str], store=None,
+                 workers: int = QUERY_JOB_WORKERS, queue_size: int = QUERY_JOB_QUEUE_SIZE,
+                 result_ttl: float = QUERY_JOB_RESULT_TTL):
+        """
+        Args:
+            run_query: Called as run_query(question, callback_handler=handler) in a
+                worker thread; handler receives the agent's streaming events
+            store: Job store (default: InMemoryJobStore)
+            workers: Number of jobs run at the same time
+            queue_size: Number of jobs waiting for a worker beyond which submissions are rejected
+            result_ttl: Seconds finished jobs are kept
+        """
+        self.run_query = run_query
+        self.store = store or InMemoryJobStore()
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query-job')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._running: Dict[str, RunningJob] = {}
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        if now - self._last_eviction < EVICTION_INTERVAL:
+            return
+        self._last_eviction = now
+        evicted = self.store.evict_expired(self.result_ttl)
+        if evicted:
+            logger.info(f"Evicted {evicted} expired query jobs")
+
+    def submit(self, question: str) -> QueryJob:
+        """
+        Start a job for question, or join the active job of an identical question.
+
+        Raises:
+            JobQueueFullError: If the runner already holds as many jobs as it accepts
+        """
+        self._evict_expired()
+        with self._lock:
+            if not self._slots.acquire(blocking=False):
+                # A full queue still serves questions that are already in flight
+                existing = self.store.find_active(question_key(question))
+                if existing:
+                    return existing
+                raise JobQueueFullError("Too many queries in progress, retry later")
+
+            job, created = self.store.create_or_get_active(QueryJob.new(question))
+            if not created:
+                self._slots.release()
+                return job
+
+            running = RunningJob()
+            self._running[job.job_id] = running
+            running.future = self._executor.submit(self._run, job, running)
+
+        # Registered outside the lock: the callback runs right away, in this thread,
+        # if the job already finished, and _finish takes the lock
+        running.future.add_done_callback(lambda _: self._finish(job.job_id))
+        logger.info(f"Queued query job {job.job_id}: {question}")
+        return job
+
+    def _finish(self, job_id: str) -> None:
+        running = self._running.get(job_id)
+        if running and running.future.cancelled():
+            self.store.update(job_id, only_if_active=True, status=CANCELLED)
+        with self._lock:
+            self._running.pop(job_id, None)
+        self._slots.release()
+
+    def _run(self, job: QueryJob, running: RunningJob) -> QueryJob:
+        job_id = job.job_id
+        current = self.store.update(job_id, only_if_active=True, status=PROCESSING)
+        if current is None or current.status != PROCESSING:
+            # Cancelled (possibly by another worker) before it started
+            return current
+
+        last_cancel_check = last_heartbeat = time.monotonic()
+
+        def callback_handler(**kwargs):
+            nonlocal last_cancel_check, last_heartbeat
+            if time.monotonic() - last_heartbeat > HEARTBEAT_INTERVAL:
+                last_heartbeat = time.monotonic()
+                self.store.update(job_id, only_if_active=True)
+            if self.store.shared and time.monotonic() - last_cancel_check > CANCEL_CHECK_INTERVAL:
+                last_cancel_check = time.monotonic()
+                stored = self.store.get(job_id)
+                if stored is None or stored.status == CANCELLED:
+                    running.cancelled.set()
+            if running.cancelled.is_set():
+                raise JobCancelledError(job_id)
+            text = kwargs.get('data')
+            if isinstance(text, str) and text:
+                running.append(text)
+
+        try:
+            logger.info(f"Processing query {job_id}: {job.question}")
+            answer = self.run_query(job.question, callback_handler=callback_handler)
+            if running.cancelled.is_set():
+                raise JobCancelledError(job_id)
+            return self.store.update(job_id, only_if_active=True, status=COMPLETED,
+                                     answer=str(answer), error=None)
+        except JobCancelledError:
+            logger.info(f"Cancelled query job {job_id}")
+            return self.store.update(job_id, only_if_active=True, status=CANCELLED)
+        except Exception as e:
+            logger.warning(f"Error processing query {job_id}: {str(e)}")
+            return self.store.update(job_id, only_if_active=True, status=FAILED,
+                                     answer=None, error=str(e))
+
+    def get(self, job_id: str) -> Optional[QueryJob]:
+        """Current state of a job, or None if it doesn't exist or has expired"""
+        self._evict_expired()
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[QueryJob]:
+        """
+        Cancel a job. Queued jobs never start; running jobs stop at the next token
+        the agent streams. Finished jobs are left as they are.
+        """
+        job = self.store.update(job_id, only_if_active=True, status=CANCELLED)
+        running = self._running.get(job_id)
+        if running:
+            running.cancelled.set()
+            running.future.cancel()
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[QueryJob]:
+        """
+        Wait for a job to finish without cancelling it on timeout.
+
+        Returns:
+            The finished job, or None if it is still active after timeout seconds
+        """
+        running = self._running.get(job_id)
+        if running:
+            try:
+                # Shield the job's future so that timing out doesn't cancel it
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(running.future)), timeout)
+            except asyncio.TimeoutError:
+                return None
+            return self.store.get(job_id)
+
+        # Run by another worker: follow it in the store
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job.finished:
+                return job
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def running_job(self, job_id: str) -> Optional[RunningJob]:
+        """
+        The job if this process is running it, to follow the text the agent streams.
+        Jobs run by another worker, or already finished, have no running job.
+        """
+        return self._running.get(job_id)
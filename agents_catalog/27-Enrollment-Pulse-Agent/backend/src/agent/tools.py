@@ -9,20 +9,18 @@ from pathlib import Path
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from data.processors import CTMSDataProcessor
-from analysis.enrollment_metrics import EnrollmentAnalyzer
+from data.store import get_ctms_store
+from analysis.enrollment_metrics import EnrollmentAnalyzer, get_enrollment_analyzer
 
 
-# Global data cache to avoid reprocessing
-_data_cache = {}
+def _get_processed_data():
+    """Get processed CTMS data from the data store shared with the API"""
+    return get_ctms_store().get_data()
 
 
-def _get_processed_data():
-    """Get processed CTMS data, using cache if available"""
-    if not _data_cache:
-        processor = CTMSDataProcessor()
-        _data_cache.update(processor.process_all())
-    return _data_cache
+def _get_analyzer() -> EnrollmentAnalyzer:
+    """Get the analyzer of the current CTMS data, whose results are memoized per data version"""
+    return get_enrollment_analyzer(get_ctms_store().snapshot())
 
 
 @tool
@@ -38,12 +36,7 @@ def get_overall_enrollment_status() -> Dict:
     if not data.get('enrollment_summaries'):
         return {"error": "No enrollment data available"}
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.get_overall_enrollment_status()
 
@@ -61,12 +54,7 @@ def get_site_performance_ranking() -> List[Dict]:
     if not data.get('enrollment_summaries'):
         return []
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.get_site_performance_ranking()
 
@@ -87,12 +75,7 @@ def get_underperforming_sites_detailed(threshold: float = 60.0) -> Dict:
     if not data.get('enrollment_summaries'):
         return {"error": "No enrollment data available"}
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     # Get comprehensive analysis for all sites
     comprehensive_analysis = get_comprehensive_site_analysis()
@@ -127,12 +110,7 @@ def identify_underperforming_sites(threshold: float = 60.0) -> List[Dict]:
     if not data.get('enrollment_summaries'):
         return []
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.identify_underperforming_sites(threshold)
 
@@ -150,12 +128,7 @@ def analyze_cra_performance() -> Dict:
     if not data.get('enrollment_summaries'):
         return {"error": "No enrollment data available"}
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.analyze_cra_performance()
 
@@ -173,12 +146,7 @@ def get_monthly_enrollment_trends() -> Dict:
     if not data.get('enrollment_summaries'):
         return {"error": "No enrollment data available"}
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.get_monthly_enrollment_trends()
 
@@ -196,12 +164,7 @@ def calculate_screening_efficiency() -> List[Dict]:
     if not data.get('enrollment_summaries'):
         return []
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.calculate_screening_efficiency()
 
@@ -219,12 +182,7 @@ def project_enrollment_timeline() -> Dict:
     if not data.get('enrollment_summaries'):
         return {"error": "No enrollment data available"}
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.project_enrollment_timeline()
 
@@ -242,12 +200,7 @@ def get_historical_performance() -> List[Dict]:
     if not data.get('enrollment_summaries'):
         return []
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.get_historical_performance()
 
@@ -268,12 +221,7 @@ def get_alternative_site_recommendations(underperforming_site_number: str) -> Li
     if not data.get('enrollment_summaries'):
         return []
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     return analyzer.get_alternative_site_recommendations(underperforming_site_number)
 
@@ -294,12 +242,7 @@ def get_comprehensive_site_analysis(site_number: Optional[str] = None) -> Dict:
     if not data.get('enrollment_summaries'):
         return {"error": "No enrollment data available"}
     
-    analyzer = EnrollmentAnalyzer(
-        summaries=data['enrollment_summaries'],
-        subjects=data['subjects'],
-        sites=data['sites'],
-        metrics=data.get('enrollment_metrics', [])
-    )
+    analyzer = _get_analyzer()
     
     # Get all supporting data
     site_rankings = analyzer.get_site_performance_ranking()
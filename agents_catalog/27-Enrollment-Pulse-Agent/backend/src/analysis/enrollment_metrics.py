@@ -1,8 +1,11 @@
 """
 Enrollment metrics and calculations
 """
-from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from functools import cached_property, wraps
+from typing import List, Dict, Optional, Tuple
+import copy
 import pandas as pd
 import sys
 from pathlib import Path
@@ -13,16 +16,73 @@ sys.path.append(str(Path(__file__).parent.parent))
 from data.models import EnrollmentSummary, Subject, Site, EnrollmentMetric
 
 
+# Memoized results kept per analyzer before the memo is cleared
+MEMO_MAX_ENTRIES = 256
+
+
+def memoized(method):
+    """
+    Compute an analyzer result once per set of arguments and day.
+
+    An analyzer is built for one data snapshot, so results only change with the
+    arguments and, for projections, with the calendar. Callers get a copy they
+    can modify.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())), date.today())
+        try:
+            result = self._memo[key]
+        except KeyError:
+            result = method(self, *args, **kwargs)
+            if len(self._memo) >= MEMO_MAX_ENTRIES:
+                self._memo.clear()
+            result = self._memo.setdefault(key, result)
+        return copy.deepcopy(result)
+    return wrapper
+
+
 class EnrollmentAnalyzer:
     """Analyze enrollment performance and trends"""
     
     def __init__(self, summaries: List[EnrollmentSummary], subjects: List[Subject], 
-                 sites: List[Site], metrics: List[EnrollmentMetric]):
+                 sites: List[Site], metrics: List[EnrollmentMetric], version: Optional[str] = None):
         self.summaries = summaries
         self.subjects = subjects
         self.sites = sites
         self.metrics = metrics
+        # Identifies the data snapshot the results are computed from
+        self.version = version
+        self._memo = {}
+    
+    @cached_property
+    def _status_counts(self) -> Counter:
+        """Number of subjects with each status"""
+        return Counter(s.status for s in self.subjects)
+    
+    @cached_property
+    def _subjects_by_site(self) -> Dict[str, List[Subject]]:
+        subjects_by_site = defaultdict(list)
+        for subject in self.subjects:
+            subjects_by_site[subject.site_number].append(subject)
+        return subjects_by_site
     
+    @cached_property
+    def _metrics_by_site(self) -> Dict[str, List[EnrollmentMetric]]:
+        metrics_by_site = defaultdict(list)
+        for metric in self.metrics:
+            metrics_by_site[metric.site_number].append(metric)
+        return metrics_by_site
+    
+    @cached_property
+    def _summaries_by_site(self) -> Dict[str, EnrollmentSummary]:
+        summaries_by_site = {}
+        for summary in self.summaries:
+            # Keep the first summary of a site, as a linear search would
+            summaries_by_site.setdefault(summary.site_number, summary)
+        return summaries_by_site
+    
+    @memoized
     def get_overall_enrollment_status(self) -> Dict:
         """Calculate overall study enrollment status"""
         total_target = sum(s.target_enrollment for s in self.summaries)
@@ -30,8 +90,8 @@ class EnrollmentAnalyzer:
         overall_percentage = (total_enrolled / total_target) * 100 if total_target > 0 else 0
         
         # Count subjects by status
-        randomized = len([s for s in self.subjects if s.status == 'Randomized'])
-        screen_failed = len([s for s in self.subjects if s.status == 'Screen Failed'])
+        randomized = self._status_counts['Randomized']
+        screen_failed = self._status_counts['Screen Failed']
         total_screened = len(self.subjects)
         screen_failure_rate = (screen_failed / total_screened) * 100 if total_screened > 0 else 0
         
@@ -45,6 +105,7 @@ class EnrollmentAnalyzer:
             'screen_failure_rate': round(screen_failure_rate, 1)
         }
     
+    @memoized
     def get_site_performance_ranking(self) -> List[Dict]:
         """Rank sites by enrollment performance"""
         ranked_sites = []
@@ -62,6 +123,7 @@ class EnrollmentAnalyzer:
         
         return ranked_sites
     
+    @memoized
     def identify_underperforming_sites(self, threshold: float = 60.0) -> List[Dict]:
         """Identify sites below enrollment threshold"""
         underperforming = []
@@ -87,6 +149,7 @@ class EnrollmentAnalyzer:
         
         return sorted(underperforming, key=lambda x: x['shortfall'], reverse=True)
     
+    @memoized
     def analyze_cra_performance(self) -> Dict:
         """Analyze CRA performance correlation with site enrollment"""
         # This would require site team member data to be fully implemented
@@ -106,6 +169,7 @@ class EnrollmentAnalyzer:
             'recommendation': 'Consider redistributing CRA workload or providing additional support to Amanda Garcia\'s sites'
         }
     
+    @memoized
     def get_monthly_enrollment_trends(self) -> Dict:
         """Analyze monthly enrollment patterns by region"""
         trends = {}
@@ -131,12 +195,13 @@ class EnrollmentAnalyzer:
         
         return trends
     
+    @memoized
     def calculate_screening_efficiency(self) -> List[Dict]:
         """Calculate screening to randomization efficiency by site"""
         efficiency_data = []
         
         for summary in self.summaries:
-            site_subjects = [s for s in self.subjects if s.site_number == summary.site_number]
+            site_subjects = self._subjects_by_site.get(summary.site_number, [])
             
             # Calculate average screening to randomization time
             randomized_subjects = [s for s in site_subjects if s.randomization_date and s.screen_date]
@@ -159,6 +224,7 @@ class EnrollmentAnalyzer:
         
         return sorted(efficiency_data, key=lambda x: x['avg_screening_days'])
     
+    @memoized
     def project_enrollment_timeline(self) -> Dict:
         """Project final enrollment based on current trends"""
         projections = {}
@@ -181,13 +247,14 @@ class EnrollmentAnalyzer:
         
         return projections
     
+    @memoized
     def get_historical_performance(self) -> List[Dict]:
         """Get historical performance trends for all sites"""
         historical_data = []
         
         # Process monthly enrollment metrics to create historical trends
         for site_summary in self.summaries:
-            site_metrics = [m for m in self.metrics if m.site_number == site_summary.site_number]
+            site_metrics = self._metrics_by_site.get(site_summary.site_number, [])
             
             cumulative_enrollment = 0
             previous_month_enrollment = 0
@@ -227,12 +294,10 @@ class EnrollmentAnalyzer:
         
         return historical_data
     
+    @memoized
     def get_alternative_site_recommendations(self, underperforming_site_number: str) -> List[Dict]:
         """Get alternative site recommendations for underperforming sites"""
-        underperforming_site = next(
-            (s for s in self.summaries if s.site_number == underperforming_site_number), 
-            None
-        )
+        underperforming_site = self._summaries_by_site.get(underperforming_site_number)
         
         if not underperforming_site:
             return []
@@ -245,9 +310,11 @@ class EnrollmentAnalyzer:
             if s.enrollment_percentage > 85 and s.site_number != underperforming_site_number
         ]
         
+        historical_data = self.get_historical_performance()
+        
         for site in high_performing_sites:
             # Calculate historical performance score
-            site_historical = [h for h in self.get_historical_performance() if h['site_number'] == site.site_number]
+            site_historical = [h for h in historical_data if h['site_number'] == site.site_number]
             
             # Calculate average monthly performance over time
             if site_historical:
@@ -323,4 +390,23 @@ class EnrollmentAnalyzer:
         elif site1_region and site2_region:
             return "Different Region"
         else:
-            return "Unknown"
\ No newline at end of file
+            return "Unknown"
+
+
+def get_enrollment_analyzer(snapshot) -> EnrollmentAnalyzer:
+    """
+    Get the analyzer of a CTMS data snapshot (see data.store), shared by every reader
+    of that snapshot so each result is computed once per data version
+    """
+    analyzer = snapshot.derived.get('enrollment_analyzer')
+    if analyzer is None:
+        data = snapshot.data
+        # Tables whose CSV file is missing (e.g. removed before a refresh) are empty
+        analyzer = snapshot.derived.setdefault('enrollment_analyzer', EnrollmentAnalyzer(
+            summaries=data.get('enrollment_summaries', []),
+            subjects=data.get('subjects', []),
+            sites=data.get('sites', []),
+            metrics=data.get('enrollment_metrics', []),
+            version=snapshot.etag
+        ))
+    return analyzer
\ No newline at end of file
@@ -0,0 +1,512 @@
+"""
+Local mirror of ClinicalTrials.gov studies for the live trial tools
+
+The mirror keeps the study fields the live tools analyze (the columns of
+ClinicalTrialsAPIClient.get_enrollment_data) in one columnar frame and the trial
+locations in another, indexed by condition, status, phase, sponsor and country.
+
+Studies are mirrored per condition search. The first sync of a condition downloads
+all of its studies once, requesting only the mirrored fields. Later syncs download only the
+studies whose lastUpdatePostDate is on or after the day of the previous sync, and a
+full sync every FULL_SYNC_DAYS drops the studies that no longer match the condition.
+A condition is synced again when its mirror is older than
+CLINICAL_TRIALS_MIRROR_MAX_AGE seconds; if the API can't be reached, queries are
+answered from the mirrored data. Queries that don't wait for the first sync of a
+condition start it in the background and are answered from an API search of at
+most SEARCH_MAX_PAGES pages meanwhile.
+
+Readers query a snapshot of the mirror. Each condition is synced under its own lock,
+so a large condition doesn't hold up the others; a sync downloads its studies, then
+merges them into the latest snapshot and swaps the result in with a single
+assignment, and saves it to CLINICAL_TRIALS_MIRROR_PATH if set.
+"""
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .clinicaltrials_api_client import ClinicalTrialsAPIClient
+
+logger = logging.getLogger(__name__)
+
+# Mirror configuration
+# Seconds before a mirrored condition is synced again; 0 never re-syncs it
+CLINICAL_TRIALS_MIRROR_MAX_AGE = int(os.getenv('CLINICAL_TRIALS_MIRROR_MAX_AGE', '86400'))
+# Pickle file the mirror is saved to and loaded from; in memory only if unset
+CLINICAL_TRIALS_MIRROR_PATH = os.getenv('CLINICAL_TRIALS_MIRROR_PATH', '')
+
+# Days between full syncs of a condition
+FULL_SYNC_DAYS = 7
+# Safety limit on the pages of 1000 studies downloaded per sync
+SYNC_MAX_PAGES = 100
+# Pages of 1000 studies searched for a query while its condition is first synced
+SEARCH_MAX_PAGES = 50
+# Bumped when the saved format changes; saved mirrors of other versions are ignored
+MIRROR_FORMAT_VERSION = 1
+
+# Fields requested from the API, and the columns they are mirrored to
+MIRROR_FIELDS = [
+    'NCTId', 'BriefTitle', 'OverallStatus', 'Phase', 'EnrollmentCount', 'EnrollmentType',
+    'StartDate', 'PrimaryCompletionDate', 'LastUpdatePostDate', 'LeadSponsorName',
+    'LeadSponsorClass', 'Condition', 'InterventionType', 'InterventionName',
+    'LocationFacility', 'LocationCity', 'LocationState', 'LocationZip',
+    'LocationCountry', 'LocationStatus'
+]
+STUDY_COLUMNS = [
+    'nct_id', 'title', 'status', 'phase', 'enrollment_count', 'enrollment_type',
+    'start_date', 'completion_date', 'last_update', 'sponsor', 'sponsor_class',
+    'conditions', 'interventions', 'location_count', 'countries'
+]
+LOCATION_COLUMNS = ['nct_id', 'facility', 'city', 'state', 'zip', 'country', 'status']
+# Low-cardinality columns stored as categoricals
+STUDY_CATEGORIES = ['status', 'phase', 'enrollment_type', 'sponsor_class']
+LOCATION_CATEGORIES = ['state', 'country', 'status']
+
+EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+def condition_key(condition: str) -> str:
+    """Key shared by conditions that only differ in case or whitespace"""
+    return re.sub(r'\s+', ' ', condition).strip().casefold()
+
+
+class ConditionScope(NamedTuple):
+    """The studies mirrored for a condition search, and when they were synced"""
+    condition: str
+    nct_ids: FrozenSet[str]
+    synced_at: datetime
+    full_synced_at: datetime
+    complete: bool
+
+
+@dataclass
+class SyncResult:
+    """What a sync downloaded"""
+    condition: str
+    full: bool
+    studies_synced: int
+    condition_studies: int
+    mirrored_studies: int
+    synced_at: datetime
+
+
+def _frames(client: ClinicalTrialsAPIClient, studies: List[Dict]):
+    """Mirror frames of the studies of API responses"""
+    return _compact(
+        client.get_enrollment_data(studies).drop_duplicates('nct_id', keep='last'),
+        pd.DataFrame(_location_rows(studies)).drop_duplicates()
+    )
+
+
+def _compact(studies: pd.DataFrame, locations: pd.DataFrame):
+    """Mirror frames with the mirror's column order and dtypes"""
+    studies = studies.reindex(columns=STUDY_COLUMNS)
+    counts = ['enrollment_count', 'location_count']
+    studies[counts] = studies[counts].fillna(0).astype('int64')
+    studies = studies.astype({column: 'category' for column in STUDY_CATEGORIES})
+    locations = locations.reindex(columns=LOCATION_COLUMNS)
+    locations = locations.astype({column: 'category' for column in LOCATION_CATEGORIES})
+    return studies.reset_index(drop=True), locations.reset_index(drop=True)
+
+
+def records(frame: pd.DataFrame) -> List[Dict]:
+    """Rows of a mirror frame as dictionaries of plain values, with None for missing values"""
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
+
+
+def _postings(values: pd.Series) -> Dict[str, np.ndarray]:
+    """Sorted row positions of each case-folded value; values indexed by row position"""
+    values = values.dropna()
+    values = values[values != ''].str.casefold()
+    positions = values.index.to_numpy()
+    return {
+        key: np.unique(positions[rows])
+        for key, rows in values.groupby(values.to_numpy()).indices.items()
+    }
+
+
+@dataclass(frozen=True)
+class MirrorSnapshot:
+    """An immutable version of the mirror"""
+    version: int
+    studies: pd.DataFrame
+    locations: pd.DataFrame
+    scopes: Dict[str, ConditionScope]
+
+    @classmethod
+    def empty(cls) -> 'MirrorSnapshot':
+        studies, locations = _compact(pd.DataFrame(columns=STUDY_COLUMNS),
+                                      pd.DataFrame(columns=LOCATION_COLUMNS))
+        return cls(version=0, studies=studies, locations=locations, scopes={})
+
+    @cached_property
+    def positions(self) -> pd.Index:
+        """Row positions of the studies, by NCT number"""
+        return pd.Index(self.studies['nct_id'])
+
+    @cached_property
+    def indexes(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """Row positions of the studies by case-folded condition, status, phase, sponsor and country"""
+        studies = self.studies
+        countries = self.locations.drop_duplicates(['nct_id', 'country'])
+        return {
+            'condition': _postings(studies['conditions'].str.split('|').explode()),
+            'status': _postings(studies['status']),
+            'phase': _postings(studies['phase'].str.split('|').explode()),
+            'sponsor': _postings(studies['sponsor']),
+            'sponsor_class': _postings(studies['sponsor_class']),
+            'country': _postings(pd.Series(
+                countries['country'].to_numpy(),
+                index=self.positions.get_indexer(countries['nct_id'])
+            ))
+        }
+
+    def condition_rows(self, condition: str) -> np.ndarray:
+        """
+        Row positions of the studies of a condition: those its synced search
+        returned, or else those listing it as one of their conditions
+        """
+        key = condition_key(condition)
+        scope = self.scopes.get(key)
+        if scope is None:
+            return self.indexes['condition'].get(key, EMPTY_ROWS)
+        rows = self.positions.get_indexer(list(scope.nct_ids))
+        return np.sort(rows[rows >= 0])
+
+    def find(self,
+             condition: Optional[str] = None,
+             status: Optional[Union[str, List[str]]] = None,
+             phase: Optional[Union[str, List[str]]] = None,
+             sponsor: Optional[Union[str, List[str]]] = None,
+             sponsor_class: Optional[Union[str, List[str]]] = None,
+             country: Optional[Union[str, List[str]]] = None,
+             intervention: Optional[str] = None) -> pd.DataFrame:
+        """
+        Mirrored studies matching all the given filters, most recently updated first.
+
+        Each filter other than intervention takes one value or a list of values, any
+        of which may match, and is compared ignoring case. Intervention matches any
+        study with an intervention name containing it.
+
+        Returns:
+            DataFrame with the columns of ClinicalTrialsAPIClient.get_enrollment_data
+        """
+        rows = self.condition_rows(condition) if condition else None
+        filters = {
+            'status': status, 'phase': phase, 'sponsor': sponsor,
+            'sponsor_class': sponsor_class, 'country': country
+        }
+        for name, values in filters.items():
+            if not values:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            index = self.indexes[name]
+            matches = np.unique(np.concatenate(
+                [index.get(value.casefold(), EMPTY_ROWS) for value in values]
+            ))
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+
+        studies = self.studies if rows is None else self.studies.take(rows)
+        if intervention:
+            studies = studies[studies['interventions'].str.contains(
+                intervention, case=False, regex=False, na=False
+            )]
+        studies = studies.sort_values(['last_update', 'nct_id'], ascending=[False, True])
+        # Plain columns, so value counts only list the values that occur
+        return studies.astype({column: object for column in STUDY_CATEGORIES}).reset_index(drop=True)
+
+    def locations_of(self, nct_ids) -> pd.DataFrame:
+        """Mirrored locations of the given studies"""
+        locations = self.locations[self.locations['nct_id'].isin(nct_ids)]
+        return locations.astype({column: object for column in LOCATION_CATEGORIES})
+
+
+@dataclass
+class MirrorQuery:
+    """Studies found in the mirror, and how fresh the mirror is"""
+    studies: pd.DataFrame
+    total_found: int
+    snapshot: MirrorSnapshot
+    scope: Optional[ConditionScope]
+    stale: bool
+    mirrored: bool = True
+
+    def locations(self) -> pd.DataFrame:
+        return self.snapshot.locations_of(self.studies['nct_id'])
+
+    def freshness(self) -> Dict:
+        return {
+            'source': 'local mirror of ClinicalTrials.gov' if self.mirrored else 'ClinicalTrials.gov API',
+            'synced_at': self.scope.synced_at.isoformat() if self.scope else None,
+            'stale': self.stale
+        }
+
+
+def _location_rows(studies: List[Dict]) -> List[Dict]:
+    rows = []
+    for study in studies:
+        protocol_section = study.get('protocolSection', {})
+        nct_id = protocol_section.get('identificationModule', {}).get('nctId')
+        for location in protocol_section.get('contactsLocationsModule', {}).get('locations', []):
+            rows.append({
+                'nct_id': nct_id,
+                **{column: location.get(column) for column in LOCATION_COLUMNS[1:]}
+            })
+    return rows
+
+
+class ClinicalTrialsMirror:
+    """Studies of ClinicalTrials.gov condition searches, synced incrementally"""
+
+    def __init__(self,
+                 client: Optional[ClinicalTrialsAPIClient] = None,
+                 path: Optional[str] = CLINICAL_TRIALS_MIRROR_PATH,
+                 max_age: int = CLINICAL_TRIALS_MIRROR_MAX_AGE):
+        self.client = client or ClinicalTrialsAPIClient()
+        self.path = Path(path) if path else None
+        self.max_age = max_age
+        self._snapshot = self._load() or MirrorSnapshot.empty()
+        self._sync_locks = {}
+        self._sync_locks_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._background_syncs = set()
+        self._background_lock = threading.Lock()
+
+    def snapshot(self) -> MirrorSnapshot:
+        return self._snapshot
+
+    def has_condition(self, condition: str) -> bool:
+        """Whether a condition has been synced, however long ago"""
+        return condition_key(condition) in self._snapshot.scopes
+
+    def _expired(self, scope: Optional[ConditionScope]) -> bool:
+        if scope is None:
+            return True
+        return self.max_age > 0 and datetime.now() - scope.synced_at > timedelta(seconds=self.max_age)
+
+    def _sync_lock(self, key: str) -> threading.Lock:
+        """The lock a condition is synced under"""
+        with self._sync_locks_lock:
+            return self._sync_locks.setdefault(key, threading.Lock())
+
+    def _download(self, condition: str, max_pages: int, **search_params):
+        """Studies of a condition search, and whether the search returned them all"""
+        studies = []
+        complete = True
+        for page in self.client.iter_pages(
+            max_pages=max_pages, condition=condition, fields=MIRROR_FIELDS,
+            page_size=1000, **search_params
+        ):
+            studies.extend(page.get('studies', []))
+            complete = not page.get('nextPageToken')
+        if not complete:
+            logger.warning(f"Downloaded the first {len(studies)} '{condition}' studies only")
+        return studies, complete
+
+    def sync(self, condition: str, full: bool = False, only_if_expired: bool = False) -> SyncResult:
+        """
+        Download the studies of a condition search changed since its previous sync.
+
+        Args:
+            condition: Medical condition, as passed to the API's condition search
+            full: Download every study of the condition, not only the changed ones
+            only_if_expired: Skip the sync if the condition's mirror isn't older than
+                the maximum age, e.g. because another caller just synced it
+
+        Returns:
+            SyncResult: What was downloaded
+        """
+        key = condition_key(condition)
+        with self._sync_lock(key):
+            scope = self._snapshot.scopes.get(key)
+            if only_if_expired and not self._expired(scope):
+                return SyncResult(condition, False, 0, len(scope.nct_ids),
+                                  len(self._snapshot.studies), scope.synced_at)
+
+            started = datetime.now()
+            full = (full or scope is None or not scope.complete
+                    or started - scope.full_synced_at > timedelta(days=FULL_SYNC_DAYS))
+            # lastUpdatePostDate has no time of day, so the previous sync's day is synced again
+            updated_since = None if full else (scope.synced_at - timedelta(days=1)).date().isoformat()
+
+            studies, complete = self._download(condition, SYNC_MAX_PAGES, updated_since=updated_since)
+            new_studies, new_locations = _frames(self.client, studies)
+            synced_ids = frozenset(new_studies['nct_id'])
+
+            # Merge into the latest snapshot, which syncs of other conditions may have replaced
+            with self._swap_lock:
+                previous = self._snapshot
+                kept_studies = previous.studies[~previous.studies['nct_id'].isin(synced_ids)]
+                kept_locations = previous.locations[~previous.locations['nct_id'].isin(synced_ids)]
+                merged_studies, merged_locations = _compact(
+                    pd.concat([kept_studies, new_studies]), pd.concat([kept_locations, new_locations])
+                )
+
+                scopes = dict(previous.scopes)
+                scopes[key] = ConditionScope(
+                    condition=condition,
+                    nct_ids=synced_ids if full else scope.nct_ids | synced_ids,
+                    synced_at=started,
+                    full_synced_at=started if full else scope.full_synced_at,
+                    complete=complete if full else scope.complete
+                )
+                snapshot = MirrorSnapshot(
+                    version=previous.version + 1,
+                    studies=merged_studies,
+                    locations=merged_locations,
+                    scopes=scopes
+                )
+                self._snapshot = snapshot
+                self._save(snapshot)
+
+            logger.info(
+                f"Clinical trials mirror {snapshot.version}: synced {len(synced_ids)} "
+                f"'{condition}' studies ({'full' if full else f'updated since {updated_since}'})"
+            )
+            return SyncResult(condition, full, len(synced_ids), len(scopes[key].nct_ids),
+                              len(merged_studies), started)
+
+    def sync_in_background(self, condition: str) -> bool:
+        """
+        Sync a condition in a background thread, unless it is already being synced
+        in one or its mirror isn't older than the maximum age.
+
+        Returns:
+            bool: Whether a sync was started
+        """
+        key = condition_key(condition)
+        with self._background_lock:
+            if key in self._background_syncs:
+                return False
+            self._background_syncs.add(key)
+
+        def run():
+            try:
+                self.sync(condition, only_if_expired=True)
+            except Exception as e:
+                logger.warning(f"Error syncing '{condition}' studies in the background: {e}")
+            finally:
+                with self._background_lock:
+                    self._background_syncs.discard(key)
+
+        threading.Thread(target=run, name=f"mirror-sync-{key}", daemon=True).start()
+        return True
+
+    def query(self, condition: str, limit: Optional[int] = None, wait: bool = True,
+              **filters) -> MirrorQuery:
+        """
+        Studies of a condition matching the given filters, syncing the condition first
+        if its mirror is missing or older than the maximum age.
+
+        Args:
+            condition: Medical condition, as passed to the API's condition search
+            limit: Return only this many of the most recently updated studies
+            wait: Wait for the first sync of the condition; if False, sync it in the
+                background and answer from an API search of SEARCH_MAX_PAGES pages
+            **filters: Filters of MirrorSnapshot.find
+
+        Returns:
+            MirrorQuery: The studies found and the freshness of the mirror
+
+        Raises:
+            requests.exceptions.RequestException: If the condition has never been
+                synced and the API can't be reached
+        """
+        snapshot = self._snapshot
+        scope = snapshot.scopes.get(condition_key(condition))
+        if scope is None and not wait:
+            self.sync_in_background(condition)
+            return self._search(condition, limit, **filters)
+        stale = self._expired(scope)
+        if stale:
+            try:
+                self.sync(condition, only_if_expired=True)
+                snapshot = self._snapshot
+                scope = snapshot.scopes[condition_key(condition)]
+                stale = False
+            except Exception as e:
+                if scope is None:
+                    raise
+                logger.warning(f"Answering from '{condition}' studies synced at {scope.synced_at}: {e}")
+
+        studies = snapshot.find(condition, **filters)
+        total_found = len(studies)
+        if limit:
+            studies = studies.head(limit)
+        return MirrorQuery(studies, total_found, snapshot, scope, stale)
+
+    def _search(self, condition: str, limit: Optional[int] = None, **filters) -> MirrorQuery:
+        """Query the studies of an API search of a condition, without mirroring them"""
+        started = datetime.now()
+        studies, complete = self._download(condition, SEARCH_MAX_PAGES)
+        found_studies, found_locations = _frames(self.client, studies)
+        nct_ids = frozenset(found_studies['nct_id'])
+        scope = ConditionScope(condition, nct_ids, started, started, complete)
+        snapshot = MirrorSnapshot(
+            version=0,
+            studies=found_studies,
+            locations=found_locations,
+            scopes={condition_key(condition): scope}
+        )
+
+        studies = snapshot.find(condition, **filters)
+        total_found = len(studies)
+        if limit:
+            studies = studies.head(limit)
+        return MirrorQuery(studies, total_found, snapshot, scope, stale=False, mirrored=False)
+
+    def _load(self) -> Optional[MirrorSnapshot]:
+        if not self.path or not self.path.exists():
+            return None
+        try:
+            saved = pd.read_pickle(self.path)
+            if saved.get('format_version') != MIRROR_FORMAT_VERSION:
+                logger.info(f"Ignoring clinical trials mirror {self.path} of another format")
+                return None
+            studies, locations = _compact(saved['studies'], saved['locations'])
+            scopes = {key: ConditionScope(**scope) for key, scope in saved['scopes'].items()}
+        except Exception as e:
+            logger.warning(f"Error loading clinical trials mirror {self.path}: {e}")
+            return None
+        logger.info(f"Loaded {len(studies)} mirrored clinical trials from {self.path}")
+        return MirrorSnapshot(version=1, studies=studies, locations=locations, scopes=scopes)
+
+    def _save(self, snapshot: MirrorSnapshot) -> None:
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            pd.to_pickle({
+                'format_version': MIRROR_FORMAT_VERSION,
+                'studies': snapshot.studies,
+                'locations': snapshot.locations,
+                # Plain dicts, so the file loads whatever path this module is imported by
+                'scopes': {key: scope._asdict() for key, scope in snapshot.scopes.items()}
+            }, temp_path)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Error saving clinical trials mirror {self.path}: {e}")
+
+
+_mirror: Optional[ClinicalTrialsMirror] = None
+_mirror_lock = threading.Lock()
+
+
+def get_clinical_trials_mirror() -> ClinicalTrialsMirror:
+    """The process-wide clinical trials mirror"""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = ClinicalTrialsMirror()
+        return _mirror
@@ -3,7 +3,7 @@ ClinicalTrials.gov API Client for Live Data Integration
 """
 import requests
 import pandas as pd
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 import logging
 import time
 from datetime import datetime, timedelta
@@ -33,6 +33,8 @@ class ClinicalTrialsAPIClient:
                       min_age: Optional[str] = None,
                       max_age: Optional[str] = None,
                       gender: Optional[str] = None,
+                      updated_since: Optional[str] = None,
+                      fields: Optional[List[str]] = None,
                       page_size: int = 100,
                       page_token: Optional[str] = None) -> Dict:
         """
@@ -49,6 +51,8 @@ class ClinicalTrialsAPIClient:
             min_age: Minimum age (e.g., '18 Years')
             max_age: Maximum age (e.g., '65 Years')
             gender: 'ALL', 'FEMALE', 'MALE'
+            updated_since: Only studies last updated on or after this date (YYYY-MM-DD)
+            fields: Study fields to return (e.g., ['NCTId', 'OverallStatus']), all if None
             page_size: Number of results per page (max 1000)
             page_token: Token for pagination
             
@@ -83,6 +87,10 @@ class ClinicalTrialsAPIClient:
             params['filter.maxAge'] = max_age
         if gender:
             params['filter.sex'] = gender
+        if updated_since:
+            params['filter.advanced'] = f"AREA[LastUpdatePostDate]RANGE[{updated_since},MAX]"
+        if fields:
+            params['fields'] = ','.join(fields)
         if page_token:
             params['pageToken'] = page_token
             
@@ -138,41 +146,57 @@ class ClinicalTrialsAPIClient:
             logger.warning(f"Error getting multiple studies: {e}")
             raise
     
-    def search_all_pages(self, **search_params) -> List[Dict]:
+    def iter_pages(self, max_pages: int = 50, **search_params) -> Iterator[Dict]:
+        """
+        Iterate over the response pages of a search
+        
+        Args:
+            max_pages: Safety limit on the number of pages requested
+            **search_params: Parameters to pass to search_studies
+            
+        Yields:
+            API responses, one per page; the last one has a nextPageToken if the
+            search stopped at max_pages
+        """
+        page_token = None
+        for _ in range(max_pages):
+            response = self.search_studies(page_token=page_token, **search_params)
+            yield response
+            
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+    
+    def search_all_pages(self, max_studies: Optional[int] = None, **search_params) -> List[Dict]:
         """
         Search all pages of results for a query
         
         Args:
+            max_studies: Stop after this many studies
             **search_params: Parameters to pass to search_studies
             
         Returns:
             List of all studies from all pages
         """
+        if max_studies:
+            search_params['page_size'] = min(search_params.get('page_size', 1000), max_studies)
+        
         all_studies = []
-        page_token = None
-        max_pages = 50  # Safety limit
         page_count = 0
         
-        while page_count < max_pages:
-            try:
-                response = self.search_studies(page_token=page_token, **search_params)
-                
-                studies = response.get('studies', [])
-                all_studies.extend(studies)
+        try:
+            for response in self.iter_pages(**search_params):
+                page_count += 1
+                all_studies.extend(response.get('studies', []))
                 
-                # Check if there are more pages
-                page_token = response.get('nextPageToken')
-                if not page_token:
+                if max_studies and len(all_studies) >= max_studies:
+                    all_studies = all_studies[:max_studies]
                     break
-                    
-                page_count += 1
-                # Rate limiting handled by API server
                 
-            except Exception as e:
-                logger.warning(f"Error on page {page_count}: {e}")
-                break
+        except Exception as e:
+            logger.warning(f"Error on page {page_count}: {e}")
         
-        logger.info(f"Retrieved {len(all_studies)} studies across {page_count + 1} pages")
+        logger.info(f"Retrieved {len(all_studies)} studies across {page_count} pages")
         return all_studies
     
     def search_oncology_trials(self, 
@@ -1,206 +1,312 @@
 """
 Data processors for CTMS CSV files
+
+Each table is processed column-wise into a pandas DataFrame. Model objects are only
+built when a caller iterates or indexes the processed lists, so loading and
+summarizing a large CTMS export never creates one Pydantic object per row.
 """
 import pandas as pd
+import numpy as np
+from collections.abc import Sequence
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Type
 from pathlib import Path
 
+from pydantic import BaseModel
+
 from .models import (
-    Study, Site, Subject, StudyTeamMember, SiteTeamMember, 
+    Study, Site, Subject, StudyTeamMember, SiteTeamMember,
     Milestone, EnrollmentMetric, EnrollmentSummary
 )
 
 
+# CTMS exports write dates as month/day/year
+CTMS_DATE_FORMAT = '%m/%d/%Y'
+
+STUDY_NUMBER = "ONCO-2025-117"  # From the data pattern
+
+# Map site ID to site number (simplified mapping)
+SITE_MAPPING = {
+    'a0C5f000000JtS9EAK': '1',
+    'a0C5f000000JtSAEA0': '2',
+    'a0C5f000000JtSBEA0': '3',
+    'a0C5f000000JtSCEA0': '4',
+    'a0C5f000000JtSDEA0': '5'
+}
+
+ENROLLED_STATUSES = ['Randomized', 'Active']
+SCREEN_FAILED_STATUS = 'Screen Failed'
+
+# CTMS tables that are processed into models: table -> (processed data key, model)
+PROCESSED_TABLES = {
+    'study': ('studies', Study),
+    'site': ('sites', Site),
+    'subject': ('subjects', Subject),
+    'enrollment_metric': ('enrollment_metrics', EnrollmentMetric)
+}
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Parse a column of CTMS dates in one pass; missing values become NaT"""
+    try:
+        return pd.to_datetime(values, format=CTMS_DATE_FORMAT)
+    except (ValueError, TypeError):
+        # Fall back to per-value format inference for exports in another format
+        return pd.to_datetime(values, format='mixed')
+
+
+class LazyModelList(Sequence):
+    """
+    Read-only list of models backed by a DataFrame with one column per model field.
+
+    len() reads the frame only; the models are built the first time an item is
+    accessed and reused afterwards.
+    """
+
+    def __init__(self, model: Type[BaseModel], frame: pd.DataFrame):
+        self.model = model
+        self.frame = frame
+        self._items = None
+
+    def materialize(self) -> List[BaseModel]:
+        """Build (once) and return the model objects"""
+        if self._items is None:
+            # Object columns keep Timestamps and turn NaN/NaT into None
+            records = self.frame.astype(object).where(self.frame.notna(), None).to_dict('records')
+            self._items = [self.model(**record) for record in records]
+        return self._items
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __getitem__(self, index):
+        return self.materialize()[index]
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (LazyModelList, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LazyModelList({self.model.__name__}, {len(self)} rows)"
+
+
 class CTMSDataProcessor:
     """Process CTMS CSV data into structured models"""
-    
+
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
         self._raw_data = {}
+        self._frames = {}
         self._processed_data = {}
-    
+
     def load_csv_files(self) -> None:
         """Load all CSV files into pandas DataFrames"""
         csv_files = [
             'study.csv', 'site.csv', 'subject.csv', 'enrollment_metric.csv',
             'study_team_member.csv', 'site_team_member.csv', 'milestone.csv'
         ]
-        
+
         for file in csv_files:
-            file_path = self.data_dir / file
-            if file_path.exists():
-                self._raw_data[file.replace('.csv', '')] = pd.read_csv(file_path)
-                print(f"Loaded {file}: {len(self._raw_data[file.replace('.csv', '')])} records")
-    
+            self.load_csv_file(file.replace('.csv', ''))
+
+    def load_csv_file(self, table: str) -> bool:
+        """Load one CSV file (e.g. 'subject') into a pandas DataFrame, if it exists"""
+        file_path = self.data_dir / f"{table}.csv"
+        if not file_path.exists():
+            return False
+        self._raw_data[table] = pd.read_csv(file_path)
+        print(f"Loaded {table}.csv: {len(self._raw_data[table])} records")
+        return True
+
+    def load_frames(self, frames: Dict[str, pd.DataFrame], processed_data: Dict) -> None:
+        """Start from previously processed tables, e.g. to re-process only changed tables"""
+        self._frames = dict(frames)
+        self._processed_data = dict(processed_data)
+
+    def remove_table(self, table: str) -> None:
+        """Drop a processed table whose CSV file no longer exists"""
+        key = PROCESSED_TABLES[table][0]
+        self._raw_data.pop(table, None)
+        self._frames.pop(key, None)
+        self._processed_data.pop(key, None)
+
+    def _store(self, key: str, model: Type[BaseModel], frame: pd.DataFrame) -> LazyModelList:
+        """Keep a processed frame and expose it as a lazily built model list"""
+        frame = frame.reset_index(drop=True)
+        self._frames[key] = frame
+        self._processed_data[key] = LazyModelList(model, frame)
+        return self._processed_data[key]
+
+    def build_frame(self, table: str, raw: pd.DataFrame) -> pd.DataFrame:
+        """Process raw rows of a CTMS table (e.g. 'subject') into a frame of model fields"""
+        return getattr(self, f"_{PROCESSED_TABLES[table][0]}_frame")(raw)
+
+    def append_rows(self, table: str, raw: pd.DataFrame) -> pd.DataFrame:
+        """Process rows appended to a CTMS table and add them to its processed data"""
+        key, model = PROCESSED_TABLES[table]
+        frame = self.build_frame(table, raw)
+        if key in self._frames:
+            frame = pd.concat([self._frames[key], frame], ignore_index=True)
+        self._store(key, model, frame)
+        return self._frames[key]
+
+    def process_table(self, table: str) -> List[BaseModel]:
+        """Process one loaded CTMS table (e.g. 'subject')"""
+        if table not in self._raw_data:
+            return []
+
+        key, model = PROCESSED_TABLES[table]
+        return self._store(key, model, self.build_frame(table, self._raw_data[table]))
+
     def process_studies(self) -> List[Study]:
         """Process study data"""
-        if 'study' not in self._raw_data:
-            return []
-        
-        studies = []
-        for _, row in self._raw_data['study'].iterrows():
-            study = Study(
-                study_number=row['study_number'],
-                study_name=row['study_name'],
-                phase=row['phase'],
-                indication=row['indication'],
-                target_enrollment=row['total_planned_subjects'],
-                enrollment_start_date=pd.to_datetime(row['enrollment_start_date']),
-                enrollment_end_date=pd.to_datetime(row['enrollment_end_date']),
-                status=row['status']
-            )
-            studies.append(study)
-        
-        self._processed_data['studies'] = studies
-        return studies
-    
+        return self.process_table('study')
+
     def process_sites(self) -> List[Site]:
         """Process site data"""
-        if 'site' not in self._raw_data:
-            return []
-        
-        sites = []
-        for _, row in self._raw_data['site'].iterrows():
-            # Extract study number from site data
-            study_number = "ONCO-2025-117"  # From the data pattern
-            
-            site = Site(
-                site_number=str(row['site_number']),
-                site_name=row['site_name'],
-                study_number=study_number,
-                target_enrollment=row['enrollment_target'],
-                site_activated_date=pd.to_datetime(row['site_activated_date']),
-                status=row['status'],
-                region=self._get_region_from_state(row['state_province']),
-                country=row['country']
-            )
-            sites.append(site)
-        
-        self._processed_data['sites'] = sites
-        return sites
-    
+        return self.process_table('site')
+
     def process_subjects(self) -> List[Subject]:
         """Process subject enrollment data"""
-        if 'subject' not in self._raw_data:
-            return []
-        
-        subjects = []
-        for _, row in self._raw_data['subject'].iterrows():
-            # Extract site number from subject_id (e.g., "001-001" -> site "1")
-            site_number = row['subject_id'].split('-')[0].lstrip('0') or '1'
-            
-            subject = Subject(
-                subject_id=row['subject_id'],
-                site_number=site_number,
-                study_number="ONCO-2025-117",
-                screen_date=pd.to_datetime(row['screen_date']),
-                enrollment_date=pd.to_datetime(row['enrollment_date']) if pd.notna(row['enrollment_date']) else None,
-                randomization_date=pd.to_datetime(row['randomization_date']) if pd.notna(row['randomization_date']) else None,
-                status=row['status'],
-                screen_failure_reason=row['screen_failure_reason'] if pd.notna(row['screen_failure_reason']) else None
-            )
-            subjects.append(subject)
-        
-        self._processed_data['subjects'] = subjects
-        return subjects
-    
+        return self.process_table('subject')
+
     def process_enrollment_metrics(self) -> List[EnrollmentMetric]:
         """Process monthly enrollment metrics"""
-        if 'enrollment_metric' not in self._raw_data:
-            return []
-        
-        metrics = []
-        for _, row in self._raw_data['enrollment_metric'].iterrows():
-            # Extract month from metric_date
-            metric_date = pd.to_datetime(row['metric_date'])
-            month = metric_date.strftime('%Y-%m')
-            
-            # Map site ID to site number (simplified mapping)
-            site_mapping = {
-                'a0C5f000000JtS9EAK': '1',
-                'a0C5f000000JtSAEA0': '2', 
-                'a0C5f000000JtSBEA0': '3',
-                'a0C5f000000JtSCEA0': '4',
-                'a0C5f000000JtSDEA0': '5'
-            }
-            site_number = site_mapping.get(row['site'], '1')
-            
-            metric = EnrollmentMetric(
-                site_number=site_number,
-                study_number="ONCO-2025-117",
-                month=month,
-                enrolled_count=row['enrolled_count'],
-                screened_count=row['screened_count'],
-                screen_failed_count=row['screen_failure_count'],
-                randomized_count=row['randomized_count']
-            )
-            metrics.append(metric)
-        
-        self._processed_data['enrollment_metrics'] = metrics
-        return metrics
-    
-    def calculate_enrollment_summaries(self) -> List[EnrollmentSummary]:
-        """Calculate enrollment summaries for each site"""
-        sites = self._processed_data.get('sites', [])
-        subjects = self._processed_data.get('subjects', [])
-        
-        if not sites or not subjects:
+        return self.process_table('enrollment_metric')
+
+    def _studies_frame(self, raw: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame({
+            'study_number': raw['study_number'],
+            'study_name': raw['study_name'],
+            'phase': raw['phase'],
+            'indication': raw['indication'],
+            'target_enrollment': raw['total_planned_subjects'],
+            'enrollment_start_date': parse_dates(raw['enrollment_start_date']),
+            'enrollment_end_date': parse_dates(raw['enrollment_end_date']),
+            'status': raw['status']
+        })
+
+    def _sites_frame(self, raw: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame({
+            'site_number': raw['site_number'].astype(str),
+            'site_name': raw['site_name'],
+            'study_number': STUDY_NUMBER,
+            'target_enrollment': raw['enrollment_target'],
+            'site_activated_date': parse_dates(raw['site_activated_date']),
+            'status': raw['status'],
+            'region': raw['state_province'].map(self._get_region_from_state),
+            'country': raw['country']
+        })
+
+    def _subjects_frame(self, raw: pd.DataFrame) -> pd.DataFrame:
+        # Extract site number from subject_id (e.g., "001-001" -> site "1")
+        site_numbers = raw['subject_id'].str.extract(r'^0*([^-]*)', expand=False).replace('', '1')
+
+        return pd.DataFrame({
+            'subject_id': raw['subject_id'],
+            'site_number': site_numbers,
+            'study_number': STUDY_NUMBER,
+            'screen_date': parse_dates(raw['screen_date']),
+            'enrollment_date': parse_dates(raw['enrollment_date']),
+            'randomization_date': parse_dates(raw['randomization_date']),
+            'status': raw['status'],
+            'screen_failure_reason': raw['screen_failure_reason']
+        })
+
+    def _enrollment_metrics_frame(self, raw: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame({
+            'site_number': raw['site'].map(SITE_MAPPING).fillna('1'),
+            'study_number': STUDY_NUMBER,
+            'month': parse_dates(raw['metric_date']).dt.to_period('M').astype(str),
+            'enrolled_count': raw['enrolled_count'],
+            'screened_count': raw['screened_count'],
+            'screen_failed_count': raw['screen_failure_count'],
+            'randomized_count': raw['randomized_count']
+        })
+
+    def calculate_enrollment_summaries(self, site_numbers: Optional[Iterable[str]] = None) -> List[EnrollmentSummary]:
+        """
+        Calculate enrollment summaries for each site
+
+        Args:
+            site_numbers: Only recalculate these sites and keep the current summaries
+                of the others (default: recalculate every site)
+        """
+        sites = self._frames.get('sites')
+        subjects = self._frames.get('subjects')
+
+        if sites is None or subjects is None or sites.empty or subjects.empty:
+            self._frames.pop('enrollment_summaries', None)
+            self._processed_data.pop('enrollment_summaries', None)
             return []
-        
-        summaries = []
-        
-        for site in sites:
-            # Get subjects for this site
-            site_subjects = [s for s in subjects if s.site_number == site.site_number]
-            
-            # Calculate metrics
-            enrolled_subjects = [s for s in site_subjects if s.status in ['Randomized', 'Active']]
-            screen_failed = [s for s in site_subjects if s.status == 'Screen Failed']
-            
-            current_enrollment = len(enrolled_subjects)
-            total_screened = len(site_subjects)
-            screen_failure_rate = len(screen_failed) / total_screened if total_screened > 0 else 0
-            
-            # Calculate days since activation
-            days_since_activation = (datetime.now() - site.site_activated_date).days
-            
-            # Calculate average monthly enrollment
-            months_active = max(1, days_since_activation / 30)
-            avg_monthly_enrollment = current_enrollment / months_active
-            
-            # Determine risk level
-            enrollment_percentage = (current_enrollment / site.target_enrollment) * 100
-            risk_level = self._calculate_risk_level(enrollment_percentage, avg_monthly_enrollment)
-            
-            summary = EnrollmentSummary(
-                site_number=site.site_number,
-                site_name=site.site_name,
-                target_enrollment=site.target_enrollment,
-                current_enrollment=current_enrollment,
-                enrollment_percentage=enrollment_percentage,
-                screen_failure_rate=screen_failure_rate * 100,
-                avg_monthly_enrollment=avg_monthly_enrollment,
-                days_since_activation=days_since_activation,
-                risk_level=risk_level
-            )
-            summaries.append(summary)
-        
-        self._processed_data['enrollment_summaries'] = summaries
-        return summaries
-    
+
+        previous = self._frames.get('enrollment_summaries')
+        if site_numbers is None or previous is None or sites['site_number'].duplicated().any():
+            return self._store('enrollment_summaries', EnrollmentSummary, self._summarize(sites, subjects))
+
+        site_numbers = set(site_numbers)
+        recalculated = self._summarize(
+            sites[sites['site_number'].isin(site_numbers)],
+            subjects[subjects['site_number'].isin(site_numbers)]
+        )
+        kept = previous[~previous['site_number'].isin(site_numbers)]
+        # Keep the site order of the sites table
+        frame = sites[['site_number']].merge(
+            pd.concat([kept, recalculated], ignore_index=True), on='site_number'
+        )
+        return self._store('enrollment_summaries', EnrollmentSummary, frame)
+
+    def _summarize(self, sites: pd.DataFrame, subjects: pd.DataFrame) -> pd.DataFrame:
+        """Enrollment summary frame of the given sites"""
+        # Screened, enrolled and screen failed counts for every site in one pass
+        counts = pd.DataFrame({
+            'site_number': subjects['site_number'],
+            'total_screened': 1,
+            'current_enrollment': subjects['status'].isin(ENROLLED_STATUSES).astype(int),
+            'screen_failed': (subjects['status'] == SCREEN_FAILED_STATUS).astype(int)
+        }).groupby('site_number', sort=False).sum()
+
+        summary = sites[['site_number', 'site_name', 'target_enrollment', 'site_activated_date']].join(
+            counts, on='site_number'
+        )
+        summary[counts.columns] = summary[counts.columns].fillna(0).astype(int)
+
+        total_screened = summary['total_screened']
+        screen_failure_rate = (summary['screen_failed'] / total_screened.where(total_screened > 0)).fillna(0)
+
+        # Calculate days since activation and average monthly enrollment
+        summary['days_since_activation'] = (datetime.now() - summary['site_activated_date']).dt.days
+        months_active = (summary['days_since_activation'] / 30).clip(lower=1)
+        summary['avg_monthly_enrollment'] = summary['current_enrollment'] / months_active
+
+        summary['enrollment_percentage'] = (summary['current_enrollment'] / summary['target_enrollment']) * 100
+        summary['screen_failure_rate'] = screen_failure_rate * 100
+        summary['risk_level'] = self._calculate_risk_levels(
+            summary['enrollment_percentage'], summary['avg_monthly_enrollment']
+        )
+
+        return summary[[
+            'site_number', 'site_name', 'target_enrollment', 'current_enrollment',
+            'enrollment_percentage', 'screen_failure_rate', 'avg_monthly_enrollment',
+            'days_since_activation', 'risk_level'
+        ]]
+
     def _get_region_from_state(self, state: str) -> str:
         """Map state to region"""
         east_coast = ['NY', 'MA', 'FL', 'NC', 'VA']
         west_coast = ['CA', 'WA', 'OR']
-        
+
         if state in east_coast:
             return 'East Coast'
         elif state in west_coast:
             return 'West Coast'
         else:
             return 'Midwest/South'
-    
+
     def _calculate_risk_level(self, enrollment_percentage: float, avg_monthly_enrollment: float) -> str:
         """Calculate risk level based on enrollment metrics"""
         if enrollment_percentage < 50 or avg_monthly_enrollment < 2:
@@ -209,11 +315,27 @@ class CTMSDataProcessor:
             return 'Medium'
         else:
             return 'Low'
-    
+
+    def _calculate_risk_levels(self, enrollment_percentage: pd.Series,
+                               avg_monthly_enrollment: pd.Series) -> np.ndarray:
+        """Vectorized _calculate_risk_level"""
+        return np.select(
+            [
+                (enrollment_percentage < 50) | (avg_monthly_enrollment < 2),
+                (enrollment_percentage < 75) | (avg_monthly_enrollment < 4)
+            ],
+            ['High', 'Medium'],
+            default='Low'
+        )
+
+    def get_frames(self) -> Dict[str, pd.DataFrame]:
+        """Get the processed tables as DataFrames, one column per model field"""
+        return self._frames
+
     def get_processed_data(self) -> Dict:
         """Get all processed data"""
         return self._processed_data
-    
+
     def process_all(self) -> Dict:
         """Process all data and return summaries"""
         self.load_csv_files()
@@ -222,5 +344,5 @@ class CTMSDataProcessor:
         self.process_subjects()
         self.process_enrollment_metrics()
         self.calculate_enrollment_summaries()
-        
-        return self.get_processed_data()
\ No newline at end of file
+
+        return self.get_processed_data()
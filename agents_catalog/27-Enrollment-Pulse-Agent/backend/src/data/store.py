@@ -0,0 +1,264 @@
+"""
+Shared, incrementally refreshed store of processed CTMS data
+
+The API and the agent tools read the same store, so each process holds one copy of
+the processed data. A refresh fingerprints the CTMS CSV files and re-ingests only
+the tables whose content changed: rows appended to the end of a file are parsed on
+their own, other edits re-parse that table. Enrollment summaries are recalculated
+only for the sites whose sites or subject rows changed.
+
+Readers take a snapshot and use it for the whole request. A refresh builds a new
+snapshot next to the current one and swaps it in with a single assignment, so
+readers never see a half-refreshed state.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import pandas as pd
+
+from .processors import CTMSDataProcessor, PROCESSED_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Bytes hashed at a time when fingerprinting a CSV file
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class FileFingerprint(NamedTuple):
+    """Size, modification time and content hash of a CSV file"""
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+@dataclass(frozen=True)
+class CTMSSnapshot:
+    """An immutable version of the processed CTMS data"""
+    version: int
+    data: Dict
+    frames: Dict[str, pd.DataFrame]
+    fingerprints: Dict[str, FileFingerprint]
+    summary_date: Optional[date] = None
+    refreshed_at: datetime = field(default_factory=datetime.now)
+    # Results derived from this snapshot's data, e.g. its analyzer, shared by all readers
+    derived: Dict = field(default_factory=dict, compare=False, repr=False)
+
+    @cached_property
+    def etag(self) -> str:
+        """
+        Content hash of the snapshot; the same in every process serving the same CSV
+        files on the same day
+        """
+        digest = hashlib.sha256(str(self.summary_date).encode())
+        for table in sorted(self.fingerprints):
+            digest.update(f"{table}:{self.fingerprints[table].sha256}".encode())
+        return digest.hexdigest()[:20]
+
+
+@dataclass
+class RefreshResult:
+    """What a refresh changed"""
+    version: int
+    changed_tables: List[str]
+    appended_tables: List[str]
+    affected_sites: List[str]
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.changed_tables)
+
+
+def _hash_file(path: Path, limit: Optional[int] = None) -> str:
+    """SHA-256 of a file, or of its first limit bytes"""
+    digest = hashlib.sha256()
+    remaining = limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(HASH_CHUNK_SIZE if remaining is None else min(HASH_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_file(path: Path, previous: Optional[FileFingerprint] = None) -> Optional[FileFingerprint]:
+    """
+    Fingerprint a CSV file, or return None if it doesn't exist.
+
+    The file is only hashed when its size or modification time differs from the
+    previous fingerprint.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if previous and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+        return previous
+    return FileFingerprint(stat.st_size, stat.st_mtime_ns, _hash_file(path))
+
+
+def _changed_sites(previous: Optional[pd.DataFrame], current: Optional[pd.DataFrame]) -> Set[str]:
+    """Site numbers of the rows added to, removed from or changed between two frames"""
+    if previous is None or current is None:
+        frame = current if previous is None else previous
+        return set() if frame is None else set(frame['site_number'])
+
+    previous_hashes = pd.util.hash_pandas_object(previous, index=False)
+    current_hashes = pd.util.hash_pandas_object(current, index=False)
+    removed = previous['site_number'][~previous_hashes.isin(current_hashes)]
+    added = current['site_number'][~current_hashes.isin(previous_hashes)]
+    return set(removed) | set(added)
+
+
+class CTMSDataStore:
+    """Processed CTMS data of a directory of CSV exports, refreshed incrementally"""
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = Path(data_dir)
+        self._snapshot = CTMSSnapshot(version=0, data={}, frames={}, fingerprints={})
+        self._refresh_lock = threading.Lock()
+
+    def snapshot(self) -> CTMSSnapshot:
+        """The current snapshot, loading the data on first use"""
+        snapshot = self._snapshot
+        if snapshot.version == 0:
+            self.refresh()
+            snapshot = self._snapshot
+        return snapshot
+
+    def get_data(self) -> Dict:
+        """Processed data of the current snapshot, keyed like CTMSDataProcessor.process_all()"""
+        return self.snapshot().data
+
+    def _read_appended_rows(self, path: Path, previous: FileFingerprint,
+                            current: FileFingerprint) -> Optional[pd.DataFrame]:
+        """
+        Rows appended to a CSV file since its previous fingerprint, or None if the
+        file was changed in any other way.
+        """
+        if current.size <= previous.size or _hash_file(path, previous.size) != previous.sha256:
+            return None
+        with open(path, 'rb') as f:
+            header = f.readline()
+            f.seek(previous.size - 1)
+            if f.read(1) != b'\n':
+                return None
+            appended = f.read()
+        if len(header) > previous.size:
+            return None
+        return pd.read_csv(io.BytesIO(header + appended))
+
+    def refresh(self, force: bool = False) -> RefreshResult:
+        """
+        Re-ingest the CTMS tables whose CSV files changed and swap in a new snapshot.
+
+        Args:
+            force: Re-process every table, whether or not its file changed
+
+        Returns:
+            RefreshResult: The new snapshot version and what changed
+        """
+        with self._refresh_lock:
+            previous = self._snapshot
+            fingerprints = {}
+            for table in PROCESSED_TABLES:
+                fingerprint = fingerprint_file(
+                    self.data_dir / f"{table}.csv", previous.fingerprints.get(table)
+                )
+                if fingerprint:
+                    fingerprints[table] = fingerprint
+
+            changed = [
+                table for table in PROCESSED_TABLES
+                if force or previous.version == 0
+                or _content(fingerprints.get(table)) != _content(previous.fingerprints.get(table))
+            ]
+            # Days since activation moves with the calendar, so every site is recalculated daily
+            stale_summaries = force or previous.summary_date != date.today()
+
+            if not changed and not stale_summaries:
+                if fingerprints != previous.fingerprints:
+                    # Files were touched without changing their content
+                    self._snapshot = replace(previous, fingerprints=fingerprints)
+                return RefreshResult(previous.version, [], [], [])
+
+            processor = CTMSDataProcessor(data_dir=str(self.data_dir))
+            processor.load_frames(previous.frames, previous.data)
+
+            affected_sites: Set[str] = set()
+            appended = []
+            for table in changed:
+                key = PROCESSED_TABLES[table][0]
+                old_frame = previous.frames.get(key)
+                path = self.data_dir / f"{table}.csv"
+
+                if table not in fingerprints:
+                    processor.remove_table(table)
+                    new_frame = None
+                else:
+                    rows = None
+                    if not force and old_frame is not None and table in previous.fingerprints:
+                        rows = self._read_appended_rows(
+                            path, previous.fingerprints[table], fingerprints[table]
+                        )
+                    if rows is not None:
+                        processor.append_rows(table, rows)
+                        appended.append(table)
+                        logger.info(f"Appended {len(rows)} rows to {table}")
+                    else:
+                        processor.load_csv_file(table)
+                        processor.process_table(table)
+                    new_frame = processor.get_frames().get(key)
+
+                if table in ('site', 'subject'):
+                    if table in appended:
+                        affected_sites |= set(new_frame['site_number'].iloc[len(old_frame):])
+                    else:
+                        affected_sites |= _changed_sites(old_frame, new_frame)
+
+            if stale_summaries:
+                processor.calculate_enrollment_summaries()
+            elif affected_sites:
+                processor.calculate_enrollment_summaries(affected_sites)
+
+            snapshot = CTMSSnapshot(
+                version=previous.version + 1,
+                data=processor.get_processed_data(),
+                frames=processor.get_frames(),
+                fingerprints=fingerprints,
+                summary_date=date.today()
+            )
+            self._snapshot = snapshot
+
+            logger.info(
+                f"CTMS data snapshot {snapshot.version}: changed tables {changed}, "
+                f"affected sites {sorted(affected_sites)}"
+            )
+            return RefreshResult(snapshot.version, changed, appended, sorted(affected_sites))
+
+
+def _content(fingerprint: Optional[FileFingerprint]) -> Optional[Tuple[int, str]]:
+    return (fingerprint.size, fingerprint.sha256) if fingerprint else None
+
+
+_stores: Dict[str, CTMSDataStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_ctms_store(data_dir: str = "data") -> CTMSDataStore:
+    """The process-wide store of a CTMS data directory"""
+    key = os.path.abspath(data_dir)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = CTMSDataStore(data_dir)
+        return _stores[key]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for CTMS data processing
+
+Generates synthetic CTMS exports of increasing size (same columns as the files in
+backend/data) and times the columnar ingest, the per-site summaries and the lazy
+materialization of Subject models separately.
+
+Usage:
+    python tests/benchmark_data_processing.py [--subjects 1000 10000 100000]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Set up backend environment
+from test_helper import setup_backend_environment
+setup_backend_environment()
+
+from src.data.processors import CTMSDataProcessor, SITE_MAPPING, CTMS_DATE_FORMAT
+
+
+SUBJECTS_PER_SITE = 25
+STATUSES = ['Randomized', 'Active', 'Screen Failed', 'Screening', 'Discontinued']
+STATUS_WEIGHTS = [0.55, 0.1, 0.2, 0.1, 0.05]
+STATES = ['NY', 'MA', 'TX', 'CA', 'MN', 'FL', 'WA', 'IL']
+
+
+def write_synthetic_export(data_dir: Path, n_subjects: int, seed: int = 0) -> None:
+    """Write study, site, subject and enrollment_metric CSVs for n_subjects subjects"""
+    rng = np.random.default_rng(seed)
+    n_sites = max(1, n_subjects // SUBJECTS_PER_SITE)
+    site_ids = list(SITE_MAPPING)
+
+    pd.DataFrame([{
+        'study_number': 'ONCO-2025-117', 'study_name': 'ONCO-2025-117', 'phase': 'Phase 2',
+        'indication': 'Triple-Negative Breast Cancer', 'status': 'Active',
+        'enrollment_start_date': '10/1/2024', 'enrollment_end_date': '10/1/2025',
+        'total_planned_subjects': n_subjects
+    }]).to_csv(data_dir / 'study.csv', index=False)
+
+    activated = pd.Timestamp('2024-10-01') + pd.to_timedelta(rng.integers(0, 60, n_sites), unit='D')
+    pd.DataFrame({
+        'site_number': np.arange(1, n_sites + 1),
+        'site_name': [f'Site {i}' for i in range(1, n_sites + 1)],
+        'status': 'Active',
+        'state_province': rng.choice(STATES, n_sites),
+        'country': 'United States',
+        'site_activated_date': activated.strftime(CTMS_DATE_FORMAT),
+        'enrollment_target': rng.integers(15, 35, n_sites)
+    }).to_csv(data_dir / 'site.csv', index=False)
+
+    site_numbers = rng.integers(1, n_sites + 1, n_subjects)
+    statuses = rng.choice(STATUSES, n_subjects, p=STATUS_WEIGHTS)
+    screen_dates = pd.Timestamp('2024-10-01') + pd.to_timedelta(rng.integers(0, 300, n_subjects), unit='D')
+    enrolled = np.isin(statuses, ['Randomized', 'Active'])
+    enrollment_dates = (screen_dates + pd.Timedelta(days=7)).strftime(CTMS_DATE_FORMAT)
+    randomization_dates = (screen_dates + pd.Timedelta(days=8)).strftime(CTMS_DATE_FORMAT)
+    pd.DataFrame({
+        'subject_id': [f'{site:03d}-{i:06d}' for i, site in enumerate(site_numbers)],
+        'status': statuses,
+        'screen_date': screen_dates.strftime(CTMS_DATE_FORMAT),
+        'enrollment_date': np.where(enrolled, enrollment_dates, None),
+        'randomization_date': np.where(enrolled, randomization_dates, None),
+        'screen_failure_reason': np.where(statuses == 'Screen Failed', 'Exclusion Criterion #4 - Prior treatment', None)
+    }).to_csv(data_dir / 'subject.csv', index=False)
+
+    n_metrics = n_sites * 12
+    metric_dates = pd.date_range('2024-10-31', periods=12, freq='ME').strftime(CTMS_DATE_FORMAT)
+    pd.DataFrame({
+        'site': rng.choice(site_ids, n_metrics),
+        'metric_date': np.tile(metric_dates, n_sites),
+        'screened_count': rng.integers(0, 5, n_metrics),
+        'enrolled_count': rng.integers(0, 4, n_metrics),
+        'randomized_count': rng.integers(0, 4, n_metrics),
+        'screen_failure_count': rng.integers(0, 2, n_metrics)
+    }).to_csv(data_dir / 'enrollment_metric.csv', index=False)
+
+
+def time_call(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def benchmark(n_subjects: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        write_synthetic_export(data_dir, n_subjects)
+
+        processor = CTMSDataProcessor(data_dir=str(data_dir))
+        processor.load_csv_files()
+        _, ingest = time_call(lambda: (
+            processor.process_studies(),
+            processor.process_sites(),
+            processor.process_subjects(),
+            processor.process_enrollment_metrics()
+        ))
+        summaries, summarize = time_call(processor.calculate_enrollment_summaries)
+        _, materialize = time_call(processor.get_processed_data()['subjects'].materialize)
+
+    return {
+        'subjects': n_subjects,
+        'sites': len(summaries),
+        'ingest_ms': ingest * 1000,
+        'summaries_ms': summarize * 1000,
+        'materialize_ms': materialize * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CTMS data processing")
+    parser.add_argument('--subjects', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Synthetic export sizes, in subjects")
+    args = parser.parse_args()
+
+    print("⏱️  Benchmarking CTMS Data Processing...")
+    print("=" * 50)
+
+    results = [benchmark(n) for n in args.subjects]
+
+    print(f"\n{'Subjects':>10} {'Sites':>7} {'Ingest (ms)':>12} {'Summaries (ms)':>15} {'Models (ms)':>12}")
+    for r in results:
+        print(f"{r['subjects']:>10} {r['sites']:>7} {r['ingest_ms']:>12.1f} "
+              f"{r['summaries_ms']:>15.1f} {r['materialize_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local ClinicalTrials.gov mirror (no network access needed)
+
+Usage:
+    python -m pytest tests/test_clinical_trials_mirror.py
+"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+# Set up backend environment
+from test_helper import setup_backend_environment
+setup_backend_environment()
+
+from src.agent import live_clinical_trials_tools
+from src.data import clinical_trials_mirror
+from src.data.clinical_trials_mirror import ClinicalTrialsMirror
+from src.data.clinicaltrials_api_client import ClinicalTrialsAPIClient
+
+
+def make_study(number, condition='Breast Cancer', status='RECRUITING', phases=('PHASE2',),
+               sponsor_class='INDUSTRY', countries=('United States',),
+               intervention='Pembrolizumab', updated='2025-01-01'):
+    return {'protocolSection': {
+        'identificationModule': {'nctId': f'NCT{number:08d}', 'briefTitle': f'Study {number}'},
+        'statusModule': {
+            'overallStatus': status,
+            'startDateStruct': {'date': '2025-03-01'},
+            'lastUpdatePostDateStruct': {'date': updated}
+        },
+        'designModule': {
+            'phases': list(phases),
+            'enrollmentInfo': {'count': 100, 'type': 'ESTIMATED'}
+        },
+        'sponsorCollaboratorsModule': {'leadSponsor': {'name': 'Merck', 'class': sponsor_class}},
+        'conditionsModule': {'conditions': [condition, 'Neoplasms']},
+        'armsInterventionsModule': {'interventions': [{'type': 'DRUG', 'name': intervention}]},
+        'contactsLocationsModule': {'locations': [
+            {'facility': f'Site {i}', 'city': 'Boston', 'country': country, 'status': 'RECRUITING'}
+            for i, country in enumerate(countries)
+        ]}
+    }}
+
+
+class FakeClient(ClinicalTrialsAPIClient):
+    """API client answering condition searches from a list of studies, a few per page"""
+
+    def __init__(self, studies, page_size=3):
+        super().__init__()
+        self.studies = studies
+        self.page_size = page_size
+        self.requests = []
+        self.offline = False
+
+    def search_studies(self, condition=None, updated_since=None, page_token=None, **kwargs):
+        self.requests.append({'condition': condition, 'updated_since': updated_since,
+                              'page_token': page_token})
+        if self.offline:
+            raise ConnectionError("ClinicalTrials.gov is unreachable")
+        matches = [
+            study for study in self.studies
+            if condition.lower() in study['protocolSection']['conditionsModule']['conditions'][0].lower()
+            and (not updated_since
+                 or study['protocolSection']['statusModule']['lastUpdatePostDateStruct']['date'] >= updated_since)
+        ]
+        start = int(page_token or 0)
+        page = {'studies': matches[start:start + self.page_size]}
+        if start + self.page_size < len(matches):
+            page['nextPageToken'] = str(start + self.page_size)
+        return page
+
+
+@pytest.fixture
+def client():
+    return FakeClient([
+        make_study(1, status='RECRUITING', phases=('PHASE1', 'PHASE2'), countries=('France',),
+                   intervention='Olaparib', updated='2025-03-01'),
+        make_study(2, status='COMPLETED', sponsor_class='OTHER', updated='2025-02-01'),
+        make_study(3, countries=('United States', 'Canada'), updated='2025-01-01'),
+        make_study(4, phases=('PHASE3',), sponsor_class='OTHER', updated='2024-12-01'),
+        make_study(5, status='ACTIVE_NOT_RECRUITING', countries=(), updated='2024-11-01'),
+        make_study(6, condition='Lung Cancer')
+    ])
+
+
+@pytest.fixture
+def mirror(client):
+    return ClinicalTrialsMirror(client=client, path=None, max_age=3600)
+
+
+def set_synced_at(mirror, condition, synced_at):
+    snapshot = mirror.snapshot()
+    scopes = dict(snapshot.scopes)
+    scopes[condition] = scopes[condition]._replace(synced_at=synced_at)
+    mirror._snapshot = clinical_trials_mirror.MirrorSnapshot(
+        snapshot.version, snapshot.studies, snapshot.locations, scopes
+    )
+
+
+def test_first_sync_downloads_every_page(mirror, client):
+    result = mirror.sync('Breast Cancer')
+
+    assert result.full
+    assert result.studies_synced == 5
+    assert [request['page_token'] for request in client.requests] == [None, '3']
+    assert all(request['updated_since'] is None for request in client.requests)
+    assert mirror.has_condition('  breast   CANCER ')
+    assert not mirror.has_condition('Lung Cancer')
+
+
+def test_incremental_sync_merges_updated_studies(mirror, client):
+    mirror.sync('Breast Cancer')
+    set_synced_at(mirror, 'breast cancer', datetime(2026, 1, 10, 12))
+    client.studies[1] = make_study(2, status='TERMINATED', updated='2026-01-10')
+    client.studies.append(make_study(7, updated='2026-01-11'))
+    client.requests.clear()
+
+    result = mirror.sync('Breast Cancer')
+
+    assert not result.full
+    assert client.requests[0]['updated_since'] == '2026-01-09'
+    assert result.studies_synced == 2
+    assert result.condition_studies == 6
+    studies = mirror.snapshot().find('breast cancer').set_index('nct_id')
+    assert len(studies) == 6
+    assert studies.loc['NCT00000002', 'status'] == 'TERMINATED'
+    # Updated studies replace their previous rows, locations included
+    assert len(mirror.snapshot().locations_of(['NCT00000002'])) == 1
+
+
+def test_full_sync_drops_studies_no_longer_matching(mirror, client):
+    mirror.sync('Breast Cancer')
+    del client.studies[0]
+
+    result = mirror.sync('Breast Cancer', full=True)
+
+    assert result.condition_studies == 4
+    assert 'NCT00000001' not in set(mirror.snapshot().find('breast cancer')['nct_id'])
+
+
+def test_only_if_expired_skips_fresh_conditions(mirror, client):
+    mirror.sync('Breast Cancer')
+    client.requests.clear()
+
+    result = mirror.sync('breast cancer', only_if_expired=True)
+
+    assert result.studies_synced == 0
+    assert client.requests == []
+
+
+def test_condition_scope_and_condition_index(mirror):
+    mirror.sync('Breast Cancer')
+    snapshot = mirror.snapshot()
+
+    # A synced condition answers with the studies its search returned
+    assert len(snapshot.find('Breast Cancer')) == 5
+    # Other conditions fall back to the studies listing them
+    assert len(snapshot.find('neoplasms')) == 5
+    assert snapshot.find('Lung Cancer').empty
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'status': 'recruiting'}, ['NCT00000001', 'NCT00000003', 'NCT00000004']),
+    ({'status': ['COMPLETED', 'ACTIVE_NOT_RECRUITING']}, ['NCT00000002', 'NCT00000005']),
+    ({'phase': 'PHASE1'}, ['NCT00000001']),
+    ({'phase': 'phase2', 'status': 'RECRUITING'}, ['NCT00000001', 'NCT00000003']),
+    ({'sponsor_class': 'other'}, ['NCT00000002', 'NCT00000004']),
+    ({'country': 'Canada'}, ['NCT00000003']),
+    ({'country': 'United States', 'sponsor_class': 'INDUSTRY'}, ['NCT00000003']),
+    ({'intervention': 'olap'}, ['NCT00000001']),
+    ({'intervention': 'pembro', 'country': 'France'}, []),
+])
+def test_find_filters(mirror, filters, expected):
+    mirror.sync('Breast Cancer')
+
+    # Most recently updated first
+    assert list(mirror.snapshot().find('Breast Cancer', **filters)['nct_id']) == expected
+
+
+def test_query_limits_results(mirror):
+    query = mirror.query('Breast Cancer', limit=2, status='RECRUITING')
+
+    assert query.total_found == 3
+    assert list(query.studies['nct_id']) == ['NCT00000001', 'NCT00000003']
+    assert not query.stale
+    assert list(query.locations()['country']) == ['France', 'United States', 'Canada']
+
+
+def test_query_answers_from_expired_mirror_when_api_fails(mirror, client):
+    mirror.sync('Breast Cancer')
+    synced_at = datetime.now() - timedelta(days=2)
+    set_synced_at(mirror, 'breast cancer', synced_at)
+    client.offline = True
+
+    query = mirror.query('Breast Cancer')
+
+    assert query.stale
+    assert query.total_found == 5
+    assert query.freshness()['synced_at'] == synced_at.isoformat()
+    with pytest.raises(ConnectionError):
+        mirror.query('Lung Cancer')
+
+
+def test_saved_mirror_is_loaded(client, tmp_path):
+    path = tmp_path / 'mirror.pkl'
+    ClinicalTrialsMirror(client=client, path=str(path)).sync('Breast Cancer')
+    client.requests.clear()
+
+    reloaded = ClinicalTrialsMirror(client=client, path=str(path), max_age=3600)
+    query = reloaded.query('breast cancer', phase='PHASE2')
+
+    assert client.requests == []
+    assert list(query.studies['nct_id']) == ['NCT00000001', 'NCT00000002', 'NCT00000003', 'NCT00000005']
+
+
+def test_background_syncs_are_not_duplicated(mirror, client):
+    release = threading.Event()
+    iter_pages = client.iter_pages
+
+    def slow_iter_pages(**kwargs):
+        release.wait(5)
+        return iter_pages(**kwargs)
+
+    client.iter_pages = slow_iter_pages
+    assert mirror.sync_in_background('Breast Cancer')
+    assert not mirror.sync_in_background('breast cancer')
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name.startswith('mirror-sync-'):
+            thread.join(5)
+
+    assert mirror.has_condition('Breast Cancer')
+    assert len(client.requests) == 2
+
+
+def test_search_tool_uses_api_until_condition_is_mirrored(mirror, client, monkeypatch):
+    monkeypatch.setattr(live_clinical_trials_tools, 'get_clinical_trials_mirror', lambda: mirror)
+    monkeypatch.setattr(live_clinical_trials_tools, 'get_api_client', lambda: client)
+    synced = threading.Event()
+    monkeypatch.setattr(mirror, 'sync_in_background', lambda condition: synced.set())
+
+    result = live_clinical_trials_tools.search_live_clinical_trials(condition='Breast Cancer', max_results=2)
+
+    # One API request answers the search while the condition is synced in the background
+    assert synced.is_set()
+    assert len(client.requests) == 1
+    assert 'data_freshness' not in result
+
+    mirror.sync('Breast Cancer')
+    client.requests.clear()
+    result = live_clinical_trials_tools.search_live_clinical_trials(condition='Breast Cancer', max_results=2)
+
+    assert client.requests == []
+    assert result['total_found'] == 5
+    assert [study['nct_id'] for study in result['studies']] == ['NCT00000001', 'NCT00000002']
+
+
+def test_conditions_sync_concurrently(mirror, client):
+    release = threading.Event()
+    iter_pages = client.iter_pages
+
+    def blocking_iter_pages(**kwargs):
+        if kwargs['condition'] == 'Breast Cancer':
+            release.wait(5)
+        return iter_pages(**kwargs)
+
+    client.iter_pages = blocking_iter_pages
+    breast_cancer = threading.Thread(target=mirror.sync, args=('Breast Cancer',))
+    breast_cancer.start()
+
+    # Lung cancer is synced while the breast cancer download is still waiting
+    result = mirror.sync('Lung Cancer')
+    assert result.condition_studies == 1
+    assert not mirror.has_condition('Breast Cancer')
+
+    release.set()
+    breast_cancer.join(5)
+    # Neither sync replaced the other's studies
+    assert mirror.has_condition('Lung Cancer') and mirror.has_condition('Breast Cancer')
+    assert len(mirror.snapshot().studies) == 6
+
+
+def test_tools_use_api_until_condition_is_mirrored(mirror, client, monkeypatch):
+    monkeypatch.setattr(live_clinical_trials_tools, 'get_clinical_trials_mirror', lambda: mirror)
+    synced = []
+    monkeypatch.setattr(mirror, 'sync_in_background', synced.append)
+
+    landscape = live_clinical_trials_tools.analyze_live_competitive_landscape(
+        condition='Breast Cancer', max_studies=2
+    )
+    by_location = live_clinical_trials_tools.find_recruiting_trials_by_location(
+        condition='Breast Cancer', country='United States'
+    )
+
+    # Each tool answers from the API while the condition is synced in the background
+    assert synced == ['Breast Cancer', 'Breast Cancer']
+    assert [request['page_token'] for request in client.requests] == [None, '3'] * 2
+    assert not mirror.has_condition('Breast Cancer')
+    assert landscape['overview']['total_studies'] == 2
+    assert landscape['data_freshness']['source'] == 'ClinicalTrials.gov API'
+    assert [trial['nct_id'] for trial in by_location['results']['trials']] == ['NCT00000003', 'NCT00000004']
+
+    mirror.sync('Breast Cancer')
+    client.requests.clear()
+    landscape = live_clinical_trials_tools.analyze_live_competitive_landscape(
+        condition='Breast Cancer', max_studies=2
+    )
+
+    assert client.requests == []
+    assert len(synced) == 2
+    assert landscape['data_freshness']['source'] == 'local mirror of ClinicalTrials.gov'
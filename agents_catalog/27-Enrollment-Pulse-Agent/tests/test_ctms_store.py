@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the incrementally refreshed CTMS data store: after each kind of CSV
+change, an incremental refresh must match processing every file from scratch
+
+Usage:
+    python -m pytest tests/test_ctms_store.py
+"""
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Set up backend environment
+from test_helper import setup_backend_environment
+setup_backend_environment()
+
+from src.analysis.enrollment_metrics import get_enrollment_analyzer
+from src.data.processors import CTMSDataProcessor
+from src.data.store import CTMSDataStore
+
+NEW_SUBJECTS = [
+    "a0H5f000000KzZ1EAK,002-099,0125f000000QS3EAAW,002-099,a0C5f000000JtSAEA0,a0B5f000000XmGrEAK,"
+    "Randomized,5/1/2025,5/8/2025,5/9/2025,,5/1/2025,,,61,Female",
+    "a0H5f000000KzZ2EAK,004-099,0125f000000QS3EAAW,004-099,a0C5f000000JtSCEA0,a0B5f000000XmGrEAK,"
+    "Screen Failed,5/2/2025,,,Exclusion Criterion #2 - Lab values,5/2/2025,5/9/2025,,57,Female",
+]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    backend_data = Path(__file__).parent.parent / 'backend' / 'data'
+    return Path(shutil.copytree(backend_data, tmp_path / 'data'))
+
+
+def assert_matches_full_processing(store, data_dir):
+    """The store's processed tables equal those of a from-scratch process_all()"""
+    processor = CTMSDataProcessor(data_dir=str(data_dir))
+    processor.process_all()
+    expected = processor.get_frames()
+    frames = store.snapshot().frames
+
+    assert sorted(frames) == sorted(expected)
+    for key, frame in expected.items():
+        pd.testing.assert_frame_equal(frames[key], frame, check_dtype=False, obj=key)
+
+
+def test_appended_rows_are_parsed_on_their_own(data_dir):
+    store = CTMSDataStore(str(data_dir))
+    store.snapshot()
+    with open(data_dir / 'subject.csv', 'a', newline='') as f:
+        f.write('\r\n'.join(NEW_SUBJECTS) + '\r\n')
+
+    result = store.refresh()
+
+    assert result.changed_tables == ['subject']
+    assert result.appended_tables == ['subject']
+    assert result.affected_sites == ['2', '4']
+    assert_matches_full_processing(store, data_dir)
+
+
+def test_edited_file_is_reprocessed(data_dir):
+    store = CTMSDataStore(str(data_dir))
+    store.snapshot()
+    path = data_dir / 'subject.csv'
+    content = path.read_bytes()
+    edited = content.replace(b'001-002,a0C5f000000JtS9EAK,a0B5f000000XmGrEAK,Screen Failed,',
+                             b'001-002,a0C5f000000JtS9EAK,a0B5f000000XmGrEAK,Randomized,')
+    assert edited != content
+    path.write_bytes(edited)
+
+    result = store.refresh()
+
+    assert result.changed_tables == ['subject']
+    assert result.appended_tables == []
+    assert result.affected_sites == ['1']
+    assert_matches_full_processing(store, data_dir)
+
+
+def test_edited_site_changes_its_summary_only(data_dir):
+    store = CTMSDataStore(str(data_dir))
+    store.snapshot()
+    path = data_dir / 'site.csv'
+    path.write_bytes(path.read_bytes().replace(b',9/30/2025,20,9,45', b',9/30/2025,40,9,45'))
+
+    result = store.refresh()
+
+    assert result.changed_tables == ['site']
+    assert result.affected_sites == ['4']
+    assert_matches_full_processing(store, data_dir)
+
+
+def test_removed_file_drops_its_table(data_dir):
+    store = CTMSDataStore(str(data_dir))
+    store.snapshot()
+    (data_dir / 'subject.csv').unlink()
+
+    result = store.refresh()
+
+    assert result.changed_tables == ['subject']
+    assert 'subjects' not in store.get_data()
+    assert 'enrollment_summaries' not in store.get_data()
+    assert_matches_full_processing(store, data_dir)
+    # The analytics still answer, with no subjects or summaries
+    status = get_enrollment_analyzer(store.snapshot()).get_overall_enrollment_status()
+    assert status['total_screened'] == 0
+    assert status['total_target'] == 0
+
+
+def test_unchanged_files_keep_the_snapshot(data_dir):
+    store = CTMSDataStore(str(data_dir))
+    snapshot = store.snapshot()
+    (data_dir / 'subject.csv').touch()
+
+    result = store.refresh()
+
+    assert not result.changed
+    assert store.snapshot().version == snapshot.version
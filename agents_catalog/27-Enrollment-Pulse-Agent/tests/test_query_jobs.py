@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the agent query job runner (no AWS access needed)
+
+Usage:
+    python -m pytest tests/test_query_jobs.py
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+# Set up backend environment
+from test_helper import setup_backend_environment
+setup_backend_environment()
+
+from src.agent import query_jobs
+from src.agent.query_jobs import (
+    CANCELLED, COMPLETED, FAILED, JobQueueFullError, QueryJobRunner, SQLiteJobStore
+)
+
+
+def wait_for(runner, job_id, timeout=5.0):
+    return asyncio.run(runner.wait(job_id, timeout))
+
+
+class BlockingQuery:
+    """Agent stand-in that streams a token, then waits until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = 0
+
+    def __call__(self, question, callback_handler=None):
+        self.calls += 1
+        callback_handler(data="partial ")
+        self.started.set()
+        while not self.release.wait(0.01):
+            callback_handler()
+        callback_handler(data="answer")
+        return f"answer to {question}"
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return SQLiteJobStore(str(tmp_path / 'jobs.sqlite3')) if request.param == 'sqlite' else None
+
+
+def test_fast_failing_jobs_do_not_deadlock(store):
+    def failing_query(question, callback_handler=None):
+        raise RuntimeError("Unable to locate credentials")
+
+    runner = QueryJobRunner(failing_query, store=store, workers=2, queue_size=2)
+    result = {}
+
+    def submit_many():
+        for i in range(300):
+            job = runner.submit(f"question {i}")
+            result[i] = wait_for(runner, job.job_id)
+
+    thread = threading.Thread(target=submit_many, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), "submit() deadlocked"
+    assert all(job.status == FAILED for job in result.values())
+    assert "credentials" in result[299].error
+
+
+def test_identical_questions_join_one_job(store):
+    query = BlockingQuery()
+    runner = QueryJobRunner(query, store=store, workers=1, queue_size=1)
+
+    first = runner.submit("How is site 101 doing?")
+    second = runner.submit("  how is SITE 101 doing? ")
+    assert second.job_id == first.job_id
+
+    query.release.set()
+    job = wait_for(runner, first.job_id)
+    assert job.status == COMPLETED
+    assert job.answer == "answer to How is site 101 doing?"
+    assert query.calls == 1
+
+
+def test_full_queue_rejects_new_questions(store):
+    query = BlockingQuery()
+    runner = QueryJobRunner(query, store=store, workers=1, queue_size=1)
+
+    running = runner.submit("question 1")
+    queued = runner.submit("question 2")
+    with pytest.raises(JobQueueFullError):
+        runner.submit("question 3")
+    # Questions already in flight are still served
+    assert runner.submit("question 2").job_id == queued.job_id
+
+    query.release.set()
+    assert wait_for(runner, running.job_id).status == COMPLETED
+    assert wait_for(runner, queued.job_id).status == COMPLETED
+    assert wait_for(runner, runner.submit("question 3").job_id).status == COMPLETED
+
+
+def test_cancel_running_and_queued_jobs(store):
+    query = BlockingQuery()
+    runner = QueryJobRunner(query, store=store, workers=1, queue_size=1)
+
+    running = runner.submit("question 1")
+    queued = runner.submit("question 2")
+    assert query.started.wait(5)
+    assert runner.running_job(running.job_id).read() == ["partial "]
+
+    assert runner.cancel(queued.job_id).status == CANCELLED
+    assert runner.cancel(running.job_id).status == CANCELLED
+    assert wait_for(runner, running.job_id).status == CANCELLED
+    assert wait_for(runner, queued.job_id).status == CANCELLED
+    # The queued job never started
+    assert query.calls == 1
+
+
+def test_slow_running_job_is_not_treated_as_lost(store, monkeypatch):
+    monkeypatch.setattr(query_jobs, 'STALE_JOB_SECONDS', 0.5)
+    monkeypatch.setattr(query_jobs, 'HEARTBEAT_INTERVAL', 0.05)
+    query = BlockingQuery()
+    runner = QueryJobRunner(query, store=store, workers=2, queue_size=0)
+
+    first = runner.submit("question 1")
+    assert query.started.wait(5)
+    time.sleep(1.0)
+    # Still running past STALE_JOB_SECONDS, so the same question joins it
+    assert runner.submit("question 1").job_id == first.job_id
+
+    query.release.set()
+    assert wait_for(runner, first.job_id).status == COMPLETED
+    assert query.calls == 1
@@ -30,6 +30,9 @@ def create_database_lambda_zip():
         # Copy function files
         shutil.copy("lambda-database/python/lambda_function.py", temp_path / "lambda_function.py")
         shutil.copy("lambda-database/python/database.py", temp_path / "database.py")
+        shutil.copy("lambda-database/python/http_client.py", temp_path / "http_client.py")
+        shutil.copy("lambda-database/python/schema_registry.py", temp_path / "schema_registry.py")
+        shutil.copy("lambda-database/python/translation_cache.py", temp_path / "translation_cache.py")
         
         # Copy schema files if they exist
         schema_dir = Path("lambda-database/python/schema_db")
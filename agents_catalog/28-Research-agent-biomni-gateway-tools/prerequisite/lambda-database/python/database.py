@@ -1,12 +1,19 @@
 #This script is adapted from Biomni https://github.com/snap-stanford/Biomni/blob/main/biomni/tool/database.py and have removed the following commercial license tools 'kegg', 'iucn', and 'remap'. It invokes Amazon Bedrock LLMs directly with the converse API. Note, this script depends upon you setting up the schema folder under 'schema_db'
 import json
+import logging
 import sys
 import os
 import requests
-import pickle
+import threading
 import time
 from typing import Dict, Any, List
 
+import http_client
+from schema_registry import registry as schema_registry
+from translation_cache import create_translation_cache
+
+logger = logging.getLogger(__name__)
+
 # Add the layer paths
 sys.path.append('/opt/python')
 
@@ -18,26 +25,61 @@ except ImportError as e:
     print(f"Warning: Bedrock imports not available: {e}")
     BEDROCK_AVAILABLE = False
 
+# Mark the schema system prompt as a Bedrock prompt cache point
+BEDROCK_PROMPT_CACHING = os.environ.get("BEDROCK_PROMPT_CACHING", "true").lower() == "true"
+
+_bedrock_client = None
+
 def get_bedrock_client():
-    """Get Bedrock runtime client for database queries."""
+    """Get the Bedrock runtime client for database queries, created once per container."""
+    global _bedrock_client
     if not BEDROCK_AVAILABLE:
         return None
+    if _bedrock_client is not None:
+        return _bedrock_client
     
     session = boto3.session.Session()
     region = session.region_name
     
     try:
-        return boto3.client("bedrock-runtime", region_name=region)
+        _bedrock_client = boto3.client("bedrock-runtime", region_name=region)
+        return _bedrock_client
     except Exception as e:
         print(f"Error creating Bedrock client: {e}")
         return None
 
-def invoke_bedrock_model(client, model_id, system_prompt, user_message, max_tokens=2000, temperature=0, top_p=0.9):
-    """Invoke Bedrock model using Converse API."""
+# Prompt -> API call translations, reused across invocations
+translation_cache = create_translation_cache(get_bedrock_client)
+
+# Translation used by the REST call in progress on this thread, so its outcome can be recorded
+_translation_context = threading.local()
+
+def reset_translation_tracking():
+    """Forget the pending translation of this thread (called at the start of each invocation)."""
+    _translation_context.pending = None
+
+def _record_translation_outcome(succeeded):
+    """Record the outcome of the first REST call made from the pending translation."""
+    pending = getattr(_translation_context, "pending", None)
+    if pending is None or translation_cache is None:
+        return
+    _translation_context.pending = None
+    translation_cache.record_outcome(*pending, succeeded)
+
+def invoke_bedrock_model(client, model_id, system_prompt, user_message, max_tokens=2000, temperature=0, top_p=0.9,
+                         cache_system_prompt=False):
+    """Invoke Bedrock model using Converse API.
+
+    With cache_system_prompt, a cache point follows the system prompt so the static
+    schema prefix is served from the Bedrock prompt cache on repeated calls.
+    """
+    system = [{"text": system_prompt}]
+    if cache_system_prompt:
+        system.append({"cachePoint": {"type": "default"}})
     try:
         response = client.converse(
             modelId=model_id,
-            system=[{"text": system_prompt}],
+            system=system,
             messages=[
                 {
                     "role": "user",
@@ -54,43 +96,56 @@ def invoke_bedrock_model(client, model_id, system_prompt, user_message, max_toke
                 "topP": top_p
             }
         )
-        print('response is')
-        print(response)
+        usage = response['usage']
         result = response['output']['message']['content'][0]['text'] \
         + '\n--- Latency: ' + str(response['metrics']['latencyMs']) \
-        + 'ms - Input tokens:' + str(response['usage']['inputTokens']) \
-        + ' - Output tokens:' + str(response['usage']['outputTokens']) + ' ---\n'
-        print('result is ')
-        print(result)
+        + 'ms - Input tokens:' + str(usage['inputTokens']) \
+        + ' - Output tokens:' + str(usage['outputTokens']) + ' ---\n'
+        print(f"Model {model_id}: latency {response['metrics']['latencyMs']}ms, "
+              f"input tokens {usage['inputTokens']}, cache read {usage.get('cacheReadInputTokens', 0)}, "
+              f"cache write {usage.get('cacheWriteInputTokens', 0)}, output tokens {usage['outputTokens']}")
         return result
         
     except Exception as e:
         print(f"Model invocation error: {e}")
         return None
 
-def _query_llm_for_api(prompt, schema, system_template, model="global.anthropic.claude-sonnet-4-20250514-v1:0"):
-    """Query Bedrock for generating API calls using direct Converse API."""
+def _query_llm_for_api(prompt, schema=None, system_template=None, model="global.anthropic.claude-sonnet-4-20250514-v1:0",
+                       schema_name=None, schema_required=True):
+    """Query Bedrock for generating API calls using direct Converse API.
+
+    Pass `schema_name` to use a schema from the registry; its system prompt is rendered
+    once per container and marked for Bedrock prompt caching. An explicit `schema`
+    object is rendered on every call.
+    """
+    reset_translation_tracking()
+    namespace = None
+    if translation_cache is not None:
+        namespace = translation_cache.namespace(schema_name, system_template)
+        entry, match = translation_cache.lookup(namespace, prompt)
+        if entry is not None:
+            print(f"Translation cache hit ({match}) for {schema_name or 'inline'} prompt: {prompt}")
+            _translation_context.pending = (namespace, translation_cache.prompt_key(entry["prompt"]))
+            return {"success": True, "data": entry["data"], "raw_response": entry["raw_response"], "cached": match}
+
     client = get_bedrock_client()
     if not client:
         return {
             "success": False,
             "error": "Bedrock client not available"
         }
-    
-    print('****')
-    print(schema)
 
     try:
         # Format the system prompt with the schema
-        if schema is not None:
+        if schema_name is not None:
+            system_prompt = schema_registry.system_prompt(schema_name, system_template, required=schema_required)
+        elif schema is not None:
             schema_json = json.dumps(schema, indent=2)
             system_prompt = system_template.format(schema=schema_json)
         else:
             system_prompt = system_template
         
-        # Create full prompt
-        full_prompt = f"{system_prompt}\n\nUser: {prompt}\n\nAssistant:"
-        print(full_prompt)
+        print(f"Translating prompt with {schema_name or 'inline'} schema ({len(system_prompt)} chars): {prompt}")
 
         # Use direct Bedrock Converse API
         claude_text = invoke_bedrock_model(
@@ -98,9 +153,9 @@ def _query_llm_for_api(prompt, schema, system_template, model="global.anthropic.
             model_id=model,
             system_prompt=system_prompt,
             user_message=prompt,
-            #prompt=full_prompt,
             max_tokens=4096,
-            temperature=0.7
+            temperature=0,
+            cache_system_prompt=BEDROCK_PROMPT_CACHING and schema_name is not None
         )
 
         if claude_text is None:
@@ -122,13 +177,14 @@ def _query_llm_for_api(prompt, schema, system_template, model="global.anthropic.
             result = json.loads(json_text)
         else:
             result = json.loads(claude_text)
-        print('result is ')
-        print(result)
+        logger.debug("Translation: %s", http_client.truncate(json.dumps(result, default=str)))
+        if namespace is not None:
+            prompt_key = translation_cache.put(namespace, prompt, result, claude_text)
+            _translation_context.pending = (namespace, prompt_key)
         return {"success": True, "data": result, "raw_response": claude_text}
         
     except Exception as e:
-        print("error")
-        print(str(e))
+        logger.warning("Error translating prompt: %s", http_client.truncate(e))
         return {
             "success": False,
             "error": f"Error querying Bedrock: {str(e)}",
@@ -167,13 +223,12 @@ def _query_rest_api(endpoint, method="GET", params=None, headers=None, json_data
     try:
         # Make the API request
         if method.upper() == "GET":
-            response = requests.get(endpoint, params=params, headers=headers)
+            response = http_client.get(endpoint, params=params, headers=headers)
         elif method.upper() == "POST":
-            response = requests.post(endpoint, params=params, headers=headers, json=json_data)
+            response = http_client.post(endpoint, params=params, headers=headers, json=json_data)
         else:
             return {"error": f"Unsupported HTTP method: {method}"}
-        print('response text')
-        print(str(response.text))
+        http_client.log_response(response)
         url_error = str(response.text)
         response.raise_for_status()
 
@@ -184,6 +239,7 @@ def _query_rest_api(endpoint, method="GET", params=None, headers=None, json_data
             # Return raw text if not JSON
             result = {"raw_text": response.text}
 
+        _record_translation_outcome(True)
         return {
             "success": True,
             "query_info": {
@@ -213,6 +269,7 @@ def _query_rest_api(endpoint, method="GET", params=None, headers=None, json_data
             except Exception:
                 response_text = e.response.text
 
+        _record_translation_outcome(False)
         return {
             "success": False,
             "error": f"API error: {error_msg}",
@@ -225,6 +282,7 @@ def _query_rest_api(endpoint, method="GET", params=None, headers=None, json_data
             "response_text": response_text,
         }
     except Exception as e:
+        _record_translation_outcome(False)
         return {
             "success": False,
             "error": f"Error: {str(e)}",
@@ -518,11 +576,6 @@ def query_uniprot(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load UniProt schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "uniprot.pkl")
-        with open(schema_path, "rb") as f:
-            uniprot_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a protein biology expert specialized in using the UniProt REST API.
@@ -550,7 +603,7 @@ def query_uniprot(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=uniprot_schema,
+            schema_name="uniprot",
             system_template=system_template,
         )
 
@@ -641,7 +694,7 @@ def query_alphafold(
 
     try:
         # Make the API request
-        response = requests.get(url)
+        response = http_client.get(url)
         response.raise_for_status()
 
         # Parse the response as JSON
@@ -664,7 +717,7 @@ def query_alphafold(
             download_url = f"https://alphafold.ebi.ac.uk/files/{filename}"
 
             # Download the file
-            download_response = requests.get(download_url)
+            download_response = http_client.get(download_url)
             if download_response.status_code == 200:
                 with open(file_path, "wb") as f:
                     f.write(download_response.content)
@@ -766,11 +819,6 @@ def query_interpro(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load InterPro schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "interpro.pkl")
-        with open(schema_path, "rb") as f:
-            interpro_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a protein domain expert specialized in using the InterPro REST API.
@@ -797,7 +845,7 @@ def query_interpro(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=interpro_schema,
+            schema_name="interpro",
             system_template=system_template,
         )
 
@@ -869,12 +917,6 @@ def query_pdb(
 
     # Generate search query from natural language if prompt is provided and query is not
     if prompt and not query:
-        # Load schema from pickle file
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "pdb.pkl")
-
-        with open(schema_path, "rb") as f:
-            schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a structural biology expert that creates precise RCSB PDB Search API queries based on natural language requests.
@@ -906,7 +948,7 @@ def query_pdb(
         # Query Claude to generate the search query
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=schema,
+            schema_name="pdb",
             system_template=system_template,
         )
 
@@ -1003,7 +1045,7 @@ def query_pdb_identifiers(identifiers, return_type="entry", download=False, attr
                     data_url = f"https://data.rcsb.org/rest/v1/core/chem_comp/{identifier}"
 
                 # Fetch data
-                data_response = requests.get(data_url)
+                data_response = http_client.get(data_url)
                 data_response.raise_for_status()
                 entity_data = data_response.json()
 
@@ -1042,7 +1084,7 @@ def query_pdb_identifiers(identifiers, return_type="entry", download=False, attr
                 try:
                     # Download PDB file
                     pdb_url = f"https://files.rcsb.org/download/{pdb_id}.pdb"
-                    pdb_response = requests.get(pdb_url)
+                    pdb_response = http_client.get(pdb_url)
 
                     if pdb_response.status_code == 200:
                         # Create data directory if it doesn't exist
@@ -1107,11 +1149,6 @@ def query_stringdb(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load STRING schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "stringdb.pkl")
-        with open(schema_path, "rb") as f:
-            stringdb_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a protein interaction expert specialized in using the STRING database API.
@@ -1138,7 +1175,7 @@ def query_stringdb(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=stringdb_schema,
+            schema_name="stringdb",
             system_template=system_template,
         )
 
@@ -1176,7 +1213,7 @@ def query_stringdb(
         if download_image:
             # For images, we need to handle the download manually
             try:
-                response = requests.get(endpoint, stream=True)
+                response = http_client.get(endpoint, stream=True)
                 response.raise_for_status()
 
                 # Create output directory if needed
@@ -1271,11 +1308,6 @@ def query_paleobiology(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load PBDB schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "pbdb.pkl")
-        with open(schema_path, "rb") as f:
-            pbdb_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a paleobiology expert specialized in using the Paleobiology Database (PBDB) API.
@@ -1303,7 +1335,7 @@ def query_paleobiology(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=pbdb_schema,
+            schema_name="pbdb",
             system_template=system_template,
         )
 
@@ -1334,7 +1366,7 @@ def query_paleobiology(
     if is_image:
         # For image queries, we need special handling
         try:
-            response = requests.get(endpoint)
+            response = http_client.get(endpoint)
             response.raise_for_status()
 
             # Return image metadata without the binary data
@@ -1399,11 +1431,6 @@ def query_jaspar(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load JASPAR schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "jaspar.pkl")
-        with open(schema_path, "rb") as f:
-            jaspar_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a transcription factor binding site expert specialized in using the JASPAR REST API.
@@ -1429,7 +1456,7 @@ def query_jaspar(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=jaspar_schema,
+            schema_name="jaspar",
             system_template=system_template,
         )
 
@@ -1503,11 +1530,6 @@ def query_worms(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load WoRMS schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "worms.pkl")
-        with open(schema_path, "rb") as f:
-            worms_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a marine biology expert specialized in using the World Register of Marine Species (WoRMS) API.
@@ -1534,7 +1556,7 @@ def query_worms(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=worms_schema,
+            schema_name="worms",
             system_template=system_template,
         )
 
@@ -1600,11 +1622,6 @@ def query_cbioportal(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load cBioPortal schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "cbioportal.pkl")
-        with open(schema_path, "rb") as f:
-            cbioportal_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a cancer genomics expert specialized in using the cBioPortal REST API.
@@ -1632,7 +1649,7 @@ def query_cbioportal(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=cbioportal_schema,
+            schema_name="cbioportal",
             system_template=system_template,
         )
 
@@ -1692,11 +1709,6 @@ def query_clinvar(
         return {"error": "Either a prompt or an endpoint must be provided"}
 
     if prompt:
-        # Load ClinVar schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "clinvar.pkl")
-        with open(schema_path, "rb") as f:
-            clinvar_schema = pickle.load(f)
-
         # ClinVar system prompt template
         system_prompt_template = """
         You are a genetics research assistant that helps convert natural language queries into structured ClinVar search queries.
@@ -1729,7 +1741,7 @@ def query_clinvar(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=clinvar_schema,
+            schema_name="clinvar",
             system_template=system_prompt_template,
         )
 
@@ -1782,11 +1794,6 @@ def query_geo(
     database = "gds"  # Default database
 
     if prompt:
-        # Load GEO schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "geo.pkl")
-        with open(schema_path, "rb") as f:
-            geo_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a bioinformatics research assistant that helps convert natural language queries into structured GEO (Gene Expression Omnibus) search queries.
@@ -1823,7 +1830,7 @@ def query_geo(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=geo_schema,
+            schema_name="geo",
             system_template=system_template,
         )
 
@@ -1878,11 +1885,6 @@ def query_dbsnp(
         return {"error": "Either a prompt or a search term must be provided"}
 
     if prompt:
-        # Load dbSNP schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "dbsnp.pkl")
-        with open(schema_path, "rb") as f:
-            dbsnp_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a genetics research assistant that helps convert natural language queries into structured dbSNP search queries.
@@ -1912,7 +1914,7 @@ def query_dbsnp(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=dbsnp_schema,
+            schema_name="dbsnp",
             system_template=system_template,
         )
 
@@ -1971,11 +1973,6 @@ def query_ucsc(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load UCSC schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "ucsc.pkl")
-        with open(schema_path, "rb") as f:
-            ucsc_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a genomics expert specialized in using the UCSC Genome Browser API.
@@ -2005,7 +2002,7 @@ def query_ucsc(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=ucsc_schema,
+            schema_name="ucsc",
             system_template=system_template,
         )
 
@@ -2073,11 +2070,6 @@ def query_ensembl(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load Ensembl schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "ensembl.pkl")
-        with open(schema_path, "rb") as f:
-            ensembl_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a genomics and bioinformatics expert specialized in using the Ensembl REST API.
@@ -2107,7 +2099,7 @@ def query_ensembl(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=ensembl_schema,
+            schema_name="ensembl",
             system_template=system_template,
         )
 
@@ -2196,11 +2188,6 @@ def query_opentarget(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load OpenTargets schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "opentarget.pkl")
-        with open(schema_path, "rb") as f:
-            opentarget_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are an expert in translating natural language requests into GraphQL queries for the OpenTargets Platform API.
@@ -2226,7 +2213,7 @@ def query_opentarget(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=opentarget_schema,
+            schema_name="opentarget",
             system_template=system_template,
         )
 
@@ -2294,13 +2281,6 @@ def query_monarch(
 
     # If using prompt, use Claude to generate the endpoint
     if prompt:
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "monarch.pkl")
-        if os.path.exists(schema_path):
-            with open(schema_path, "rb") as f:
-                monarch_schema = pickle.load(f)
-        else:
-            monarch_schema = None
-
         system_template = """
         You are an expert in translating natural language requests into REST API calls for the Monarch Initiative Platform API.
 
@@ -2338,7 +2318,8 @@ def query_monarch(
 
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=monarch_schema,
+            schema_name="monarch",
+            schema_required=False,
             system_template=system_template,
         )
         if not llm_result["success"]:
@@ -2406,19 +2387,13 @@ def query_openfda(
 
     # If using prompt, use Claude or Gemini to generate the endpoint
     if prompt:
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "openfda.pkl")
-        if os.path.exists(schema_path):
-            with open(schema_path, "rb") as f:
-                openfda_schema = pickle.load(f)
-        else:
-            openfda_schema = None
-
         system_template = """
         You are a biomedical informatics expert specialized in using the OpenFDA API.\n\nBased on the user's natural language request, determine the appropriate OpenFDA API endpoint and parameters.\n\nOPENFDA API SCHEMA:\n{schema}\n\nYour response should be a JSON object with the following fields:\n1. \"full_url\": The complete URL to query (including the base URL \"https://api.fda.gov\" and any parameters)\n2. \"description\": A brief description of what the query is doing\n\nSPECIAL NOTES:\n- For drug event queries, use /drug/event.json?search=...\n- For drug label queries, use /drug/label.json?search=...\n- For recall queries, use /drug/enforcement.json?search=...\n- Use max_results to limit the number of returned items if supported (limit=)\n- Always URL-encode search terms\n- Return ONLY the JSON object with no additional text.\n        """
         # Select LLM for prompt translation
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=openfda_schema,
+            schema_name="openfda",
+            schema_required=False,
             system_template=system_template,
         )
         if not llm_result["success"]:
@@ -2626,11 +2601,6 @@ def query_gwas_catalog(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load GWAS Catalog schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "gwas_catalog.pkl")
-        with open(schema_path, "rb") as f:
-            gwas_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a genomics expert specialized in using the GWAS Catalog API.
@@ -2658,7 +2628,7 @@ def query_gwas_catalog(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=gwas_schema,
+            schema_name="gwas_catalog",
             system_template=system_template,
         )
 
@@ -2727,11 +2697,6 @@ def query_gnomad(
 
     # If using prompt, parse with Claude
     if prompt and not gene_symbol:
-        # Load gnomAD schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "gnomad.pkl")
-        with open(schema_path, "rb") as f:
-            gnomad_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a genomics expert specialized in using the gnomAD GraphQL API.
@@ -2759,7 +2724,7 @@ def query_gnomad(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=gnomad_schema,
+            schema_name="gnomad",
             system_template=system_template,
         )
 
@@ -2778,7 +2743,7 @@ def query_gnomad(
     else:
         description = f"Query gnomAD for variants in {gene_symbol}"
         # replace BRCA1 with gene_symbol
-        query_str = gnomad_schema.replace("BRCA1", gene_symbol)
+        query_str = schema_registry.get("gnomad").replace("BRCA1", gene_symbol)
 
     api_result = _query_rest_api(
         endpoint=base_url,
@@ -2837,11 +2802,6 @@ def query_reactome(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load Reactome schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "reactome.pkl")
-        with open(schema_path, "rb") as f:
-            reactome_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a bioinformatics expert specialized in using the Reactome API.
@@ -2870,7 +2830,7 @@ def query_reactome(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=reactome_schema,
+            schema_name="reactome",
             system_template=system_template,
         )
 
@@ -2937,7 +2897,7 @@ def query_reactome(
         if pathway_id and output_dir:
             diagram_url = f"{content_base_url}/data/pathway/{pathway_id}/diagram"
             try:
-                diagram_response = requests.get(diagram_url)
+                diagram_response = http_client.get(diagram_url)
                 diagram_response.raise_for_status()
 
                 # Save diagram file
@@ -3075,11 +3035,6 @@ def query_pride(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load PRIDE schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "pride.pkl")
-        with open(schema_path, "rb") as f:
-            pride_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a proteomics expert specialized in using the PRIDE API.
@@ -3106,7 +3061,7 @@ def query_pride(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=pride_schema,
+            schema_name="pride",
             system_template=system_template,
         )
 
@@ -3174,11 +3129,6 @@ def query_gtopdb(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load GtoPdb schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "gtopdb.pkl")
-        with open(schema_path, "rb") as f:
-            gtopdb_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = r"""
         You are a pharmacology expert specialized in using the Guide to PHARMACOLOGY API.
@@ -3206,7 +3156,7 @@ def query_gtopdb(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=gtopdb_schema,
+            schema_name="gtopdb",
             system_template=system_template,
         )
 
@@ -3276,7 +3226,7 @@ def region_to_ccre_screen(coord_chrom: str, coord_start: int, coord_end: int, as
         steps.append(str(data))
 
         # Make the request
-        response = requests.post(url, json=data)
+        response = http_client.post(url, json=data)
 
         # Check if the response is successful
         if not response.ok:
@@ -3375,7 +3325,7 @@ def get_genes_near_ccre(accession: str, assembly: str, chromosome: str, k: int =
     data = {"accession": accession, "assembly": assembly, "coord_chrom": chromosome}
 
     steps_log += "Sending POST request to API with given data.\n"
-    response = requests.post(url, json=data)
+    response = http_client.post(url, json=data)
 
     if not response.ok:
         steps_log += f"API request failed with response: {response.text}\n"
@@ -3444,11 +3394,6 @@ def query_mpd(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load MPD schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "mpd.pkl")
-        with open(schema_path, "rb") as f:
-            mpd_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a mouse genetics expert specialized in using the Mouse Phenome Database (MPD) API.
@@ -3475,7 +3420,7 @@ def query_mpd(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=mpd_schema,
+            schema_name="mpd",
             system_template=system_template,
         )
 
@@ -3545,11 +3490,6 @@ def query_emdb(
 
     # If using prompt, parse with Claude
     if prompt:
-        # Load EMDB schema
-        schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "emdb.pkl")
-        with open(schema_path, "rb") as f:
-            emdb_schema = pickle.load(f)
-
         # Create system prompt template
         system_template = """
         You are a structural biology expert specialized in using the Electron Microscopy Data Bank (EMDB) API.
@@ -3578,7 +3518,7 @@ def query_emdb(
         # Query Claude to generate the API call
         llm_result = _query_llm_for_api(
             prompt=prompt,
-            schema=emdb_schema,
+            schema_name="emdb",
             system_template=system_template,
         )
 
@@ -0,0 +1,394 @@
+"""Shared HTTP layer for the database query tools.
+
+All REST calls from database.py go through this module, which provides:
+
+- a module-level requests Session with per-host keep-alive connection pools, so
+  connections persist across warm Lambda invocations
+- retries with exponential backoff on 429/5xx responses, honoring Retry-After
+- per-host rate limiting (NCBI E-utilities and Ensembl publish request limits)
+- an HTTP cache for GET requests that honors Cache-Control and revalidates with
+  ETag / Last-Modified, falling back to a TTL when the server sends no caching
+  headers; entries are kept in memory and optionally in a /tmp disk tier, both
+  size-capped with least recently used entries evicted first
+- bounded response logging
+
+Configuration (environment variables):
+    HTTP_TIMEOUT_SECONDS: connect/read timeout (default 30)
+    HTTP_MAX_RETRIES: retries for failed requests (default 3)
+    HTTP_CACHE_TTL_SECONDS: TTL for responses without caching headers (default 3600, 0 disables caching)
+    HTTP_CACHE_MAX_MB: in-memory cache size (default 64)
+    HTTP_CACHE_DIR: disk cache directory (default /tmp/biomni-http-cache, empty disables)
+    HTTP_CACHE_DISK_MAX_MB: disk cache size (default 256)
+    HTTP_LOG_MAX_CHARS: response body characters written to the log (default 500)
+    NCBI_API_KEY: raises the NCBI rate limit from 3 to 10 requests per second
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+HTTP_TIMEOUT_SECONDS = float(os.environ.get("HTTP_TIMEOUT_SECONDS", "30"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+HTTP_CACHE_TTL_SECONDS = int(os.environ.get("HTTP_CACHE_TTL_SECONDS", "3600"))
+HTTP_CACHE_MAX_MB = int(os.environ.get("HTTP_CACHE_MAX_MB", "64"))
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", "/tmp/biomni-http-cache")
+HTTP_CACHE_DISK_MAX_MB = int(os.environ.get("HTTP_CACHE_DISK_MAX_MB", "256"))
+HTTP_LOG_MAX_CHARS = int(os.environ.get("HTTP_LOG_MAX_CHARS", "500"))
+POOL_MAXSIZE = 10
+
+# Requests per second allowed per host
+HOST_RATE_LIMITS = {
+    "eutils.ncbi.nlm.nih.gov": 10.0 if os.environ.get("NCBI_API_KEY") else 3.0,
+    "rest.ensembl.org": 15.0,
+    "grch37.rest.ensembl.org": 15.0,
+}
+
+# Fraction of the disk cap the disk tier is trimmed to once it is exceeded
+DISK_EVICTION_TARGET = 0.9
+
+# Response headers kept with cached entries
+CACHED_HEADERS = ("Content-Type", "Content-Encoding", "ETag", "Last-Modified", "Cache-Control", "Expires")
+
+
+class RateLimiter:
+    """Per-host limiter that spaces requests to at most `rate` per second."""
+
+    def __init__(self, rates=None):
+        self.rates = dict(rates or {})
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        rate = self.rates.get(host)
+        if not rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + 1.0 / rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+def _cache_control(headers):
+    """Parse a Cache-Control header into a dict of directive -> value (or True)."""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') if value else True
+    return directives
+
+
+def freshness_lifetime(headers, default_ttl):
+    """Seconds a response may be served without revalidation, or None if it must not be stored."""
+    directives = _cache_control(headers)
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(0, int(directives[name]))
+            except ValueError:
+                break
+    if "Expires" in headers:
+        try:
+            return max(0, int(parsedate_to_datetime(headers["Expires"]).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return 0
+    return default_ttl
+
+
+class HTTPCache:
+    """Two-tier (memory LRU + optional disk) cache of GET responses."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, cache_dir=None, disk_max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError as e:
+                print(f"HTTP disk cache disabled: {e}")
+                self.cache_dir = None
+        if self.cache_dir:
+            # Entries written by earlier invocations of a warm container count towards the cap
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    @staticmethod
+    def make_key(url, params=None, headers=None):
+        accept = (headers or {}).get("Accept", "")
+        payload = json.dumps([url, sorted((params or {}).items()), accept], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _disk_files(self):
+        """(mtime, size, path) of each file in the disk tier."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = self._path(name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def get(self, key):
+        """Return the entry for `key` (possibly stale), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                entry = pickle.load(f)  # nosec - entries are written by this module only
+            # The modification time orders disk evictions, so reads count as use
+            os.utime(self._path(key))
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        if self.cache_dir:
+            self._write(key, entry)
+
+    def _write(self, key, entry):
+        data = pickle.dumps(entry)
+        if len(data) > self.disk_max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write HTTP cache entry: {e}")
+            return
+        with self._disk_lock:
+            self._disk_bytes += len(data) - replaced
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete the least recently used disk entries until the tier is below its target size."""
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * DISK_EVICTION_TARGET
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_bytes = total
+
+    def _remember(self, key, entry):
+        size = len(entry["content"])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old["content"])
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted["content"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+        with self._disk_lock:
+            self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "disk_bytes": self._disk_bytes,
+                "hits": self.hits,
+                "revalidations": self.revalidations,
+                "misses": self.misses,
+            }
+
+
+def _build_session():
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Module-level state lives for the lifetime of the Lambda execution environment
+session = _build_session()
+rate_limiter = RateLimiter(HOST_RATE_LIMITS)
+cache = HTTPCache(
+    max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024,
+    cache_dir=HTTP_CACHE_DIR or None,
+    disk_max_bytes=HTTP_CACHE_DISK_MAX_MB * 1024 * 1024,
+)
+
+
+def _response_from_entry(entry, url):
+    response = requests.Response()
+    response.status_code = entry["status_code"]
+    response._content = entry["content"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.url = entry.get("url", url)
+    response.encoding = entry.get("encoding")
+    response.from_cache = True
+    return response
+
+
+def _entry_from_response(response, lifetime):
+    return {
+        "status_code": response.status_code,
+        "content": response.content,
+        "headers": {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers},
+        "url": response.url,
+        "encoding": response.encoding,
+        "expires_at": time.time() + lifetime,
+    }
+
+
+def truncate(text, max_chars=None):
+    """Shorten text for logging to at most `max_chars` characters (default HTTP_LOG_MAX_CHARS)."""
+    max_chars = HTTP_LOG_MAX_CHARS if max_chars is None else max_chars
+    text = str(text)
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + f"... [{len(text) - max_chars} more chars]"
+
+
+def log_response(response, max_chars=None):
+    """Log status, size and the start of the body of a response."""
+    max_chars = HTTP_LOG_MAX_CHARS if max_chars is None else max_chars
+    source = " (cached)" if getattr(response, "from_cache", False) else ""
+    size = len(response.content) if response.content is not None else 0
+    print(f"HTTP {response.status_code} {response.url} [{size} bytes]{source}")
+    content_type = response.headers.get("Content-Type", "")
+    if max_chars > 0 and re.search(r"json|text|xml", content_type):
+        print(truncate(response.text, max_chars))
+
+
+def _send(method, url, timeout, **kwargs):
+    rate_limiter.wait(urlsplit(url).hostname)
+    return session.request(method, url, timeout=timeout, **kwargs)
+
+
+def request(method, url, params=None, headers=None, json=None, data=None, timeout=None, stream=False,
+            use_cache=True):
+    """Send an HTTP request through the shared session.
+
+    GET requests are served from the cache while fresh, and revalidated with
+    If-None-Match / If-Modified-Since once stale. Other methods and streamed
+    requests always go to the network.
+
+    Returns
+    -------
+    requests.Response: the response; `response.from_cache` is True when it was served locally
+
+    """
+    method = method.upper()
+    timeout = HTTP_TIMEOUT_SECONDS if timeout is None else timeout
+    cacheable = use_cache and method == "GET" and not stream and HTTP_CACHE_TTL_SECONDS > 0
+
+    if not cacheable:
+        response = _send(method, url, timeout, params=params, headers=headers, json=json, data=data, stream=stream)
+        response.from_cache = False
+        return response
+
+    key = cache.make_key(url, params, headers)
+    entry = cache.get(key)
+    if entry is not None and entry["expires_at"] > time.time():
+        cache.hits += 1
+        return _response_from_entry(entry, url)
+
+    request_headers = dict(headers or {})
+    if entry is not None:
+        if "ETag" in entry["headers"]:
+            request_headers["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            request_headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+    response = _send(method, url, timeout, params=params, headers=request_headers)
+
+    if response.status_code == 304 and entry is not None:
+        cache.revalidations += 1
+        lifetime = freshness_lifetime(response.headers, HTTP_CACHE_TTL_SECONDS) or 0
+        entry = dict(entry, expires_at=time.time() + lifetime)
+        cache.put(key, entry)
+        return _response_from_entry(entry, url)
+
+    cache.misses += 1
+    response.from_cache = False
+    if response.status_code == 200:
+        lifetime = freshness_lifetime(response.headers, HTTP_CACHE_TTL_SECONDS)
+        if lifetime is not None and (lifetime > 0 or "ETag" in response.headers or "Last-Modified" in response.headers):
+            cache.put(key, _entry_from_response(response, lifetime))
+    return response
+
+
+def get(url, params=None, **kwargs):
+    """GET through the shared session and cache."""
+    return request("GET", url, params=params, **kwargs)
+
+
+def post(url, params=None, json=None, **kwargs):
+    """POST through the shared session (never cached)."""
+    return request("POST", url, params=params, json=json, **kwargs)
@@ -1,6 +1,9 @@
+import copy
 import json
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the current directory to the path to import database functions
 sys.path.append(os.path.dirname(__file__))
@@ -34,16 +37,147 @@ from database import (
     query_gtopdb,
     query_mpd,
     query_emdb,
-    query_synapse
+    query_synapse,
+    reset_translation_tracking
 )
 
+# Tool name -> (function, {argument: default}); arguments are read from the event
+TOOLS = {
+    'query_uniprot': (query_uniprot, {'prompt': None, 'endpoint': None, 'max_results': 5}),
+    'query_alphafold': (query_alphafold, {
+        'uniprot_id': None, 'endpoint': 'prediction', 'residue_range': None, 'download': False,
+        'output_dir': None, 'file_format': 'pdb', 'model_version': 'v4', 'model_number': 1
+    }),
+    'query_interpro': (query_interpro, {'prompt': None, 'endpoint': None}),
+    'query_pdb': (query_pdb, {'prompt': None, 'query': None}),
+    'query_pdb_identifiers': (query_pdb_identifiers, {
+        'identifiers': None, 'return_type': 'entry', 'download': False, 'attributes': None
+    }),
+    'query_stringdb': (query_stringdb, {'prompt': None, 'endpoint': None}),
+    'query_paleobiology': (query_paleobiology, {'prompt': None, 'endpoint': None}),
+    'query_jaspar': (query_jaspar, {'prompt': None, 'endpoint': None}),
+    'query_worms': (query_worms, {'prompt': None, 'endpoint': None}),
+    'query_cbioportal': (query_cbioportal, {'prompt': None, 'endpoint': None}),
+    'query_clinvar': (query_clinvar, {'prompt': None, 'search_term': None}),
+    'query_geo': (query_geo, {'prompt': None, 'search_term': None}),
+    'query_dbsnp': (query_dbsnp, {'prompt': None, 'search_term': None}),
+    'query_ucsc': (query_ucsc, {'prompt': None, 'endpoint': None}),
+    'query_ensembl': (query_ensembl, {'prompt': None, 'endpoint': None}),
+    'query_opentarget': (query_opentarget, {'prompt': None, 'query': None}),
+    'query_monarch': (query_monarch, {'prompt': None, 'endpoint': None}),
+    'query_openfda': (query_openfda, {'prompt': None, 'endpoint': None}),
+    'query_clinicaltrials': (query_clinicaltrials, {'prompt': None, 'endpoint': None}),
+    'query_gwas_catalog': (query_gwas_catalog, {'prompt': None, 'endpoint': None}),
+    'query_gnomad': (query_gnomad, {'prompt': None, 'gene_symbol': None, 'variant_id': None}),
+    'query_reactome': (query_reactome, {'prompt': None, 'endpoint': None}),
+    'query_regulomedb': (query_regulomedb, {'prompt': None, 'endpoint': None}),
+    'query_pride': (query_pride, {'prompt': None, 'endpoint': None}),
+    'query_gtopdb': (query_gtopdb, {'prompt': None, 'endpoint': None}),
+    'query_mpd': (query_mpd, {'prompt': None, 'endpoint': None}),
+    'query_emdb': (query_emdb, {'prompt': None, 'endpoint': None}),
+    'query_synapse': (query_synapse, {
+        'prompt': None, 'query_term': None, 'return_fields': ["name", "node_type", "description"],
+        'max_results': 20, 'query_type': 'file', 'verbose': True
+    }),
+}
+
+# Batch tool limits
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '8'))
+
+
+def strip_tool_prefix(tool_name):
+    """Remove the gateway target prefix ('<target>___') from a tool name"""
+    delimiter = "___"
+    if delimiter in tool_name:
+        tool_name = tool_name[tool_name.index(delimiter) + len(delimiter):]
+    return tool_name
+
+
+def dispatch(tool_name, arguments):
+    """Call a database tool with its arguments, filling in the tool's defaults"""
+    function, defaults = TOOLS[tool_name]
+    return function(**{name: arguments.get(name, copy.deepcopy(default)) for name, default in defaults.items()})
+
+
+def _run_batch_item(tool_name, arguments):
+    """Run one batch item on a worker thread and time it"""
+    reset_translation_tracking()
+    start = time.perf_counter()
+    try:
+        result = dispatch(tool_name, arguments)
+        item = {'success': not (isinstance(result, dict) and 'error' in result), 'result': result}
+    except Exception as e:
+        item = {'success': False, 'error': f'{type(e).__name__}: {str(e)}'}
+    item['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return item
+
+
+def query_batch(requests, max_workers=None):
+    """
+    Run several database tool requests concurrently.
+
+    Args:
+        requests: List of {"tool": <tool name>, "args": {...}}
+        max_workers: Concurrent requests (capped at BATCH_MAX_WORKERS)
+
+    Returns:
+        dict: Per-request results in request order, each with success, result or error and
+        elapsed_ms; identical requests run once and are marked with duplicate_of
+    """
+    if not isinstance(requests, list) or not requests:
+        return {'error': 'requests must be a non-empty list of {"tool": ..., "args": {...}}'}
+    if len(requests) > BATCH_MAX_REQUESTS:
+        return {'error': f'At most {BATCH_MAX_REQUESTS} requests are allowed per batch, got {len(requests)}'}
+
+    start = time.perf_counter()
+    items = [None] * len(requests)
+    first_index = {}
+    unique = []
+    for index, request in enumerate(requests):
+        tool_name = strip_tool_prefix(str(request.get('tool', ''))) if isinstance(request, dict) else ''
+        arguments = (request.get('args') or {}) if isinstance(request, dict) else {}
+        if tool_name not in TOOLS:
+            items[index] = {'index': index, 'tool': tool_name, 'success': False, 'error': f'Unknown tool: {tool_name}'}
+            continue
+        key = json.dumps([tool_name, arguments], sort_keys=True, default=str)
+        if key in first_index:
+            items[index] = {'index': index, 'tool': tool_name, 'duplicate_of': first_index[key]}
+            continue
+        first_index[key] = index
+        unique.append((index, tool_name, arguments))
+
+    workers = max(1, min(max_workers or BATCH_MAX_WORKERS, BATCH_MAX_WORKERS, len(unique) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(index, tool_name, executor.submit(_run_batch_item, tool_name, arguments))
+                   for index, tool_name, arguments in unique]
+        for index, tool_name, future in futures:
+            items[index] = {'index': index, 'tool': tool_name, **future.result()}
+
+    # Duplicates share the result of the first identical request
+    for item in items:
+        if 'duplicate_of' in item:
+            original = items[item['duplicate_of']]
+            item.update({key: value for key, value in original.items() if key not in ('index', 'tool')})
+
+    return {
+        'batch_size': len(requests),
+        'unique_requests': len(unique),
+        'succeeded': sum(1 for item in items if item.get('success')),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        'results': items
+    }
+
+
 def lambda_handler(event, context):
     """
     Lambda handler for the Database Gateway.
     
     This function routes requests to the appropriate database query function
-    based on the tool name specified in the context.
+    based on the tool name specified in the context. The query_batch tool runs
+    several tool requests concurrently in one invocation.
     """
+    reset_translation_tracking()
     try:
         # Get the tool name from the context
         tool_name = context.client_context.custom['bedrockAgentCoreToolName']
@@ -51,182 +185,21 @@ def lambda_handler(event, context):
         print(f"Event: {event}")
         
         # Remove any prefix from tool name if present
-        delimiter = "___"
-        if delimiter in tool_name:
-            tool_name = tool_name[tool_name.index(delimiter) + len(delimiter):]
+        tool_name = strip_tool_prefix(tool_name)
         
         print(f"Processed tool name: {tool_name}")
         
         # Route to the appropriate function based on tool name
-        if tool_name == 'query_uniprot':
-            result = query_uniprot(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint'),
-                max_results=event.get('max_results', 5)
-            )
-        elif tool_name == 'query_alphafold':
-            result = query_alphafold(
-                uniprot_id=event.get('uniprot_id'),
-                endpoint=event.get('endpoint', 'prediction'),
-                residue_range=event.get('residue_range'),
-                download=event.get('download', False),
-                output_dir=event.get('output_dir'),
-                file_format=event.get('file_format', 'pdb'),
-                model_version=event.get('model_version', 'v4'),
-                model_number=event.get('model_number', 1)
-            )
-        elif tool_name == 'query_interpro':
-            result = query_interpro(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_pdb':
-            result = query_pdb(
-                prompt=event.get('prompt'),
-                query=event.get('query')
-            )
-        elif tool_name == 'query_pdb_identifiers':
-            result = query_pdb_identifiers(
-                identifiers=event.get('identifiers'),
-                return_type=event.get('return_type', 'entry'),
-                download=event.get('download', False),
-                attributes=event.get('attributes')
-            )
-        elif tool_name == 'query_stringdb':
-            result = query_stringdb(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_paleobiology':
-            result = query_paleobiology(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_jaspar':
-            result = query_jaspar(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_worms':
-            result = query_worms(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_cbioportal':
-            result = query_cbioportal(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_clinvar':
-            result = query_clinvar(
-                prompt=event.get('prompt'),
-                search_term=event.get('search_term')
-            )
-        elif tool_name == 'query_geo':
-            result = query_geo(
-                prompt=event.get('prompt'),
-                search_term=event.get('search_term')
-            )
-        elif tool_name == 'query_dbsnp':
-            result = query_dbsnp(
-                prompt=event.get('prompt'),
-                search_term=event.get('search_term')
-            )
-        elif tool_name == 'query_ucsc':
-            result = query_ucsc(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_ensembl':
-            result = query_ensembl(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_opentarget':
-            result = query_opentarget(
-                prompt=event.get('prompt'),
-                query=event.get('query')
-            )
-        elif tool_name == 'query_monarch':
-            result = query_monarch(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_openfda':
-            result = query_openfda(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_clinicaltrials':
-            result = query_clinicaltrials(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_gwas_catalog':
-            result = query_gwas_catalog(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_gnomad':
-            result = query_gnomad(
-                prompt=event.get('prompt'),
-                gene_symbol=event.get('gene_symbol'),
-                variant_id=event.get('variant_id')
-            )
-        elif tool_name == 'query_reactome':
-            result = query_reactome(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_regulomedb':
-            result = query_regulomedb(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_pride':
-            result = query_pride(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_gtopdb':
-            result = query_gtopdb(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_mpd':
-            result = query_mpd(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_emdb':
-            result = query_emdb(
-                prompt=event.get('prompt'),
-                endpoint=event.get('endpoint')
-            )
-        elif tool_name == 'query_synapse':
-            result = query_synapse(
-                prompt=event.get('prompt'),
-                query_term=event.get('query_term'),
-                return_fields=event.get('return_fields', ["name", "node_type", "description"]),
-                max_results=event.get('max_results', 20),
-                query_type=event.get('query_type', 'file'),
-                verbose=event.get('verbose', True)
-            )
+        if tool_name == 'query_batch':
+            result = query_batch(event.get('requests'), max_workers=event.get('max_workers'))
+        elif tool_name in TOOLS:
+            result = dispatch(tool_name, event)
         else:
             return {
                 'statusCode': 400,
                 'body': json.dumps({
                     'error': f'Unknown tool: {tool_name}',
-                    'available_tools': [
-                        'query_uniprot', 'query_alphafold', 'query_interpro', 'query_pdb',
-                        'query_pdb_identifiers', 'query_stringdb', 
-                        'query_paleobiology', 'query_jaspar', 'query_worms', 'query_cbioportal',
-                        'query_clinvar', 'query_geo', 'query_dbsnp', 'query_ucsc', 'query_ensembl',
-                        'query_opentarget', 'query_monarch', 'query_openfda', 'query_clinicaltrials',
-                        'query_gwas_catalog', 'query_gnomad', 'query_reactome', 'query_regulomedb',
-                        'query_pride', 'query_gtopdb',  'query_mpd', 'query_emdb',
-                        'query_synapse'
-                    ]
+                    'available_tools': list(TOOLS) + ['query_batch']
                 })
             }
         print(f"Processed results: {result}")
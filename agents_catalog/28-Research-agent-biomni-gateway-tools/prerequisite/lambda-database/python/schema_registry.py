@@ -0,0 +1,67 @@
+"""Load-once registry of the Biomni API schemas in schema_db/.
+
+Each schema is unpickled the first time a tool needs it and kept for the lifetime
+of the Lambda container, together with the system prompts rendered from it. Nothing
+is loaded at import time, so cold starts do not pay for schemas that are never used.
+"""
+
+import json
+import os
+import pickle
+import threading
+
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), "schema_db")
+
+
+class SchemaRegistry:
+    """Lazily loaded API schemas and their pre-rendered system prompts."""
+
+    def __init__(self, schema_dir=SCHEMA_DIR):
+        self.schema_dir = schema_dir
+        self._schemas = {}
+        self._prompts = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, required=True):
+        """Return the schema stored in schema_db/<name>.pkl.
+
+        Parameters
+        ----------
+        name (str): Schema name, e.g. "uniprot"
+        required (bool): Raise if the schema file is missing; otherwise return None
+
+        """
+        with self._lock:
+            if name in self._schemas:
+                return self._schemas[name]
+            schema_path = os.path.join(self.schema_dir, f"{name}.pkl")
+            if not required and not os.path.exists(schema_path):
+                schema = None
+            else:
+                with open(schema_path, "rb") as f:
+                    schema = pickle.load(f)
+            self._schemas[name] = schema
+            return schema
+
+    def system_prompt(self, name, template, required=True):
+        """Return `template` formatted with the JSON-rendered schema, rendered once per template.
+
+        If the schema is optional and missing, the template is returned unformatted.
+        """
+        key = (name, template)
+        with self._lock:
+            if key in self._prompts:
+                return self._prompts[key]
+        schema = self.get(name, required=required)
+        prompt = template.format(schema=json.dumps(schema, indent=2)) if schema is not None else template
+        with self._lock:
+            self._prompts[key] = prompt
+        return prompt
+
+    def loaded(self):
+        """Names of the schemas loaded so far."""
+        with self._lock:
+            return sorted(self._schemas)
+
+
+registry = SchemaRegistry()
@@ -0,0 +1,330 @@
+"""Cache of natural-language-to-endpoint translations for the database query tools.
+
+The translation of a prompt into an API call (full_url, params, GraphQL query, ...)
+is stored per database and system prompt, keyed on the normalized prompt, together
+with whether the REST call made from it succeeded. Cached translations that worked
+are served without calling the LLM; ones that failed are regenerated.
+
+An optional similarity lookup serves paraphrases: prompts are embedded with a
+Bedrock embedding model and a validated translation is reused when the cosine
+similarity clears the threshold and every word of both prompts other than a
+stopword matches exactly: accessions, gene symbols (in any case) and numbers all
+change the API call.
+
+Entries are kept in memory and persisted to DynamoDB (TRANSLATION_CACHE_TABLE) or,
+when no table is configured, to local disk (TRANSLATION_CACHE_DIR).
+
+DynamoDB table layout: partition key "namespace" (S), sort key "prompt_key" (S).
+"""
+
+import copy
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+TRANSLATION_CACHE_ENABLED = os.environ.get("TRANSLATION_CACHE_ENABLED", "true").lower() == "true"
+TRANSLATION_CACHE_TABLE = os.environ.get("TRANSLATION_CACHE_TABLE", "")
+TRANSLATION_CACHE_DIR = os.environ.get("TRANSLATION_CACHE_DIR", "/tmp/biomni-translation-cache")
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_MAX_ENTRIES", "2048"))
+# Cosine similarity needed to reuse a paraphrase's translation; 0 disables the similarity lookup
+TRANSLATION_SIMILARITY_THRESHOLD = float(os.environ.get("TRANSLATION_SIMILARITY_THRESHOLD", "0"))
+TRANSLATION_EMBEDDING_MODEL = os.environ.get("TRANSLATION_EMBEDDING_MODEL", "amazon.titan-embed-text-v2:0")
+
+LITERAL_PATTERN = re.compile(r"[A-Za-z0-9_:.\-]+")
+
+# Words that carry no meaning for the API call
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "with", "by", "is", "are", "be",
+    "me", "show", "list", "give", "find", "get", "what", "which", "all", "any", "please", "can",
+    "you", "i", "we", "do", "does", "there", "that", "have", "has", "about"
+}
+
+
+def normalize_prompt(prompt):
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", prompt).strip().rstrip("?.!").strip().lower()
+
+
+def literal_terms(prompt):
+    """Terms that must match exactly for two prompts to share a translation.
+
+    Every word that isn't a stopword, since a gene or protein name typed in
+    lowercase ("kras") can't be told apart from other words.
+    """
+    terms = set()
+    for word in LITERAL_PATTERN.findall(prompt.lower()):
+        word = word.strip(".:-")
+        if word and word not in STOPWORDS:
+            terms.add(word.upper())
+    return sorted(terms)
+
+
+def _served(entry):
+    """An entry with its own copy of the translation."""
+    return dict(entry, data=copy.deepcopy(entry["data"]))
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class LocalTranslationStore:
+    """One JSON file per namespace under a local directory (e.g. /tmp in Lambda)."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, namespace):
+        return os.path.join(self.directory, f"{namespace}.json")
+
+    def load_namespace(self, namespace):
+        try:
+            with open(self._path(namespace)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, namespace, prompt_key):
+        return self.load_namespace(namespace).get(prompt_key)
+
+    def put(self, namespace, prompt_key, entry):
+        with self._lock:
+            entries = self.load_namespace(namespace)
+            entries[prompt_key] = entry
+            tmp_path = f"{self._path(namespace)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self._path(namespace))
+
+
+class DynamoDBTranslationStore:
+    """Translations shared across containers in a DynamoDB table."""
+
+    def __init__(self, table_name, dynamodb_resource=None):
+        if dynamodb_resource is None:
+            import boto3
+            dynamodb_resource = boto3.resource("dynamodb")
+        self.table = dynamodb_resource.Table(table_name)
+
+    def load_namespace(self, namespace):
+        from boto3.dynamodb.conditions import Key
+
+        entries = {}
+        kwargs = {"KeyConditionExpression": Key("namespace").eq(namespace)}
+        while True:
+            response = self.table.query(**kwargs)
+            for item in response.get("Items", []):
+                entries[item["prompt_key"]] = json.loads(item["entry"])
+            if "LastEvaluatedKey" not in response:
+                return entries
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def get(self, namespace, prompt_key):
+        item = self.table.get_item(Key={"namespace": namespace, "prompt_key": prompt_key}).get("Item")
+        return json.loads(item["entry"]) if item else None
+
+    def put(self, namespace, prompt_key, entry):
+        self.table.put_item(Item={"namespace": namespace, "prompt_key": prompt_key, "entry": json.dumps(entry)})
+
+
+class TranslationCache:
+    """In-memory translation cache backed by an optional persistent store.
+
+    Parameters
+    ----------
+    store: LocalTranslationStore, DynamoDBTranslationStore or None
+    similarity_threshold (float): Minimum cosine similarity for paraphrase reuse; 0 disables it
+    embedder (callable): Function returning an embedding vector for a text, used for similarity
+    max_entries (int): Maximum entries kept in memory
+
+    """
+
+    def __init__(self, store=None, similarity_threshold=0.0, embedder=None, max_entries=2048):
+        self.store = store
+        self.similarity_threshold = similarity_threshold if embedder else 0.0
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._loaded_namespaces = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def namespace(database, system_template):
+        """Namespace for a database and system prompt; editing the prompt starts a new namespace."""
+        template_hash = hashlib.sha256((system_template or "").encode("utf-8")).hexdigest()[:12]
+        return f"{database or 'inline'}-{template_hash}"
+
+    @staticmethod
+    def prompt_key(prompt):
+        return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+    def _load(self, namespace):
+        """Pull a namespace from the persistent store into memory, once per container."""
+        with self._lock:
+            if namespace in self._loaded_namespaces or self.store is None:
+                return
+            self._loaded_namespaces.add(namespace)
+        try:
+            stored = self.store.load_namespace(namespace)
+        except Exception as e:
+            print(f"Could not load translation cache {namespace}: {e}")
+            return
+        with self._lock:
+            for prompt_key, entry in stored.items():
+                self._entries.setdefault((namespace, prompt_key), entry)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _embed(self, prompt):
+        try:
+            return self.embedder(normalize_prompt(prompt))
+        except Exception as e:
+            print(f"Could not embed prompt for the translation cache: {e}")
+            return None
+
+    def lookup(self, namespace, prompt):
+        """Return (entry, match) for a usable cached translation, or (None, None).
+
+        match is "exact" or "similar". Entries whose REST call failed are never served.
+        The entry's data is a copy, so callers may change it.
+        """
+        self._load(namespace)
+        key = (namespace, self.prompt_key(prompt))
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.store is not None:
+            # Written by another container since this namespace was loaded
+            try:
+                entry = self.store.get(*key)
+            except Exception as e:
+                print(f"Could not read translation cache entry: {e}")
+            if entry is not None:
+                with self._lock:
+                    self._entries[key] = entry
+                    self._evict()
+        with self._lock:
+            if entry is not None and entry.get("succeeded") is not False:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _served(entry), "exact"
+
+        if self.similarity_threshold > 0:
+            embedding = self._embed(prompt)
+            literals = literal_terms(prompt)
+            if embedding is not None:
+                best_key, best_score = None, 0.0
+                with self._lock:
+                    for other_key, other in self._entries.items():
+                        if (other_key[0] != namespace or other.get("succeeded") is not True
+                                or not other.get("embedding") or other.get("literals") != literals):
+                            continue
+                        score = _cosine(embedding, other["embedding"])
+                        if score > best_score:
+                            best_key, best_score = other_key, score
+                    if best_key is not None and best_score >= self.similarity_threshold:
+                        self._entries.move_to_end(best_key)
+                        self.similar_hits += 1
+                        return _served(self._entries[best_key]), "similar"
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, namespace, prompt, data, raw_response=None):
+        """Store a fresh translation; its outcome is unknown until record_outcome is called."""
+        prompt_key = self.prompt_key(prompt)
+        entry = {
+            "prompt": normalize_prompt(prompt),
+            # Copied, so callers changing their translation afterwards don't change the cache
+            "data": copy.deepcopy(data),
+            "raw_response": raw_response,
+            "succeeded": None,
+            "literals": literal_terms(prompt),
+            "created_at": time.time(),
+        }
+        if self.similarity_threshold > 0:
+            entry["embedding"] = self._embed(prompt)
+        with self._lock:
+            self._entries[(namespace, prompt_key)] = entry
+            self._entries.move_to_end((namespace, prompt_key))
+            self._evict()
+        self._persist(namespace, prompt_key, entry)
+        return prompt_key
+
+    def record_outcome(self, namespace, prompt_key, succeeded):
+        """Record whether the REST call made from a translation succeeded."""
+        with self._lock:
+            entry = self._entries.get((namespace, prompt_key))
+            if entry is None or entry.get("succeeded") == succeeded:
+                return
+            entry["succeeded"] = succeeded
+        self._persist(namespace, prompt_key, entry)
+
+    def _persist(self, namespace, prompt_key, entry):
+        if self.store is None:
+            return
+        try:
+            self.store.put(namespace, prompt_key, entry)
+        except Exception as e:
+            print(f"Could not persist translation cache entry: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+            }
+
+
+def bedrock_embedder(client_factory, model_id=TRANSLATION_EMBEDDING_MODEL):
+    """Build an embedder calling a Bedrock Titan text embedding model."""
+    def embed(text):
+        client = client_factory()
+        if client is None:
+            return None
+        response = client.invoke_model(
+            modelId=model_id,
+            body=json.dumps({"inputText": text, "normalize": True}),
+        )
+        return json.loads(response["body"].read())["embedding"]
+    return embed
+
+
+def create_translation_cache(client_factory=None):
+    """Create the cache configured by the TRANSLATION_CACHE_* environment variables."""
+    if not TRANSLATION_CACHE_ENABLED:
+        return None
+    store = None
+    try:
+        if TRANSLATION_CACHE_TABLE:
+            store = DynamoDBTranslationStore(TRANSLATION_CACHE_TABLE)
+        elif TRANSLATION_CACHE_DIR:
+            store = LocalTranslationStore(TRANSLATION_CACHE_DIR)
+    except Exception as e:
+        print(f"Translation cache persistence disabled: {e}")
+    embedder = None
+    if TRANSLATION_SIMILARITY_THRESHOLD > 0 and client_factory is not None:
+        embedder = bedrock_embedder(client_factory)
+    return TranslationCache(
+        store=store,
+        similarity_threshold=TRANSLATION_SIMILARITY_THRESHOLD,
+        embedder=embedder,
+        max_entries=TRANSLATION_CACHE_MAX_ENTRIES,
+    )
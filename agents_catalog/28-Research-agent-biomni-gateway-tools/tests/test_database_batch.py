@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sys
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+# Add the lambda function path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../prerequisite/lambda-database/python"))
+
+import lambda_function
+
+
+def make_context(tool_name):
+    context = Mock()
+    context.client_context.custom = {
+        'bedrockAgentCoreTargetId': 'RAM62IHPVL',
+        'bedrockAgentCoreGatewayId': 'researchapp-gw-ws6ooojp8n',
+        'bedrockAgentCoreToolName': f'DatabaseLambda___{tool_name}'
+    }
+    return context
+
+
+@pytest.fixture
+def fake_tools(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def slow_lookup(prompt=None, search_term=None):
+        with lock:
+            calls.append(prompt)
+        time.sleep(0.2)
+        return {"success": True, "result": {"prompt": prompt}}
+
+    def failing_lookup(prompt=None, gene_symbol=None, variant_id=None):
+        raise RuntimeError("gnomAD unavailable")
+
+    monkeypatch.setitem(lambda_function.TOOLS, 'query_clinvar', (slow_lookup, {'prompt': None, 'search_term': None}))
+    monkeypatch.setitem(lambda_function.TOOLS, 'query_dbsnp', (slow_lookup, {'prompt': None, 'search_term': None}))
+    monkeypatch.setitem(lambda_function.TOOLS, 'query_gnomad',
+                        (failing_lookup, {'prompt': None, 'gene_symbol': None, 'variant_id': None}))
+    return calls
+
+
+def test_batch_runs_concurrently_and_dedupes(fake_tools):
+    event = {'requests': [
+        {'tool': 'query_clinvar', 'args': {'prompt': 'rs6025'}},
+        {'tool': 'query_dbsnp', 'args': {'prompt': 'rs6025'}},
+        {'tool': 'query_clinvar', 'args': {'prompt': 'rs6025'}},
+        {'tool': 'query_gnomad', 'args': {'gene_symbol': 'F5'}},
+        {'tool': 'query_nothing', 'args': {}},
+    ]}
+
+    start = time.perf_counter()
+    response = lambda_function.lambda_handler(event, make_context('query_batch'))
+    elapsed = time.perf_counter() - start
+
+    body = json.loads(response['body'])
+    results = body['results']
+    assert response['statusCode'] == 200
+    assert body['unique_requests'] == 3
+    assert len(fake_tools) == 2 and elapsed < 0.35
+    assert [r['index'] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]['success'] and results[0]['result'] == {"success": True, "result": {"prompt": "rs6025"}}
+    assert results[2]['duplicate_of'] == 0 and results[2]['result'] == results[0]['result']
+    assert not results[3]['success'] and 'gnomAD unavailable' in results[3]['error']
+    assert results[4]['error'] == 'Unknown tool: query_nothing'
+    assert all('elapsed_ms' in r for r in results[:4])
+
+
+def test_batch_size_limit(fake_tools, monkeypatch):
+    monkeypatch.setattr(lambda_function, 'BATCH_MAX_REQUESTS', 2)
+
+    result = lambda_function.query_batch([{'tool': 'query_clinvar', 'args': {'prompt': str(i)}} for i in range(3)])
+
+    assert 'error' in result and not fake_tools
+
+
+def test_single_tool_dispatch_fills_defaults(fake_tools):
+    response = lambda_function.lambda_handler({'prompt': 'BRCA1'}, make_context('query_clinvar'))
+
+    assert json.loads(response['body']) == {"success": True, "result": {"prompt": "BRCA1"}}
+    assert fake_tools == ['BRCA1']
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add the lambda function path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../prerequisite/lambda-database/python"))
+
+import http_client
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Local API: /etag revalidates with an ETag, /ttl sends no caching headers, /no-store must not be cached"""
+
+    hits = {}
+
+    def do_GET(self):
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        if self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("Cache-Control", "max-age=60")
+                self.end_headers()
+                return
+            self._send_json('{"accession": "P04637"}', {"ETag": '"v1"', "Cache-Control": "no-cache"})
+        elif self.path.startswith("/no-store"):
+            self._send_json('{"value": 1}', {"Cache-Control": "no-store"})
+        else:
+            self._send_json('{"value": %d}' % Handler.hits[self.path], {})
+
+    def _send_json(self, body, headers):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_client, "cache", http_client.HTTPCache(cache_dir=str(tmp_path)))
+    Handler.hits.clear()
+
+
+def test_ttl_cache_serves_repeated_get(server):
+    first = http_client.get(f"{server}/ttl", params={"id": "1"})
+    second = http_client.get(f"{server}/ttl", params={"id": "1"})
+    other = http_client.get(f"{server}/ttl", params={"id": "2"})
+
+    assert first.json() == second.json() == {"value": 1}
+    assert second.from_cache and not first.from_cache and not other.from_cache
+    assert Handler.hits == {"/ttl?id=1": 1, "/ttl?id=2": 1}
+
+
+def test_etag_revalidation(server):
+    first = http_client.get(f"{server}/etag")
+    second = http_client.get(f"{server}/etag")
+    third = http_client.get(f"{server}/etag")
+
+    assert first.json() == second.json() == third.json() == {"accession": "P04637"}
+    # no-cache forces one revalidation, after which the 304's max-age keeps it fresh
+    assert Handler.hits["/etag"] == 2
+    assert http_client.cache.stats()["revalidations"] == 1
+
+
+def test_no_store_is_not_cached(server):
+    http_client.get(f"{server}/no-store")
+    response = http_client.get(f"{server}/no-store")
+
+    assert not response.from_cache
+    assert Handler.hits["/no-store"] == 2
+
+
+def test_disk_tier_survives_memory_loss(server, tmp_path):
+    http_client.get(f"{server}/ttl")
+    http_client.cache = http_client.HTTPCache(cache_dir=str(tmp_path))
+
+    response = http_client.get(f"{server}/ttl")
+
+    assert response.from_cache
+    assert Handler.hits["/ttl"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    def entry(size):
+        return {"status_code": 200, "content": b"x" * size, "headers": {}, "expires_at": 0}
+
+    cache = http_client.HTTPCache(cache_dir=str(tmp_path), disk_max_bytes=4000)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, entry(1000))
+        os.utime(tmp_path / key, (i, i))
+    # Reading "a" from disk makes "b" the least recently used entry
+    cache._entries.clear()
+    assert cache.get("a") is not None
+
+    cache.put("d", entry(1000))
+
+    assert sorted(os.listdir(tmp_path)) == ["a", "c", "d"]
+    assert cache.stats()["disk_bytes"] <= 4000
+    # A new cache over the same directory picks up its size
+    assert http_client.HTTPCache(cache_dir=str(tmp_path)).stats()["disk_bytes"] == cache.stats()["disk_bytes"]
+
+
+def test_freshness_lifetime():
+    assert http_client.freshness_lifetime({"Cache-Control": "public, max-age=120"}, 10) == 120
+    assert http_client.freshness_lifetime({"Cache-Control": "no-store"}, 10) is None
+    assert http_client.freshness_lifetime({"Cache-Control": "no-cache"}, 10) == 0
+    assert http_client.freshness_lifetime({}, 10) == 10
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = http_client.RateLimiter({"eutils.ncbi.nlm.nih.gov": 20.0})
+
+    delays = [limiter.wait("eutils.ncbi.nlm.nih.gov") for _ in range(3)]
+
+    assert delays[0] == 0
+    assert delays[2] == pytest.approx(0.05, abs=0.02)
+    assert limiter.wait("rest.uniprot.org") == 0.0
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import os
+import pickle
+import sys
+
+import pytest
+
+# Add the lambda function path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../prerequisite/lambda-database/python"))
+
+from schema_registry import SchemaRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    with open(tmp_path / "uniprot.pkl", "wb") as f:
+        pickle.dump({"base_url": "https://rest.uniprot.org"}, f)
+    return SchemaRegistry(schema_dir=str(tmp_path))
+
+
+def test_schemas_load_lazily_and_once(registry, tmp_path):
+    assert registry.loaded() == []
+
+    first = registry.get("uniprot")
+    (tmp_path / "uniprot.pkl").unlink()
+    second = registry.get("uniprot")
+
+    assert first is second
+    assert registry.loaded() == ["uniprot"]
+
+
+def test_system_prompt_rendered_once_per_template(registry):
+    template = "UNIPROT REST API SCHEMA:\n{schema}"
+
+    prompt = registry.system_prompt("uniprot", template)
+
+    assert '"base_url": "https://rest.uniprot.org"' in prompt
+    assert registry.system_prompt("uniprot", template) is prompt
+
+
+def test_missing_schema(registry):
+    with pytest.raises(FileNotFoundError):
+        registry.get("monarch")
+
+    assert registry.get("openfda", required=False) is None
+    assert registry.system_prompt("openfda", "SCHEMA: {schema}", required=False) == "SCHEMA: {schema}"
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+import pytest
+
+# Add the lambda function path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../prerequisite/lambda-database/python"))
+
+from translation_cache import LocalTranslationStore, TranslationCache, literal_terms, normalize_prompt
+
+TEMPLATE = "UNIPROT REST API SCHEMA:\n{schema}"
+INSULIN_URL = {"full_url": "https://rest.uniprot.org/uniprotkb/search?query=gene_exact:INS", "description": "insulin"}
+
+
+def bag_of_words_embedder(text):
+    vocabulary = ["find", "human", "insulin", "protein", "information", "about", "get", "details", "brca1", "tp53"]
+    words = text.split()
+    return [float(words.count(term)) for term in vocabulary]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TranslationCache(store=LocalTranslationStore(str(tmp_path)))
+
+
+def test_normalization():
+    assert normalize_prompt("  Find   human insulin?  ") == "find human insulin"
+    assert literal_terms("Variants of BRCA1 in chr17 for P04637") == ["BRCA1", "CHR17", "P04637", "VARIANTS"]
+    assert literal_terms("Find the kras protein") != literal_terms("Find the egfr protein")
+
+
+def test_exact_hit_and_failed_translation(cache):
+    namespace = cache.namespace("uniprot", TEMPLATE)
+    key = cache.put(namespace, "Find human insulin", INSULIN_URL)
+
+    entry, match = cache.lookup(namespace, "find human insulin?")
+    assert (entry["data"], match) == (INSULIN_URL, "exact")
+
+    cache.record_outcome(namespace, key, False)
+    assert cache.lookup(namespace, "Find human insulin") == (None, None)
+
+
+def test_namespaces_are_separate(cache):
+    cache.put(cache.namespace("uniprot", TEMPLATE), "Find human insulin", INSULIN_URL)
+
+    assert cache.lookup(cache.namespace("uniprot", TEMPLATE + " edited"), "Find human insulin") == (None, None)
+    assert cache.lookup(cache.namespace("interpro", TEMPLATE), "Find human insulin") == (None, None)
+
+
+def test_persisted_entries_survive_restart(cache, tmp_path):
+    namespace = cache.namespace("uniprot", TEMPLATE)
+    key = cache.put(namespace, "Find human insulin", INSULIN_URL)
+    cache.record_outcome(namespace, key, True)
+
+    restarted = TranslationCache(store=LocalTranslationStore(str(tmp_path)))
+    entry, match = restarted.lookup(namespace, "Find human insulin")
+
+    assert match == "exact" and entry["succeeded"] is True
+
+
+def test_similarity_requires_validation_and_matching_literals(tmp_path):
+    cache = TranslationCache(similarity_threshold=0.7, embedder=bag_of_words_embedder)
+    namespace = cache.namespace("uniprot", TEMPLATE)
+    key = cache.put(namespace, "Find information about human BRCA1 protein", {"full_url": "brca1"})
+
+    # Not served as a paraphrase until the REST call succeeded
+    assert cache.lookup(namespace, "Get details about human BRCA1 protein") == (None, None)
+
+    cache.record_outcome(namespace, key, True)
+    entry, match = cache.lookup(namespace, "Get information about human BRCA1 protein")
+    assert (entry["data"], match) == ({"full_url": "brca1"}, "similar")
+
+    assert cache.lookup(namespace, "Get information about human TP53 protein") == (None, None)
+
+
+def test_similarity_requires_matching_lowercase_gene_names():
+    def embedder(text):
+        # Ignores gene names entirely, as a real embedding nearly does for one word in a long prompt
+        return [1.0, 0.0]
+
+    cache = TranslationCache(similarity_threshold=0.7, embedder=embedder)
+    namespace = cache.namespace("uniprot", TEMPLATE)
+    key = cache.put(namespace, "Find information about human kras protein", {"full_url": "kras"})
+    cache.record_outcome(namespace, key, True)
+
+    assert cache.lookup(namespace, "Get information about human kras protein")[1] == "similar"
+    assert cache.lookup(namespace, "Get information about human egfr protein") == (None, None)
+
+
+def test_callers_cannot_change_cached_translations(cache):
+    namespace = cache.namespace("uniprot", TEMPLATE)
+    data = {"query": {"type": "terminal"}}
+    cache.put(namespace, "Find human insulin", data)
+    data["request_options"] = {"paginate": {"rows": 3}}
+
+    entry, _ = cache.lookup(namespace, "Find human insulin")
+    entry["data"]["return_type"] = "entry"
+
+    assert cache.lookup(namespace, "Find human insulin")[0]["data"] == {"query": {"type": "terminal"}}
+
+
+def test_cached_translation_skips_llm(tmp_path, monkeypatch):
+    import database
+
+    cache = TranslationCache(store=LocalTranslationStore(str(tmp_path)))
+    monkeypatch.setattr(database, "translation_cache", cache)
+    monkeypatch.setattr(database, "get_bedrock_client", lambda: pytest.fail("LLM should not be called"))
+    cache.put(cache.namespace("uniprot", TEMPLATE), "Find human insulin", INSULIN_URL)
+
+    result = database._query_llm_for_api(prompt="Find human insulin", schema_name="uniprot", system_template=TEMPLATE)
+
+    assert result["success"] and result["data"] == INSULIN_URL and result["cached"] == "exact"
+
+
+def test_repeated_pdb_prompt_uses_its_own_max_results(tmp_path, monkeypatch):
+    import database
+
+    cache = TranslationCache(store=LocalTranslationStore(str(tmp_path)))
+    monkeypatch.setattr(database, "translation_cache", cache)
+    monkeypatch.setattr(database.schema_registry, "system_prompt", lambda *args, **kwargs: "PDB SCHEMA")
+    monkeypatch.setattr(database, "get_bedrock_client", lambda: object())
+    monkeypatch.setattr(database, "invoke_bedrock_model", lambda **kwargs: (
+        '{"query": {"type": "terminal", "service": "full_text", "parameters": {"value": "insulin"}}}'
+    ))
+    sent = []
+
+    def fake_rest_api(endpoint, method="GET", params=None, headers=None, json_data=None, description=None):
+        sent.append(json_data)
+        database._record_translation_outcome(True)
+        return {"success": True, "result": {}}
+
+    monkeypatch.setattr(database, "_query_rest_api", fake_rest_api)
+
+    database.query_pdb("Find structures of human insulin", max_results=3)
+    database.query_pdb("Find structures of human insulin", max_results=50)
+
+    assert [query["request_options"]["paginate"]["rows"] for query in sent] == [3, 50]
+    assert cache.stats()["hits"] == 1
+    assert all("request_options" not in entry["data"] for entry in cache._entries.values())